@@ -0,0 +1,310 @@
+"""Микробенчмарк CRUD операций Database Service со счетчиком SQL запросов.
+
+Запуск из каталога database-service:
+
+    # быстрый прогон на SQLite
+    python -m benchmarks.crud_bench
+
+    # PostgreSQL (все таблицы сервиса будут пересозданы!)
+    python -m benchmarks.crud_bench --database-url postgresql://.../recall_bench --reset
+
+Для каждой операции считается число SQL запросов (через события движка)
+и время выполнения на нескольких размерах таблиц. Если операция выполняет
+больше запросов, чем указано в STATEMENT_BUDGETS, или число запросов растет
+вместе с размером таблицы (N+1), скрипт завершается с кодом 1.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+# Модели импортируют src.database, которому нужен DATABASE_URL
+_default_sqlite = os.path.join(tempfile.gettempdir(), "recall_crud_bench.sqlite3")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_default_sqlite}")
+
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.database import Base  # noqa: E402
+from src.models import User, RefreshToken, Deck, Card  # noqa: E402
+from src.crud import UserCRUD, RefreshTokenCRUD, DeckCRUD, CardCRUD, StatsCRUD  # noqa: E402
+from src.ranks import ranks_between  # noqa: E402
+from src.schemas import (  # noqa: E402
+    UserCreateRequest, UserUpdateRequest, CardCreateRequest, RefreshTokenCreateRequest, ReviewEventItem
+)
+
+# Максимальное число SQL запросов на одну операцию
+# Записи пользователей, колод и карточек включают выделение версии и INSERT события outbox
+STATEMENT_BUDGETS: Dict[str, int] = {
+    "UserCRUD.get_user_by_id": 1,
+    # Пачки загрузчиков сервисов: один запрос на любой размер
+    "UserCRUD.get_users_by_ids[100]": 1,
+    "DeckCRUD.get_decks_by_ids[1]": 1,
+    "CardCRUD.get_cards_by_ids[100]": 1,
+    "UserCRUD.get_user_by_username": 1,
+    "UserCRUD.get_user_by_email": 1,
+    "UserCRUD.create_user": 4,
+    "UserCRUD.update_user": 5,
+    "UserCRUD.delete_user": 7,
+    "UserCRUD.get_users_paginated": 2,
+    "UserCRUD.get_users_paginated[search]": 2,
+    # Вытеснение сессий сверх MAX_SESSIONS_PER_USER: в PostgreSQL — CTE того же
+    # INSERT, в SQLite — отдельный UPDATE
+    "RefreshTokenCRUD.create_refresh_token": 3,
+    # Пачка токенов при отложенной записи входов — один INSERT
+    "RefreshTokenCRUD.create_refresh_tokens[100]": 2,
+    "RefreshTokenCRUD.rotate_refresh_token": 2,
+    "RefreshTokenCRUD.get_refresh_token_by_hash": 1,
+    "RefreshTokenCRUD.get_user_tokens": 1,
+    "RefreshTokenCRUD.revoke_refresh_token": 2,
+    "RefreshTokenCRUD.revoke_all_user_tokens": 1,
+    "RefreshTokenCRUD.cleanup_expired_tokens": 1,
+    "RefreshTokenCRUD.get_tokens_paginated": 2,
+    # Порядок карточек: вставка и перемещение не зависят от размера колоды
+    # (плюс блокировка колоды)
+    "CardCRUD.create_card": 7,
+    "CardCRUD.create_card[after]": 8,
+    "CardCRUD.move_cards[1]": 7,
+    "CardCRUD.move_cards[100]": 7,
+    # Пачка ответов: события и три сводки (дни, колоды, итоги с блокировкой строки)
+    "StatsCRUD.record_events[20]": 7,
+    # Статистика читается только из сводок, журнал событий не просматривается
+    "StatsCRUD.get_user_stats": 3,
+    # Полный сценарий POST /api/v1/users/ (проверки уникальности + создание)
+    "route:create_user": 6,
+}
+
+TOKENS_PER_USER = 3
+
+
+class StatementCounter:
+    """Считает выполненные SQL запросы через событие before_cursor_execute"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed(session_factory, size: int):
+    """Заполнить таблицы: size пользователей, по TOKENS_PER_USER токенов у каждого
+    и колоду из size карточек"""
+    now = datetime.now(timezone.utc)
+    db = session_factory()
+    try:
+        users = [
+            {"username": f"user_{i}", "email": f"user_{i}@bench.local", "password_hash": "x" * 60}
+            for i in range(size)
+        ]
+        for start in range(0, size, 5000):
+            db.execute(insert(User), users[start:start + 5000])
+        db.commit()
+        user_ids = [row[0] for row in db.query(User.id).all()]
+        tokens = []
+        for user_id in user_ids:
+            for _ in range(TOKENS_PER_USER):
+                # Часть токенов просрочена — для cleanup_expired_tokens
+                expired = random.random() < 0.1
+                tokens.append({
+                    "token_hash": uuid.uuid4().hex,
+                    "user_id": user_id,
+                    "expires_at": now + (timedelta(days=-1) if expired else timedelta(days=7)),
+                })
+        for start in range(0, len(tokens), 5000):
+            db.execute(insert(RefreshToken), tokens[start:start + 5000])
+        deck = Deck(owner_id=user_ids[0], title="bench", tags=[], cards_count=size)
+        db.add(deck)
+        db.flush()
+        cards = [
+            {"deck_id": deck.id, "question": f"q{i}", "answer": f"a{i}", "attachments": [], "rank": rank}
+            for i, rank in enumerate(ranks_between(None, None, size))
+        ]
+        for start in range(0, size, 5000):
+            db.execute(insert(Card), cards[start:start + 5000])
+        db.commit()
+        card_ids = [row[0] for row in db.query(Card.id).filter(Card.deck_id == deck.id).all()]
+        return user_ids, [t["token_hash"] for t in tokens], deck.id, card_ids
+    finally:
+        db.close()
+
+
+def build_operations(
+    user_ids: List[int],
+    token_hashes: List[str],
+    deck_id: int,
+    card_ids: List[int]
+) -> Dict[str, Callable]:
+    """Операции бенчмарка; каждая получает сессию и номер итерации"""
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    spare_users = list(user_ids[len(user_ids) // 2:])
+    # Вторая половина пользователей уходит на delete_user, сессии первой
+    # четверти вытесняют create_refresh_token(s): обмен и отзыв берут токены второй
+    quarter = len(user_ids) // 4
+    session_users = user_ids[:quarter]
+    kept_tokens = token_hashes[quarter * TOKENS_PER_USER:len(token_hashes) // 2]
+
+    def route_create_user(db, i):
+        data = UserCreateRequest(username=f"r_{uuid.uuid4().hex[:12]}", email=f"r{i}@bench.local", password_hash="x")
+        if UserCRUD.get_user_by_username(db, data.username) or UserCRUD.get_user_by_email(db, data.email):
+            raise RuntimeError("unexpected duplicate")
+        UserCRUD.create_user(db, data)
+
+    return {
+        "UserCRUD.get_user_by_id": lambda db, i: UserCRUD.get_user_by_id(db, random.choice(user_ids)),
+        "UserCRUD.get_users_by_ids[100]": lambda db, i: UserCRUD.get_users_by_ids(
+            db, random.sample(user_ids, min(100, len(user_ids)))),
+        "DeckCRUD.get_decks_by_ids[1]": lambda db, i: DeckCRUD.get_decks_by_ids(db, [deck_id]),
+        "CardCRUD.get_cards_by_ids[100]": lambda db, i: CardCRUD.get_cards_by_ids(
+            db, random.sample(card_ids, min(100, len(card_ids)))),
+        "UserCRUD.get_user_by_username": lambda db, i: UserCRUD.get_user_by_username(
+            db, f"user_{random.randrange(len(user_ids))}"),
+        "UserCRUD.get_user_by_email": lambda db, i: UserCRUD.get_user_by_email(
+            db, f"user_{random.randrange(len(user_ids))}@bench.local"),
+        "UserCRUD.create_user": lambda db, i: UserCRUD.create_user(db, UserCreateRequest(
+            username=f"c_{uuid.uuid4().hex[:12]}", email=f"c{i}_{uuid.uuid4().hex[:6]}@bench.local",
+            password_hash="x")),
+        "UserCRUD.update_user": lambda db, i: UserCRUD.update_user(
+            db, random.choice(user_ids[:len(user_ids) // 2]), UserUpdateRequest(is_active=bool(i % 2))),
+        "UserCRUD.delete_user": lambda db, i: UserCRUD.delete_user(db, spare_users.pop()),
+        "UserCRUD.get_users_paginated": lambda db, i: UserCRUD.get_users_paginated(db, page=1 + i % 5, limit=20),
+        "UserCRUD.get_users_paginated[search]": lambda db, i: UserCRUD.get_users_paginated(
+            db, page=1, limit=20, search_term=f"user_{i % 10}"),
+        "RefreshTokenCRUD.create_refresh_token": lambda db, i: RefreshTokenCRUD.create_refresh_token(
+            db, uuid.uuid4().hex, random.choice(session_users), expires_at),
+        "RefreshTokenCRUD.create_refresh_tokens[100]": lambda db, i: RefreshTokenCRUD.create_refresh_tokens(db, [
+            RefreshTokenCreateRequest(
+                token_hash=uuid.uuid4().hex, user_id=random.choice(session_users), expires_at=expires_at)
+            for _ in range(100)
+        ]),
+        "RefreshTokenCRUD.get_refresh_token_by_hash": lambda db, i: RefreshTokenCRUD.get_refresh_token_by_hash(
+            db, random.choice(token_hashes)),
+        "RefreshTokenCRUD.get_user_tokens": lambda db, i: RefreshTokenCRUD.get_user_tokens(
+            db, random.choice(user_ids[:len(user_ids) // 2])),
+        "RefreshTokenCRUD.rotate_refresh_token": lambda db, i: RefreshTokenCRUD.rotate_refresh_token(
+            db, kept_tokens[i], uuid.uuid4().hex, expires_at),
+        "RefreshTokenCRUD.revoke_refresh_token": lambda db, i: RefreshTokenCRUD.revoke_refresh_token(
+            db, random.choice(kept_tokens[len(user_ids) // 2:])),
+        "RefreshTokenCRUD.revoke_all_user_tokens": lambda db, i: RefreshTokenCRUD.revoke_all_user_tokens(
+            db, random.choice(user_ids[:len(user_ids) // 2])),
+        "RefreshTokenCRUD.cleanup_expired_tokens": lambda db, i: RefreshTokenCRUD.cleanup_expired_tokens(db),
+        "RefreshTokenCRUD.get_tokens_paginated": lambda db, i: RefreshTokenCRUD.get_tokens_paginated(
+            db, page=1, limit=20, user_id=random.choice(user_ids), is_revoked=False),
+        "CardCRUD.create_card": lambda db, i: CardCRUD.create_card(
+            db, deck_id, CardCreateRequest(question="q", answer="a")),
+        "CardCRUD.create_card[after]": lambda db, i: CardCRUD.create_card(
+            db, deck_id, CardCreateRequest(question="q", answer="a"), after_id=random.choice(card_ids)),
+        "CardCRUD.move_cards[1]": lambda db, i: CardCRUD.move_cards(
+            db, deck_id, [card_ids[i]], before_id=random.choice(card_ids[len(card_ids) // 2:])),
+        "CardCRUD.move_cards[100]": lambda db, i: CardCRUD.move_cards(
+            db, deck_id, random.sample(card_ids[:len(card_ids) // 2], min(100, len(card_ids) // 2)),
+            after_id=random.choice(card_ids[len(card_ids) // 2:])),
+        "StatsCRUD.record_events[20]": lambda db, i: StatsCRUD.record_events(db, random.choice(user_ids[:len(user_ids) // 2]), [
+            ReviewEventItem(
+                event_id=uuid.uuid4().hex, card_id=random.choice(card_ids), performance=random.random(),
+                reviewed_at=time.time() - random.randrange(30) * 86400)
+            for _ in range(20)
+        ]),
+        "StatsCRUD.get_user_stats": lambda db, i: StatsCRUD.get_user_stats(
+            db, random.choice(user_ids[:len(user_ids) // 2]), 30),
+        "route:create_user": route_create_user,
+    }
+
+
+def run_size(engine, session_factory, size: int, iterations: int) -> Dict[str, Dict[str, float]]:
+    """Пересоздать таблицы, заполнить их и прогнать все операции"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    user_ids, token_hashes, deck_id, card_ids = seed(session_factory, size)
+    counter = StatementCounter(engine)
+    results = {}
+
+    for name, operation in build_operations(user_ids, token_hashes, deck_id, card_ids).items():
+        timings = []
+        max_statements = 0
+        for i in range(min(iterations, size // 2)):
+            db = session_factory()
+            try:
+                counter.count = 0
+                start = time.perf_counter()
+                operation(db, i)
+                timings.append((time.perf_counter() - start) * 1e6)
+                max_statements = max(max_statements, counter.count)
+            finally:
+                db.close()
+        timings.sort()
+        results[name] = {
+            "statements": max_statements,
+            "mean_us": round(sum(timings) / len(timings), 1),
+            "p95_us": round(timings[int(len(timings) * 0.95) - 1], 1),
+        }
+
+    event.remove(engine, "before_cursor_execute", counter._on_execute)
+    return results
+
+
+def check(results: Dict[int, Dict[str, Dict[str, float]]]) -> List[str]:
+    """Проверить бюджеты запросов и отсутствие роста числа запросов с размером таблицы"""
+    problems = []
+    for size, ops in results.items():
+        for name, row in ops.items():
+            budget = STATEMENT_BUDGETS.get(name)
+            if budget is None:
+                problems.append(f"{name}: нет бюджета запросов в STATEMENT_BUDGETS")
+            elif row["statements"] > budget:
+                problems.append(f"{name} (size={size}): {row['statements']} запросов > бюджета {budget}")
+    for name in STATEMENT_BUDGETS:
+        counts = {size: ops[name]["statements"] for size, ops in results.items() if name in ops}
+        if len(set(counts.values())) > 1:
+            problems.append(f"{name}: число запросов зависит от размера таблицы {counts} (N+1?)")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк CRUD операций Database Service")
+    parser.add_argument("--database-url", default=os.environ["DATABASE_URL"], help="URL тестовой БД")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Размеры таблицы users через запятую")
+    parser.add_argument("--iterations", type=int, default=200, help="Повторов каждой операции")
+    parser.add_argument("--reset", action="store_true",
+                        help="Разрешить пересоздание таблиц в не-SQLite базе")
+    parser.add_argument("--output", help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    if not args.database_url.startswith("sqlite") and not args.reset:
+        parser.error("для не-SQLite базы нужен флаг --reset: таблицы будут пересозданы")
+
+    engine = create_engine(args.database_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        results[size] = run_size(engine, session_factory, size, args.iterations)
+        print(f"\n== {engine.dialect.name}, users={size}")
+        print(f"{'operation':<46}{'stmts':>6}{'budget':>8}{'mean us':>11}{'p95 us':>11}")
+        for name, row in results[size].items():
+            print(f"{name:<46}{row['statements']:>6}{STATEMENT_BUDGETS.get(name, '-'):>8}"
+                  f"{row['mean_us']:>11}{row['p95_us']:>11}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    problems = check(results)
+    if problems:
+        print("\nНарушены бюджеты SQL запросов:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("\nВсе операции укладываются в бюджеты SQL запросов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
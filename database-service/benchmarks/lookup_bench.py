@@ -0,0 +1,196 @@
+"""Бенчмарк горячих точечных выборок: Query на каждый вызов против готовых запросов.
+
+Запуск из каталога database-service:
+
+    # накладные расходы Python на SQLite
+    python -m benchmarks.lookup_bench
+
+    # PostgreSQL: плюс время планирования и серверные prepared statements
+    # (таблицы сервиса будут пересозданы!)
+    python -m benchmarks.lookup_bench --database-url postgresql+psycopg://.../recall_bench --reset
+
+Для каждой выборки (пользователь по id/username/email, refresh токен по
+хешу) сравнивается прежняя реализация — db.query(...).filter(...).first()
+на каждый вызов — с текущей из src.crud. Время делится на курсор
+(драйвер и база, между before/after_cursor_execute) и остаток —
+накладные расходы Python и SQLAlchemy на вызов. На PostgreSQL скрипт
+также показывает время планирования из EXPLAIN ANALYZE (его экономит
+подготовленный запрос), а для драйвера psycopg 3 — время вызова без
+подготовки и с подготовкой с первого выполнения.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+# Импорт crud_bench задает DATABASE_URL по умолчанию до импорта моделей
+from benchmarks.crud_bench import seed  # noqa: E402
+from sqlalchemy import and_, create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src import crud  # noqa: E402
+from src.crud import UserCRUD, RefreshTokenCRUD  # noqa: E402
+from src.database import Base  # noqa: E402
+from src.models import User, RefreshToken  # noqa: E402
+
+
+def legacy_lookups() -> Dict[str, Callable]:
+    """Реализация до перехода на готовые запросы (для сравнения)"""
+    return {
+        "get_user_by_id": lambda db, value: db.query(User).filter(User.id == value).first(),
+        "get_user_by_username": lambda db, value: db.query(User).filter(User.username == value).first(),
+        "get_user_by_email": lambda db, value: db.query(User).filter(User.email == value).first(),
+        "get_refresh_token_by_hash": lambda db, value: db.query(RefreshToken).filter(
+            and_(
+                RefreshToken.token_hash == value,
+                RefreshToken.is_revoked == False,
+                RefreshToken.expires_at > datetime.now(timezone.utc)
+            )
+        ).first(),
+    }
+
+
+def current_lookups() -> Dict[str, Callable]:
+    return {
+        "get_user_by_id": UserCRUD.get_user_by_id,
+        "get_user_by_username": UserCRUD.get_user_by_username,
+        "get_user_by_email": UserCRUD.get_user_by_email,
+        "get_refresh_token_by_hash": RefreshTokenCRUD.get_refresh_token_by_hash,
+    }
+
+
+class CursorTimer:
+    """Суммарное время внутри cursor.execute (драйвер и база)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0.0
+        self._start = 0.0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, *args):
+        self._start = time.perf_counter()
+
+    def _after(self, *args):
+        self.total += time.perf_counter() - self._start
+
+    def remove(self):
+        event.remove(self.engine, "before_cursor_execute", self._before)
+        event.remove(self.engine, "after_cursor_execute", self._after)
+
+
+def measure(session_factory, timer: CursorTimer, lookup: Callable, values: List, rounds: int) -> Dict[str, float]:
+    """Медиана по раундам: полное время вызова, время курсора и остаток, мкс на вызов"""
+    totals, cursors = [], []
+    for _ in range(rounds):
+        with session_factory() as db:
+            # Прогрев: соединение из пула и кеш компиляции
+            lookup(db, values[0])
+            timer.total = 0.0
+            start = time.perf_counter()
+            for value in values:
+                lookup(db, value)
+                # Без identity map: каждый вызов строит объект заново, как в запросах API
+                db.expunge_all()
+            totals.append((time.perf_counter() - start) / len(values) * 1e6)
+            cursors.append(timer.total / len(values) * 1e6)
+    total, cursor = statistics.median(totals), statistics.median(cursors)
+    return {"total_us": round(total, 1), "cursor_us": round(cursor, 1), "python_us": round(total - cursor, 1)}
+
+
+def planning_times(engine, samples: Dict[str, List], runs: int = 20) -> Dict[str, float]:
+    """Среднее Planning Time из EXPLAIN ANALYZE для текста каждого запроса (PostgreSQL), мс"""
+    statements = {
+        "get_user_by_id": (crud._USER_BY_ID, "user_id"),
+        "get_user_by_username": (crud._USER_BY_USERNAME, "username"),
+        "get_user_by_email": (crud._USER_BY_EMAIL, "email"),
+        "get_refresh_token_by_hash": (crud._ACTIVE_TOKEN_BY_HASH, "token_hash"),
+    }
+    result = {}
+    with engine.connect() as conn:
+        for name, (stmt, key) in statements.items():
+            compiled = stmt.compile(dialect=engine.dialect)
+            times = []
+            for value in samples[name][:runs]:
+                params = compiled.construct_params({key: value, "now": datetime.now(timezone.utc)})
+                plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {compiled}", params).scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                times.append(plan[0]["Planning Time"])
+            result[name] = round(statistics.mean(times), 3)
+    return result
+
+
+def run(engine, args, samples: Dict[str, List]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    timer = CursorTimer(engine)
+    results = {}
+    for variant, lookups in (("legacy", legacy_lookups()), ("current", current_lookups())):
+        results[variant] = {
+            name: measure(session_factory, timer, lookup, samples[name], args.rounds)
+            for name, lookup in lookups.items()
+        }
+    timer.remove()
+    return results
+
+
+def print_results(title: str, results: Dict[str, Dict[str, Dict[str, float]]]):
+    print(f"\n== {title}")
+    print(f"{'lookup':<28}{'before us':>11}{'after us':>10}{'python before':>15}{'python after':>14}{'cursor us':>11}")
+    for name, before in results["legacy"].items():
+        after = results["current"][name]
+        print(f"{name:<28}{before['total_us']:>11}{after['total_us']:>10}"
+              f"{before['python_us']:>15}{after['python_us']:>14}{after['cursor_us']:>11}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк горячих точечных выборок Database Service")
+    parser.add_argument("--database-url", default=None, help="URL тестовой БД (по умолчанию SQLite crud_bench)")
+    parser.add_argument("--users", type=int, default=10000, help="Пользователей в таблице")
+    parser.add_argument("--calls", type=int, default=2000, help="Вызовов в одном раунде")
+    parser.add_argument("--rounds", type=int, default=5, help="Раундов (берется медиана)")
+    parser.add_argument("--reset", action="store_true",
+                        help="Разрешить пересоздание таблиц в не-SQLite базе")
+    args = parser.parse_args()
+
+    url = args.database_url or os.environ["DATABASE_URL"]
+    if not url.startswith("sqlite") and not args.reset:
+        parser.error("для не-SQLite базы нужен флаг --reset: таблицы будут пересозданы")
+
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    user_ids, token_hashes, _, _ = seed(session_factory, args.users)
+
+    rng = random.Random(42)
+    picked = [rng.randrange(len(user_ids)) for _ in range(args.calls)]
+    samples = {
+        "get_user_by_id": [user_ids[i] for i in picked],
+        "get_user_by_username": [f"user_{i}" for i in picked],
+        "get_user_by_email": [f"user_{i}@bench.local" for i in picked],
+        "get_refresh_token_by_hash": rng.sample(token_hashes, min(args.calls, len(token_hashes))),
+    }
+
+    print_results(f"{engine.dialect.name} ({engine.driver}), users={args.users}", run(engine, args, samples))
+
+    if engine.dialect.name == "postgresql":
+        print("\nPlanning Time на каждое выполнение без подготовки, мс:")
+        for name, ms in planning_times(engine, samples).items():
+            print(f"  {name:<28}{ms:>8}")
+        if engine.driver == "psycopg":
+            for threshold in (None, 0):
+                prepared = create_engine(url, connect_args={"prepare_threshold": threshold})
+                label = "без подготовки" if threshold is None else "prepared с первого выполнения"
+                print_results(f"psycopg 3, {label}", run(prepared, args, samples))
+                prepared.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
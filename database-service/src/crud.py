@@ -1,9 +1,62 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from datetime import datetime, timezone
-from typing import Optional, List, Tuple
-from src.models import User, RefreshToken
-from src.schemas import UserCreateRequest, UserUpdateRequest
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, or_, func, insert, update, delete, select, case, any_, bindparam, text, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from heapq import merge
+import os
+from itertools import islice
+from typing import Optional, Dict, List, Sequence, Tuple, Any
+from src.models import (
+    User, RefreshToken, Deck, Card, CardReview, Tombstone, SyncStream,
+    OutboxEvent, OutboxCursor, OutboxDeadLetter,
+    ReviewEvent, StudyUserStats, StudyDailyStats, StudyDeckStats
+)
+from src.ranks import ranks_between
+from src.schemas import (
+    UserCreateRequest, UserUpdateRequest,
+    DeckCreateRequest, DeckUpdateRequest,
+    CardCreateRequest, CardUpdateRequest, CardHtmlUpdateRequest,
+    CardReviewState, RefreshTokenCreateRequest, ReviewEventItem
+)
+
+# Карточек в одном UPDATE ... CASE при перебалансировке колоды
+REBALANCE_CHUNK = 1000
+
+# Сессий (refresh токенов) на пользователя: при входе сверх лимита отзываются
+# самые старые; 0 — без ограничения
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", "10"))
+
+
+def _id_in(db: Session, column, ids: Sequence[int]):
+    """Условие выборки пачки по ID.
+
+    В PostgreSQL — ``id = ANY(:ids)`` с одним параметром-массивом: текст
+    запроса не зависит от размера пачки, и план переиспользуется. В SQLite
+    массивов нет — обычный IN.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(bindparam("ids", list(ids), type_=postgresql.ARRAY(Integer)))
+    return column.in_(list(ids))
+
+
+# Горячие точечные выборки собраны один раз при импорте: значения приходят
+# через bindparam, поэтому у каждого запроса один текст SQL. SQLAlchemy
+# запоминает ключ кеша на самом объекте запроса и берет готовую компиляцию
+# из кеша движка, не строя Query/select на каждый вызов; драйвер с
+# серверной подготовкой (psycopg 3, см. DB_PREPARE_THRESHOLD) после
+# нескольких выполнений переиспользует план PostgreSQL.
+_USER_BY_ID = select(User).where(User.id == bindparam("user_id")).limit(1)
+_USER_BY_USERNAME = select(User).where(User.username == bindparam("username")).limit(1)
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email")).limit(1)
+_TOKEN_BY_HASH = select(RefreshToken).where(RefreshToken.token_hash == bindparam("token_hash")).limit(1)
+_ACTIVE_TOKEN_BY_HASH = select(RefreshToken).where(
+    RefreshToken.token_hash == bindparam("token_hash"),
+    RefreshToken.is_revoked == False,
+    RefreshToken.expires_at > bindparam("now")
+).limit(1)
+
 
 class UserCRUD:
     """CRUD операции для пользователей"""
@@ -11,17 +64,22 @@ class UserCRUD:
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
         """Получить пользователя по ID"""
-        return db.query(User).filter(User.id == user_id).first()
+        return db.scalars(_USER_BY_ID, {"user_id": user_id}).first()
+    
+    @staticmethod
+    def get_users_by_ids(db: Session, user_ids: Sequence[int]) -> List[Any]:
+        """ID и имена пользователей по списку ID одним запросом (несуществующие пропускаются)"""
+        return db.query(User.id, User.username).filter(_id_in(db, User.id, user_ids)).all()
     
     @staticmethod
     def get_user_by_username(db: Session, username: str) -> Optional[User]:
         """Получить пользователя по имени пользователя"""
-        return db.query(User).filter(User.username == username).first()
+        return db.scalars(_USER_BY_USERNAME, {"username": username}).first()
     
     @staticmethod
     def get_user_by_email(db: Session, email: str) -> Optional[User]:
         """Получить пользователя по email"""
-        return db.query(User).filter(User.email == email).first()
+        return db.scalars(_USER_BY_EMAIL, {"email": email}).first()
     
     @staticmethod
     def create_user(db: Session, user_data: UserCreateRequest) -> User:
@@ -29,9 +87,17 @@ class UserCRUD:
         db_user = User(
             username=user_data.username,
             email=user_data.email,
-            password_hash=user_data.password_hash
+            password_hash=user_data.password_hash,
+            version=1
         )
         db.add(db_user)
+        db.flush()
+        # Поток версий нового пользователя начинается с 1; строка потока
+        # может остаться от удаленного пользователя с тем же ID (SQLite)
+        version = SyncCRUD.next_versions(db, db_user.id)
+        if version != db_user.version:
+            db_user.version = version
+        OutboxCRUD.add_events(db, [OutboxCRUD.user_event(db_user, "user.created")])
         db.commit()
         db.refresh(db_user)
         return db_user
@@ -46,6 +112,8 @@ class UserCRUD:
         update_data = user_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(user, field, value)
+        user.version = SyncCRUD.next_versions(db, user.id)
+        OutboxCRUD.add_events(db, [OutboxCRUD.user_event(user, "user.updated")])
         
         db.commit()
         db.refresh(user)
@@ -58,10 +126,42 @@ class UserCRUD:
         if not user:
             return False
         
+        # Колоды удаляются каскадно: подписчики (поиск) получают событие по каждой.
+        # Блокировка колод до потока версий — тот же порядок, что в операциях с карточками
+        deck_ids = [
+            deck_id for (deck_id,) in
+            db.query(Deck.id).filter(Deck.owner_id == user_id).order_by(Deck.id).with_for_update()
+        ]
+        first = SyncCRUD.next_versions(db, user_id, len(deck_ids) + 1) - len(deck_ids)
+        events = [
+            ("deck.deleted", f"deck:{deck_id}", {"deck_id": deck_id, "owner_id": user_id, "version": first + i})
+            for i, deck_id in enumerate(deck_ids)
+        ]
+        user.version = first + len(deck_ids)
+        events.append(OutboxCRUD.user_event(user, "user.deleted"))
+        OutboxCRUD.add_events(db, events)
         db.delete(user)
         db.commit()
         return True
     
+    @staticmethod
+    def get_user_version(
+        db: Session,
+        user_id: Optional[int] = None,
+        username: Optional[str] = None,
+        email: Optional[str] = None
+    ) -> Optional[Tuple[int, int]]:
+        """(id, version) пользователя по уникальному индексу — без загрузки строки целиком"""
+        query = db.query(User.id, User.version)
+        if user_id is not None:
+            query = query.filter(User.id == user_id)
+        elif username is not None:
+            query = query.filter(User.username == username)
+        else:
+            query = query.filter(User.email == email)
+        row = query.first()
+        return (row.id, row.version) if row else None
+    
     @staticmethod
     def get_users_paginated(
         db: Session, 
@@ -88,33 +188,145 @@ class UserCRUD:
 class RefreshTokenCRUD:
     """CRUD операции для refresh токенов"""
     
+    @staticmethod
+    def _insert_tokens(db: Session, stmt, incoming: Dict[int, int]):
+        """Выполнить INSERT токенов, отозвав самые старые сессии их владельцев сверх лимита.
+
+        incoming — число вставляемых токенов каждого владельца: у владельца
+        с k новыми токенами остается MAX_SESSIONS_PER_USER - k прежних
+        действующих сессий. Лишние отзываются, а не удаляются: с revoked_at
+        они попадают в дельту снимка отзыва, и User Service перестает
+        принимать их сразу, а не после следующего полного снимка. В
+        PostgreSQL отзыв идет CTE того же оператора, в SQLite — отдельным
+        оператором той же транзакции; оба видят таблицу до вставки.
+        """
+        if MAX_SESSIONS_PER_USER <= 0:
+            return db.execute(stmt)
+        ranked = select(
+            RefreshToken.id,
+            RefreshToken.user_id,
+            func.row_number().over(
+                partition_by=RefreshToken.user_id,
+                order_by=(RefreshToken.created_at.desc(), RefreshToken.id.desc())
+            ).label("position")
+        ).where(
+            RefreshToken.user_id.in_(sorted(incoming)),
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.now(timezone.utc)
+        ).subquery()
+        # Владельцы группируются по числу новых токенов: почти всегда одна
+        # группа (k = 1), и текст запроса не зависит от состава пачки
+        by_count: Dict[int, List[int]] = defaultdict(list)
+        for user_id, count in incoming.items():
+            by_count[min(count, MAX_SESSIONS_PER_USER)].append(user_id)
+        over_limit = or_(*(
+            and_(ranked.c.user_id.in_(sorted(user_ids)), ranked.c.position > MAX_SESSIONS_PER_USER - count)
+            for count, user_ids in sorted(by_count.items())
+        ))
+        evict = update(RefreshToken).where(
+            RefreshToken.id.in_(select(ranked.c.id).where(over_limit))
+        ).values(is_revoked=True, revoked_at=func.now()).execution_options(synchronize_session=False)
+        if db.get_bind().dialect.name == "postgresql":
+            return db.execute(stmt.add_cte(evict.returning(RefreshToken.id).cte("evicted")))
+        db.execute(evict)
+        return db.execute(stmt)
+    
     @staticmethod
     def create_refresh_token(
         db: Session, 
         token_hash: str, 
         user_id: int, 
-        expires_at: datetime
+        expires_at: datetime,
+        family_id: Optional[str] = None
     ) -> RefreshToken:
-        """Создать новый refresh токен"""
-        db_token = RefreshToken(
+        """Создать новый refresh токен (сессию) с учетом лимита сессий пользователя"""
+        stmt = insert(RefreshToken).values(
             token_hash=token_hash,
             user_id=user_id,
-            expires_at=expires_at
-        )
-        db.add(db_token)
+            expires_at=expires_at,
+            family_id=family_id
+        ).returning(RefreshToken)
+        db_token = RefreshTokenCRUD._insert_tokens(db, stmt, {user_id: 1}).scalar_one()
         db.commit()
         db.refresh(db_token)
         return db_token
     
+    @staticmethod
+    def create_refresh_tokens(db: Session, tokens: List[RefreshTokenCreateRequest]) -> int:
+        """Создать пачку токенов одним INSERT; уже сохраненные хеши пропускаются (повтор пачки безопасен).
+
+        Больше MAX_SESSIONS_PER_USER токенов одного владельца в пачке не
+        вставляется: лишние — самые ранние входы — вытеснил бы уже лимит.
+        """
+        per_user: Dict[int, List[RefreshTokenCreateRequest]] = defaultdict(list)
+        for token in tokens:
+            per_user[token.user_id].append(token)
+        if MAX_SESSIONS_PER_USER > 0:
+            tokens = [
+                token for user_tokens in per_user.values()
+                for token in user_tokens[-MAX_SESSIONS_PER_USER:]
+            ]
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(RefreshToken).values([token.model_dump() for token in tokens])
+        stmt = stmt.on_conflict_do_nothing(index_elements=[RefreshToken.token_hash])
+        incoming = {user_id: len(user_tokens) for user_id, user_tokens in per_user.items()}
+        created = RefreshTokenCRUD._insert_tokens(db, stmt, incoming).rowcount
+        db.commit()
+        return created
+    
+    @staticmethod
+    def rotate_refresh_token(
+        db: Session,
+        token_hash: str,
+        new_token_hash: str,
+        expires_at: datetime,
+        user_id: Optional[int] = None,
+        family_id: Optional[str] = None
+    ) -> Tuple[Optional[RefreshToken], bool]:
+        """Обменять действующий токен на новый одним UPDATE ... RETURNING.
+
+        Возвращает (токен, reused). Если токен не найден, но сессия его
+        семейства (family_id из подписанного токена) жива с другим хешем,
+        или это прежний хеш какой-то сессии, токен одного из прежних поколений
+        использован повторно — украден или перехвачен: сессия отзывается,
+        reused = True.
+        """
+        conditions = [
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > datetime.now(timezone.utc)
+        ]
+        if user_id is not None:
+            conditions.append(RefreshToken.user_id == user_id)
+        stmt = update(RefreshToken).where(and_(*conditions)).values(
+            token_hash=new_token_hash,
+            previous_hash=token_hash,
+            expires_at=expires_at,
+            rotated_at=func.now()
+        ).returning(RefreshToken).execution_options(synchronize_session=False)
+        token = db.execute(stmt).scalar_one_or_none()
+        if token is not None:
+            db.commit()
+            db.refresh(token)
+            return token, False
+        
+        reused_conditions = [RefreshToken.previous_hash == token_hash]
+        if family_id is not None:
+            family = [RefreshToken.family_id == family_id, RefreshToken.token_hash != token_hash]
+            if user_id is not None:
+                family.append(RefreshToken.user_id == user_id)
+            reused_conditions.append(and_(*family))
+        reused = db.query(RefreshToken).filter(
+            or_(*reused_conditions)
+        ).update({"is_revoked": True, "revoked_at": func.now()}, synchronize_session=False)
+        db.commit()
+        return None, reused > 0
+    
     @staticmethod
     def get_refresh_token_by_hash(db: Session, token_hash: str) -> Optional[RefreshToken]:
         """Получить refresh токен по хешу"""
-        return db.query(RefreshToken).filter(
-            and_(
-                RefreshToken.token_hash == token_hash,
-                RefreshToken.is_revoked == False,
-                RefreshToken.expires_at > datetime.now(timezone.utc)
-            )
+        return db.scalars(
+            _ACTIVE_TOKEN_BY_HASH, {"token_hash": token_hash, "now": datetime.now(timezone.utc)}
         ).first()
     
     @staticmethod
@@ -123,13 +335,41 @@ class RefreshTokenCRUD:
         return db.query(RefreshToken).filter(RefreshToken.user_id == user_id).all()
     
     @staticmethod
-    def revoke_refresh_token(db: Session, token_hash: str) -> bool:
-        """Отозвать refresh токен"""
-        token = db.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).first()
+    def revoke_refresh_token(
+        db: Session,
+        token_hash: str,
+        user_id: Optional[int] = None,
+        expires_at: Optional[datetime] = None
+    ) -> bool:
+        """Отозвать refresh токен.
+
+        С user_id и expires_at неизвестный хеш сохраняется сразу отозванным:
+        токен может еще ждать в очереди отложенной записи другого воркера
+        User Service, и его INSERT ... ON CONFLICT DO NOTHING тогда проиграет
+        конфликт, а не запишет выход из системы как активную сессию.
+        """
+        token = db.scalars(_TOKEN_BY_HASH, {"token_hash": token_hash}).first()
         if not token:
-            return False
+            if user_id is None or expires_at is None:
+                return False
+            dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+            stmt = dialect.insert(RefreshToken).values(
+                token_hash=token_hash,
+                user_id=user_id,
+                expires_at=expires_at,
+                is_revoked=True,
+                revoked_at=func.now()
+            ).on_conflict_do_nothing(index_elements=[RefreshToken.token_hash])
+            if db.execute(stmt).rowcount:
+                db.commit()
+                return True
+            # Пачка успела записать токен между выборкой и вставкой — отзываем его
+            token = db.scalars(_TOKEN_BY_HASH, {"token_hash": token_hash}).first()
+            if not token:
+                return False
         
         token.is_revoked = True
+        token.revoked_at = func.now()
         db.commit()
         return True
     
@@ -141,10 +381,40 @@ class RefreshTokenCRUD:
                 RefreshToken.user_id == user_id,
                 RefreshToken.is_revoked == False
             )
-        ).update({"is_revoked": True})
+        ).update({"is_revoked": True, "revoked_at": func.now()}, synchronize_session=False)
+        db.commit()
+        return count
+    
+    @staticmethod
+    def delete_user_tokens(db: Session, user_id: int) -> int:
+        """Удалить все токены пользователя (в шардах без внешнего ключа на users)"""
+        count = db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
         db.commit()
         return count
     
+    @staticmethod
+    def get_revocation_state(db: Session, since: Optional[datetime] = None) -> Tuple[List[str], List[str]]:
+        """Хеши действующих и отозванных непросроченных токенов.
+
+        С since — только созданные, отозванные или обмененные позже него (дельта
+        снимка отзыва). Прежние хеши обмененных токенов считаются отозванными.
+        """
+        query = db.query(RefreshToken.token_hash, RefreshToken.is_revoked, RefreshToken.previous_hash).filter(
+            RefreshToken.expires_at > datetime.now(timezone.utc)
+        )
+        if since is not None:
+            query = query.filter(or_(
+                RefreshToken.created_at > since,
+                RefreshToken.revoked_at > since,
+                RefreshToken.rotated_at > since
+            ))
+        active, revoked = [], []
+        for token_hash, is_revoked, previous_hash in query:
+            (revoked if is_revoked else active).append(token_hash)
+            if previous_hash:
+                revoked.append(previous_hash)
+        return active, revoked
+    
     @staticmethod
     def cleanup_expired_tokens(db: Session) -> int:
         """Удалить просроченные токены"""
@@ -172,6 +442,866 @@ class RefreshTokenCRUD:
             query = query.filter(RefreshToken.is_revoked == is_revoked)
         
         total = query.count()
-        tokens = query.offset((page - 1) * limit).limit(limit).all()
+        # Общий порядок нужен для слияния страниц из нескольких шардов
+        tokens = query.order_by(RefreshToken.created_at, RefreshToken.id).offset((page - 1) * limit).limit(limit).all()
+        
+        return tokens, total 
+
+class DeckCRUD:
+    """CRUD операции для колод"""
+    
+    @staticmethod
+    def get_deck_by_id(db: Session, deck_id: int) -> Optional[Deck]:
+        """Получить колоду по ID"""
+        return db.query(Deck).filter(Deck.id == deck_id).first()
+    
+    @staticmethod
+    def get_decks_by_ids(db: Session, deck_ids: Sequence[int]) -> List[Deck]:
+        """Колоды по списку ID одним запросом (несуществующие пропускаются)"""
+        return db.query(Deck).filter(_id_in(db, Deck.id, deck_ids)).all()
+    
+    @staticmethod
+    def get_deck_version(db: Session, deck_id: int) -> Optional[int]:
+        """Версия колоды (для проверки ETag)"""
+        return db.query(Deck.version).filter(Deck.id == deck_id).scalar()
+    
+    @staticmethod
+    def create_deck(db: Session, deck_data: DeckCreateRequest) -> Deck:
+        """Создать новую колоду"""
+        db_deck = Deck(**deck_data.model_dump(), version=SyncCRUD.next_versions(db, deck_data.owner_id))
+        db.add(db_deck)
+        db.flush()
+        OutboxCRUD.add_events(db, [OutboxCRUD.deck_upserted(db_deck)])
+        db.commit()
+        db.refresh(db_deck)
+        return db_deck
+    
+    @staticmethod
+    def update_deck(db: Session, deck_id: int, deck_data: DeckUpdateRequest) -> Optional[Deck]:
+        """Обновить колоду"""
+        deck = db.query(Deck).filter(Deck.id == deck_id).first()
+        if not deck:
+            return None
+        
+        deck.version = SyncCRUD.next_versions(db, deck.owner_id)
+        for field, value in deck_data.model_dump(exclude_unset=True).items():
+            setattr(deck, field, value)
+        OutboxCRUD.add_events(db, [OutboxCRUD.deck_upserted(deck)])
+        
+        db.commit()
+        db.refresh(deck)
+        return deck
+    
+    @staticmethod
+    def delete_deck(db: Session, deck_id: int) -> bool:
+        """Удалить колоду вместе с карточками.
+
+        Надгробие пишется только для колоды: клиент удаляет ее карточки и их
+        состояния повторения сам.
+        """
+        owner_id = db.query(Deck.owner_id).filter(Deck.id == deck_id).with_for_update().scalar()
+        if owner_id is None:
+            return False
+        version = SyncCRUD.add_tombstones(db, "deck", [(deck_id, deck_id)], owner_id)
+        OutboxCRUD.add_events(db, [
+            ("deck.deleted", f"deck:{deck_id}", {"deck_id": deck_id, "owner_id": owner_id, "version": version})
+        ])
+        db.query(Deck).filter(Deck.id == deck_id).delete(synchronize_session=False)
+        db.commit()
+        return True
+    
+    @staticmethod
+    def get_decks_paginated(
+        db: Session,
+        page: int = 1,
+        limit: int = 10,
+        owner_id: Optional[int] = None,
+        is_public: Optional[bool] = None,
+        search_term: Optional[str] = None
+    ) -> Tuple[List[Deck], int]:
+        """Получить колоды с пагинацией"""
+        query = db.query(Deck)
+        
+        if owner_id is not None:
+            query = query.filter(Deck.owner_id == owner_id)
+        
+        if is_public is not None:
+            query = query.filter(Deck.is_public == is_public)
+        
+        if search_term:
+            query = query.filter(
+                or_(
+                    Deck.title.ilike(f"%{search_term}%"),
+                    Deck.description.ilike(f"%{search_term}%")
+                )
+            )
+        
+        total = query.count()
+        decks = query.order_by(Deck.id).offset((page - 1) * limit).limit(limit).all()
         
-        return tokens, total 
\ No newline at end of file
+        return decks, total
+
+class CardCRUD:
+    """CRUD операции для карточек"""
+    
+    @staticmethod
+    def get_card_by_id(db: Session, card_id: int) -> Optional[Card]:
+        """Получить карточку по ID"""
+        return db.query(Card).filter(Card.id == card_id).first()
+    
+    @staticmethod
+    def get_cards_by_ids(db: Session, card_ids: Sequence[int]) -> List[Card]:
+        """Карточки по списку ID одним запросом (несуществующие пропускаются)"""
+        return db.query(Card).filter(_id_in(db, Card.id, card_ids)).all()
+    
+    @staticmethod
+    def create_card(
+        db: Session,
+        deck_id: int,
+        card_data: CardCreateRequest,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> Optional[Card]:
+        """Создать карточку после after_id / перед before_id (по умолчанию в конце колоды).
+
+        None, если соседняя карточка не найдена в колоде.
+        """
+        owner_id = CardCRUD._lock_deck(db, deck_id)
+        ranks = CardCRUD._place(db, deck_id, owner_id, 1, after_id, before_id)
+        if ranks is None:
+            return None
+        db_card = Card(
+            deck_id=deck_id, rank=ranks[0], version=SyncCRUD.next_versions(db, owner_id), **card_data.model_dump()
+        )
+        db.add(db_card)
+        db.flush()
+        OutboxCRUD.add_events(db, [OutboxCRUD.card_upserted(db_card)])
+        db.query(Deck).filter(Deck.id == deck_id).update(
+            {Deck.cards_count: Deck.cards_count + 1}, synchronize_session=False
+        )
+        db.commit()
+        db.refresh(db_card)
+        return db_card
+    
+    @staticmethod
+    def create_cards_bulk(db: Session, deck_id: int, cards: List[CardCreateRequest]) -> int:
+        """Добавить пачку карточек в конец колоды одним multi-row INSERT"""
+        owner_id = CardCRUD._lock_deck(db, deck_id)
+        ranks = ranks_between(CardCRUD._last_rank(db, deck_id), None, len(cards))
+        first = SyncCRUD.next_versions(db, owner_id, len(cards)) - len(cards) + 1
+        rows = [
+            {"deck_id": deck_id, "rank": rank, "version": first + i, **card_data.model_dump()}
+            for i, (card_data, rank) in enumerate(zip(cards, ranks))
+        ]
+        # Список параметров выполняется как executemany: для PostgreSQL SQLAlchemy
+        # собирает его в INSERT ... VALUES (...), (...) пачками (insertmanyvalues)
+        created = db.execute(
+            insert(Card).returning(Card.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        OutboxCRUD.add_events(db, [
+            ("card.upserted", f"deck:{deck_id}", {
+                "card_id": card_id, "deck_id": deck_id, "question": row["question"], "answer": row["answer"],
+                "version": row["version"]
+            })
+            for card_id, row in zip(created, rows)
+        ])
+        db.query(Deck).filter(Deck.id == deck_id).update(
+            {Deck.cards_count: Deck.cards_count + len(rows)}, synchronize_session=False
+        )
+        db.commit()
+        return len(rows)
+    
+    @staticmethod
+    def move_cards(
+        db: Session,
+        deck_id: int,
+        card_ids: List[int],
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> Optional[List[Tuple[int, str]]]:
+        """Поставить карточки подряд в указанном порядке после after_id / перед before_id.
+
+        Меняются только ключи перемещаемых карточек, одним UPDATE. None, если
+        какая-то карточка не из колоды; ValueError при некорректном месте.
+        """
+        card_ids = list(dict.fromkeys(card_ids))
+        if after_id in card_ids or before_id in card_ids:
+            raise ValueError("Соседняя карточка не может быть среди перемещаемых")
+        owner_id = CardCRUD._lock_deck(db, deck_id)
+        found = db.query(func.count(Card.id)).filter(Card.deck_id == deck_id, Card.id.in_(card_ids)).scalar()
+        if found != len(card_ids):
+            return None
+        ranks = CardCRUD._place(db, deck_id, owner_id, len(card_ids), after_id, before_id, exclude=card_ids)
+        if ranks is None:
+            return None
+        version = CardCRUD._update_ranks(db, owner_id, card_ids, ranks)
+        OutboxCRUD.add_events(db, [OutboxCRUD.cards_reordered(deck_id, version)])
+        db.commit()
+        return list(zip(card_ids, ranks))
+    
+    @staticmethod
+    def rebalance_deck(db: Session, deck_id: int) -> int:
+        """Заново раздать короткие ключи всем карточкам колоды в текущем порядке"""
+        owner_id = CardCRUD._lock_deck(db, deck_id)
+        count = CardCRUD._rebalance(db, deck_id, owner_id)
+        db.commit()
+        return count
+    
+    @staticmethod
+    def _rebalance(db: Session, deck_id: int, owner_id: int) -> int:
+        card_ids = [
+            card_id for (card_id,) in
+            db.query(Card.id).filter(Card.deck_id == deck_id).order_by(Card.rank, Card.id)
+        ]
+        ranks = ranks_between(None, None, len(card_ids))
+        version = None
+        for start in range(0, len(card_ids), REBALANCE_CHUNK):
+            version = CardCRUD._update_ranks(
+                db, owner_id, card_ids[start:start + REBALANCE_CHUNK], ranks[start:start + REBALANCE_CHUNK]
+            )
+        if version is not None:
+            OutboxCRUD.add_events(db, [OutboxCRUD.cards_reordered(deck_id, version)])
+        return len(card_ids)
+    
+    @staticmethod
+    def _update_ranks(db: Session, owner_id: int, card_ids: List[int], ranks: List[str]) -> int:
+        """Новые ключи порядка и версии карточек одним UPDATE ... CASE; вернуть последнюю версию"""
+        last = SyncCRUD.next_versions(db, owner_id, len(card_ids))
+        versions = range(last - len(card_ids) + 1, last + 1)
+        if len(card_ids) == 1:
+            values = {Card.rank: ranks[0], Card.version: last}
+        else:
+            values = {
+                Card.rank: case(dict(zip(card_ids, ranks)), value=Card.id),
+                Card.version: case(dict(zip(card_ids, versions)), value=Card.id)
+            }
+        db.query(Card).filter(Card.id.in_(card_ids)).update(values, synchronize_session=False)
+        return last
+    
+    @staticmethod
+    def _lock_deck(db: Session, deck_id: int) -> Optional[int]:
+        """Блокировка строки колоды (PostgreSQL) упорядочивает вставки, перемещения и перебалансировку.
+
+        Берется до потока версий: порядок блокировок колода -> поток владельца
+        одинаков во всех операциях. Возвращает владельца колоды (его поток версий).
+        """
+        return db.query(Deck.owner_id).filter(Deck.id == deck_id).with_for_update().scalar()
+    
+    @staticmethod
+    def _last_rank(db: Session, deck_id: int, exclude: Sequence[int] = ()) -> Optional[str]:
+        query = db.query(func.max(Card.rank)).filter(Card.deck_id == deck_id)
+        if exclude:
+            query = query.filter(Card.id.notin_(exclude))
+        return query.scalar()
+    
+    @staticmethod
+    def _place(
+        db: Session,
+        deck_id: int,
+        owner_id: int,
+        count: int,
+        after_id: Optional[int],
+        before_id: Optional[int],
+        exclude: Sequence[int] = ()
+    ) -> Optional[List[str]]:
+        """count новых ключей для места в колоде; None, если соседней карточки нет в колоде"""
+        for attempt in range(2):
+            bounds = CardCRUD._neighbor_ranks(db, deck_id, after_id, before_id, exclude)
+            if bounds is None:
+                return None
+            lower, upper = bounds
+            if lower is None or upper is None or lower < upper:
+                return ranks_between(lower, upper, count)
+            if lower != upper or attempt:
+                raise ValueError("Карточка after_id должна стоять перед before_id")
+            # Одинаковые ключи (одновременные вставки в одно место): перебалансируем и повторяем
+            CardCRUD._rebalance(db, deck_id, owner_id)
+        return None
+    
+    @staticmethod
+    def _neighbor_ranks(
+        db: Session,
+        deck_id: int,
+        after_id: Optional[int],
+        before_id: Optional[int],
+        exclude: Sequence[int]
+    ) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Ключи карточек, между которыми встает вставка"""
+        def card_key(card_id: int):
+            return db.query(Card.rank, Card.id).filter(Card.id == card_id, Card.deck_id == deck_id).first()
+        
+        others = db.query(Card.rank).filter(Card.deck_id == deck_id)
+        if exclude:
+            others = others.filter(Card.id.notin_(exclude))
+        after = card_key(after_id) if after_id is not None else None
+        before = card_key(before_id) if before_id is not None else None
+        if (after_id is not None and after is None) or (before_id is not None and before is None):
+            return None
+        if after is not None and before is not None:
+            return after.rank, before.rank
+        if after is not None:
+            upper = others.filter(or_(
+                Card.rank > after.rank,
+                and_(Card.rank == after.rank, Card.id > after.id)
+            )).order_by(Card.rank, Card.id).limit(1).scalar()
+            return after.rank, upper
+        if before is not None:
+            lower = others.filter(or_(
+                Card.rank < before.rank,
+                and_(Card.rank == before.rank, Card.id < before.id)
+            )).order_by(Card.rank.desc(), Card.id.desc()).limit(1).scalar()
+            return lower, before.rank
+        return CardCRUD._last_rank(db, deck_id, exclude), None
+    
+    @staticmethod
+    def update_card(db: Session, card_id: int, card_data: CardUpdateRequest) -> Optional[Card]:
+        """Обновить карточку"""
+        card = db.query(Card).filter(Card.id == card_id).first()
+        if not card:
+            return None
+        
+        owner_id = db.query(Deck.owner_id).filter(Deck.id == card.deck_id).scalar()
+        card.version = SyncCRUD.next_versions(db, owner_id)
+        for field, value in card_data.model_dump(exclude_unset=True).items():
+            setattr(card, field, value)
+        OutboxCRUD.add_events(db, [OutboxCRUD.card_upserted(card)])
+        
+        db.commit()
+        db.refresh(card)
+        return card
+    
+    @staticmethod
+    def update_card_html(db: Session, card_id: int, html_data: CardHtmlUpdateRequest) -> bool:
+        """Сохранить отрендеренный HTML карточки (без изменения updated_at)"""
+        updated = db.query(Card).filter(Card.id == card_id).update(
+            {
+                Card.question_html: html_data.question_html,
+                Card.answer_html: html_data.answer_html,
+                Card.html_key: html_data.html_key,
+                Card.updated_at: Card.updated_at
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        return updated > 0
+    
+    @staticmethod
+    def delete_card(db: Session, card_id: int) -> bool:
+        """Удалить карточку"""
+        card = db.query(Card).filter(Card.id == card_id).first()
+        if not card:
+            return False
+        
+        # Порядок блокировок: колода, поток версий владельца, затем карточка и ее состояния повторения
+        owner_id = db.query(Deck.owner_id).filter(Deck.id == card.deck_id).with_for_update().scalar()
+        version = SyncCRUD.add_tombstones(db, "card", [(card.id, card.deck_id)], owner_id)
+        OutboxCRUD.add_events(db, [
+            ("card.deleted", f"deck:{card.deck_id}",
+             {"card_id": card.id, "deck_id": card.deck_id, "version": version})
+        ])
+        db.delete(card)
+        db.query(Deck).filter(Deck.id == card.deck_id).update(
+            {Deck.cards_count: Deck.cards_count - 1}, synchronize_session=False
+        )
+        db.commit()
+        return True
+    
+    @staticmethod
+    def get_deck_cards_paginated(
+        db: Session,
+        deck_id: int,
+        page: int = 1,
+        limit: int = 50
+    ) -> Tuple[List[Card], int]:
+        """Получить карточки колоды по порядку"""
+        query = db.query(Card).filter(Card.deck_id == deck_id)
+        total = query.count()
+        cards = query.order_by(Card.rank, Card.id).offset((page - 1) * limit).limit(limit).all()
+        return cards, total
+    
+    @staticmethod
+    def get_deck_cards_after(
+        db: Session,
+        deck_id: int,
+        after_rank: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int = 500
+    ) -> List[Card]:
+        """Keyset пагинация карточек колоды по (rank, id) для потокового экспорта"""
+        query = db.query(Card).filter(Card.deck_id == deck_id)
+        if after_rank is not None and after_id is not None:
+            query = query.filter(or_(
+                Card.rank > after_rank,
+                and_(Card.rank == after_rank, Card.id > after_id)
+            ))
+        return query.order_by(Card.rank, Card.id).limit(limit).all()
+
+class ReviewCRUD:
+    """CRUD операции для состояний повторения карточек"""
+    
+    @staticmethod
+    def upsert_reviews(db: Session, user_id: int, reviews: List[CardReviewState]) -> int:
+        """Записать состояния повторения одним INSERT ... ON CONFLICT; карточки, которых уже нет, пропускаются"""
+        latest = {review.card_id: review for review in reviews}
+        existing = {
+            card_id for (card_id,) in db.query(Card.id).filter(Card.id.in_(list(latest)))
+        }
+        states = [review for card_id, review in latest.items() if card_id in existing]
+        if not states:
+            return 0
+        first = SyncCRUD.next_versions(db, user_id, len(states)) - len(states) + 1
+        rows = [
+            {"user_id": user_id, "version": first + i, **review.model_dump()}
+            for i, review in enumerate(states)
+        ]
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(CardReview).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CardReview.user_id, CardReview.card_id],
+            set_={
+                "interval": stmt.excluded.interval,
+                "due": stmt.excluded.due,
+                "reps": stmt.excluded.reps,
+                "lapses": stmt.excluded.lapses,
+                "version": stmt.excluded.version,
+                "updated_at": func.now()
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+        return len(rows)
+    
+    @staticmethod
+    def get_user_reviews(db: Session, user_id: int, after_card_id: int = 0, limit: int = 1000) -> List[CardReview]:
+        """Страница состояний повторения пользователя по card_id (keyset, по первичному ключу)"""
+        return db.query(CardReview).filter(
+            CardReview.user_id == user_id,
+            CardReview.card_id > after_card_id
+        ).order_by(CardReview.card_id).limit(limit).all()
+    
+    @staticmethod
+    def remove_reviews(db: Session, user_id: int, card_ids: List[int]) -> int:
+        """Удалить состояния повторения и записать надгробия"""
+        removed = [
+            card_id for (card_id,) in
+            db.query(CardReview.card_id).filter(CardReview.user_id == user_id, CardReview.card_id.in_(card_ids))
+        ]
+        if not removed:
+            return 0
+        SyncCRUD.add_tombstones(db, "review", [(card_id, None) for card_id in removed], user_id)
+        db.query(CardReview).filter(
+            CardReview.user_id == user_id, CardReview.card_id.in_(removed)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return len(removed)
+
+class StatsCRUD:
+    """Журнал ответов и инкрементальные сводки статистики обучения"""
+    
+    @staticmethod
+    def record_events(db: Session, user_id: int, events: List[ReviewEventItem]) -> int:
+        """Записать события и обновить сводки в той же транзакции.
+
+        В сводки попадают только действительно вставленные события, поэтому
+        повтор пачки с теми же event_id ничего не удваивает.
+        """
+        card_ids = list({event.card_id for event in events})
+        decks = dict(db.query(Card.id, Card.deck_id).filter(Card.id.in_(card_ids)).all())
+        rows = [
+            {
+                "event_id": event.event_id,
+                "user_id": user_id,
+                "card_id": event.card_id,
+                "deck_id": decks.get(event.card_id),
+                "performance": event.performance,
+                "reviewed_at": datetime.fromtimestamp(event.reviewed_at, tz=timezone.utc)
+            }
+            for event in events
+        ]
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(ReviewEvent).values(rows).on_conflict_do_nothing(
+            index_elements=[ReviewEvent.event_id]
+        ).returning(ReviewEvent.deck_id, ReviewEvent.performance, ReviewEvent.reviewed_at)
+        inserted = db.execute(stmt).all()
+        if not inserted:
+            db.commit()
+            return 0
+        
+        by_day = defaultdict(lambda: [0, 0])
+        by_deck = {}
+        for deck_id, performance, reviewed_at in inserted:
+            if reviewed_at.tzinfo is None:
+                reviewed_at = reviewed_at.replace(tzinfo=timezone.utc)
+            correct = int(performance > 0)
+            day = by_day[reviewed_at.date()]
+            day[0] += 1
+            day[1] += correct
+            if deck_id is not None:
+                deck = by_deck.setdefault(deck_id, [0, 0, reviewed_at])
+                deck[0] += 1
+                deck[1] += correct
+                deck[2] = max(deck[2], reviewed_at)
+        
+        stmt = dialect.insert(StudyDailyStats).values([
+            {"user_id": user_id, "day": day, "reviews": reviews, "correct": correct}
+            for day, (reviews, correct) in by_day.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[StudyDailyStats.user_id, StudyDailyStats.day],
+            set_={
+                "reviews": StudyDailyStats.reviews + stmt.excluded.reviews,
+                "correct": StudyDailyStats.correct + stmt.excluded.correct
+            }
+        ))
+        if by_deck:
+            stmt = dialect.insert(StudyDeckStats).values([
+                {"user_id": user_id, "deck_id": deck_id, "reviews": reviews, "correct": correct,
+                 "last_reviewed_at": last_reviewed_at}
+                for deck_id, (reviews, correct, last_reviewed_at) in by_deck.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[StudyDeckStats.user_id, StudyDeckStats.deck_id],
+                set_={
+                    "reviews": StudyDeckStats.reviews + stmt.excluded.reviews,
+                    "correct": StudyDeckStats.correct + stmt.excluded.correct,
+                    "last_reviewed_at": case(
+                        (StudyDeckStats.last_reviewed_at >= stmt.excluded.last_reviewed_at,
+                         StudyDeckStats.last_reviewed_at),
+                        else_=stmt.excluded.last_reviewed_at
+                    )
+                }
+            ))
+        
+        # Итоги и серия: строка пользователя блокируется до commit
+        db.execute(dialect.insert(StudyUserStats).values(user_id=user_id).on_conflict_do_nothing(
+            index_elements=[StudyUserStats.user_id]
+        ))
+        totals = db.query(StudyUserStats).filter(StudyUserStats.user_id == user_id).with_for_update().one()
+        totals.reviews += len(inserted)
+        totals.correct += sum(correct for _, correct in by_day.values())
+        for day in sorted(by_day):
+            # Опоздавшие события (не позже last_active_day) серию не меняют
+            if totals.last_active_day is not None and day <= totals.last_active_day:
+                continue
+            if totals.last_active_day is not None and day - totals.last_active_day == timedelta(days=1):
+                totals.current_streak += 1
+            else:
+                totals.current_streak = 1
+            totals.last_active_day = day
+            totals.longest_streak = max(totals.longest_streak, totals.current_streak)
+        db.commit()
+        return len(inserted)
+    
+    @staticmethod
+    def get_user_stats(
+        db: Session,
+        user_id: int,
+        days: int
+    ) -> Tuple[Optional[StudyUserStats], List[StudyDailyStats], List[StudyDeckStats]]:
+        """Сводки пользователя: итоги, дни за последние days дней и колоды (без просмотра событий)"""
+        totals = db.query(StudyUserStats).filter(StudyUserStats.user_id == user_id).first()
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        daily = db.query(StudyDailyStats).filter(
+            StudyDailyStats.user_id == user_id,
+            StudyDailyStats.day >= since
+        ).order_by(StudyDailyStats.day).all()
+        decks = db.query(StudyDeckStats).filter(
+            StudyDeckStats.user_id == user_id
+        ).order_by(StudyDeckStats.last_reviewed_at.desc()).all()
+        return totals, daily, decks
+    
+    @staticmethod
+    def compact_events(db: Session, before: datetime, limit: int = 10000) -> Tuple[int, bool]:
+        """Удалить до limit событий старше before (они уже учтены в сводках).
+
+        Возвращает (удалено, остались ли еще).
+        """
+        ids = [
+            event_id for (event_id,) in
+            db.query(ReviewEvent.id).filter(ReviewEvent.reviewed_at < before).order_by(ReviewEvent.id).limit(limit + 1)
+        ]
+        if not ids:
+            return 0, False
+        deleted = db.query(ReviewEvent).filter(
+            ReviewEvent.id.in_(ids[:limit])
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted, len(ids) > limit
+
+class SyncCRUD:
+    """Версии изменений и выборка изменений для дельта-синхронизации"""
+    
+    @staticmethod
+    def next_versions(db: Session, owner_id: int, count: int = 1) -> int:
+        """Выделить count версий подряд из потока владельца, вернуть последнюю.
+
+        Строка потока остается заблокированной до commit, поэтому вызывать
+        ближе к концу транзакции и после блокировки колоды. Ждут друг друга
+        только изменения одного владельца; на порядок возрастания версий
+        при фиксации внутри потока опирается get_changes (until = get_state).
+        """
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(SyncStream).values(owner_id=owner_id, version=count, purged_version=0)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SyncStream.owner_id],
+            set_={"version": SyncStream.version + count}
+        ).returning(SyncStream.version)
+        return db.execute(stmt).scalar()
+    
+    @staticmethod
+    def add_tombstones(db: Session, entity: str, items: List[Tuple[int, Optional[int]]], owner_id: int) -> int:
+        """Надгробия для пар (entity_id, deck_id) с новыми версиями; вернуть первую версию"""
+        first = SyncCRUD.next_versions(db, owner_id, len(items)) - len(items) + 1
+        db.execute(insert(Tombstone), [
+            {"entity": entity, "entity_id": entity_id, "deck_id": deck_id, "owner_id": owner_id, "version": first + i}
+            for i, (entity_id, deck_id) in enumerate(items)
+        ])
+        return first
+    
+    @staticmethod
+    def get_state(db: Session, owner_id: int) -> Tuple[int, int]:
+        """Последняя зафиксированная версия потока владельца и граница удаленных надгробий"""
+        row = db.query(SyncStream.version, SyncStream.purged_version).filter(
+            SyncStream.owner_id == owner_id
+        ).first()
+        return (row.version, row.purged_version) if row else (0, 0)
+    
+    @staticmethod
+    def get_changes(
+        db: Session,
+        user_id: int,
+        since: int,
+        until: int,
+        limit: int = 500
+    ) -> Tuple[List[Tuple[int, str, Any]], bool]:
+        """Изменения пользователя с версиями в (since, until] по возрастанию версии.
+
+        until — версия потока пользователя, прочитанная до выборки: все версии
+        до нее уже зафиксированы, поэтому четыре запроса видят согласованный срез.
+        Возвращает тройки (версия, сущность, объект) и признак следующей страницы.
+        """
+        decks = db.query(Deck).filter(
+            Deck.owner_id == user_id, Deck.version > since, Deck.version <= until
+        ).order_by(Deck.version).limit(limit + 1)
+        cards = db.query(Card).join(Deck, Deck.id == Card.deck_id).filter(
+            Deck.owner_id == user_id, Card.version > since, Card.version <= until
+        ).order_by(Card.version).limit(limit + 1)
+        reviews = db.query(CardReview).filter(
+            CardReview.user_id == user_id, CardReview.version > since, CardReview.version <= until
+        ).order_by(CardReview.version).limit(limit + 1)
+        tombstones = db.query(Tombstone).filter(
+            Tombstone.owner_id == user_id, Tombstone.version > since, Tombstone.version <= until
+        ).order_by(Tombstone.version).limit(limit + 1)
+        
+        streams = [
+            [(row.version, entity, row) for row in query]
+            for entity, query in (("deck", decks), ("card", cards), ("review", reviews), ("tombstone", tombstones))
+        ]
+        changes = list(islice(merge(*streams, key=lambda change: change[0]), limit + 1))
+        return changes[:limit], len(changes) > limit
+    
+    @staticmethod
+    def purge_tombstones(db: Session, before: datetime) -> Tuple[int, int]:
+        """Удалить надгробия старше before; вернуть число удаленных и наибольшую новую границу.
+
+        Граница своя у каждого владельца: наибольшая версия его надгробий старше before.
+        """
+        purged = db.query(func.max(Tombstone.version)).filter(Tombstone.created_at < before).scalar()
+        if purged is None:
+            return 0, 0
+        
+        def bound(owner_id):
+            old = aliased(Tombstone)
+            return select(func.max(old.version)).where(
+                old.owner_id == owner_id, old.created_at < before
+            ).scalar_subquery()
+        
+        db.query(SyncStream).filter(SyncStream.purged_version < bound(SyncStream.owner_id)).update(
+            {SyncStream.purged_version: bound(SyncStream.owner_id)}, synchronize_session=False
+        )
+        deleted = db.query(Tombstone).filter(Tombstone.version <= bound(Tombstone.owner_id)).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        return deleted, purged
+
+# Событие outbox: (топик, ключ упорядочивания, данные с версией изменения)
+OutboxEventRow = Tuple[str, str, dict]
+
+class OutboxCRUD:
+    """Transactional outbox: запись событий и состояние доставки подписчикам"""
+    
+    @staticmethod
+    def add_events(db: Session, events: List[OutboxEventRow]):
+        """Добавить события в текущую транзакцию (commit делает вызывающий).
+
+        Вызывать после next_versions: ID выделяются под блокировкой потока
+        владельца, поэтому события одного ключа получают ID в порядке фиксации.
+        """
+        if events:
+            db.execute(insert(OutboxEvent), [
+                {"topic": topic, "key": key, "payload": payload}
+                for topic, key, payload in events
+            ])
+    
+    @staticmethod
+    def user_event(user: User, topic: str) -> OutboxEventRow:
+        return topic, f"user:{user.id}", {
+            "user_id": user.id, "username": user.username, "email": user.email, "is_active": user.is_active,
+            "version": user.version
+        }
+    
+    @staticmethod
+    def deck_upserted(deck: Deck) -> OutboxEventRow:
+        return "deck.upserted", f"deck:{deck.id}", {
+            "deck_id": deck.id,
+            "owner_id": deck.owner_id,
+            "title": deck.title,
+            "description": deck.description,
+            "is_public": deck.is_public,
+            "category": deck.category,
+            "tags": list(deck.tags or []),
+            "version": deck.version
+        }
+    
+    @staticmethod
+    def card_upserted(card: Card) -> OutboxEventRow:
+        return "card.upserted", f"deck:{card.deck_id}", {
+            "card_id": card.id, "deck_id": card.deck_id, "question": card.question, "answer": card.answer,
+            "version": card.version
+        }
+    
+    @staticmethod
+    def cards_reordered(deck_id: int, version: int) -> OutboxEventRow:
+        return "deck.cards_reordered", f"deck:{deck_id}", {"deck_id": deck_id, "version": version}
+    
+    @staticmethod
+    def ensure_cursors(db: Session, subscribers: Sequence[str]):
+        """Завести курсоры новых подписчиков (доставка с первого хранимого события)"""
+        existing = {
+            name for (name,) in
+            db.query(OutboxCursor.subscriber).filter(OutboxCursor.subscriber.in_(list(subscribers)))
+        }
+        for name in subscribers:
+            if name not in existing:
+                db.add(OutboxCursor(subscriber=name, last_event_id=0, attempts=0))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Курсор одновременно завел ретранслятор другого воркера
+            db.rollback()
+    
+    @staticmethod
+    def claim_batch(
+        db: Session,
+        subscriber: str,
+        limit: int,
+        lease: timedelta
+    ) -> Optional[Tuple[OutboxCursor, List[OutboxEvent], int]]:
+        """Взять в аренду курсор подписчика и прочитать следующую пачку событий.
+
+        None — курсор арендован другим ретранслятором, ждет повтора или новых
+        событий нет. Иначе курсор, события и ID, до которого пачка просмотрена.
+        """
+        now = datetime.now(timezone.utc)
+        claimed = db.query(OutboxCursor).filter(
+            OutboxCursor.subscriber == subscriber,
+            or_(OutboxCursor.lease_until.is_(None), OutboxCursor.lease_until < now),
+            or_(OutboxCursor.next_attempt_at.is_(None), OutboxCursor.next_attempt_at <= now)
+        ).update({OutboxCursor.lease_until: now + lease}, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+        cursor = db.query(OutboxCursor).filter(OutboxCursor.subscriber == subscriber).first()
+        postgres = db.get_bind().dialect.name == "postgresql"
+        xmin = None
+        if postgres and cursor.gap_xmax is not None:
+            # Снимок читается до событий: транзакции старше xmin уже завершены и видны
+            xmin = db.execute(text(
+                "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+            )).scalar()
+        events = db.query(OutboxEvent).filter(
+            OutboxEvent.id > cursor.last_event_id
+        ).order_by(OutboxEvent.id).limit(limit).all()
+        if postgres and events:
+            # Транзакции разных владельцев фиксируются не в порядке ID: пропуск
+            # в начале может занять еще не зафиксированное событие. Его ID
+            # выделен после xid транзакции, поэтому пропуск окончательный,
+            # когда завершились все транзакции, активные при его обнаружении
+            start = cursor.last_event_id + 1
+            if events[0].id != start:
+                if xmin is None or xmin < cursor.gap_xmax:
+                    if cursor.gap_xmax is None:
+                        db.query(OutboxCursor).filter(OutboxCursor.subscriber == subscriber).update({
+                            OutboxCursor.gap_xmax: text("pg_snapshot_xmax(pg_current_snapshot())::text::bigint")
+                        }, synchronize_session=False)
+                        db.commit()
+                    events = []
+                else:
+                    start = events[0].id
+            # Дальше пачки — только непрерывный отрезок ID
+            for i, event in enumerate(events):
+                if event.id != start + i:
+                    events = events[:i]
+                    break
+        if not events:
+            OutboxCRUD.release(db, subscriber)
+            return None
+        return cursor, events, events[-1].id
+    
+    @staticmethod
+    def release(db: Session, subscriber: str, last_event_id: Optional[int] = None):
+        """Снять аренду; с last_event_id — продвинуть курсор после успешной доставки"""
+        values = {OutboxCursor.lease_until: None}
+        if last_event_id is not None:
+            values.update({
+                OutboxCursor.last_event_id: last_event_id,
+                OutboxCursor.gap_xmax: None,
+                OutboxCursor.attempts: 0,
+                OutboxCursor.next_attempt_at: None,
+                OutboxCursor.last_error: None
+            })
+        db.query(OutboxCursor).filter(OutboxCursor.subscriber == subscriber).update(
+            values, synchronize_session=False
+        )
+        db.commit()
+    
+    @staticmethod
+    def fail(
+        db: Session,
+        subscriber: str,
+        first_event_id: int,
+        last_event_id: int,
+        error: str,
+        max_attempts: int,
+        backoff: timedelta
+    ) -> bool:
+        """Отметить неудачную доставку; True, если пачка ушла в dead letters и курсор продвинут"""
+        cursor = db.query(OutboxCursor).filter(OutboxCursor.subscriber == subscriber).first()
+        attempts = cursor.attempts + 1
+        if attempts >= max_attempts:
+            db.add(OutboxDeadLetter(
+                subscriber=subscriber, first_event_id=first_event_id, last_event_id=last_event_id, error=error
+            ))
+            db.commit()
+            OutboxCRUD.release(db, subscriber, last_event_id)
+            return True
+        cursor.attempts = attempts
+        cursor.next_attempt_at = datetime.now(timezone.utc) + backoff
+        cursor.lease_until = None
+        cursor.last_error = error
+        db.commit()
+        return False
+    
+    @staticmethod
+    def cleanup(db: Session, subscribers: Sequence[str], before: datetime) -> int:
+        """Удалить события старше before, доставленные всем подписчикам"""
+        query = db.query(OutboxEvent).filter(OutboxEvent.created_at < before)
+        if subscribers:
+            delivered = db.query(func.min(OutboxCursor.last_event_id)).filter(
+                OutboxCursor.subscriber.in_(list(subscribers))
+            ).scalar()
+            query = query.filter(OutboxEvent.id <= (delivered or 0))
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,30 @@
+"""Сильные ETag по версии строки и условные GET (If-None-Match -> 304).
+
+Версия меняется при каждом изменении строки (поток версий владельца), поэтому ETag
+вида "user-7-1042" однозначно определяет тело ответа. Если клиент прислал
+If-None-Match, роутер сначала читает только версию по индексу и при
+совпадении отвечает 304 без загрузки ORM объекта и сериализации.
+"""
+from fastapi import Request, Response, status
+
+
+def make_etag(kind: str, entity_id: int, version: int) -> str:
+    return f'"{kind}-{entity_id}-{version}"'
+
+
+def if_none_match(request: Request) -> str:
+    """Значение заголовка If-None-Match (пустая строка, если его нет)"""
+    return request.headers.get("if-none-match", "")
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Совпадает ли ETag с If-None-Match (слабое сравнение, как требует RFC 9110)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
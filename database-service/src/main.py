@@ -1,15 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-import os
-from src.routers import users, tokens
-from src.database import create_tables
+from src.routers import users, tokens, decks, cards, reviews, sync, stats
+from src.database import create_tables, engine
+from src.profiling import setup_profiling
+from src.outbox import outbox_relay
+from src.sharding import shard_router
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация при запуске и освобождение ресурсов при остановке"""
+    # Создание таблиц в базе данных
+    create_tables()
+    # Таблицы токенов в дополнительных шардах
+    shard_router.create_tables()
+    print("Database Service: База данных инициализирована")
+    # Доставка событий outbox подписчикам
+    await outbox_relay.start()
+    yield
+    await outbox_relay.shutdown()
+    # Закрываем соединения пула после завершения текущих запросов
+    shard_router.dispose()
+    engine.dispose()
+    print("Database Service остановлен")
 
 # Создание FastAPI приложения
 app = FastAPI(
     title="Recall Pro - Database Service",
     description="Сервис для работы с базой данных",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -21,16 +41,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профилирование запросов (подключается только при PROFILING_ENABLED=true)
+setup_profiling(app)
+
 # Подключение роутеров
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
 app.include_router(tokens.router, prefix="/api/v1/tokens", tags=["tokens"])
-
-@app.on_event("startup")
-async def startup_event():
-    """Инициализация при запуске приложения"""
-    # Создание таблиц в базе данных
-    create_tables()
-    print("Database Service: База данных инициализирована")
+app.include_router(decks.router, prefix="/api/v1/decks", tags=["decks"])
+app.include_router(cards.router, prefix="/api/v1/cards", tags=["cards"])
+app.include_router(reviews.router, prefix="/api/v1/reviews", tags=["reviews"])
+app.include_router(sync.router, prefix="/api/v1/sync", tags=["sync"])
+app.include_router(stats.router, prefix="/api/v1/stats", tags=["stats"])
 
 @app.get("/")
 async def root():
@@ -43,12 +64,5 @@ async def health_check():
     return {"status": "healthy", "service": "database"}
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", "8002"))
-    debug = os.getenv("DEBUG", "false").lower() == "true"
-    
-    uvicorn.run(
-        "main:app", 
-        host="0.0.0.0", 
-        port=port,
-        reload=debug
-    ) 
\ No newline at end of file
+    from src.server import run
+    run()
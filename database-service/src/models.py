@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Boolean, Date, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from src.database import Base
+from src.ranks import RANK_MAX_LENGTH
 import hashlib
 
 class User(Base):
@@ -15,6 +16,8 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     is_active = Column(Boolean, default=True, nullable=False)
+    # Версия последнего изменения (поток версий SyncStream пользователя): ETag чтений
+    version = Column(BigInteger, default=0, nullable=False)
     
     # Связи
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
@@ -29,11 +32,234 @@ class RefreshToken(Base):
     expires_at = Column(DateTime(timezone=True), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     is_revoked = Column(Boolean, default=False, nullable=False)
+    # Время отзыва: по нему и created_at строятся дельты снимка отзыва
+    revoked_at = Column(DateTime(timezone=True))
+    # Ротация заменяет хеш в той же строке (одна строка на сессию); прежний
+    # хеш хранится для обнаружения повторного использования
+    previous_hash = Column(String(255))
+    rotated_at = Column(DateTime(timezone=True))
+    # Семейство ротации: ID сессии из claim fid, общий для всех поколений
+    # токена — повтор любого прежнего поколения отзывает сессию
+    family_id = Column(String(32))
     
     # Связи
     user = relationship("User", back_populates="refresh_tokens")
     
+    __table_args__ = (
+        Index("idx_refresh_tokens_created_at", "created_at"),
+        Index("idx_refresh_tokens_revoked_at", "revoked_at"),
+        Index("idx_refresh_tokens_previous_hash", "previous_hash"),
+        Index("idx_refresh_tokens_rotated_at", "rotated_at"),
+        Index("idx_refresh_tokens_family_id", "family_id"),
+    )
+    
     @classmethod
     def hash_token(cls, token: str) -> str:
         """Хеширование токена для безопасного хранения"""
-        return hashlib.sha256(token.encode()).hexdigest()
\ No newline at end of file
+        return hashlib.sha256(token.encode()).hexdigest()
+
+class Deck(Base):
+    """Модель колоды карточек"""
+    __tablename__ = "decks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text)
+    is_public = Column(Boolean, default=False, nullable=False)
+    category = Column(String(100), index=True)
+    tags = Column(JSON, default=list, nullable=False)
+    cards_count = Column(Integer, default=0, nullable=False)
+    # Версия последнего изменения для дельта-синхронизации (поток SyncStream владельца)
+    version = Column(BigInteger, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Связи
+    cards = relationship("Card", back_populates="deck", cascade="all, delete-orphan", passive_deletes=True)
+    
+    __table_args__ = (
+        Index("idx_decks_owner_version", "owner_id", "version"),
+    )
+
+class Card(Base):
+    """Модель карточки с Markdown контентом"""
+    __tablename__ = "cards"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), index=True, nullable=False)
+    question = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    # Отрендеренный HTML и ключ рендера (хеш исходника и версии рендерера)
+    question_html = Column(Text)
+    answer_html = Column(Text)
+    html_key = Column(String(64))
+    attachments = Column(JSON, default=list, nullable=False)
+    # Дробный ключ порядка (src/ranks.py); побайтовое сравнение и в PostgreSQL
+    rank = Column(String(RANK_MAX_LENGTH).with_variant(String(RANK_MAX_LENGTH, collation="C"), "postgresql"), nullable=False)
+    version = Column(BigInteger, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Связи
+    deck = relationship("Deck", back_populates="cards")
+    
+    __table_args__ = (
+        # Порядок карточек в колоде и keyset пагинация экспорта
+        Index("idx_cards_deck_rank", "deck_id", "rank", "id"),
+        Index("idx_cards_version", "version"),
+    )
+
+class CardReview(Base):
+    """Состояние повторения карточки пользователем (пишет Study Service)"""
+    __tablename__ = "card_reviews"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    card_id = Column(Integer, ForeignKey("cards.id", ondelete="CASCADE"), primary_key=True)
+    interval = Column(Float, nullable=False)
+    # Время следующего повторения (unix time, как в Study Service)
+    due = Column(Float, nullable=False)
+    reps = Column(Integer, default=0, nullable=False)
+    lapses = Column(Integer, default=0, nullable=False)
+    version = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_card_reviews_user_version", "user_id", "version"),
+    )
+
+class Tombstone(Base):
+    """Запись об удалении для дельта-синхронизации"""
+    __tablename__ = "tombstones"
+    
+    id = Column(Integer, primary_key=True)
+    # deck, card или review (для review entity_id — ID карточки)
+    entity = Column(String(16), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # Чьи клиенты должны узнать об удалении: владелец колоды или пользователь
+    owner_id = Column(Integer, nullable=False)
+    deck_id = Column(Integer)
+    version = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_tombstones_owner_version", "owner_id", "version"),
+        Index("idx_tombstones_created_at", "created_at"),
+    )
+
+class SyncStream(Base):
+    """Счетчик версий изменений одного владельца (пользователя).
+
+    Версии колод и карточек владельца, его состояний повторения, надгробий
+    и его собственной строки users идут из его потока. Версия выделяется
+    upsert этой строки перед commit: блокировка держится до конца
+    транзакции, поэтому версии владельца фиксируются по возрастанию и
+    клиент, продолжающий с последней полученной версии, ничего не
+    пропустит. Записи разных владельцев друг друга не ждут.
+    """
+    __tablename__ = "sync_streams"
+    
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+    # Надгробия с версией не больше этой удалены: клиентам со старым since нужна полная синхронизация
+    purged_version = Column(BigInteger, default=0, nullable=False)
+
+class OutboxEvent(Base):
+    """Событие для подписчиков (transactional outbox).
+
+    Пишется в той же транзакции, что и изменение, после выделения версии:
+    ID из последовательности берется под блокировкой потока владельца,
+    поэтому события одного ключа (колода, пользователь) получают ID в
+    порядке фиксации. События разных владельцев фиксируются вразнобой —
+    ретранслятор не перескакивает пропуск в ID, пока транзакция, которая
+    могла его занять, не завершилась (см. OutboxCRUD.claim_batch).
+    """
+    __tablename__ = "outbox_events"
+    
+    # В SQLite автоинкремент есть только у INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    topic = Column(String(64), nullable=False)
+    # Ключ упорядочивания: события одного ключа доставляются в порядке ID
+    key = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class OutboxCursor(Base):
+    """Позиция доставки событий подписчику"""
+    __tablename__ = "outbox_cursors"
+    
+    subscriber = Column(String(64), primary_key=True)
+    last_event_id = Column(BigInteger, default=0, nullable=False)
+    # PostgreSQL: xmax снимка, когда впервые замечен пропуск после last_event_id;
+    # пропуск перескакивается, когда все транзакции до этого xmax завершены
+    gap_xmax = Column(BigInteger)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True))
+    # Аренда курсора: одну пачку доставляет один ретранслятор среди воркеров и реплик
+    lease_until = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+
+class OutboxDeadLetter(Base):
+    """Пачка событий, которую подписчик не принял за OUTBOX_MAX_ATTEMPTS попыток"""
+    __tablename__ = "outbox_dead_letters"
+    
+    id = Column(Integer, primary_key=True)
+    subscriber = Column(String(64), nullable=False)
+    first_event_id = Column(BigInteger, nullable=False)
+    last_event_id = Column(BigInteger, nullable=False)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ReviewEvent(Base):
+    """Ответ пользователя на карточку (append-only журнал, пишет Study Service).
+
+    Сводки study_* обновляются в той же транзакции, что и вставка событий;
+    старые события удаляются компактизацией, сводки остаются.
+    """
+    __tablename__ = "review_events"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # Ключ события от клиента: повтор пачки не учитывается в сводках дважды
+    event_id = Column(String(36), unique=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Без внешних ключей: журнал переживает удаление карточек и колод
+    card_id = Column(Integer, nullable=False)
+    deck_id = Column(Integer)
+    performance = Column(Float, nullable=False)
+    reviewed_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_review_events_user_reviewed", "user_id", "reviewed_at"),
+        Index("idx_review_events_reviewed_at", "reviewed_at"),
+    )
+
+class StudyUserStats(Base):
+    """Итоги пользователя: ответы, верные ответы и серия дней подряд"""
+    __tablename__ = "study_user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    reviews = Column(BigInteger, default=0, nullable=False)
+    correct = Column(BigInteger, default=0, nullable=False)
+    # Серия заканчивается на last_active_day (дни — по UTC)
+    current_streak = Column(Integer, default=0, nullable=False)
+    longest_streak = Column(Integer, default=0, nullable=False)
+    last_active_day = Column(Date)
+
+class StudyDailyStats(Base):
+    """Ответы пользователя за день (UTC): история активности"""
+    __tablename__ = "study_daily_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    reviews = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+
+class StudyDeckStats(Base):
+    """Ответы пользователя по колоде"""
+    __tablename__ = "study_deck_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), primary_key=True)
+    reviews = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    last_reviewed_at = Column(DateTime(timezone=True))
@@ -0,0 +1,169 @@
+"""Ретранслятор transactional outbox.
+
+События пишутся CRUD операциями в той же транзакции, что и изменение
+(таблица outbox_events), а фоновая задача сервиса доставляет их
+подписчикам пачками: POST {"events": [...]} на URL подписчика. У каждого
+подписчика свой курсор: пачка доставляется по возрастанию ID, следующая
+уходит только после ответа 2xx, поэтому события одного ключа (колоды,
+пользователя) приходят в порядке изменений. Доставка "хотя бы один раз":
+подписчики обрабатывают повторы идемпотентно.
+
+Подписчики задаются JSON в OUTBOX_SUBSCRIBERS:
+
+    {"search": {"url": "http://search-service:8005/api/v1/events", "topics": ["deck.", "card."]}}
+
+topics — префиксы топиков (пусто — все события).
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+from src.crud import OutboxCRUD
+from src.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_SUBSCRIBERS = os.getenv("OUTBOX_SUBSCRIBERS", "{}")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+OUTBOX_TIMEOUT = float(os.getenv("OUTBOX_TIMEOUT", "10"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "300"))
+# Доставленные всем подписчикам события хранятся столько часов
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+
+CLEANUP_INTERVAL = 600
+
+
+class Subscriber:
+    """Получатель событий"""
+
+    def __init__(self, name: str, url: str, topics: Optional[List[str]] = None):
+        self.name = name
+        self.url = url
+        self.topics = tuple(topics or ())
+
+    def wants(self, topic: str) -> bool:
+        return not self.topics or topic.startswith(self.topics)
+
+
+def parse_subscribers(config: str) -> List[Subscriber]:
+    """Подписчики из JSON конфигурации OUTBOX_SUBSCRIBERS"""
+    return [
+        Subscriber(name, options["url"], options.get("topics"))
+        for name, options in json.loads(config or "{}").items()
+    ]
+
+
+class OutboxRelay:
+    """Фоновая доставка событий outbox подписчикам.
+
+    На каждого подписчика — своя задача: пачки одного подписчика уходят
+    последовательно, медленный или недоступный подписчик не задерживает
+    остальных. После неудачи пачка повторяется с экспоненциальной паузой;
+    после OUTBOX_MAX_ATTEMPTS попыток она записывается в outbox_dead_letters,
+    и доставка продолжается со следующей.
+    """
+
+    def __init__(self, subscribers: Optional[List[Subscriber]] = None):
+        self.subscribers = subscribers if subscribers is not None else parse_subscribers(OUTBOX_SUBSCRIBERS)
+        self.batch_size = OUTBOX_BATCH_SIZE
+        self.poll_interval = OUTBOX_POLL_INTERVAL
+        # Аренда курсора переживает запрос к подписчику с запасом
+        self.lease = timedelta(seconds=OUTBOX_TIMEOUT * 3)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        names = [subscriber.name for subscriber in self.subscribers]
+        await run_in_threadpool(self._run_db, OutboxCRUD.ensure_cursors, names)
+        self._client = httpx.AsyncClient(timeout=OUTBOX_TIMEOUT)
+        self._tasks = [asyncio.create_task(self._deliver_loop(subscriber)) for subscriber in self.subscribers]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _run_db(func, *args):
+        db = SessionLocal()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    async def _deliver_loop(self, subscriber: Subscriber):
+        while True:
+            try:
+                delivered = await self.deliver_batch(subscriber)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка ретранслятора outbox (%s)", subscriber.name)
+                delivered = False
+            if not delivered:
+                await asyncio.sleep(self.poll_interval)
+
+    async def deliver_batch(self, subscriber: Subscriber) -> bool:
+        """Доставить следующую пачку; False — нечего доставлять или подписчик недоступен"""
+        claimed = await run_in_threadpool(
+            self._run_db, OutboxCRUD.claim_batch, subscriber.name, self.batch_size, self.lease
+        )
+        if claimed is None:
+            return False
+        cursor, events, last_id = claimed
+        batch = [
+            {
+                "id": event.id,
+                "topic": event.topic,
+                "key": event.key,
+                "payload": event.payload,
+                "created_at": event.created_at.isoformat()
+            }
+            for event in events if subscriber.wants(event.topic)
+        ]
+        try:
+            if batch:
+                response = await self._client.post(subscriber.url, json={"events": batch})
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            backoff = timedelta(seconds=min(self.poll_interval * 2 ** cursor.attempts, OUTBOX_MAX_BACKOFF))
+            dead = await run_in_threadpool(
+                self._run_db, OutboxCRUD.fail, subscriber.name, events[0].id, last_id,
+                f"{type(e).__name__}: {e}", OUTBOX_MAX_ATTEMPTS, backoff
+            )
+            if dead:
+                logger.error("Outbox: пачка %s-%s не доставлена %s", events[0].id, last_id, subscriber.name)
+            return False
+        await run_in_threadpool(self._run_db, OutboxCRUD.release, subscriber.name, last_id)
+        return True
+
+    async def _cleanup_loop(self):
+        names = [subscriber.name for subscriber in self.subscribers]
+        while True:
+            before = datetime.now(timezone.utc) - timedelta(hours=OUTBOX_RETENTION_HOURS)
+            try:
+                await run_in_threadpool(self._run_db, OutboxCRUD.cleanup, names, before)
+            except Exception:
+                logger.exception("Ошибка очистки outbox")
+            await asyncio.sleep(CLEANUP_INTERVAL)
+
+
+# Singleton instance
+outbox_relay = OutboxRelay()
+
+def get_outbox_relay() -> OutboxRelay:
+    """Dependency для получения ретранслятора outbox"""
+    return outbox_relay
@@ -0,0 +1,149 @@
+"""Дробные ключи порядка карточек (fractional indexing).
+
+Ключ — строка, порядок карточек — лексикографический порядок ключей, поэтому
+между любыми двумя ключами всегда есть третий: вставка и перемещение карточки
+меняют одну строку. Ключ состоит из целой части переменной длины (первый
+символ задает ее длину, так что добавление в конец растит ключ логарифмически)
+и дробной части без завершающих нулей.
+
+Алфавит — только цифры и строчные латинские буквы: для таких строк порядок
+байтов совпадает с порядком сравнения в БД (в PostgreSQL колонка объявлена
+с COLLATE "C").
+"""
+import os
+from typing import List, Optional
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+# Первый символ целой части: "0".."9" — отрицательные числа, "a".."z" — положительные
+HEADS = DIGITS
+INTEGER_ZERO = "a0"
+SMALLEST_INTEGER = "0" + "0" * 10
+
+# Ключи длиннее этого значения (многократные вставки в одно место) — сигнал перебалансировать колоду
+RANK_REBALANCE_LENGTH = int(os.getenv("RANK_REBALANCE_LENGTH", "32"))
+RANK_MAX_LENGTH = 128
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "0" <= head <= "9":
+        return ord("9") - ord(head) + 2
+    raise ValueError(f"Некорректный ключ порядка: первый символ {head!r}")
+
+
+def _split(key: str):
+    if not key:
+        raise ValueError("Пустой ключ порядка")
+    length = _integer_length(key[0])
+    if length > len(key) or key[:length] == SMALLEST_INTEGER:
+        raise ValueError(f"Некорректный ключ порядка: {key!r}")
+    fraction = key[length:]
+    if fraction.endswith(DIGITS[0]):
+        raise ValueError(f"Некорректный ключ порядка: {key!r}")
+    return key[:length], fraction
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Дробная часть строго между a и b (b=None — верхняя граница 1)"""
+    if b is not None:
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _increment_integer(x: str) -> Optional[str]:
+    head, digits = x[0], list(x[1:])
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) + 1
+        if d < len(DIGITS):
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = DIGITS[0]
+    if head == "z":
+        return None
+    next_head = HEADS[HEADS.index(head) + 1]
+    if next_head > "a":
+        digits.append(DIGITS[0])
+    elif next_head < "a":
+        digits.pop()
+    return next_head + "".join(digits)
+
+
+def _decrement_integer(x: str) -> Optional[str]:
+    head, digits = x[0], list(x[1:])
+    for i in reversed(range(len(digits))):
+        d = DIGITS.index(digits[i]) - 1
+        if d >= 0:
+            digits[i] = DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = DIGITS[-1]
+    if head == "0":
+        return None
+    prev_head = HEADS[HEADS.index(head) - 1]
+    if prev_head < "9":
+        digits.append(DIGITS[-1])
+    elif prev_head > "9":
+        digits.pop()
+    return prev_head + "".join(digits)
+
+
+def rank_between(a: Optional[str], b: Optional[str]) -> str:
+    """Ключ строго между a и b (None — начало или конец колоды)"""
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Ключи порядка не возрастают: {a!r} >= {b!r}")
+    if a is None:
+        if b is None:
+            return INTEGER_ZERO
+        integer, fraction = _split(b)
+        if integer == SMALLEST_INTEGER:
+            return integer + _midpoint("", fraction)
+        if fraction:
+            return integer
+        result = _decrement_integer(integer)
+        if result is None:
+            raise ValueError("Ключ порядка нельзя уменьшить")
+        return result
+    integer_a, fraction_a = _split(a)
+    if b is None:
+        result = _increment_integer(integer_a)
+        return result if result is not None else integer_a + _midpoint(fraction_a, None)
+    integer_b, fraction_b = _split(b)
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    result = _increment_integer(integer_a)
+    if result is not None and result < b:
+        return result
+    return integer_a + _midpoint(fraction_a, None)
+
+
+def ranks_between(a: Optional[str], b: Optional[str], n: int) -> List[str]:
+    """n возрастающих ключей между a и b.
+
+    В конец и в начало ключи идут подряд по целой части (длина растет
+    логарифмически), между двумя ключами — делением пополам.
+    """
+    if n <= 0:
+        return []
+    if b is None:
+        keys = [rank_between(a, None)]
+        for _ in range(n - 1):
+            keys.append(rank_between(keys[-1], None))
+        return keys
+    if a is None:
+        keys = [rank_between(None, b)]
+        for _ in range(n - 1):
+            keys.append(rank_between(None, keys[-1]))
+        return keys[::-1]
+    middle = rank_between(a, b)
+    half = n // 2
+    return ranks_between(a, middle, half) + [middle] + ranks_between(middle, b, n - half - 1)
@@ -0,0 +1,119 @@
+"""Перенос refresh токенов по текущей раскладке шардов.
+
+Запуск из каталога database-service с той же конфигурацией, что у сервиса:
+
+    DATABASE_SHARD_URLS=<новые шарды> DATABASE_SHARD_URLS_PREVIOUS=<прежние шарды> python -m src.reshard
+
+Скрипт обходит все базы обеих раскладок и переносит токены, чей шард по
+DATABASE_SHARD_URLS отличается от базы, где они лежат. Строки блокируются
+в исходной базе, копия фиксируется в целевой, и только потом исходные
+строки удаляются: отзыв, пришедший во время переноса, дождется удаления и
+найдет копию (см. ShardRouter.urls_for). Просроченные токены не
+копируются, а только удаляются. Повторный запуск безопасен: уже
+перенесенные хеши не дублируются.
+"""
+import argparse
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import insert
+
+from src.models import RefreshToken
+from src.sharding import ShardRouter, shard_router
+
+TOKEN_COLUMNS = ("token_hash", "user_id", "expires_at", "created_at", "is_revoked", "revoked_at",
+                 "previous_hash", "rotated_at", "family_id")
+
+
+def _copy(shards: ShardRouter, target: str, tokens: List[RefreshToken]) -> int:
+    """Записать копии токенов в целевую базу, пропуская уже перенесенные"""
+    with shards.session(target) as db:
+        hashes = [token.token_hash for token in tokens]
+        existing = {
+            token_hash for (token_hash,) in
+            db.query(RefreshToken.token_hash).filter(RefreshToken.token_hash.in_(hashes))
+        }
+        rows = [
+            {column: getattr(token, column) for column in TOKEN_COLUMNS}
+            for token in tokens if token.token_hash not in existing
+        ]
+        if rows:
+            db.execute(insert(RefreshToken), rows)
+            db.commit()
+        return len(rows)
+
+
+def move_batch(
+    shards: ShardRouter,
+    source: str,
+    after_id: int,
+    batch_size: int,
+    dry_run: bool = False
+) -> Tuple[int, int, int]:
+    """Перенести неправильно размещенные токены из очередной пачки исходной базы.
+
+    Возвращает (последний просмотренный ID, просмотрено, перенесено);
+    последний ID равен after_id, когда база пройдена до конца.
+    """
+    with shards.session(source) as db:
+        scanned = db.query(RefreshToken.id, RefreshToken.user_id).filter(
+            RefreshToken.id > after_id
+        ).order_by(RefreshToken.id).limit(batch_size).all()
+        if not scanned:
+            return after_id, 0, 0
+        last_id = scanned[-1].id
+        misplaced = [row.id for row in scanned if shards.shard_url(row.user_id) != source]
+        if not misplaced or dry_run:
+            return last_id, len(scanned), len(misplaced)
+
+        # Блокировка до удаления: отзыв или очистка не изменят строку после копирования
+        tokens = db.query(RefreshToken).filter(
+            RefreshToken.id.in_(misplaced)
+        ).with_for_update().all()
+        now = datetime.now(timezone.utc)
+        by_target: Dict[str, List[RefreshToken]] = defaultdict(list)
+        for token in tokens:
+            expires_at = token.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at > now:
+                by_target[shards.shard_url(token.user_id)].append(token)
+        for target, moving in by_target.items():
+            _copy(shards, target, moving)
+
+        db.query(RefreshToken).filter(
+            RefreshToken.id.in_([token.id for token in tokens])
+        ).delete(synchronize_session=False)
+        db.commit()
+        return last_id, len(scanned), len(tokens)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Перенос refresh токенов между шардами")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Строк исходной базы за проход")
+    parser.add_argument("--dry-run", action="store_true", help="Только посчитать токены для переноса")
+    args = parser.parse_args()
+
+    shards = shard_router
+    shards.create_tables()
+    print(f"Шардов в раскладке: {len(shards.urls)}, баз для обхода: {len(shards.all_urls)}")
+    try:
+        for index, source in enumerate(shards.all_urls):
+            after_id, total_scanned, total_moved = 0, 0, 0
+            while True:
+                after_id, scanned, moved = move_batch(shards, source, after_id, args.batch_size, args.dry_run)
+                if not scanned:
+                    break
+                total_scanned += scanned
+                total_moved += moved
+            action = "к переносу" if args.dry_run else "перенесено"
+            print(f"База #{index}: просмотрено {total_scanned}, {action} {total_moved}")
+    finally:
+        shards.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Снимок отзыва refresh токенов для локальной проверки в User Service.
+
+Полный снимок — отсортированный массив 64-битных префиксов хешей
+действующих токенов (uint64 little-endian, base64) и фильтр Блума по
+хешам отозванных. Дельта с момента since — префиксы новых токенов и
+список отозванных хешей. Токен, чей префикс есть в массиве и хеш не
+попал в фильтр, заведомо не отозван; в остальных случаях User Service
+спрашивает базу.
+
+Хеши — sha256 в hex. Позиции фильтра берутся прямо из хеша: i-я функция —
+i-й блок из 8 hex символов по модулю числа бит, поэтому повторно
+хешировать не нужно. Формат должен совпадать с src/revocation.py User
+Service.
+"""
+import base64
+import os
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+# Дельта перекрывает предыдущую на столько секунд: покрывает расхождение
+# часов сервиса и баз и транзакции, зафиксированные позже своего now()
+REVOCATION_OVERLAP = float(os.getenv("REVOCATION_OVERLAP", "5"))
+
+PREFIX_HEX = 16
+BLOOM_HASHES = 7
+# ~1% ложных срабатываний при 7 функциях
+BLOOM_BITS_PER_ITEM = 10
+BLOOM_MIN_BITS = 1024
+HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def token_prefix(token_hash: str) -> Optional[int]:
+    """64-битный префикс sha256 хеша; None для хешей другого формата"""
+    if len(token_hash) != 64 or not HEX_DIGITS.issuperset(token_hash):
+        return None
+    return int(token_hash[:PREFIX_HEX], 16)
+
+
+def bloom_positions(token_hash: str, bits: int, hashes: int) -> List[int]:
+    return [int(token_hash[8 * i:8 * i + 8], 16) % bits for i in range(hashes)]
+
+
+def encode_prefixes(token_hashes: Iterable[str]) -> str:
+    prefixes = array("Q", sorted({p for p in map(token_prefix, token_hashes) if p is not None}))
+    if sys.byteorder == "big":
+        prefixes.byteswap()
+    return base64.b64encode(prefixes.tobytes()).decode()
+
+
+def build_bloom(token_hashes: List[str]) -> Dict:
+    token_hashes = [token_hash for token_hash in token_hashes if token_prefix(token_hash) is not None]
+    bits = max(len(token_hashes) * BLOOM_BITS_PER_ITEM, BLOOM_MIN_BITS)
+    bits += -bits % 8
+    bloom = bytearray(bits // 8)
+    for token_hash in token_hashes:
+        for position in bloom_positions(token_hash, bits, BLOOM_HASHES):
+            bloom[position >> 3] |= 1 << (position & 7)
+    return {
+        "bloom": base64.b64encode(bytes(bloom)).decode(),
+        "bloom_bits": bits,
+        "bloom_hashes": BLOOM_HASHES
+    }
+
+
+def build_snapshot(version: float, active: List[str], revoked: List[str], full: bool) -> Dict:
+    """Ответ /tokens/revocations из хешей действующих и отозванных токенов"""
+    snapshot = {"version": version, "full": full, "prefixes": encode_prefixes(active)}
+    if full:
+        snapshot.update(build_bloom(revoked))
+    else:
+        snapshot["revoked"] = [token_hash for token_hash in revoked if token_prefix(token_hash) is not None]
+    return snapshot
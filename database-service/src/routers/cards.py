@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from src.database import get_db
+from src.crud import CardCRUD
+from src.schemas import (
+    CardResponse, CardUpdateRequest, CardHtmlUpdateRequest, SuccessResponse,
+    IdBatchRequest, CardBatchResponse
+)
+
+router = APIRouter()
+
+@router.post("/batch", response_model=CardBatchResponse)
+async def get_cards_batch(
+    batch: IdBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Карточки по списку ID одним запросом"""
+    return CardBatchResponse(cards=CardCRUD.get_cards_by_ids(db, set(batch.ids)))
+
+@router.get("/{card_id}", response_model=CardResponse)
+async def get_card(
+    card_id: int,
+    db: Session = Depends(get_db)
+):
+    """Получить карточку по ID"""
+    card = CardCRUD.get_card_by_id(db, card_id)
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Карточка не найдена"
+        )
+    return card
+
+@router.put("/{card_id}", response_model=CardResponse)
+async def update_card(
+    card_id: int,
+    card_data: CardUpdateRequest,
+    db: Session = Depends(get_db)
+):
+    """Обновить карточку"""
+    card = CardCRUD.update_card(db, card_id, card_data)
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Карточка не найдена"
+        )
+    return card
+
+@router.put("/{card_id}/html", response_model=SuccessResponse)
+async def update_card_html(
+    card_id: int,
+    html_data: CardHtmlUpdateRequest,
+    db: Session = Depends(get_db)
+):
+    """Сохранить отрендеренный HTML карточки"""
+    if not CardCRUD.update_card_html(db, card_id, html_data):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Карточка не найдена"
+        )
+    return SuccessResponse(message="HTML карточки сохранен")
+
+@router.delete("/{card_id}", response_model=SuccessResponse)
+async def delete_card(
+    card_id: int,
+    db: Session = Depends(get_db)
+):
+    """Удалить карточку"""
+    if not CardCRUD.delete_card(db, card_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Карточка не найдена"
+        )
+    return SuccessResponse(message="Карточка успешно удалена")
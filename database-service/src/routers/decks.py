@@ -0,0 +1,226 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import math
+
+from src.database import get_db, SessionLocal
+from src.crud import DeckCRUD, CardCRUD
+from src.etag import make_etag, if_none_match, etag_matches, not_modified
+from src.ranks import RANK_REBALANCE_LENGTH, RANK_MAX_LENGTH
+from src.schemas import (
+    DeckCreateRequest, DeckUpdateRequest, DeckResponse, DeckListResponse,
+    CardCreateRequest, CardResponse, CardListResponse, SuccessResponse,
+    CardBulkCreateRequest, CardBulkCreateResponse, CardKeysetResponse,
+    CardMoveRequest, CardMoveResponse, CardRank,
+    IdBatchRequest, DeckBatchResponse
+)
+
+router = APIRouter()
+
+def _rebalance_deck(deck_id: int):
+    """Фоновая перебалансировка ключей порядка в отдельной сессии"""
+    db = SessionLocal()
+    try:
+        CardCRUD.rebalance_deck(db, deck_id)
+    finally:
+        db.close()
+
+@router.post("/", response_model=DeckResponse, status_code=status.HTTP_201_CREATED)
+async def create_deck(
+    deck_data: DeckCreateRequest,
+    db: Session = Depends(get_db)
+):
+    """Создать новую колоду"""
+    try:
+        return DeckCRUD.create_deck(db, deck_data)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка создания колоды: {str(e)}"
+        )
+
+@router.get("/", response_model=DeckListResponse)
+async def get_decks(
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    limit: int = Query(10, ge=1, le=100, description="Количество элементов на странице"),
+    owner_id: Optional[int] = Query(None, description="Фильтр по владельцу"),
+    is_public: Optional[bool] = Query(None, description="Фильтр по публичности"),
+    search: Optional[str] = Query(None, description="Поиск по названию и описанию"),
+    db: Session = Depends(get_db)
+):
+    """Получить список колод с пагинацией и фильтрами"""
+    decks, total = DeckCRUD.get_decks_paginated(db, page, limit, owner_id, is_public, search)
+    return DeckListResponse(
+        decks=decks,
+        total=total,
+        page=page,
+        limit=limit,
+        total_pages=math.ceil(total / limit)
+    )
+
+@router.post("/batch", response_model=DeckBatchResponse)
+async def get_decks_batch(
+    batch: IdBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Колоды по списку ID одним запросом"""
+    return DeckBatchResponse(decks=DeckCRUD.get_decks_by_ids(db, set(batch.ids)))
+
+@router.get("/{deck_id}", response_model=DeckResponse)
+async def get_deck(
+    deck_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Получить колоду по ID (с ETag; If-None-Match -> 304 после чтения одной версии)"""
+    header = if_none_match(request)
+    if header:
+        version = DeckCRUD.get_deck_version(db, deck_id)
+        if version is not None and etag_matches(header, make_etag("deck", deck_id, version)):
+            return not_modified(make_etag("deck", deck_id, version))
+    deck = DeckCRUD.get_deck_by_id(db, deck_id)
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не найдена"
+        )
+    response.headers["ETag"] = make_etag("deck", deck.id, deck.version)
+    return deck
+
+@router.put("/{deck_id}", response_model=DeckResponse)
+async def update_deck(
+    deck_id: int,
+    deck_data: DeckUpdateRequest,
+    db: Session = Depends(get_db)
+):
+    """Обновить колоду"""
+    deck = DeckCRUD.update_deck(db, deck_id, deck_data)
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не найдена"
+        )
+    return deck
+
+@router.delete("/{deck_id}", response_model=SuccessResponse)
+async def delete_deck(
+    deck_id: int,
+    db: Session = Depends(get_db)
+):
+    """Удалить колоду со всеми карточками"""
+    if not DeckCRUD.delete_deck(db, deck_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не найдена"
+        )
+    return SuccessResponse(message="Колода успешно удалена")
+
+@router.get("/{deck_id}/cards", response_model=CardListResponse)
+async def get_deck_cards(
+    deck_id: int,
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    limit: int = Query(50, ge=1, le=1000, description="Количество элементов на странице"),
+    db: Session = Depends(get_db)
+):
+    """Получить карточки колоды"""
+    cards, total = CardCRUD.get_deck_cards_paginated(db, deck_id, page, limit)
+    return CardListResponse(
+        cards=cards,
+        total=total,
+        page=page,
+        limit=limit,
+        total_pages=math.ceil(total / limit)
+    )
+
+@router.get("/{deck_id}/cards/after", response_model=CardKeysetResponse)
+async def get_deck_cards_after(
+    deck_id: int,
+    after_rank: Optional[str] = Query(None, max_length=RANK_MAX_LENGTH, description="rank последней полученной карточки"),
+    after_id: Optional[int] = Query(None, description="ID последней полученной карточки"),
+    limit: int = Query(500, ge=1, le=1000, description="Количество элементов"),
+    db: Session = Depends(get_db)
+):
+    """Получить карточки колоды после курсора (keyset пагинация без COUNT и OFFSET)"""
+    cards = CardCRUD.get_deck_cards_after(db, deck_id, after_rank, after_id, limit + 1)
+    return CardKeysetResponse(cards=cards[:limit], has_more=len(cards) > limit)
+
+@router.post("/{deck_id}/cards", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
+async def create_card(
+    deck_id: int,
+    card_data: CardCreateRequest,
+    background_tasks: BackgroundTasks,
+    after_id: Optional[int] = Query(None, description="Вставить после карточки"),
+    before_id: Optional[int] = Query(None, description="Вставить перед карточкой (без обоих — в конец)"),
+    db: Session = Depends(get_db)
+):
+    """Добавить карточку в колоду"""
+    if not DeckCRUD.get_deck_by_id(db, deck_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не найдена"
+        )
+    try:
+        card = CardCRUD.create_card(db, deck_id, card_data, after_id, before_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка создания карточки: {str(e)}"
+        )
+    if card is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Соседняя карточка не найдена в колоде"
+        )
+    if len(card.rank) > RANK_REBALANCE_LENGTH:
+        background_tasks.add_task(_rebalance_deck, deck_id)
+    return card
+
+@router.post("/{deck_id}/cards/move", response_model=CardMoveResponse)
+async def move_cards(
+    deck_id: int,
+    move_data: CardMoveRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Переставить карточки: меняются только ключи перемещаемых карточек (один UPDATE)"""
+    try:
+        moved = CardCRUD.move_cards(db, deck_id, move_data.card_ids, move_data.after_id, move_data.before_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if moved is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Карточка не найдена в колоде"
+        )
+    if any(len(rank) > RANK_REBALANCE_LENGTH for _, rank in moved):
+        background_tasks.add_task(_rebalance_deck, deck_id)
+    return CardMoveResponse(cards=[CardRank(id=card_id, rank=rank) for card_id, rank in moved])
+
+@router.post("/{deck_id}/cards/bulk", response_model=CardBulkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_cards_bulk(
+    deck_id: int,
+    bulk_data: CardBulkCreateRequest,
+    db: Session = Depends(get_db)
+):
+    """Добавить пачку карточек в колоду одним запросом"""
+    if not DeckCRUD.get_deck_by_id(db, deck_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не найдена"
+        )
+    try:
+        return CardBulkCreateResponse(created_count=CardCRUD.create_cards_bulk(db, deck_id, bulk_data.cards))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка создания карточек: {str(e)}"
+        )
@@ -0,0 +1,39 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from src.database import get_db
+from src.crud import ReviewCRUD
+from src.schemas import CardReviewBulkRequest, CardReviewBulkResponse, CardReviewResponse
+
+router = APIRouter()
+
+@router.get("/users/{user_id}", response_model=List[CardReviewResponse])
+async def get_user_reviews(
+    user_id: int,
+    after_card_id: int = Query(0, ge=0, description="Последний card_id предыдущей страницы"),
+    limit: int = Query(1000, ge=1, le=1000, description="Количество состояний"),
+    db: Session = Depends(get_db)
+):
+    """Состояния повторения пользователя страницами по card_id (восстановление расписания Study Service)"""
+    return ReviewCRUD.get_user_reviews(db, user_id, after_card_id, limit)
+
+@router.put("/bulk", response_model=CardReviewBulkResponse)
+async def save_reviews(
+    bulk_data: CardReviewBulkRequest,
+    db: Session = Depends(get_db)
+):
+    """Сохранить состояния повторения пользователя и убрать удаленные из повторения"""
+    try:
+        updated = ReviewCRUD.upsert_reviews(db, bulk_data.user_id, bulk_data.reviews) if bulk_data.reviews else 0
+        removed = (
+            ReviewCRUD.remove_reviews(db, bulk_data.user_id, bulk_data.removed_card_ids)
+            if bulk_data.removed_card_ids else 0
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка сохранения состояний повторения: {str(e)}"
+        )
+    return CardReviewBulkResponse(updated_count=updated, removed_count=removed)
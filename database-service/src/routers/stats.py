@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+
+from src.database import get_db
+from src.crud import StatsCRUD
+from src.schemas import (
+    ReviewEventBulkRequest, ReviewEventBulkResponse,
+    StudyStatsResponse, ReviewEventCompactResponse
+)
+
+router = APIRouter()
+
+@router.post("/events", response_model=ReviewEventBulkResponse)
+async def record_events(
+    bulk_data: ReviewEventBulkRequest,
+    db: Session = Depends(get_db)
+):
+    """Записать ответы пользователя в журнал и обновить сводки статистики"""
+    try:
+        recorded = StatsCRUD.record_events(db, bulk_data.user_id, bulk_data.events)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка записи событий: {str(e)}"
+        )
+    return ReviewEventBulkResponse(recorded_count=recorded)
+
+@router.get("/users/{user_id}", response_model=StudyStatsResponse)
+async def get_user_stats(
+    user_id: int,
+    days: int = Query(30, ge=1, le=366, description="Глубина истории активности в днях"),
+    db: Session = Depends(get_db)
+):
+    """Статистика обучения пользователя из сводок: итоги, серия, активность по дням и колодам"""
+    totals, daily, decks = StatsCRUD.get_user_stats(db, user_id, days)
+    if totals is None:
+        return StudyStatsResponse(user_id=user_id)
+    # Серия прервана, если последний день с ответами раньше вчерашнего
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    active = totals.last_active_day is not None and totals.last_active_day >= yesterday
+    return StudyStatsResponse(
+        user_id=user_id,
+        reviews=totals.reviews,
+        correct=totals.correct,
+        accuracy=totals.correct / totals.reviews if totals.reviews else None,
+        current_streak=totals.current_streak if active else 0,
+        longest_streak=totals.longest_streak,
+        last_active_day=totals.last_active_day,
+        days=daily,
+        decks=decks
+    )
+
+@router.delete("/events", response_model=ReviewEventCompactResponse)
+async def compact_events(
+    older_than_days: int = Query(90, ge=1, description="Удалить события старше стольких дней"),
+    limit: int = Query(10000, ge=1, le=100000, description="Событий за один вызов"),
+    db: Session = Depends(get_db)
+):
+    """Компактизация журнала: старые события удаляются, сводки остаются"""
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    deleted, has_more = StatsCRUD.compact_events(db, before, limit)
+    return ReviewEventCompactResponse(deleted_count=deleted, has_more=has_more)
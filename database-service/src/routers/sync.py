@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+
+from src.database import get_db
+from src.crud import SyncCRUD
+from src.schemas import ChangeItem, ChangesResponse, TombstoneCleanupResponse
+
+router = APIRouter()
+
+@router.get("/changes", response_model=ChangesResponse, response_model_exclude_none=True)
+async def get_changes(
+    user_id: int = Query(..., description="ID пользователя"),
+    since: int = Query(0, ge=0, description="Последняя полученная версия (0 — полная синхронизация)"),
+    limit: int = Query(500, ge=1, le=1000, description="Количество изменений"),
+    db: Session = Depends(get_db)
+):
+    """Изменения колод, карточек и состояний повторения пользователя после версии since"""
+    until, purged = SyncCRUD.get_state(db, user_id)
+    if 0 < since < purged:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Надгробия после этой версии удалены, нужна полная синхронизация (since=0)"
+        )
+    changes, has_more = SyncCRUD.get_changes(db, user_id, since, until, limit)
+    items = []
+    for version, entity, row in changes:
+        if entity == "deck":
+            items.append(ChangeItem(version=version, entity=entity, id=row.id, deck=row))
+        elif entity == "card":
+            items.append(ChangeItem(version=version, entity=entity, id=row.id, deck_id=row.deck_id, card=row))
+        elif entity == "review":
+            items.append(ChangeItem(version=version, entity=entity, id=row.card_id, review=row))
+        else:
+            items.append(ChangeItem(
+                version=version, entity=row.entity, id=row.entity_id, deck_id=row.deck_id, deleted=True
+            ))
+    # Без следующей страницы клиент может сразу продолжать с текущей версии потока
+    next_since = changes[-1][0] if has_more else max(until, since)
+    return ChangesResponse(changes=items, next_since=next_since, has_more=has_more)
+
+@router.delete("/tombstones", response_model=TombstoneCleanupResponse)
+async def cleanup_tombstones(
+    older_than_days: int = Query(30, ge=1, description="Удалить надгробия старше стольких дней"),
+    db: Session = Depends(get_db)
+):
+    """Удалить старые надгробия; клиенты с более ранним since получат 410"""
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    deleted, purged = SyncCRUD.purge_tombstones(db, before)
+    return TombstoneCleanupResponse(deleted_count=deleted, purged_version=purged)
@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
 from typing import Optional, List
+import heapq
 import math
+import time
+
+from starlette.concurrency import run_in_threadpool
 
-from src.database import get_db
 from src.crud import RefreshTokenCRUD
+from src.revocation import REVOCATION_OVERLAP, build_snapshot
+from src.sharding import ShardRouter, get_shards
 from src.schemas import (
-    RefreshTokenCreateRequest, RefreshTokenResponse, 
-    RefreshTokenRevokeRequest, SuccessResponse,
-    TokenCleanupResponse
+    RefreshTokenCreateRequest, RefreshTokenResponse,
+    RefreshTokenBulkCreateRequest, RefreshTokenBulkCreateResponse,
+    RefreshTokenRevokeRequest, RefreshTokenRotateRequest, SuccessResponse,
+    TokenCleanupResponse, RevocationSnapshotResponse
 )
 
 router = APIRouter()
@@ -16,15 +22,18 @@ router = APIRouter()
 @router.post("/", response_model=RefreshTokenResponse, status_code=status.HTTP_201_CREATED)
 async def create_token(
     token_data: RefreshTokenCreateRequest,
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Создать новый refresh токен"""
     try:
-        token = RefreshTokenCRUD.create_refresh_token(
-            db, 
-            token_data.token_hash, 
-            token_data.user_id, 
-            token_data.expires_at
+        token = await run_in_threadpool(
+            shards.run,
+            token_data.user_id,
+            RefreshTokenCRUD.create_refresh_token,
+            token_data.token_hash,
+            token_data.user_id,
+            token_data.expires_at,
+            token_data.family_id
         )
         return token
     except Exception as e:
@@ -33,59 +42,136 @@ async def create_token(
             detail=f"Ошибка создания токена: {str(e)}"
         )
 
+@router.post("/bulk", response_model=RefreshTokenBulkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_tokens_bulk(
+    bulk_data: RefreshTokenBulkCreateRequest,
+    shards: ShardRouter = Depends(get_shards)
+):
+    """Создать пачку refresh токенов: один INSERT и один commit на шард"""
+    created = await run_in_threadpool(
+        shards.run_grouped,
+        bulk_data.tokens,
+        lambda token: token.user_id,
+        RefreshTokenCRUD.create_refresh_tokens
+    )
+    return RefreshTokenBulkCreateResponse(created=sum(created))
+
 @router.get("/verify/{token_hash}", response_model=RefreshTokenResponse)
 async def verify_token(
     token_hash: str,
-    db: Session = Depends(get_db)
+    user_id: Optional[int] = Query(None, description="ID владельца: поиск в одном шарде вместо всех"),
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Проверить и получить refresh токен по хешу"""
-    token = RefreshTokenCRUD.get_refresh_token_by_hash(db, token_hash)
-    if not token:
+    if user_id is not None:
+        found = await run_in_threadpool(
+            shards.each_for_user, user_id, RefreshTokenCRUD.get_refresh_token_by_hash, token_hash
+        )
+    else:
+        found = await run_in_threadpool(shards.scatter, RefreshTokenCRUD.get_refresh_token_by_hash, token_hash)
+    token = next((token for token in found if token is not None), None)
+    if not token or (user_id is not None and token.user_id != user_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Токен не найден, отозван или истек"
         )
     return token
 
+@router.post("/rotate", response_model=RefreshTokenResponse)
+async def rotate_token(
+    rotate_data: RefreshTokenRotateRequest,
+    shards: ShardRouter = Depends(get_shards)
+):
+    """Обменять refresh токен на новый; повторно предъявленный старый токен отзывает сессию"""
+    args = (
+        RefreshTokenCRUD.rotate_refresh_token,
+        rotate_data.token_hash,
+        rotate_data.new_token_hash,
+        rotate_data.expires_at,
+        rotate_data.user_id,
+        rotate_data.family_id
+    )
+    if rotate_data.user_id is not None:
+        results = await run_in_threadpool(shards.each_for_user, rotate_data.user_id, *args)
+    else:
+        results = await run_in_threadpool(shards.scatter, *args)
+    token = next((token for token, _ in results if token is not None), None)
+    if token is not None:
+        return token
+    if any(reused for _, reused in results):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Токен уже обменян: сессия отозвана"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Токен не найден, отозван или истек"
+    )
+
+@router.get("/revocations", response_model=RevocationSnapshotResponse)
+async def get_revocations(
+    since: Optional[float] = Query(None, description="version предыдущего снимка: вернуть дельту"),
+    shards: ShardRouter = Depends(get_shards)
+):
+    """Снимок (или дельта) отзыва refresh токенов для локальной проверки в User Service"""
+    version = time.time()
+    changed_after = None
+    if since is not None:
+        changed_after = datetime.fromtimestamp(since - REVOCATION_OVERLAP, tz=timezone.utc)
+    active, revoked = [], []
+    states = await run_in_threadpool(shards.scatter, RefreshTokenCRUD.get_revocation_state, changed_after)
+    for shard_active, shard_revoked in states:
+        active += shard_active
+        revoked += shard_revoked
+    return build_snapshot(version, active, revoked, full=since is None)
+
 @router.get("/user/{user_id}", response_model=List[RefreshTokenResponse])
 async def get_user_tokens(
     user_id: int,
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Получить все токены пользователя"""
-    tokens = RefreshTokenCRUD.get_user_tokens(db, user_id)
-    return tokens
+    results = await run_in_threadpool(shards.each_for_user, user_id, RefreshTokenCRUD.get_user_tokens, user_id)
+    return [token for tokens in results for token in tokens]
 
 @router.post("/revoke", response_model=SuccessResponse)
 async def revoke_token(
     revoke_data: RefreshTokenRevokeRequest,
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Отозвать refresh токен"""
-    success = RefreshTokenCRUD.revoke_refresh_token(db, revoke_data.token_hash)
-    if not success:
+    if revoke_data.user_id is not None:
+        revoked = await run_in_threadpool(
+            shards.each_for_user, revoke_data.user_id, RefreshTokenCRUD.revoke_refresh_token,
+            revoke_data.token_hash, revoke_data.user_id, revoke_data.expires_at
+        )
+    else:
+        revoked = await run_in_threadpool(shards.scatter, RefreshTokenCRUD.revoke_refresh_token, revoke_data.token_hash)
+    if not any(revoked):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Токен не найден"
         )
-    
+
     return SuccessResponse(message="Токен успешно отозван")
 
 @router.post("/revoke-user/{user_id}", response_model=SuccessResponse)
 async def revoke_user_tokens(
     user_id: int,
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Отозвать все токены пользователя"""
-    count = RefreshTokenCRUD.revoke_all_user_tokens(db, user_id)
+    count = sum(await run_in_threadpool(
+        shards.each_for_user, user_id, RefreshTokenCRUD.revoke_all_user_tokens, user_id
+    ))
     return SuccessResponse(message=f"Отозвано токенов: {count}")
 
 @router.post("/cleanup", response_model=TokenCleanupResponse)
 async def cleanup_expired_tokens(
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Очистить просроченные токены"""
-    deleted_count = RefreshTokenCRUD.cleanup_expired_tokens(db)
+    deleted_count = sum(await run_in_threadpool(shards.scatter, RefreshTokenCRUD.cleanup_expired_tokens))
     return TokenCleanupResponse(
         deleted_count=deleted_count,
         message=f"Удалено просроченных токенов: {deleted_count}"
@@ -97,10 +183,17 @@ async def get_tokens(
     limit: int = Query(10, ge=1, le=100, description="Количество элементов на странице"),
     user_id: Optional[int] = Query(None, description="Фильтр по ID пользователя"),
     is_revoked: Optional[bool] = Query(None, description="Фильтр по статусу отзыва"),
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Получить список токенов с пагинацией и фильтрами"""
-    tokens, total = RefreshTokenCRUD.get_tokens_paginated(
-        db, page, limit, user_id, is_revoked
+    # Каждый шард отдает первые page * limit токенов, страница вырезается после слияния
+    args = (RefreshTokenCRUD.get_tokens_paginated, 1, page * limit, user_id, is_revoked)
+    if user_id is not None:
+        results = await run_in_threadpool(shards.each_for_user, user_id, *args)
+    else:
+        results = await run_in_threadpool(shards.scatter, *args)
+    merged = heapq.merge(
+        *(tokens for tokens, _ in results),
+        key=lambda token: (token.created_at, token.id)
     )
-    return tokens 
\ No newline at end of file
+    return list(merged)[(page - 1) * limit:page * limit]
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
 import math
 
+from starlette.concurrency import run_in_threadpool
+
 from src.database import get_db
-from src.crud import UserCRUD
+from src.crud import UserCRUD, RefreshTokenCRUD
+from src.sharding import ShardRouter, get_shards
+from src.etag import make_etag, if_none_match, etag_matches, not_modified
 from src.schemas import (
     UserCreateRequest, UserResponse, UserUpdateRequest,
     UserSearchRequest, UserListResponse, SuccessResponse,
+    IdBatchRequest, UserBatchResponse,
     PaginationParams
 )
 
@@ -45,47 +50,71 @@ async def create_user(
             detail=f"Ошибка создания пользователя: {str(e)}"
         )
 
-@router.get("/{user_id}", response_model=UserResponse)
-async def get_user_by_id(
-    user_id: int,
-    db: Session = Depends(get_db)
+def _user_response(
+    request: Request,
+    response: Response,
+    db: Session,
+    user_id: Optional[int] = None,
+    username: Optional[str] = None,
+    email: Optional[str] = None
 ):
-    """Получить пользователя по ID"""
-    user = UserCRUD.get_user_by_id(db, user_id)
+    """Пользователь с ETag; при совпадении If-None-Match — 304 после чтения одной версии"""
+    header = if_none_match(request)
+    if header:
+        found = UserCRUD.get_user_version(db, user_id, username, email)
+        if found is not None and etag_matches(header, make_etag("user", *found)):
+            return not_modified(make_etag("user", *found))
+    if user_id is not None:
+        user = UserCRUD.get_user_by_id(db, user_id)
+    elif username is not None:
+        user = UserCRUD.get_user_by_username(db, username)
+    else:
+        user = UserCRUD.get_user_by_email(db, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пользователь не найден"
         )
+    response.headers["ETag"] = make_etag("user", user.id, user.version)
     return user
 
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user_by_id(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Получить пользователя по ID"""
+    return _user_response(request, response, db, user_id=user_id)
+
+@router.post("/batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    batch: IdBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Пользователи по списку ID одним запросом"""
+    return UserBatchResponse(users=UserCRUD.get_users_by_ids(db, set(batch.ids)))
+
 @router.get("/search/by-username/{username}", response_model=UserResponse)
 async def get_user_by_username(
     username: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Получить пользователя по имени пользователя"""
-    user = UserCRUD.get_user_by_username(db, username)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Пользователь не найден"
-        )
-    return user
+    return _user_response(request, response, db, username=username)
 
 @router.get("/search/by-email/{email}", response_model=UserResponse)
 async def get_user_by_email(
     email: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Получить пользователя по email"""
-    user = UserCRUD.get_user_by_email(db, email)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Пользователь не найден"
-        )
-    return user
+    return _user_response(request, response, db, email=email)
 
 @router.get("/", response_model=UserListResponse)
 async def get_users(
@@ -124,7 +153,8 @@ async def update_user(
 @router.delete("/{user_id}", response_model=SuccessResponse)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    shards: ShardRouter = Depends(get_shards)
 ):
     """Удалить пользователя"""
     success = UserCRUD.delete_user(db, user_id)
@@ -133,5 +163,7 @@ async def delete_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пользователь не найден"
         )
+    # В основной базе токены удаляются каскадно, в остальных шардах внешнего ключа нет
+    await run_in_threadpool(shards.each_for_user, user_id, RefreshTokenCRUD.delete_user_tokens, user_id)
     
     return SuccessResponse(message="Пользователь успешно удален") 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 
 # Базовые схемы для пользователя
@@ -28,6 +28,7 @@ class UserResponse(UserBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     is_active: bool
+    version: int
     
     class Config:
         from_attributes = True
@@ -45,6 +46,15 @@ class RefreshTokenCreateRequest(BaseModel):
     token_hash: str = Field(..., description="Хеш токена")
     user_id: int = Field(..., description="ID пользователя")
     expires_at: datetime = Field(..., description="Время истечения токена")
+    family_id: Optional[str] = Field(None, max_length=32, description="Семейство ротации (claim fid)")
+
+
+class RefreshTokenBulkCreateRequest(BaseModel):
+    tokens: List[RefreshTokenCreateRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class RefreshTokenBulkCreateResponse(BaseModel):
+    created: int = Field(..., description="Сколько токенов сохранено (повторы пропускаются)")
 
 
 class RefreshTokenResponse(BaseModel):
@@ -67,6 +77,271 @@ class RefreshTokenSearchRequest(BaseModel):
 
 class RefreshTokenRevokeRequest(BaseModel):
     token_hash: str = Field(..., description="Хеш токена для отзыва")
+    user_id: Optional[int] = Field(None, description="ID владельца: отзыв в одном шарде вместо всех")
+    expires_at: Optional[datetime] = Field(
+        None, description="Срок действия: с user_id неизвестный хеш сохраняется отозванным"
+    )
+
+
+class RefreshTokenRotateRequest(BaseModel):
+    token_hash: str = Field(..., description="Хеш предъявленного токена")
+    new_token_hash: str = Field(..., description="Хеш нового токена")
+    expires_at: datetime = Field(..., description="Время истечения нового токена")
+    user_id: Optional[int] = Field(None, description="ID владельца: обмен в одном шарде вместо всех")
+    family_id: Optional[str] = Field(
+        None, max_length=32, description="Семейство ротации: повтор любого прежнего токена отзывает сессию"
+    )
+
+
+# Схемы для колод
+class DeckCreateRequest(BaseModel):
+    owner_id: int = Field(..., description="ID владельца")
+    title: str = Field(..., min_length=1, max_length=200, description="Название колоды")
+    description: Optional[str] = None
+    is_public: bool = False
+    category: Optional[str] = Field(None, max_length=100)
+    tags: List[str] = []
+
+
+class DeckUpdateRequest(BaseModel):
+    title: Optional[str] = Field(None, min_length=1, max_length=200)
+    description: Optional[str] = None
+    is_public: Optional[bool] = None
+    category: Optional[str] = Field(None, max_length=100)
+    tags: Optional[List[str]] = None
+
+
+class DeckResponse(BaseModel):
+    id: int
+    owner_id: int
+    title: str
+    description: Optional[str] = None
+    is_public: bool
+    category: Optional[str] = None
+    tags: List[str]
+    cards_count: int
+    version: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class DeckListResponse(BaseModel):
+    decks: List[DeckResponse]
+    total: int
+    page: int
+    limit: int
+    total_pages: int
+
+
+# Схемы для карточек
+class CardCreateRequest(BaseModel):
+    question: str = Field(..., description="Вопрос (Markdown)")
+    answer: str = Field(..., description="Ответ (Markdown)")
+    question_html: Optional[str] = None
+    answer_html: Optional[str] = None
+    html_key: Optional[str] = Field(None, max_length=64, description="Ключ рендера HTML")
+    attachments: List[str] = []
+
+
+class CardBulkCreateRequest(BaseModel):
+    cards: List[CardCreateRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class CardBulkCreateResponse(BaseModel):
+    created_count: int
+
+
+class CardUpdateRequest(BaseModel):
+    question: Optional[str] = None
+    answer: Optional[str] = None
+    question_html: Optional[str] = None
+    answer_html: Optional[str] = None
+    html_key: Optional[str] = Field(None, max_length=64)
+    attachments: Optional[List[str]] = None
+
+
+class CardHtmlUpdateRequest(BaseModel):
+    question_html: str
+    answer_html: str
+    html_key: str = Field(..., max_length=64)
+
+
+class CardResponse(BaseModel):
+    id: int
+    deck_id: int
+    question: str
+    answer: str
+    question_html: Optional[str] = None
+    answer_html: Optional[str] = None
+    html_key: Optional[str] = None
+    attachments: List[str]
+    rank: str
+    version: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class CardListResponse(BaseModel):
+    cards: List[CardResponse]
+    total: int
+    page: int
+    limit: int
+    total_pages: int
+
+
+class CardKeysetResponse(BaseModel):
+    cards: List[CardResponse]
+    has_more: bool
+
+
+class CardMoveRequest(BaseModel):
+    card_ids: List[int] = Field(..., min_length=1, max_length=1000, description="Карточки в новом порядке")
+    after_id: Optional[int] = Field(None, description="Поставить после карточки")
+    before_id: Optional[int] = Field(None, description="Поставить перед карточкой (без обоих — в конец)")
+
+
+class CardRank(BaseModel):
+    id: int
+    rank: str
+
+
+class CardMoveResponse(BaseModel):
+    cards: List[CardRank]
+
+
+# Схемы для состояния повторения и дельта-синхронизации
+class CardReviewState(BaseModel):
+    card_id: int
+    interval: float = Field(..., ge=0, description="Интервал в днях")
+    due: float = Field(..., description="Время следующего повторения (unix time)")
+    reps: int = Field(0, ge=0)
+    lapses: int = Field(0, ge=0)
+
+
+class CardReviewBulkRequest(BaseModel):
+    user_id: int = Field(..., description="ID пользователя")
+    reviews: List[CardReviewState] = Field([], max_length=1000, description="Новые состояния карточек")
+    removed_card_ids: List[int] = Field([], max_length=1000, description="Карточки, убранные из повторения")
+
+
+class CardReviewBulkResponse(BaseModel):
+    updated_count: int
+    removed_count: int
+
+
+class CardReviewResponse(CardReviewState):
+    version: int
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ChangeItem(BaseModel):
+    version: int
+    entity: str = Field(..., description="deck, card или review")
+    id: int = Field(..., description="ID сущности (для review — ID карточки)")
+    deck_id: Optional[int] = None
+    deleted: bool = False
+    deck: Optional[DeckResponse] = None
+    card: Optional[CardResponse] = None
+    review: Optional[CardReviewResponse] = None
+
+
+class ChangesResponse(BaseModel):
+    changes: List[ChangeItem]
+    next_since: int = Field(..., description="Значение since для следующего запроса")
+    has_more: bool
+
+
+class TombstoneCleanupResponse(BaseModel):
+    deleted_count: int
+    purged_version: int
+
+
+# Схемы для журнала ответов и статистики
+class ReviewEventItem(BaseModel):
+    event_id: str = Field(..., min_length=1, max_length=36, description="Уникальный ключ события (повтор пачки безопасен)")
+    card_id: int
+    performance: float = Field(..., ge=0, le=1, description="0 — неверно, иначе верный ответ")
+    reviewed_at: float = Field(..., description="Время ответа (unix time)")
+
+
+class ReviewEventBulkRequest(BaseModel):
+    user_id: int = Field(..., description="ID пользователя")
+    events: List[ReviewEventItem] = Field(..., min_length=1, max_length=1000)
+
+
+class ReviewEventBulkResponse(BaseModel):
+    recorded_count: int = Field(..., description="Сколько событий записано (повторы пропускаются)")
+
+
+class StudyDayStats(BaseModel):
+    day: date
+    reviews: int
+    correct: int
+    
+    class Config:
+        from_attributes = True
+
+
+class StudyDeckStatsResponse(BaseModel):
+    deck_id: int
+    reviews: int
+    correct: int
+    last_reviewed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class StudyStatsResponse(BaseModel):
+    user_id: int
+    reviews: int = 0
+    correct: int = 0
+    accuracy: Optional[float] = Field(None, description="Доля верных ответов")
+    current_streak: int = Field(0, description="Дней подряд с ответами, включая сегодня или вчера (UTC)")
+    longest_streak: int = 0
+    last_active_day: Optional[date] = None
+    days: List[StudyDayStats] = Field([], description="Активность за последние дни (дни без ответов пропущены)")
+    decks: List[StudyDeckStatsResponse] = []
+
+
+class ReviewEventCompactResponse(BaseModel):
+    deleted_count: int
+    has_more: bool
+
+
+# Выборка пачки сущностей по ID (загрузчики сервисов собирают запросы в одну пачку)
+class IdBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="ID сущностей (повторы допустимы)")
+
+
+class UserSummaryResponse(BaseModel):
+    """Публичные поля пользователя для других сервисов (без хеша пароля и email)"""
+    id: int
+    username: str
+    
+    class Config:
+        from_attributes = True
+
+
+class UserBatchResponse(BaseModel):
+    users: List[UserSummaryResponse] = Field(..., description="Найденные пользователи; отсутствующие ID пропущены")
+
+
+class DeckBatchResponse(BaseModel):
+    decks: List[DeckResponse] = Field(..., description="Найденные колоды; отсутствующие ID пропущены")
+
+
+class CardBatchResponse(BaseModel):
+    cards: List[CardResponse] = Field(..., description="Найденные карточки; отсутствующие ID пропущены")
 
 
 # Схемы для пагинации
@@ -98,4 +373,14 @@ class ErrorResponse(BaseModel):
 # Схема для очистки токенов
 class TokenCleanupResponse(BaseModel):
     deleted_count: int
-    message: str 
\ No newline at end of file
+    message: str 
+
+# Схема снимка отзыва refresh токенов
+class RevocationSnapshotResponse(BaseModel):
+    version: float = Field(..., description="Момент снимка (unix time): since для следующей дельты")
+    full: bool = Field(..., description="Полный снимок или дельта")
+    prefixes: str = Field(..., description="base64 отсортированных uint64 LE префиксов хешей действующих токенов (в дельте — новых)")
+    bloom: Optional[str] = Field(None, description="base64 фильтра Блума отозванных токенов (только в полном снимке)")
+    bloom_bits: int = 0
+    bloom_hashes: int = 0
+    revoked: List[str] = Field([], description="Хеши токенов, отозванных после since (только в дельте)")
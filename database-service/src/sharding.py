@@ -0,0 +1,181 @@
+"""Шардирование refresh токенов по user_id.
+
+Пользователи остаются в основной базе: на них ссылаются колоды и прогресс,
+а их изменения пишут события outbox и версии синхронизации в той же
+транзакции. Основная база с ее уникальными индексами username/email —
+справочник пользователей. Refresh токены (запись на каждый вход, отзыв и
+очистку) распределяются по базам:
+
+    DATABASE_SHARD_URLS=postgresql://...@postgres-shard-1/recall_pro,postgresql://...@postgres-shard-2/recall_pro
+
+Основная база (DATABASE_URL) — шард 0. Шард пользователя выбирается
+jump consistent hash от user_id: при добавлении шарда в конец списка
+переезжает только 1/N пользователей. Операции с известным user_id идут в
+один шард, остальные (поиск по хешу без user_id, списки, очистка) —
+параллельно во все шарды с объединением результатов.
+
+Решардинг: новая раскладка задается в DATABASE_SHARD_URLS, прежнее
+значение переменной — в DATABASE_SHARD_URLS_PREVIOUS (пустая строка, если
+дополнительных шардов не было). Запись идет по новой раскладке, чтение и
+отзыв проверяют обе, пока `python -m src.reshard` переносит токены.
+После переноса DATABASE_SHARD_URLS_PREVIOUS убирается.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateTable
+
+from src.database import DATABASE_URL, SQL_ECHO, Base, SessionLocal, _engine_options
+
+
+def _parse_urls(value: str) -> List[str]:
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+DATABASE_SHARD_URLS = _parse_urls(os.getenv("DATABASE_SHARD_URLS", ""))
+# Заданная (хотя бы пустой строкой) переменная означает, что идет решардинг
+DATABASE_SHARD_URLS_PREVIOUS = os.getenv("DATABASE_SHARD_URLS_PREVIOUS")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping, Veach): номер корзины от 0 до buckets - 1"""
+    bucket, jump = -1, 0
+    key &= 0xFFFFFFFFFFFFFFFF
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+class ShardRouter:
+    """Сессии шардов токенов и маршрутизация операций по user_id.
+
+    Методы блокирующие: async эндпоинты вызывают их через run_in_threadpool.
+    """
+
+    def __init__(self, urls: List[str], previous_urls: Optional[List[str]] = None):
+        self.urls = urls
+        # Старая раскладка; None, если решардинг не идет
+        self.previous_urls = previous_urls
+        self._sessions: Dict[str, sessionmaker] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def all_urls(self) -> List[str]:
+        """Все базы обеих раскладок без повторов"""
+        return list(dict.fromkeys(self.urls + (self.previous_urls or [])))
+
+    @staticmethod
+    def _pick(urls: List[str], user_id: int) -> str:
+        return urls[jump_hash(user_id, len(urls))]
+
+    def shard_url(self, user_id: int) -> str:
+        """База, в которую пишутся токены пользователя"""
+        return self._pick(self.urls, user_id)
+
+    def urls_for(self, user_id: int) -> List[str]:
+        """Базы, где могут лежать токены пользователя.
+
+        Во время решардинга старая база идет первой: перенос сначала
+        фиксирует копию в новой базе и только потом удаляет строку из
+        старой, поэтому чтение или отзыв, не нашедшие строку в старой
+        базе, найдут ее в новой.
+        """
+        current = self.shard_url(user_id)
+        if self.previous_urls is None:
+            return [current]
+        previous = self._pick(self.previous_urls, user_id)
+        return [current] if previous == current else [previous, current]
+
+    def _factory(self, url: str) -> sessionmaker:
+        factory = self._sessions.get(url)
+        if factory is None:
+            if url == DATABASE_URL:
+                # Шард 0 — основная база с общим пулом соединений
+                factory = SessionLocal
+            else:
+                engine = create_engine(url, echo=SQL_ECHO, **_engine_options(url))
+                factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            self._sessions[url] = factory
+        return factory
+
+    def engine(self, url: str) -> Engine:
+        return self._factory(url).kw["bind"]
+
+    @contextmanager
+    def session(self, url: str) -> Iterator[Session]:
+        db = self._factory(url)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _call(self, url: str, func: Callable, *args) -> Any:
+        with self.session(url) as db:
+            return func(db, *args)
+
+    def run(self, user_id: int, func: Callable, *args) -> Any:
+        """Выполнить func(db, *args) в текущем шарде пользователя"""
+        return self._call(self.shard_url(user_id), func, *args)
+
+    def run_grouped(self, items: List[Any], user_id: Callable[[Any], int], func: Callable) -> List[Any]:
+        """Разложить items по шардам их пользователей и выполнить func(db, group) в каждом"""
+        groups: Dict[str, List[Any]] = {}
+        for item in items:
+            groups.setdefault(self.shard_url(user_id(item)), []).append(item)
+        return [self._call(url, func, group) for url, group in groups.items()]
+
+    def each_for_user(self, user_id: int, func: Callable, *args) -> List[Any]:
+        """Выполнить func во всех базах, где могут быть токены пользователя"""
+        return [self._call(url, func, *args) for url in self.urls_for(user_id)]
+
+    def scatter(self, func: Callable, *args) -> List[Any]:
+        """Выполнить func параллельно во всех базах"""
+        urls = self.all_urls
+        if len(urls) == 1:
+            return [self._call(urls[0], func, *args)]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="shard")
+        return list(self._executor.map(lambda url: self._call(url, func, *args), urls))
+
+    def create_tables(self):
+        """Создать таблицу refresh_tokens в дополнительных шардах.
+
+        В шардах нет таблицы users, поэтому внешний ключ на нее не
+        создается: токены удаляются вместе с пользователем явно.
+        """
+        tokens = Base.metadata.tables["refresh_tokens"]
+        for url in self.all_urls:
+            if url == DATABASE_URL:
+                continue
+            with self.engine(url).begin() as conn:
+                if not inspect(conn).has_table(tokens.name):
+                    conn.execute(CreateTable(tokens, include_foreign_key_constraints=[]))
+                for index in tokens.indexes:
+                    index.create(conn, checkfirst=True)
+
+    def dispose(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        for url, factory in self._sessions.items():
+            if url != DATABASE_URL:
+                factory.kw["bind"].dispose()
+        self._sessions = {}
+
+
+# Singleton instance
+shard_router = ShardRouter(
+    [DATABASE_URL] + DATABASE_SHARD_URLS,
+    None if DATABASE_SHARD_URLS_PREVIOUS is None else [DATABASE_URL] + _parse_urls(DATABASE_SHARD_URLS_PREVIOUS)
+)
+
+def get_shards() -> ShardRouter:
+    """Dependency для получения маршрутизатора шардов токенов"""
+    return shard_router
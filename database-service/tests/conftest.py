@@ -0,0 +1,75 @@
+import asyncio
+import inspect
+import os
+import tempfile
+
+# База для тестов задается до импорта src: движок создается при импорте
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.database import Base, SessionLocal, engine  # noqa: E402
+from src.main import app  # noqa: E402
+from src.sharding import ShardRouter  # noqa: E402
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def тесты выполняются в своем event loop через asyncio.run (без pytest-asyncio)"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    asyncio.run(pyfuncitem.obj(**{name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}))
+    return True
+
+
+@pytest.fixture
+def db():
+    """Чистые таблицы на каждый тест"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    # Без lifespan: таблицы уже созданы, relay outbox тестам не нужен
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_id(client):
+    response = client.post("/api/v1/users/", json={
+        "username": "tester",
+        "email": "tester@example.com",
+        "password_hash": "hash",
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+@pytest.fixture
+def deck_id(client, user_id):
+    response = client.post("/api/v1/decks/", json={"owner_id": user_id, "title": "Колода"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+@pytest.fixture
+def shard_urls(tmp_path):
+    """Три шарда токенов в отдельных файлах SQLite"""
+    return [f"sqlite:///{tmp_path}/shard{i}.db" for i in range(3)]
+
+
+@pytest.fixture
+def shards(shard_urls):
+    """Маршрутизатор по всем трем шардам; решардинг не идет"""
+    router = ShardRouter(shard_urls)
+    router.create_tables()
+    yield router
+    router.dispose()
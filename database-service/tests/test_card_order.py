@@ -0,0 +1,90 @@
+from src.models import Card
+
+
+def _add(client, deck_id: int, question: str, **params) -> dict:
+    response = client.post(
+        f"/api/v1/decks/{deck_id}/cards", params=params, json={"question": question, "answer": "a"}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _order(client, deck_id: int, limit: int = 1000) -> list:
+    """Вопросы карточек колоды, пройденной keyset страницами по (rank, id)"""
+    questions, params = [], {"limit": limit}
+    while True:
+        page = client.get(f"/api/v1/decks/{deck_id}/cards/after", params=params).json()
+        questions += [card["question"] for card in page["cards"]]
+        if not page["has_more"]:
+            return questions
+        last = page["cards"][-1]
+        params.update(after_rank=last["rank"], after_id=last["id"])
+
+
+def test_insert_after_and_before(client, deck_id):
+    a = _add(client, deck_id, "A")
+    _add(client, deck_id, "B")
+    _add(client, deck_id, "C")
+    _add(client, deck_id, "X", after_id=a["id"])
+    _add(client, deck_id, "Y", before_id=a["id"])
+    assert _order(client, deck_id) == ["Y", "A", "X", "B", "C"]
+
+
+def test_insert_next_to_missing_or_misordered_card(client, deck_id, user_id):
+    a = _add(client, deck_id, "A")
+    b = _add(client, deck_id, "B")
+    other = client.post("/api/v1/decks/", json={"owner_id": user_id, "title": "Другая"}).json()
+    foreign = _add(client, other["id"], "F")
+
+    response = client.post(
+        f"/api/v1/decks/{deck_id}/cards", params={"after_id": foreign["id"]}, json={"question": "Q", "answer": "a"}
+    )
+    assert response.status_code == 404
+    response = client.post(
+        f"/api/v1/decks/{deck_id}/cards", params={"after_id": b["id"], "before_id": a["id"]},
+        json={"question": "Q", "answer": "a"}
+    )
+    assert response.status_code == 400
+
+
+def test_move_changes_only_moved_cards(client, db, deck_id):
+    cards = {q: _add(client, deck_id, q) for q in "ABCDE"}
+    response = client.post(f"/api/v1/decks/{deck_id}/cards/move", json={
+        "card_ids": [cards["E"]["id"], cards["D"]["id"]], "after_id": cards["A"]["id"],
+    })
+    assert response.status_code == 200
+    assert [card["id"] for card in response.json()["cards"]] == [cards["E"]["id"], cards["D"]["id"]]
+    assert _order(client, deck_id) == ["A", "E", "D", "B", "C"]
+
+    ranks = {card.question: card.rank for card in db.query(Card).filter(Card.deck_id == deck_id)}
+    assert all(ranks[q] == cards[q]["rank"] for q in "ABC")
+
+    response = client.post(f"/api/v1/decks/{deck_id}/cards/move", json={
+        "card_ids": [cards["B"]["id"]], "before_id": cards["B"]["id"],
+    })
+    assert response.status_code == 400
+
+
+def test_insert_between_duplicate_keys_rebalances_deck(client, db, deck_id):
+    cards = [_add(client, deck_id, q) for q in "ABC"]
+    # Одновременные вставки в одно место дают одинаковые ключи
+    db.query(Card).filter(Card.id.in_([cards[1]["id"], cards[2]["id"]])).update(
+        {Card.rank: cards[1]["rank"]}, synchronize_session=False
+    )
+    db.commit()
+
+    _add(client, deck_id, "X", after_id=cards[1]["id"], before_id=cards[2]["id"])
+    assert _order(client, deck_id) == ["A", "B", "X", "C"]
+    db.expire_all()
+    ranks = [rank for (rank,) in db.query(Card.rank).filter(Card.deck_id == deck_id)]
+    assert len(set(ranks)) == len(ranks)
+
+
+def test_keyset_pages_follow_rank_then_id(client, db, deck_id):
+    cards = [_add(client, deck_id, str(i)) for i in range(7)]
+    # Ключи 1..5 совпадают: внутри одного rank порядок задает id
+    db.query(Card).filter(Card.id.in_([card["id"] for card in cards[1:6]])).update(
+        {Card.rank: cards[1]["rank"]}, synchronize_session=False
+    )
+    db.commit()
+    assert _order(client, deck_id, limit=2) == [str(i) for i in range(7)]
@@ -0,0 +1,54 @@
+import pytest
+
+from src.etag import etag_matches
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/users/{user_id}",
+    "/api/v1/users/search/by-username/tester",
+    "/api/v1/users/search/by-email/tester@example.com",
+])
+def test_user_etag_revalidation(client, user_id, path):
+    url = path.format(user_id=user_id)
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith(f'"user-{user_id}-')
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    # Изменение пользователя меняет ETag: прежний больше не совпадает
+    client.put(f"/api/v1/users/{user_id}", json={"is_active": False})
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["is_active"] is False
+
+
+def test_deck_etag_revalidation(client, deck_id):
+    url = f"/api/v1/decks/{deck_id}"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"deck-0-1"'}).status_code == 200
+
+    client.put(url, json={"title": "Новое название"})
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["title"] == "Новое название"
+    assert client.get(url, headers={"If-None-Match": changed.headers["ETag"]}).status_code == 304
+
+    # If-None-Match по удаленной колоде — 404, а не 304
+    client.delete(url)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_etag_matches_header_forms():
+    etag = '"deck-1-5"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"deck-1-4", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches("", etag)
+    assert not etag_matches('"deck-1-4"', etag)
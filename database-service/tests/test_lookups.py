@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from src.crud import RefreshTokenCRUD, UserCRUD
+from src.database import engine
+from src.models import RefreshToken, User
+
+# Прежний путь через ORM Query на каждый вызов — эталон для готовых запросов
+ORM_LOOKUPS = {
+    UserCRUD.get_user_by_id: lambda db, value: db.query(User).filter(User.id == value).first(),
+    UserCRUD.get_user_by_username: lambda db, value: db.query(User).filter(User.username == value).first(),
+    UserCRUD.get_user_by_email: lambda db, value: db.query(User).filter(User.email == value).first(),
+    RefreshTokenCRUD.get_refresh_token_by_hash: lambda db, value: db.query(RefreshToken).filter(
+        RefreshToken.token_hash == value,
+        RefreshToken.is_revoked == False,
+        RefreshToken.expires_at > datetime.now(timezone.utc)
+    ).first(),
+}
+
+
+@pytest.fixture
+def users(client, user_id):
+    ids = [user_id]
+    for name in ("alice", "bob"):
+        response = client.post("/api/v1/users/", json={
+            "username": name, "email": f"{name}@example.com", "password_hash": "hash",
+        })
+        ids.append(response.json()["id"])
+    return ids
+
+
+@pytest.fixture
+def tokens(client, db, users):
+    now = datetime.now(timezone.utc)
+    client.post("/api/v1/tokens/bulk", json={"tokens": [
+        {"token_hash": f"active-{user}", "user_id": user, "expires_at": (now + timedelta(days=7)).isoformat()}
+        for user in users
+    ] + [
+        {"token_hash": "expired", "user_id": users[0], "expires_at": (now - timedelta(days=1)).isoformat()},
+        {"token_hash": "revoked", "user_id": users[1], "expires_at": (now + timedelta(days=7)).isoformat()},
+    ]})
+    assert RefreshTokenCRUD.revoke_refresh_token(db, "revoked")
+    return ["active-" + str(user) for user in users] + ["expired", "revoked", "missing"]
+
+
+def _lookup_values(db, users, tokens):
+    names = [db.get(User, user).username for user in users]
+    return {
+        UserCRUD.get_user_by_id: users + [0, 10 ** 6],
+        UserCRUD.get_user_by_username: names + ["nobody"],
+        UserCRUD.get_user_by_email: [f"{name}@example.com" for name in names] + ["nobody@example.com"],
+        RefreshTokenCRUD.get_refresh_token_by_hash: tokens,
+    }
+
+
+def test_prebuilt_lookups_match_orm_queries(db, users, tokens):
+    for lookup, values in _lookup_values(db, users, tokens).items():
+        # Вперемешку: значения параметров не залипают в готовом запросе
+        for value in values + values[::-1]:
+            expected = ORM_LOOKUPS[lookup](db, value)
+            found = lookup(db, value)
+            assert (found.id if found else None) == (expected.id if expected else None), (lookup.__name__, value)
+
+    assert RefreshTokenCRUD.get_refresh_token_by_hash(db, "expired") is None
+    assert RefreshTokenCRUD.get_refresh_token_by_hash(db, "revoked") is None
+    assert RefreshTokenCRUD.get_refresh_token_by_hash(db, tokens[0]).token_hash == tokens[0]
+
+
+def test_prebuilt_lookups_reuse_one_sql_text(db, users, tokens):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for lookup, values in _lookup_values(db, users, tokens).items():
+            statements.clear()
+            for value in values:
+                lookup(db, value)
+            assert len(statements) == len(values) and len(set(statements)) == 1, lookup.__name__
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_revoke_finds_token_through_prebuilt_lookup(db, tokens):
+    assert RefreshTokenCRUD.revoke_refresh_token(db, tokens[0])
+    assert RefreshTokenCRUD.get_refresh_token_by_hash(db, tokens[0]) is None
+    assert not RefreshTokenCRUD.revoke_refresh_token(db, "missing")
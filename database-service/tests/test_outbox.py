@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from src import outbox
+from src.crud import OutboxCRUD
+from src.models import OutboxCursor, OutboxDeadLetter, OutboxEvent
+from src.outbox import OutboxRelay, Subscriber
+
+
+class Receiver:
+    """Подписчики на httpx.MockTransport: пачки по хосту URL, коды ответа из очереди"""
+
+    def __init__(self):
+        self.batches = []
+        self.statuses = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        events = json.loads(request.content)["events"]
+        self.batches.append((request.url.host, [event["topic"] for event in events]))
+        return httpx.Response(self.statuses.pop(0) if self.statuses else 200)
+
+
+@pytest.fixture
+def receiver():
+    return Receiver()
+
+
+@pytest.fixture
+def relay(db, receiver):
+    relay = OutboxRelay([
+        Subscriber("search", "http://search/events", ["deck.", "card."]),
+        Subscriber("all", "http://all/events")
+    ])
+    relay.poll_interval = 1
+    relay._client = httpx.AsyncClient(transport=httpx.MockTransport(receiver))
+    OutboxCRUD.ensure_cursors(db, ["search", "all"])
+    return relay
+
+
+def _cursor(db, name: str) -> OutboxCursor:
+    db.expire_all()
+    return db.get(OutboxCursor, name)
+
+
+def _last_event_id(db) -> int:
+    return db.query(OutboxEvent.id).order_by(OutboxEvent.id.desc()).limit(1).scalar()
+
+
+def _seconds_from_now(moment: datetime) -> float:
+    # SQLite возвращает время без часового пояса (UTC)
+    return (moment.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+
+
+async def test_subscribers_receive_only_their_topics(relay, receiver, db, client, deck_id):
+    client.post(f"/api/v1/decks/{deck_id}/cards", json={"question": "q", "answer": "a"})
+    last_id = _last_event_id(db)
+
+    assert await relay.deliver_batch(relay.subscribers[0])
+    assert await relay.deliver_batch(relay.subscribers[1])
+    assert receiver.batches == [
+        ("search", ["deck.upserted", "card.upserted"]),
+        ("all", ["user.created", "deck.upserted", "card.upserted"]),
+    ]
+    assert _cursor(db, "search").last_event_id == last_id
+    assert _cursor(db, "all").last_event_id == last_id
+    assert not await relay.deliver_batch(relay.subscribers[0])
+
+
+async def test_filtered_out_batch_advances_cursor_without_request(relay, receiver, db, user_id):
+    assert await relay.deliver_batch(relay.subscribers[0])
+    assert receiver.batches == []
+    assert _cursor(db, "search").last_event_id == _last_event_id(db)
+
+
+async def test_leased_cursor_is_skipped_until_lease_expires(relay, receiver, db, user_id):
+    # Курсор арендован ретранслятором другого воркера
+    assert OutboxCRUD.claim_batch(db, "all", 100, timedelta(minutes=5)) is not None
+    assert not await relay.deliver_batch(relay.subscribers[1])
+    assert receiver.batches == []
+
+    # Аренда истекла (воркер упал): пачку забирает другой ретранслятор
+    db.query(OutboxCursor).filter(OutboxCursor.subscriber == "all").update(
+        {OutboxCursor.lease_until: datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    db.commit()
+    assert await relay.deliver_batch(relay.subscribers[1])
+    assert receiver.batches == [("all", ["user.created"])]
+    assert _cursor(db, "all").lease_until is None
+
+
+async def test_failed_delivery_backs_off_exponentially(relay, receiver, db, user_id):
+    subscriber = relay.subscribers[1]
+    receiver.statuses = [503, 500]
+
+    assert not await relay.deliver_batch(subscriber)
+    cursor = _cursor(db, "all")
+    assert (cursor.attempts, cursor.last_event_id, cursor.lease_until) == (1, 0, None)
+    assert "503" in cursor.last_error
+    assert _seconds_from_now(cursor.next_attempt_at) == pytest.approx(1, abs=0.5)
+
+    # До конца паузы пачка не повторяется
+    assert not await relay.deliver_batch(subscriber)
+    assert len(receiver.batches) == 1
+
+    db.query(OutboxCursor).filter(OutboxCursor.subscriber == "all").update({OutboxCursor.next_attempt_at: None})
+    db.commit()
+    assert not await relay.deliver_batch(subscriber)
+    cursor = _cursor(db, "all")
+    assert cursor.attempts == 2
+    assert _seconds_from_now(cursor.next_attempt_at) == pytest.approx(2, abs=0.5)
+
+    db.query(OutboxCursor).filter(OutboxCursor.subscriber == "all").update({OutboxCursor.next_attempt_at: None})
+    db.commit()
+    assert await relay.deliver_batch(subscriber)
+    cursor = _cursor(db, "all")
+    assert (cursor.attempts, cursor.next_attempt_at, cursor.last_error) == (0, None, None)
+    assert cursor.last_event_id == _last_event_id(db)
+
+
+async def test_batch_goes_to_dead_letters_after_max_attempts(relay, receiver, db, client, user_id, monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_ATTEMPTS", 3)
+    subscriber = relay.subscribers[1]
+    first_id = last_id = _last_event_id(db)
+    receiver.statuses = [500] * 3
+
+    for _ in range(3):
+        db.query(OutboxCursor).filter(OutboxCursor.subscriber == "all").update({OutboxCursor.next_attempt_at: None})
+        db.commit()
+        assert not await relay.deliver_batch(subscriber)
+    assert len(receiver.batches) == 3
+
+    dead = db.query(OutboxDeadLetter).all()
+    assert [(d.subscriber, d.first_event_id, d.last_event_id) for d in dead] == [("all", first_id, last_id)]
+    assert "500" in dead[0].error
+    cursor = _cursor(db, "all")
+    assert (cursor.last_event_id, cursor.attempts, cursor.next_attempt_at) == (last_id, 0, None)
+
+    # Доставка продолжается со следующего события
+    client.post("/api/v1/decks/", json={"owner_id": user_id, "title": "Колода"})
+    assert await relay.deliver_batch(subscriber)
+    assert receiver.batches[-1] == ("all", ["deck.upserted"])
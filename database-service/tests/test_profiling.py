@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.concurrency import run_in_threadpool
+
+from src.profiling import SHARD_ROOT, WORKER_ROOT, ProfilingMiddleware, ProfilingState
+
+
+def hot_query(seconds: float) -> int:
+    """Занимает поток, как запрос к базе"""
+    end = time.perf_counter() + seconds
+    rounds = 0
+    while time.perf_counter() < end:
+        rounds += 1
+    return rounds
+
+
+async def _profile(app) -> str:
+    state = ProfilingState()
+    state.sample_rate = 1.0
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/tokens/revocations", "headers": []}
+    await ProfilingMiddleware(app, state)(scope, None, send)
+    [record] = state.store.get_slowest()
+    return state.store.get(record["id"])["profile"]
+
+
+async def test_shard_threads_are_profiled():
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="shard")
+
+    def scatter():
+        return list(executor.map(hot_query, [0.1, 0.1]))
+
+    async def app(scope, receive, send):
+        await run_in_threadpool(scatter)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    try:
+        profile = await _profile(app)
+    finally:
+        executor.shutdown()
+    stacks = profile.splitlines()
+    assert any(line.startswith(SHARD_ROOT) and "hot_query" in line for line in stacks)
+    # Поток пула только ждет шарды: его стек попадает в профиль, но без hot_query
+    assert any(line.startswith(WORKER_ROOT) and "scatter" in line for line in stacks)
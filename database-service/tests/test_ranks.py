@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from src.ranks import INTEGER_ZERO, rank_between, ranks_between
+
+
+def _check(keys):
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_rank_between_is_strictly_between():
+    rng = random.Random(7)
+    keys = [rank_between(None, None)]
+    for _ in range(2000):
+        position = rng.randrange(len(keys) + 1)
+        a = keys[position - 1] if position > 0 else None
+        b = keys[position] if position < len(keys) else None
+        key = rank_between(a, b)
+        assert (a is None or a < key) and (b is None or key < b)
+        keys.insert(position, key)
+    _check(keys)
+
+
+def test_rank_between_appends_and_prepends():
+    tail = [INTEGER_ZERO]
+    head = [INTEGER_ZERO]
+    for _ in range(500):
+        tail.append(rank_between(tail[-1], None))
+        head.insert(0, rank_between(None, head[0]))
+    _check(tail)
+    _check(head)
+    # Целая часть растет логарифмически
+    assert max(len(key) for key in tail + head) <= 4
+
+
+def test_rank_between_same_spot_stays_ordered():
+    a, b = "a0", "a1"
+    keys = []
+    for _ in range(60):
+        b = rank_between(a, b)
+        keys.append(b)
+    assert keys == sorted(keys, reverse=True)
+    assert all(a < key for key in keys)
+
+
+@pytest.mark.parametrize("a, b", [(None, None), ("a0", None), (None, "a0"), ("a0", "a1")])
+def test_ranks_between_returns_n_ordered_keys(a, b):
+    keys = ranks_between(a, b, 50)
+    assert len(keys) == 50
+    _check(keys)
+    assert (a is None or a < keys[0]) and (b is None or keys[-1] < b)
+
+
+def test_rank_between_rejects_unordered_bounds():
+    with pytest.raises(ValueError):
+        rank_between("a1", "a0")
+    with pytest.raises(ValueError):
+        rank_between("a0", "a0")
+    with pytest.raises(ValueError):
+        rank_between("Zz", None)
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from src.revocation import bloom_positions, token_prefix
+
+
+def _hash(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def _prefixes(snapshot: dict) -> set:
+    prefixes = array("Q")
+    prefixes.frombytes(base64.b64decode(snapshot["prefixes"]))
+    assert list(prefixes) == sorted(prefixes)
+    return set(prefixes)
+
+
+def _in_bloom(snapshot: dict, token_hash: str) -> bool:
+    bloom = base64.b64decode(snapshot["bloom"])
+    return all(
+        bloom[position >> 3] & (1 << (position & 7))
+        for position in bloom_positions(token_hash, snapshot["bloom_bits"], snapshot["bloom_hashes"])
+    )
+
+
+def _save(client, user_id: int, *token_hashes: str):
+    expires_at = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
+    response = client.post("/api/v1/tokens/bulk", json={"tokens": [
+        {"token_hash": token_hash, "user_id": user_id, "expires_at": expires_at} for token_hash in token_hashes
+    ]})
+    assert response.status_code == 201
+
+
+def test_full_snapshot_and_delta(client, user_id):
+    active, revoked = _hash("active"), _hash("revoked")
+    _save(client, user_id, active, revoked, "not-a-sha256")
+    client.post("/api/v1/tokens/revoke", json={"token_hash": revoked})
+
+    snapshot = client.get("/api/v1/tokens/revocations").json()
+    assert snapshot["full"]
+    # Хеши другого формата в снимок не попадают
+    assert _prefixes(snapshot) == {token_prefix(active)}
+    assert _in_bloom(snapshot, revoked)
+    assert not _in_bloom(snapshot, active)
+
+    # Дельта после снимка: новый токен и отзыв прежде действующего
+    added = _hash("added")
+    _save(client, user_id, added)
+    client.post("/api/v1/tokens/revoke", json={"token_hash": active})
+    delta = client.get("/api/v1/tokens/revocations", params={"since": snapshot["version"]}).json()
+    assert not delta["full"] and delta["bloom"] is None
+    assert delta["version"] >= snapshot["version"]
+    assert token_prefix(added) in _prefixes(delta)
+    assert token_prefix(active) not in _prefixes(delta)
+    assert active in delta["revoked"]
+
+
+def test_rotated_token_is_revoked_in_snapshot(client, user_id):
+    old, new = _hash("old"), _hash("new")
+    _save(client, user_id, old)
+    response = client.post("/api/v1/tokens/rotate", json={
+        "token_hash": old, "new_token_hash": new, "user_id": user_id,
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
+    })
+    assert response.status_code == 200
+
+    snapshot = client.get("/api/v1/tokens/revocations").json()
+    assert _prefixes(snapshot) == {token_prefix(new)}
+    assert _in_bloom(snapshot, old)
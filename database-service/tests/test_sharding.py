@@ -0,0 +1,128 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.crud import RefreshTokenCRUD
+from src.main import app
+from src.models import RefreshToken
+from src.reshard import move_batch
+from src.sharding import ShardRouter, get_shards, jump_hash
+
+USERS = range(1, 41)
+
+
+def _expires_at(days: int = 7) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=days)
+
+
+def _create_tokens(shards: ShardRouter):
+    for user_id in USERS:
+        shards.run(user_id, RefreshTokenCRUD.create_refresh_token, f"token-{user_id}", user_id, _expires_at())
+
+
+def _stored(shards: ShardRouter, url: str) -> dict:
+    """token_hash -> user_id в одной базе"""
+    with shards.session(url) as db:
+        return dict(db.query(RefreshToken.token_hash, RefreshToken.user_id).all())
+
+
+def test_jump_hash_moves_only_to_new_bucket():
+    keys = range(10000)
+    before = [jump_hash(key, 3) for key in keys]
+    after = [jump_hash(key, 4) for key in keys]
+    assert set(before) == {0, 1, 2}
+    moved = [b for a, b in zip(before, after) if a != b]
+    assert set(moved) == {3}
+    assert 0.2 < len(moved) / len(keys) < 0.3
+
+
+def test_tokens_are_routed_by_user_id(shards, shard_urls):
+    _create_tokens(shards)
+
+    by_shard = {url: _stored(shards, url) for url in shard_urls}
+    assert sum(len(tokens) for tokens in by_shard.values()) == len(USERS)
+    assert all(by_shard.values())
+    for url, tokens in by_shard.items():
+        assert all(shards.shard_url(user_id) == url for user_id in tokens.values())
+
+    # Операции с user_id идут в один шард, поиск по хешу — во все
+    assert shards.urls_for(7) == [shards.shard_url(7)]
+    [tokens] = shards.each_for_user(7, RefreshTokenCRUD.get_user_tokens, 7)
+    assert [token.token_hash for token in tokens] == ["token-7"]
+    found = shards.scatter(RefreshTokenCRUD.get_refresh_token_by_hash, "token-7")
+    assert [token.user_id for token in found if token is not None] == [7]
+
+
+def test_reshard_reads_both_layouts_until_tokens_move(shard_urls):
+    previous = ShardRouter(shard_urls[:2])
+    previous.create_tables()
+    _create_tokens(previous)
+    previous.dispose()
+
+    shards = ShardRouter(shard_urls, previous_urls=shard_urls[:2])
+    shards.create_tables()
+    try:
+        moved_users = [user_id for user_id in USERS if shards.shard_url(user_id) == shard_urls[2]]
+        assert moved_users
+        for user_id in USERS:
+            old = previous.shard_url(user_id)
+            expected = [shards.shard_url(user_id)] if user_id not in moved_users else [old, shard_urls[2]]
+            assert shards.urls_for(user_id) == expected
+
+        # До переноса токены находятся в старой базе
+        user_id = moved_users[0]
+        found = shards.each_for_user(user_id, RefreshTokenCRUD.get_refresh_token_by_hash, f"token-{user_id}")
+        assert [token is not None for token in found] == [True, False]
+
+        # Просроченный токен при переносе удаляется, а не копируется
+        expired_user = moved_users[-1]
+        shards._call(previous.shard_url(expired_user), RefreshTokenCRUD.create_refresh_token,
+                     "expired", expired_user, _expires_at(-1))
+
+        for source in shard_urls:
+            after_id = 0
+            while True:
+                after_id, scanned, _ = move_batch(shards, source, after_id, batch_size=7)
+                if not scanned:
+                    break
+
+        by_shard = {url: _stored(shards, url) for url in shard_urls}
+        assert set(by_shard[shard_urls[2]].values()) == set(moved_users)
+        assert all(shards.shard_url(user_id) == url for url, tokens in by_shard.items() for user_id in tokens.values())
+        assert "expired" not in {token for tokens in by_shard.values() for token in tokens}
+
+        # После переноса токен находится в новой базе и отзывается через обе раскладки
+        found = shards.each_for_user(user_id, RefreshTokenCRUD.get_refresh_token_by_hash, f"token-{user_id}")
+        assert [token is not None for token in found] == [False, True]
+        assert sum(shards.each_for_user(user_id, RefreshTokenCRUD.revoke_all_user_tokens, user_id)) == 1
+
+        # Повторный запуск ничего не переносит
+        assert all(move_batch(shards, url, 0, 1000)[2] == 0 for url in shard_urls)
+    finally:
+        shards.dispose()
+
+
+def test_token_routes_query_shards_off_event_loop(client, shards, monkeypatch):
+    threads = []
+    call = shards._call
+
+    def recording_call(url, func, *args):
+        threads.append(threading.current_thread().name)
+        return call(url, func, *args)
+
+    monkeypatch.setattr(shards, "_call", recording_call)
+    app.dependency_overrides[get_shards] = lambda: shards
+    try:
+        response = client.post("/api/v1/tokens/", json={
+            "token_hash": "routed", "user_id": 7, "expires_at": _expires_at().isoformat(),
+        })
+        assert response.status_code == 201
+        assert client.get("/api/v1/tokens/verify/routed", params={"user_id": 7}).status_code == 200
+        assert client.get("/api/v1/tokens/verify/routed").status_code == 200
+        assert client.get("/api/v1/tokens/revocations").status_code == 200
+        assert client.post("/api/v1/tokens/revoke-user/7").status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_shards)
+
+    assert len(threads) == 1 + 1 + 3 + 3 + 1
+    # Запросы к шардам идут из пула потоков AnyIO или исполнителя scatter, не из event loop
+    assert all(name == "AnyIO worker thread" or name.startswith("shard") for name in threads)
@@ -0,0 +1,79 @@
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+TODAY = datetime.now(timezone.utc).date()
+
+
+@pytest.fixture
+def card_id(client, deck_id):
+    response = client.post(f"/api/v1/decks/{deck_id}/cards", json={"question": "q", "answer": "a"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _at(days_ago: int) -> float:
+    return datetime.combine(TODAY - timedelta(days=days_ago), time(12), tzinfo=timezone.utc).timestamp()
+
+
+def _post(client, user_id: int, card_id: int, *events) -> int:
+    response = client.post("/api/v1/stats/events", json={"user_id": user_id, "events": [
+        {"event_id": event_id, "card_id": card_id, "performance": performance, "reviewed_at": _at(days_ago)}
+        for event_id, performance, days_ago in events
+    ]})
+    assert response.status_code == 200
+    return response.json()["recorded_count"]
+
+
+def _stats(client, user_id: int) -> dict:
+    return client.get(f"/api/v1/stats/users/{user_id}").json()
+
+
+def test_reposted_events_are_counted_once(client, user_id, deck_id, card_id):
+    batch = [("e1", 1.0, 1), ("e2", 0.0, 1), ("e3", 0.8, 0)]
+    assert _post(client, user_id, card_id, *batch) == 3
+    assert _post(client, user_id, card_id, *batch) == 0
+    # Частично повторная пачка: учитывается только новое событие
+    assert _post(client, user_id, card_id, ("e3", 0.8, 0), ("e4", 1.0, 0)) == 1
+
+    stats = _stats(client, user_id)
+    assert (stats["reviews"], stats["correct"]) == (4, 3)
+    assert stats["accuracy"] == pytest.approx(0.75)
+    assert [(d["day"], d["reviews"], d["correct"]) for d in stats["days"]] == [
+        (str(TODAY - timedelta(days=1)), 2, 1),
+        (str(TODAY), 2, 2),
+    ]
+    assert [(d["deck_id"], d["reviews"], d["correct"]) for d in stats["decks"]] == [(deck_id, 4, 3)]
+    assert (stats["current_streak"], stats["longest_streak"]) == (2, 2)
+
+
+def test_streak_restarts_after_a_gap(client, user_id, card_id):
+    _post(client, user_id, card_id, ("a", 1.0, 6), ("b", 1.0, 5), ("c", 0.0, 4))
+    stats = _stats(client, user_id)
+    assert (stats["current_streak"], stats["longest_streak"]) == (0, 3)  # последний день — 4 дня назад
+
+    # Пропуск двух дней начинает серию заново; пачка может охватывать несколько дней
+    _post(client, user_id, card_id, ("d", 1.0, 1), ("e", 1.0, 0), ("d", 1.0, 1))
+    stats = _stats(client, user_id)
+    assert (stats["current_streak"], stats["longest_streak"]) == (2, 3)
+    assert stats["last_active_day"] == str(TODAY)
+
+    # Опоздавшее событие за пропущенный день серию не меняет
+    _post(client, user_id, card_id, ("late", 1.0, 2))
+    stats = _stats(client, user_id)
+    assert (stats["current_streak"], stats["longest_streak"], stats["reviews"]) == (2, 3, 6)
+
+
+def test_streak_survives_until_the_next_day(client, user_id, card_id):
+    _post(client, user_id, card_id, ("a", 1.0, 2), ("b", 1.0, 1))
+    # Сегодня ответов еще нет, но вчерашняя серия не прервана
+    assert _stats(client, user_id)["current_streak"] == 2
+
+
+def test_compaction_keeps_rollups(client, user_id, card_id):
+    _post(client, user_id, card_id, ("old", 1.0, 100), ("new", 1.0, 0))
+    response = client.delete("/api/v1/stats/events", params={"older_than_days": 90})
+    assert response.json() == {"deleted_count": 1, "has_more": False}
+    assert _stats(client, user_id)["reviews"] == 2
+    # Оставшиеся в журнале события по-прежнему защищены от повтора
+    assert _post(client, user_id, card_id, ("new", 1.0, 0)) == 0
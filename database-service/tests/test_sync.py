@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from src.crud import SyncCRUD
+from src.models import OutboxEvent
+
+
+def _create_user(client, name: str) -> int:
+    response = client.post("/api/v1/users/", json={
+        "username": name, "email": f"{name}@example.com", "password_hash": "hash",
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _create_deck(client, owner_id: int) -> int:
+    response = client.post("/api/v1/decks/", json={"owner_id": owner_id, "title": "Колода"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_versions_are_counted_per_owner(client, db, user_id):
+    other_id = _create_user(client, "other")
+    deck_id = _create_deck(client, user_id)
+    for i in range(3):
+        client.post(f"/api/v1/decks/{deck_id}/cards", json={"question": f"q{i}", "answer": "a"})
+    other_deck = _create_deck(client, other_id)
+
+    # Запись другого пользователя не двигает поток первого
+    assert SyncCRUD.get_state(db, user_id) == (5, 0)
+    assert SyncCRUD.get_state(db, other_id) == (2, 0)
+
+    changes = client.get("/api/v1/sync/changes", params={"user_id": other_id}).json()
+    assert [(c["entity"], c["id"], c["version"]) for c in changes["changes"]] == [("deck", other_deck, 2)]
+    assert changes["next_since"] == 2
+
+    changes = client.get("/api/v1/sync/changes", params={"user_id": user_id, "since": 2}).json()
+    assert [c["version"] for c in changes["changes"]] == [3, 4, 5]
+    assert changes["next_since"] == 5
+
+
+def test_outbox_events_carry_row_versions(client, db, user_id):
+    deck_id = _create_deck(client, user_id)
+    card = client.post(f"/api/v1/decks/{deck_id}/cards", json={"question": "q", "answer": "a"}).json()
+    client.delete(f"/api/v1/cards/{card['id']}")
+
+    events = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [event.topic for event in events] == ["user.created", "deck.upserted", "card.upserted", "card.deleted"]
+    assert [event.payload["version"] for event in events] == [1, 2, 3, 4]
+    assert [event.id for event in events] == sorted({event.id for event in events})
+
+
+def test_purge_tombstones_moves_only_owners_bound(client, db, user_id):
+    other_id = _create_user(client, "other")
+    deck_id = _create_deck(client, user_id)
+    client.delete(f"/api/v1/decks/{deck_id}")
+    _create_deck(client, other_id)
+
+    deleted, purged = SyncCRUD.purge_tombstones(db, datetime.now(timezone.utc) + timedelta(seconds=1))
+    assert (deleted, purged) == (1, 3)
+    assert SyncCRUD.get_state(db, user_id) == (3, 3)
+    assert SyncCRUD.get_state(db, other_id) == (2, 0)
+
+    assert client.get("/api/v1/sync/changes", params={"user_id": user_id, "since": 1}).status_code == 410
+    assert client.get("/api/v1/sync/changes", params={"user_id": other_id, "since": 1}).status_code == 200
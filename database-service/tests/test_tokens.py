@@ -0,0 +1,96 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from src.crud import RefreshTokenCRUD
+
+
+def _expires_at() -> str:
+    return (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
+
+
+def test_revoke_unknown_hash_without_owner_is_not_found(client):
+    response = client.post("/api/v1/tokens/revoke", json={"token_hash": "missing"})
+    assert response.status_code == 404
+
+
+def test_revoke_before_write_behind_insert_keeps_token_revoked(client, db, user_id):
+    # Выход попал в другой воркер раньше, чем пачка записала токен
+    expires_at = _expires_at()
+    response = client.post("/api/v1/tokens/revoke", json={
+        "token_hash": "pending", "user_id": user_id, "expires_at": expires_at,
+    })
+    assert response.status_code == 200
+
+    response = client.post("/api/v1/tokens/bulk", json={"tokens": [
+        {"token_hash": "pending", "user_id": user_id, "expires_at": expires_at},
+    ]})
+    assert response.status_code == 201
+    assert response.json()["created"] == 0
+
+    assert client.get("/api/v1/tokens/verify/pending").status_code == 404
+    assert RefreshTokenCRUD.get_refresh_token_by_hash(db, "pending") is None
+
+
+def test_revoke_existing_token(client, user_id):
+    client.post("/api/v1/tokens/bulk", json={"tokens": [
+        {"token_hash": "saved", "user_id": user_id, "expires_at": _expires_at()},
+    ]})
+    assert client.get("/api/v1/tokens/verify/saved").status_code == 200
+
+    response = client.post("/api/v1/tokens/revoke", json={
+        "token_hash": "saved", "user_id": user_id, "expires_at": _expires_at(),
+    })
+    assert response.status_code == 200
+    assert client.get("/api/v1/tokens/verify/saved").status_code == 404
+
+
+def test_bulk_insert_keeps_session_cap(client, db, user_id, monkeypatch):
+    monkeypatch.setattr("src.crud.MAX_SESSIONS_PER_USER", 3)
+    client.post("/api/v1/tokens/bulk", json={"tokens": [
+        {"token_hash": f"old-{i}", "user_id": user_id, "expires_at": _expires_at()} for i in range(3)
+    ]})
+    response = client.post("/api/v1/tokens/bulk", json={"tokens": [
+        {"token_hash": f"new-{i}", "user_id": user_id, "expires_at": _expires_at()} for i in range(2)
+    ]})
+    assert response.json()["created"] == 2
+
+    active = {token.token_hash for token in RefreshTokenCRUD.get_user_tokens(db, user_id) if not token.is_revoked}
+    assert active == {"old-2", "new-0", "new-1"}
+
+
+def test_evicted_session_is_revoked_in_next_delta(client, user_id, monkeypatch):
+    monkeypatch.setattr("src.crud.MAX_SESSIONS_PER_USER", 2)
+    hashes = [hashlib.sha256(f"login-{i}".encode()).hexdigest() for i in range(3)]
+    for token_hash in hashes[:2]:
+        client.post("/api/v1/tokens/", json={"token_hash": token_hash, "user_id": user_id, "expires_at": _expires_at()})
+    snapshot = client.get("/api/v1/tokens/revocations").json()
+
+    # Третий вход сверх лимита вытесняет первую сессию
+    client.post("/api/v1/tokens/", json={"token_hash": hashes[2], "user_id": user_id, "expires_at": _expires_at()})
+    delta = client.get("/api/v1/tokens/revocations", params={"since": snapshot["version"]}).json()
+
+    assert delta["full"] is False
+    assert hashes[0] in delta["revoked"]
+    assert hashes[1] not in delta["revoked"]
+    assert client.get(f"/api/v1/tokens/verify/{hashes[0]}").status_code == 404
+    assert client.get(f"/api/v1/tokens/verify/{hashes[2]}").status_code == 200
+
+
+def test_reuse_of_older_generation_revokes_family(client, user_id):
+    client.post("/api/v1/tokens/", json={
+        "token_hash": "gen-0", "user_id": user_id, "expires_at": _expires_at(), "family_id": "f" * 32,
+    })
+    for old, new in (("gen-0", "gen-1"), ("gen-1", "gen-2")):
+        response = client.post("/api/v1/tokens/rotate", json={
+            "token_hash": old, "new_token_hash": new, "expires_at": _expires_at(),
+            "user_id": user_id, "family_id": "f" * 32,
+        })
+        assert response.status_code == 200
+
+    # gen-0 на два поколения старше: previous_hash его уже не помнит
+    response = client.post("/api/v1/tokens/rotate", json={
+        "token_hash": "gen-0", "new_token_hash": "stolen", "expires_at": _expires_at(),
+        "user_id": user_id, "family_id": "f" * 32,
+    })
+    assert response.status_code == 409
+    assert client.get("/api/v1/tokens/verify/gen-2").status_code == 404
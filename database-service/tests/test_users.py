@@ -0,0 +1,4 @@
+def test_users_batch_returns_only_public_fields(client, user_id):
+    response = client.post("/api/v1/users/batch", json={"ids": [user_id, user_id + 1000]})
+    assert response.status_code == 200
+    assert response.json() == {"users": [{"id": user_id, "username": "tester"}]}
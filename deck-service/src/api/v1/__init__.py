@@ -0,0 +1 @@
+# API v1 routers package
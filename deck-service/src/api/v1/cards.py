@@ -0,0 +1,48 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, status
+
+from src.models.card import CardUpdate, CardWithHtml
+from src.services.card_service import CardService, get_card_service
+from src.services.loaders import Loaders, get_loaders
+from src.utils.auth import get_current_user_id
+
+router = APIRouter()
+
+@router.get("/", response_model=List[CardWithHtml])
+async def get_cards(
+    ids: List[int] = Query(..., max_length=500, description="ID карточек: ?ids=1&ids=2"),
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Карточки по списку ID (например, очередь повторения Study Service) одним запросом"""
+    return await card_service.get_cards(ids, user_id, loaders)
+
+@router.get("/{card_id}", response_model=CardWithHtml)
+async def get_card(
+    card_id: int,
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service)
+):
+    """Получить карточку с HTML"""
+    return await card_service.get_card(card_id, user_id)
+
+@router.put("/{card_id}", response_model=CardWithHtml)
+async def update_card(
+    card_id: int,
+    card_data: CardUpdate,
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service)
+):
+    """Обновить карточку"""
+    return await card_service.update_card(card_id, user_id, card_data)
+
+@router.delete("/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_card(
+    card_id: int,
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service)
+):
+    """Удалить карточку"""
+    await card_service.delete_card(card_id, user_id)
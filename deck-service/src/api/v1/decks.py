@@ -0,0 +1,188 @@
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional
+
+from src.models.deck import DeckCreate, DeckUpdate, DeckResponse, DeckListResponse
+from src.models.card import CardCreate, CardWithHtml, CardListResponse, CardMoveRequest, CardMoveResponse
+from src.services.deck_service import DeckService, get_deck_service
+from src.services.loaders import Loaders, get_loaders
+from src.models.import_export import ImportProgress
+from src.services.card_service import CardService, get_card_service
+from src.services.import_export_service import ImportExportService, get_import_export_service
+from src.utils.import_parsers import CsvRowParser, JsonCardsParser
+from src.utils.auth import get_current_user_id
+
+router = APIRouter()
+
+class ImportProgressResponse(StreamingResponse):
+    """NDJSON поток прогресса импорта.
+
+    StreamingResponse ждет отключения клиента через receive(), а здесь
+    receive() нужен для чтения еще не полученного тела запроса.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+async def _import_response(events: AsyncIterator[ImportProgress], progress: bool):
+    """Итог импорта одним JSON или поток состояний в NDJSON (progress=true)"""
+    if progress:
+        return ImportProgressResponse(
+            (event.model_dump_json() + "\n" async for event in events),
+            media_type="application/x-ndjson"
+        )
+    result = None
+    async for result in events:
+        pass
+    return result
+
+@router.get("/", response_model=DeckListResponse)
+async def list_decks(
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    size: int = Query(20, ge=1, le=100, description="Размер страницы"),
+    search: Optional[str] = Query(None, description="Поиск по названию и описанию"),
+    user_id: int = Depends(get_current_user_id),
+    deck_service: DeckService = Depends(get_deck_service),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Колоды текущего пользователя"""
+    return await deck_service.list_decks(user_id, page, size, search, loaders)
+
+@router.post("/", response_model=DeckResponse, status_code=status.HTTP_201_CREATED)
+async def create_deck(
+    deck_data: DeckCreate,
+    user_id: int = Depends(get_current_user_id),
+    deck_service: DeckService = Depends(get_deck_service)
+):
+    """Создать колоду"""
+    return await deck_service.create_deck(user_id, deck_data)
+
+@router.get("/{deck_id}", response_model=DeckResponse)
+async def get_deck(
+    deck_id: int,
+    user_id: int = Depends(get_current_user_id),
+    deck_service: DeckService = Depends(get_deck_service),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Получить колоду (публичные — готовым JSON из горячего кеша)"""
+    body = await deck_service.public_deck_json(deck_id, loaders)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+    deck = await deck_service.get_deck(deck_id, user_id, loaders=loaders)
+    return (await deck_service.with_owner_names([deck], loaders))[0]
+
+@router.put("/{deck_id}", response_model=DeckResponse)
+async def update_deck(
+    deck_id: int,
+    deck_data: DeckUpdate,
+    user_id: int = Depends(get_current_user_id),
+    deck_service: DeckService = Depends(get_deck_service)
+):
+    """Обновить колоду"""
+    return await deck_service.update_deck(deck_id, user_id, deck_data)
+
+@router.delete("/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_deck(
+    deck_id: int,
+    user_id: int = Depends(get_current_user_id),
+    deck_service: DeckService = Depends(get_deck_service)
+):
+    """Удалить колоду со всеми карточками"""
+    await deck_service.delete_deck(deck_id, user_id)
+
+@router.get("/{deck_id}/cards/", response_model=CardListResponse)
+async def list_cards(
+    deck_id: int,
+    page: int = Query(1, ge=1, description="Номер страницы"),
+    size: int = Query(50, ge=1, le=500, description="Размер страницы"),
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Карточки колоды с отрендеренным HTML (публичные — готовым JSON из горячего кеша)"""
+    body = await card_service.public_cards_json(deck_id, page, size, loaders)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+    return await card_service.list_cards(deck_id, user_id, page, size, loaders)
+
+@router.post("/{deck_id}/cards/", response_model=CardWithHtml, status_code=status.HTTP_201_CREATED)
+async def create_card(
+    deck_id: int,
+    card_data: CardCreate,
+    after_id: Optional[int] = Query(None, description="Вставить после карточки"),
+    before_id: Optional[int] = Query(None, description="Вставить перед карточкой (без обоих — в конец)"),
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service)
+):
+    """Добавить карточку в колоду"""
+    return await card_service.create_card(deck_id, user_id, card_data, after_id, before_id)
+
+@router.post("/{deck_id}/cards/move", response_model=CardMoveResponse)
+async def move_cards(
+    deck_id: int,
+    move_data: CardMoveRequest,
+    user_id: int = Depends(get_current_user_id),
+    card_service: CardService = Depends(get_card_service)
+):
+    """Переставить карточки подряд после after_id / перед before_id (одна запись на карточку)"""
+    return await card_service.move_cards(deck_id, user_id, move_data)
+
+@router.post("/{deck_id}/import/csv", response_model=ImportProgress)
+async def import_csv(
+    deck_id: int,
+    request: Request,
+    has_header: bool = Query(True, description="Первая строка — заголовки"),
+    question_column: int = Query(0, ge=0, description="Номер колонки с вопросами"),
+    answer_column: int = Query(1, ge=0, description="Номер колонки с ответами"),
+    render_html: bool = Query(True, description="Отрендерить HTML сразу (иначе — при первом чтении)"),
+    progress: bool = Query(False, description="Отдавать прогресс потоком NDJSON"),
+    user_id: int = Depends(get_current_user_id),
+    import_export_service: ImportExportService = Depends(get_import_export_service)
+):
+    """Импортировать карточки из CSV (тело запроса — содержимое файла)"""
+    parser = CsvRowParser(has_header, question_column, answer_column)
+    events = await import_export_service.import_cards(deck_id, user_id, request.stream(), parser, render_html)
+    return await _import_response(events, progress)
+
+@router.post("/{deck_id}/import/json", response_model=ImportProgress)
+async def import_json(
+    deck_id: int,
+    request: Request,
+    render_html: bool = Query(True, description="Отрендерить HTML сразу (иначе — при первом чтении)"),
+    progress: bool = Query(False, description="Отдавать прогресс потоком NDJSON"),
+    user_id: int = Depends(get_current_user_id),
+    import_export_service: ImportExportService = Depends(get_import_export_service)
+):
+    """Импортировать карточки из JSON (тело запроса — содержимое файла)"""
+    events = await import_export_service.import_cards(
+        deck_id, user_id, request.stream(), JsonCardsParser(), render_html
+    )
+    return await _import_response(events, progress)
+
+@router.get("/{deck_id}/export/csv")
+async def export_csv(
+    deck_id: int,
+    user_id: int = Depends(get_current_user_id),
+    import_export_service: ImportExportService = Depends(get_import_export_service)
+):
+    """Экспортировать колоду в CSV"""
+    content = await import_export_service.export_deck(deck_id, user_id, "csv")
+    return StreamingResponse(
+        content,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="deck-{deck_id}.csv"'}
+    )
+
+@router.get("/{deck_id}/export/json")
+async def export_json(
+    deck_id: int,
+    user_id: int = Depends(get_current_user_id),
+    import_export_service: ImportExportService = Depends(get_import_export_service)
+):
+    """Экспортировать колоду в JSON"""
+    content = await import_export_service.export_deck(deck_id, user_id, "json")
+    return StreamingResponse(
+        content,
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="deck-{deck_id}.json"'}
+    )
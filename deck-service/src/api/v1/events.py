@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from src.models.event import EventBatchRequest, EventBatchResponse
+from src.services.public_cache import PublicDeckCache, get_public_cache
+
+router = APIRouter()
+
+@router.post("/", response_model=EventBatchResponse)
+async def receive_events(
+    batch: EventBatchRequest,
+    cache: PublicDeckCache = Depends(get_public_cache)
+):
+    """Пачка событий outbox Database Service: сброс кеша измененных публичных колод"""
+    return EventBatchResponse(applied=cache.apply(batch.events))
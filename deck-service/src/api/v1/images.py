@@ -0,0 +1,53 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, status
+from fastapi.responses import FileResponse
+
+from src.models.image import ImageUploadResponse
+from src.services.image_store import ImageStore, get_image_store
+from src.utils.auth import get_current_user_id
+
+router = APIRouter()
+
+DIGEST = Path(..., pattern="^[0-9a-f]{64}$", description="SHA-256 содержимого")
+
+async def _file_response(store: ImageStore, digest: str, width: Optional[int]) -> FileResponse:
+    resolved = await store.resolve(digest, width)
+    if resolved is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Изображение не найдено"
+        )
+    path, media_type, cache_control = resolved
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": cache_control})
+
+@router.post("/", response_model=ImageUploadResponse, status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    image_store: ImageStore = Depends(get_image_store)
+):
+    """Загрузить изображение (тело запроса — содержимое файла); повторная загрузка не дублирует файл"""
+    return await image_store.save(request.stream())
+
+@router.get("/{digest}")
+async def get_image(
+    digest: str = DIGEST,
+    image_store: ImageStore = Depends(get_image_store)
+):
+    """Оригинал изображения"""
+    return await _file_response(image_store, digest, None)
+
+@router.get("/{digest}/{width}.webp")
+async def get_image_variant(
+    width: int,
+    digest: str = DIGEST,
+    image_store: ImageStore = Depends(get_image_store)
+):
+    """Вариант WebP заданной ширины (пока не готов — оригинал)"""
+    if width not in image_store.widths:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Нет варианта такой ширины"
+        )
+    return await _file_response(image_store, digest, width)
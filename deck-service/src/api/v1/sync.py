@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.models.sync import ChangesResponse
+from src.services.sync_service import SyncService, get_sync_service
+from src.utils.auth import get_current_user_id
+
+router = APIRouter()
+
+@router.get("/changes", response_model=ChangesResponse, response_model_exclude_none=True)
+async def get_changes(
+    since: int = Query(0, ge=0, description="next_since из прошлого ответа (0 — полная синхронизация)"),
+    limit: int = Query(500, ge=1, le=1000, description="Количество изменений"),
+    user_id: int = Depends(get_current_user_id),
+    sync_service: SyncService = Depends(get_sync_service)
+):
+    """Изменения своих колод, их карточек и прогресса повторения после версии since.
+
+    Удаления приходят надгробиями (deleted=true). 410 — since слишком старый,
+    нужно начать заново с since=0.
+    """
+    return await sync_service.get_changes(user_id, since, limit)
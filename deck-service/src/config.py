@@ -0,0 +1,41 @@
+import os
+
+# Интеграция с другими сервисами
+DATABASE_SERVICE_URL = os.getenv("DATABASE_SERVICE_URL", "http://database-service:8002")
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:8001")
+
+# Настройки приложения
+PORT = int(os.getenv("PORT", "8003"))
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
+# JWT (общий секрет с User Service)
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+
+# Настройки Markdown
+MAX_MARKDOWN_SIZE = int(os.getenv("MAX_MARKDOWN_SIZE", "50000"))
+MAX_IMAGES_PER_CARD = int(os.getenv("MAX_IMAGES_PER_CARD", "10"))
+
+# Кеш отрендеренного HTML
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "10000"))
+RENDER_POOL_WORKERS = int(os.getenv("RENDER_POOL_WORKERS", "0"))  # 0 — по числу ядер
+RENDER_POOL_THRESHOLD = int(os.getenv("RENDER_POOL_THRESHOLD", "32"))
+
+# Кеш готовых ответов публичных колод (LFU по размеру, stale-while-revalidate)
+PUBLIC_CACHE_MAX_BYTES = int(os.getenv("PUBLIC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PUBLIC_CACHE_TTL = float(os.getenv("PUBLIC_CACHE_TTL", "30"))  # Сколько секунд запись свежая
+PUBLIC_CACHE_STALE_TTL = float(os.getenv("PUBLIC_CACHE_STALE_TTL", "300"))  # До скольких секунд отдается устаревшая
+
+# Импорт/экспорт
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))  # Не больше лимита bulk эндпоинта (1000)
+MAX_CARDS_PER_IMPORT = int(os.getenv("MAX_CARDS_PER_IMPORT", "100000"))
+MAX_IMPORT_ERRORS = int(os.getenv("MAX_IMPORT_ERRORS", "100"))  # Сколько ошибок строк вернуть клиенту
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+# Изображения карточек: оригиналы по хешу содержимого на локальном диске и варианты WebP
+IMAGE_STORAGE_DIR = os.getenv("IMAGE_STORAGE_DIR", "/data/images")
+IMAGE_PUBLIC_URL = os.getenv("IMAGE_PUBLIC_URL", "/api/v1/images")  # Префикс URL изображений в Markdown
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", str(10 * 1024 * 1024)))
+IMAGE_VARIANT_WIDTHS = [int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,960").split(",") if width.strip()]
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", "2"))
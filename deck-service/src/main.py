@@ -0,0 +1,62 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from src.api.v1.decks import router as decks_router
+from src.api.v1.cards import router as cards_router
+from src.api.v1.sync import router as sync_router
+from src.api.v1.images import router as images_router
+from src.api.v1.events import router as events_router
+from src.services.database_client import database_client
+from src.services.render_cache import render_cache
+from src.services.image_store import image_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация при запуске и освобождение ресурсов при остановке"""
+    print("Deck Service запущен")
+    yield
+    await database_client.close()
+    # Пул процессов рендеринга Markdown
+    render_cache.shutdown()
+    # Пул обработки изображений
+    image_store.shutdown()
+    print("Deck Service остановлен")
+
+# Создание FastAPI приложения
+app = FastAPI(
+    title="Recall Pro - Deck Service",
+    description="Сервис управления колодами и карточками",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Настройка CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # В продакшене указать конкретные домены
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Подключение роутеров
+app.include_router(decks_router, prefix="/api/v1/decks", tags=["decks"])
+app.include_router(cards_router, prefix="/api/v1/cards", tags=["cards"])
+app.include_router(sync_router, prefix="/api/v1/sync", tags=["sync"])
+app.include_router(images_router, prefix="/api/v1/images", tags=["images"])
+app.include_router(events_router, prefix="/api/v1/events", tags=["events"])
+
+@app.get("/")
+async def root():
+    """Корневой эндпоинт"""
+    return {"message": "Recall Pro Deck Service", "version": "1.0.0"}
+
+@app.get("/health")
+async def health_check():
+    """Проверка здоровья сервиса"""
+    return {"status": "healthy", "service": "deck"}
+
+if __name__ == "__main__":
+    import uvicorn
+    from src.config import PORT, DEBUG
+    uvicorn.run("src.main:app", host="0.0.0.0", port=PORT, reload=DEBUG)
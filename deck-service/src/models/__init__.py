@@ -0,0 +1 @@
+# Pydantic models package
@@ -0,0 +1,55 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+from src.config import MAX_MARKDOWN_SIZE
+
+
+class CardCreate(BaseModel):
+    question: str = Field(..., min_length=1, max_length=MAX_MARKDOWN_SIZE, description="Вопрос (Markdown)")
+    answer: str = Field(..., min_length=1, max_length=MAX_MARKDOWN_SIZE, description="Ответ (Markdown)")
+
+
+class CardUpdate(BaseModel):
+    question: Optional[str] = Field(None, min_length=1, max_length=MAX_MARKDOWN_SIZE)
+    answer: Optional[str] = Field(None, min_length=1, max_length=MAX_MARKDOWN_SIZE)
+
+
+class CardResponse(BaseModel):
+    id: int
+    deck_id: int
+    question: str
+    answer: str
+    attachments: List[str]
+    rank: str  # Ключ порядка в колоде: карточки сортируются по (rank, id)
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class CardWithHtml(CardResponse):
+    """Карточка с отрендеренным HTML"""
+    question_html: str
+    answer_html: str
+
+
+class CardListResponse(BaseModel):
+    items: List[CardWithHtml]
+    total: int
+    page: int
+    size: int
+    pages: int
+
+
+class CardMoveRequest(BaseModel):
+    card_ids: List[int] = Field(..., min_length=1, max_length=1000, description="Карточки в новом порядке")
+    after_id: Optional[int] = Field(None, description="Поставить после карточки")
+    before_id: Optional[int] = Field(None, description="Поставить перед карточкой (без обоих — в конец)")
+
+
+class CardRank(BaseModel):
+    id: int
+    rank: str
+
+
+class CardMoveResponse(BaseModel):
+    cards: List[CardRank]
@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+
+class DeckCreate(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    description: Optional[str] = None
+    is_public: bool = False
+    category: Optional[str] = Field(None, max_length=100)
+    tags: List[str] = []
+
+
+class DeckUpdate(BaseModel):
+    title: Optional[str] = Field(None, min_length=1, max_length=200)
+    description: Optional[str] = None
+    is_public: Optional[bool] = None
+    category: Optional[str] = Field(None, max_length=100)
+    tags: Optional[List[str]] = None
+
+
+class DeckResponse(BaseModel):
+    id: int
+    owner_id: int
+    owner_username: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    is_public: bool
+    category: Optional[str] = None
+    tags: List[str]
+    cards_count: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class DeckListResponse(BaseModel):
+    items: List[DeckResponse]
+    total: int
+    page: int
+    size: int
+    pages: int
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List
+
+
+class Event(BaseModel):
+    """Событие outbox Database Service"""
+    id: int
+    topic: str
+    key: str
+    payload: Dict[str, Any]
+
+
+class EventBatchRequest(BaseModel):
+    events: List[Event]
+
+
+class EventBatchResponse(BaseModel):
+    applied: int
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class ImageUploadResponse(BaseModel):
+    hash: str = Field(..., description="SHA-256 содержимого")
+    url: str = Field(..., description="URL для вставки в Markdown: ![](url)")
+    content_type: str
+    size: int
+    variants: List[str] = Field([], description="URL вариантов WebP (готовы после фоновой обработки)")
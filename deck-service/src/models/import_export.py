@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class ImportRowError(BaseModel):
+    row: int  # Строка CSV файла или номер элемента JSON массива
+    error: str
+
+
+class ImportProgress(BaseModel):
+    """Состояние импорта: промежуточное (done=False) или итоговое"""
+    done: bool = False
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    # Ошибки строк (не больше MAX_IMPORT_ERRORS) — только в итоговом состоянии
+    errors: List[ImportRowError] = []
+    # Ошибка, прервавшая импорт; карточки из уже записанных пачек остаются в колоде
+    error: Optional[str] = None
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
+
+from src.models.card import CardWithHtml
+from src.models.deck import DeckResponse
+
+
+class ReviewState(BaseModel):
+    card_id: int
+    interval: float  # дни
+    due: float  # unix time
+    reps: int
+    lapses: int
+    updated_at: datetime
+
+
+class Change(BaseModel):
+    version: int
+    entity: str = Field(..., description="deck, card или review")
+    id: int = Field(..., description="ID сущности (для review — ID карточки)")
+    deck_id: Optional[int] = None
+    deleted: bool = False
+    deck: Optional[DeckResponse] = None
+    card: Optional[CardWithHtml] = None
+    review: Optional[ReviewState] = None
+
+
+class ChangesResponse(BaseModel):
+    changes: List[Change]
+    next_since: int = Field(..., description="Значение since для следующего запроса")
+    has_more: bool
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import HTTPException, status
+
+from src.models.card import CardCreate, CardUpdate, CardListResponse, CardMoveRequest, CardMoveResponse
+from src.services.database_client import DatabaseClient, get_database_client
+from src.services.deck_service import DeckService, get_deck_service
+from src.services.loaders import Loaders
+from src.services.markdown_service import MarkdownService, get_markdown_service
+from src.services.render_cache import RenderCache, get_render_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CardService:
+    """Карточки колод с кешированием отрендеренного HTML.
+
+    HTML рендерится при записи карточки и сохраняется вместе с ключом
+    рендера; при чтении он берется из LRU или из БД. Карточки со старым
+    ключом (например, после смены RENDERER_VERSION) перерендериваются при
+    чтении, и новый HTML сохраняется в фоне.
+    """
+
+    def __init__(
+        self,
+        db_client: Optional[DatabaseClient] = None,
+        decks: Optional[DeckService] = None,
+        markdown: Optional[MarkdownService] = None,
+        cache: Optional[RenderCache] = None
+    ):
+        self.db_client = db_client or get_database_client()
+        self.decks = decks or get_deck_service()
+        self.markdown = markdown or get_markdown_service()
+        self.cache = cache or get_render_cache()
+        # Ссылки на фоновые задачи сохранения HTML, чтобы их не собрал GC
+        self._write_backs: Set[asyncio.Task] = set()
+
+    def _validate(self, question: str, answer: str) -> List[str]:
+        """Проверить Markdown; вернуть URL изображений карточки"""
+        errors = self.markdown.validate_markdown(question) + self.markdown.validate_markdown(answer)
+        if errors:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="; ".join(errors)
+            )
+        return list(dict.fromkeys(self.markdown.extract_images(question) + self.markdown.extract_images(answer)))
+
+    def _rendered_fields(self, question: str, answer: str) -> Dict[str, Any]:
+        attachments = self._validate(question, answer)
+        html_key, (question_html, answer_html) = self.cache.render(question, answer)
+        return {
+            "question_html": question_html,
+            "answer_html": answer_html,
+            "html_key": html_key,
+            "attachments": attachments
+        }
+
+    async def create_card(
+        self,
+        deck_id: int,
+        user_id: int,
+        card_data: CardCreate,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Создать карточку; HTML рендерится сразу и сохраняется вместе с ней"""
+        await self.decks.get_deck(deck_id, user_id, write=True)
+        data = card_data.model_dump(exclude_none=True)
+        data.update(self._rendered_fields(card_data.question, card_data.answer))
+        card = await self.db_client.create_card(deck_id, data, after_id, before_id)
+        self.decks.public.invalidate_deck(deck_id)
+        if card is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Соседняя карточка не найдена в колоде"
+            )
+        return card
+
+    async def move_cards(self, deck_id: int, user_id: int, move_data: CardMoveRequest) -> CardMoveResponse:
+        """Переставить карточки: меняются только ключи порядка перемещаемых карточек"""
+        await self.decks.get_deck(deck_id, user_id, write=True)
+        result = await self.db_client.move_cards(
+            deck_id, move_data.card_ids, move_data.after_id, move_data.before_id
+        )
+        self.decks.public.invalidate_deck(deck_id)
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Карточка не найдена в колоде"
+            )
+        return CardMoveResponse(**result)
+
+    async def get_card(self, card_id: int, user_id: int) -> Dict[str, Any]:
+        """Карточка с HTML"""
+        card = await self._get_card_or_404(card_id)
+        await self.decks.get_deck(card["deck_id"], user_id)
+        await self.resolve_html([card])
+        return card
+
+    async def get_cards(self, card_ids: List[int], user_id: int, loaders: Loaders) -> List[Dict[str, Any]]:
+        """Карточки по списку ID с HTML (порядок запроса, повторы убираются).
+
+        Карточки и их колоды читаются двумя пачками вместо запроса на каждую;
+        несуществующие карточки и карточки недоступных колод пропускаются.
+        """
+        card_ids = list(dict.fromkeys(card_ids))
+        cards = [card for card in await loaders.cards.load_many(card_ids) if card]
+        decks = await loaders.decks.load_many({card["deck_id"] for card in cards})
+        readable = {
+            deck["id"] for deck in decks
+            if deck and (deck["owner_id"] == user_id or deck["is_public"])
+        }
+        cards = [card for card in cards if card["deck_id"] in readable]
+        await self.resolve_html(cards)
+        return cards
+
+    async def update_card(self, card_id: int, user_id: int, card_data: CardUpdate) -> Dict[str, Any]:
+        """Обновить карточку; при изменении Markdown HTML рендерится заново"""
+        card = await self._get_card_or_404(card_id)
+        await self.decks.get_deck(card["deck_id"], user_id, write=True)
+        data = card_data.model_dump(exclude_unset=True)
+        if "question" in data or "answer" in data:
+            data.update(self._rendered_fields(
+                data.get("question", card["question"]),
+                data.get("answer", card["answer"])
+            ))
+        updated = await self.db_client.update_card(card_id, data)
+        self.decks.public.invalidate_deck(card["deck_id"])
+        await self.resolve_html([updated])
+        return updated
+
+    async def delete_card(self, card_id: int, user_id: int):
+        """Удалить карточку"""
+        card = await self._get_card_or_404(card_id)
+        await self.decks.get_deck(card["deck_id"], user_id, write=True)
+        await self.db_client.delete_card(card_id)
+        self.decks.public.invalidate_deck(card["deck_id"])
+
+    async def list_cards(
+        self,
+        deck_id: int,
+        user_id: int,
+        page: int,
+        size: int,
+        loaders: Optional[Loaders] = None
+    ) -> CardListResponse:
+        """Карточки колоды с HTML: поиск в кеше вместо рендера на каждый запрос"""
+        await self.decks.get_deck(deck_id, user_id, loaders=loaders)
+        return await self._cards_page(deck_id, page, size)
+
+    async def public_cards_json(self, deck_id: int, page: int, size: int, loaders: Loaders) -> Optional[bytes]:
+        """Готовый JSON страницы карточек публичной колоды из горячего кеша (None — не публичная)"""
+        async def load() -> Optional[bytes]:
+            deck = await loaders.decks.load(deck_id)
+            if not deck or not deck["is_public"]:
+                return None
+            return (await self._cards_page(deck_id, page, size)).model_dump_json().encode()
+
+        return await self.decks.public.get(deck_id, ("cards", page, size), load)
+
+    async def _cards_page(self, deck_id: int, page: int, size: int) -> CardListResponse:
+        result = await self.db_client.get_deck_cards(deck_id, page, size)
+        cards = result["cards"]
+        await self.resolve_html(cards)
+        return CardListResponse(
+            items=cards,
+            total=result["total"],
+            page=page,
+            size=size,
+            pages=math.ceil(result["total"] / size)
+        )
+
+    async def _get_card_or_404(self, card_id: int) -> Dict[str, Any]:
+        card = await self.db_client.get_card(card_id)
+        if not card:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Карточка не найдена"
+            )
+        return card
+
+    async def resolve_html(self, cards: List[Dict[str, Any]], store: bool = True):
+        """Заполнить HTML карточек и сохранить в фоне тот, что пришлось перерендерить"""
+        stale = await self.cache.resolve_cards(cards, store)
+        for card in stale:
+            task = asyncio.create_task(self._write_back(card))
+            self._write_backs.add(task)
+            task.add_done_callback(self._write_backs.discard)
+
+    async def _write_back(self, card: Dict[str, Any]):
+        try:
+            await self.db_client.update_card_html(
+                card["id"], card["question_html"], card["answer_html"], card["html_key"]
+            )
+        except Exception:
+            # HTML будет сохранен при следующем чтении
+            logger.warning("Не удалось сохранить HTML карточки %s", card["id"], exc_info=True)
+
+
+# Singleton instance
+card_service = CardService()
+
+def get_card_service() -> CardService:
+    """Dependency для получения сервиса карточек"""
+    return card_service
@@ -0,0 +1,271 @@
+import httpx
+import json
+import os
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+from fastapi import HTTPException, status
+
+from src.config import DATABASE_SERVICE_URL
+
+# Лимит HTTP соединений к Database Service на весь сервис делится между воркерами
+WORKERS = max(int(os.getenv("WORKERS", "1")), 1)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_POOL_SIZE = max(HTTP_MAX_CONNECTIONS // WORKERS, 10)
+# Число ответов, которые клиент хранит для условных GET (If-None-Match)
+ETAG_CACHE_SIZE = int(os.getenv("ETAG_CACHE_SIZE", "1024"))
+
+
+class DatabaseClient:
+    """HTTP клиент для взаимодействия с Database Service"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url or DATABASE_SERVICE_URL
+        self.timeout = 30.0
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        # URL -> (ETag, тело ответа): при 304 тело берется отсюда без сериализации на сервере
+        self._etag_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Общий клиент с пулом keep-alive соединений (создается лениво)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_SIZE,
+                    max_keepalive_connections=HTTP_POOL_SIZE
+                )
+            )
+        return self._client
+
+    async def close(self):
+        """Закрыть пул соединений"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict[Any, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        revalidate: bool = False
+    ) -> Dict[Any, Any]:
+        """Выполнить HTTP запрос к Database Service"""
+        url = f"{self.base_url}{endpoint}"
+
+        client = self._get_client()
+        try:
+            if method.upper() == "GET" and revalidate:
+                return await self._revalidating_get(client, url)
+            elif method.upper() == "GET":
+                response = await client.get(url, params=params)
+            elif method.upper() == "POST":
+                response = await client.post(url, json=data, params=params)
+            elif method.upper() == "PUT":
+                response = await client.put(url, json=data, params=params)
+            elif method.upper() == "DELETE":
+                response = await client.delete(url, params=params)
+            else:
+                raise ValueError(f"Неподдерживаемый HTTP метод: {method}")
+
+            if response.status_code == 404:
+                return None
+
+            response.raise_for_status()
+            return response.json()
+
+        except httpx.TimeoutException:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database Service недоступен (timeout)"
+            )
+        except httpx.ConnectError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Не удается подключиться к Database Service"
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 400:
+                error_detail = e.response.json().get("detail", "Ошибка валидации данных")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=error_detail
+                )
+            elif e.response.status_code == 410:
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail=e.response.json().get("detail", "Данные больше недоступны")
+                )
+            elif e.response.status_code == 500:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Внутренняя ошибка Database Service"
+                )
+            else:
+                raise HTTPException(
+                    status_code=e.response.status_code,
+                    detail=f"Ошибка Database Service: {e.response.text}"
+                )
+
+    async def _revalidating_get(self, client: httpx.AsyncClient, url: str) -> Optional[Dict[Any, Any]]:
+        """GET с проверкой сохраненного ответа по ETag (LRU на ETAG_CACHE_SIZE записей)"""
+        cached = self._etag_cache.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            self._etag_cache.move_to_end(url)
+            return json.loads(cached[1])
+        if response.status_code == 404:
+            self._etag_cache.pop(url, None)
+            return None
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        if etag and ETAG_CACHE_SIZE > 0:
+            self._etag_cache[url] = (etag, response.content)
+            self._etag_cache.move_to_end(url)
+            if len(self._etag_cache) > ETAG_CACHE_SIZE:
+                self._etag_cache.popitem(last=False)
+        return response.json()
+
+    async def _get_batch(self, endpoint: str, key: str, ids: List[int]) -> Dict[int, Dict[Any, Any]]:
+        """Пачка сущностей по ID одним запросом: ID -> сущность (отсутствующих нет в ответе)"""
+        result = await self._make_request("POST", endpoint, {"ids": ids})
+        return {item["id"]: item for item in result[key]}
+
+    # Пачки по ID (используются загрузчиками src.services.loaders)
+    async def get_users_by_ids(self, user_ids: List[int]) -> Dict[int, Dict[Any, Any]]:
+        """Пользователи по списку ID"""
+        return await self._get_batch("/api/v1/users/batch", "users", user_ids)
+
+    async def get_decks_by_ids(self, deck_ids: List[int]) -> Dict[int, Dict[Any, Any]]:
+        """Колоды по списку ID"""
+        return await self._get_batch("/api/v1/decks/batch", "decks", deck_ids)
+
+    async def get_cards_by_ids(self, card_ids: List[int]) -> Dict[int, Dict[Any, Any]]:
+        """Карточки по списку ID"""
+        return await self._get_batch("/api/v1/cards/batch", "cards", card_ids)
+
+    # Методы для работы с колодами
+    async def create_deck(self, owner_id: int, data: Dict[str, Any]) -> Optional[Dict[Any, Any]]:
+        """Создать колоду"""
+        return await self._make_request("POST", "/api/v1/decks/", {**data, "owner_id": owner_id})
+
+    async def get_deck(self, deck_id: int) -> Optional[Dict[Any, Any]]:
+        """Получить колоду по ID"""
+        return await self._make_request("GET", f"/api/v1/decks/{deck_id}", revalidate=True)
+
+    async def get_decks(self, page: int, limit: int, **filters) -> Dict[Any, Any]:
+        """Получить список колод с фильтрами"""
+        params = {"page": page, "limit": limit}
+        params.update({k: v for k, v in filters.items() if v is not None})
+        return await self._make_request("GET", "/api/v1/decks/", params=params)
+
+    async def update_deck(self, deck_id: int, data: Dict[str, Any]) -> Optional[Dict[Any, Any]]:
+        """Обновить колоду"""
+        return await self._make_request("PUT", f"/api/v1/decks/{deck_id}", data)
+
+    async def delete_deck(self, deck_id: int) -> bool:
+        """Удалить колоду"""
+        result = await self._make_request("DELETE", f"/api/v1/decks/{deck_id}")
+        return result is not None
+
+    # Методы для работы с карточками
+    async def create_card(
+        self,
+        deck_id: int,
+        data: Dict[str, Any],
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> Optional[Dict[Any, Any]]:
+        """Создать карточку в колоде (после after_id / перед before_id, иначе в конце)"""
+        params = {key: value for key, value in (("after_id", after_id), ("before_id", before_id)) if value is not None}
+        return await self._make_request("POST", f"/api/v1/decks/{deck_id}/cards", data, params=params)
+
+    async def get_card(self, card_id: int) -> Optional[Dict[Any, Any]]:
+        """Получить карточку по ID"""
+        return await self._make_request("GET", f"/api/v1/cards/{card_id}")
+
+    async def get_deck_cards(self, deck_id: int, page: int, limit: int) -> Optional[Dict[Any, Any]]:
+        """Получить карточки колоды"""
+        params = {"page": page, "limit": limit}
+        return await self._make_request("GET", f"/api/v1/decks/{deck_id}/cards", params=params)
+
+    async def get_deck_cards_after(
+        self,
+        deck_id: int,
+        after_rank: Optional[str],
+        after_id: Optional[int],
+        limit: int
+    ) -> Optional[Dict[Any, Any]]:
+        """Получить карточки колоды после курсора (rank, id)"""
+        params = {"limit": limit}
+        if after_id is not None:
+            params.update(after_rank=after_rank, after_id=after_id)
+        return await self._make_request("GET", f"/api/v1/decks/{deck_id}/cards/after", params=params)
+
+    async def create_cards_bulk(self, deck_id: int, cards: List[Dict[str, Any]]) -> int:
+        """Добавить пачку карточек одним запросом; вернуть число созданных"""
+        result = await self._make_request("POST", f"/api/v1/decks/{deck_id}/cards/bulk", {"cards": cards})
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Колода не найдена"
+            )
+        return result["created_count"]
+
+    async def move_cards(
+        self,
+        deck_id: int,
+        card_ids: List[int],
+        after_id: Optional[int],
+        before_id: Optional[int]
+    ) -> Optional[Dict[Any, Any]]:
+        """Переставить карточки колоды; вернуть их новые ключи порядка"""
+        data = {"card_ids": card_ids, "after_id": after_id, "before_id": before_id}
+        return await self._make_request("POST", f"/api/v1/decks/{deck_id}/cards/move", data)
+
+    async def update_card(self, card_id: int, data: Dict[str, Any]) -> Optional[Dict[Any, Any]]:
+        """Обновить карточку"""
+        return await self._make_request("PUT", f"/api/v1/cards/{card_id}", data)
+
+    async def update_card_html(
+        self,
+        card_id: int,
+        question_html: str,
+        answer_html: str,
+        html_key: str
+    ) -> bool:
+        """Сохранить отрендеренный HTML карточки"""
+        data = {
+            "question_html": question_html,
+            "answer_html": answer_html,
+            "html_key": html_key
+        }
+        result = await self._make_request("PUT", f"/api/v1/cards/{card_id}/html", data)
+        return result is not None
+
+    async def delete_card(self, card_id: int) -> bool:
+        """Удалить карточку"""
+        result = await self._make_request("DELETE", f"/api/v1/cards/{card_id}")
+        return result is not None
+
+    # Дельта-синхронизация
+    async def get_changes(self, user_id: int, since: int, limit: int) -> Dict[Any, Any]:
+        """Изменения колод, карточек и прогресса пользователя после версии since"""
+        params = {"user_id": user_id, "since": since, "limit": limit}
+        return await self._make_request("GET", "/api/v1/sync/changes", params=params)
+
+
+# Singleton instance
+database_client = DatabaseClient()
+
+def get_database_client() -> DatabaseClient:
+    """Dependency для получения клиента базы данных"""
+    return database_client
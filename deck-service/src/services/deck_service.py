@@ -0,0 +1,110 @@
+import math
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from src.models.deck import DeckCreate, DeckUpdate, DeckResponse, DeckListResponse
+from src.services.database_client import DatabaseClient, get_database_client
+from src.services.loaders import Loaders
+from src.services.public_cache import PublicDeckCache, get_public_cache
+
+
+class DeckService:
+    """Бизнес-логика колод и проверка прав доступа"""
+
+    def __init__(self, db_client: Optional[DatabaseClient] = None, public: Optional[PublicDeckCache] = None):
+        self.db_client = db_client or get_database_client()
+        self.public = public or get_public_cache()
+
+    async def get_deck(
+        self,
+        deck_id: int,
+        user_id: int,
+        write: bool = False,
+        loaders: Optional[Loaders] = None
+    ) -> Dict[str, Any]:
+        """Колода с проверкой доступа: чтение — владелец или публичная, запись — только владелец.
+
+        С loaders колода читается через загрузчик запроса, и проверки многих
+        колод в одном запросе уходят одной пачкой.
+        """
+        deck = await (loaders.decks.load(deck_id) if loaders else self.db_client.get_deck(deck_id))
+        if not deck:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Колода не найдена"
+            )
+        if deck["owner_id"] != user_id and (write or not deck["is_public"]):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Нет доступа к колоде"
+            )
+        return deck
+
+    async def public_deck_json(self, deck_id: int, loaders: Loaders) -> Optional[bytes]:
+        """Готовый JSON публичной колоды из горячего кеша; None — колоды нет или она не публичная.
+
+        Ответ одинаков для всех пользователей, поэтому проверка доступа не нужна.
+        """
+        async def load() -> Optional[bytes]:
+            deck = await loaders.decks.load(deck_id)
+            if not deck or not deck["is_public"]:
+                return None
+            # До чтения имени: user.updated во время загрузки отбросит ее результат
+            self.public.set_owner(deck_id, deck["owner_id"])
+            deck = (await self.with_owner_names([deck], loaders))[0]
+            return DeckResponse.model_validate(deck).model_dump_json().encode()
+
+        return await self.public.get(deck_id, "deck", load)
+
+    async def with_owner_names(self, decks: List[Dict[str, Any]], loaders: Loaders) -> List[Dict[str, Any]]:
+        """Заполнить owner_username колод: все владельцы читаются одним запросом"""
+        owners = await loaders.users.load_many(deck["owner_id"] for deck in decks)
+        for deck, owner in zip(decks, owners):
+            deck["owner_username"] = owner["username"] if owner else None
+        return decks
+
+    async def create_deck(self, user_id: int, deck_data: DeckCreate) -> Dict[str, Any]:
+        """Создать колоду"""
+        return await self.db_client.create_deck(user_id, deck_data.model_dump())
+
+    async def list_decks(
+        self,
+        user_id: int,
+        page: int,
+        size: int,
+        search: Optional[str] = None,
+        loaders: Optional[Loaders] = None
+    ) -> DeckListResponse:
+        """Колоды пользователя"""
+        result = await self.db_client.get_decks(page, size, owner_id=user_id, search=search)
+        if loaders:
+            await self.with_owner_names(result["decks"], loaders)
+        return DeckListResponse(
+            items=result["decks"],
+            total=result["total"],
+            page=page,
+            size=size,
+            pages=math.ceil(result["total"] / size)
+        )
+
+    async def update_deck(self, deck_id: int, user_id: int, deck_data: DeckUpdate) -> Dict[str, Any]:
+        """Обновить колоду"""
+        await self.get_deck(deck_id, user_id, write=True)
+        deck = await self.db_client.update_deck(deck_id, deck_data.model_dump(exclude_unset=True))
+        self.public.invalidate_deck(deck_id)
+        return deck
+
+    async def delete_deck(self, deck_id: int, user_id: int):
+        """Удалить колоду"""
+        await self.get_deck(deck_id, user_id, write=True)
+        await self.db_client.delete_deck(deck_id)
+        self.public.invalidate_deck(deck_id)
+
+
+# Singleton instance
+deck_service = DeckService()
+
+def get_deck_service() -> DeckService:
+    """Dependency для получения сервиса колод"""
+    return deck_service
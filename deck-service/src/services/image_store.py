@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from src.config import (
+    IMAGE_STORAGE_DIR, IMAGE_PUBLIC_URL, MAX_IMAGE_SIZE, IMAGE_VARIANT_WIDTHS, IMAGE_POOL_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+WEBP_QUALITY = 80
+# Содержимое адресуется хешем и не меняется, поэтому кешируется навсегда
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+# Оригинал вместо еще не готового варианта: клиент перезапросит вариант позже
+CACHE_PENDING = "public, max-age=60"
+# Пауза перед повтором неудачной обработки (удваивается с каждой неудачей)
+VARIANT_RETRY_DELAY = 60
+VARIANT_RETRY_MAX_DELAY = 3600
+# Загрузка пишется на диск из потока пачками не меньше этого размера
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Тип изображения по сигнатуре первых байт (заголовку Content-Type клиента не доверяем)"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _variant_path(directory: str, digest: str, width: int) -> str:
+    return os.path.join(directory, f"{digest}-{width}.webp")
+
+
+def _make_variants(path: str, digest: str, widths: List[int]) -> Dict[str, Any]:
+    """Уменьшенные копии WebP в дочернем процессе пула.
+
+    Варианты не шире оригинала не создаются: вместо них отдается оригинал.
+    Анимированные изображения не перекодируются. Файл метаданных пишется
+    последним и означает, что обработка завершена.
+    """
+    from PIL import Image, ImageOps
+
+    directory = os.path.dirname(path)
+    made = []
+    with Image.open(path) as image:
+        animated = getattr(image, "is_animated", False)
+        if not animated:
+            # Поворот по EXIF до масштабирования, иначе миниатюры с телефонов лежат на боку
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if image.mode in ("LA", "PA", "P") else "RGB")
+        width, height = image.size
+        for target in sorted(widths):
+            if animated or target >= width:
+                continue
+            variant = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            variant_path = _variant_path(directory, digest, target)
+            variant.save(variant_path + ".tmp", "WEBP", quality=WEBP_QUALITY)
+            os.replace(variant_path + ".tmp", variant_path)
+            made.append(target)
+    meta = {"width": width, "height": height, "variants": made}
+    meta_path = os.path.join(directory, f"{digest}.json")
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return meta
+
+
+class ImageStore:
+    """Изображения карточек на локальном диске.
+
+    Оригинал хранится под именем SHA-256 своего содержимого, поэтому
+    повторная загрузка того же файла ничего не пишет. Загрузка отвечает
+    сразу после записи оригинала, а варианты WebP под ширины
+    IMAGE_VARIANT_WIDTHS делаются в пуле процессов вне пути запроса.
+    Пока вариант не готов, по его URL отдается оригинал с коротким кешем.
+    Неудачная обработка повторяется при следующем запросе варианта после
+    паузы VARIANT_RETRY_DELAY, удваивающейся с каждой неудачей. Файлы
+    пишутся из потоков, event loop на диске не ждет.
+    """
+
+    def __init__(
+        self,
+        root: str = IMAGE_STORAGE_DIR,
+        widths: List[int] = IMAGE_VARIANT_WIDTHS,
+        pool_workers: int = IMAGE_POOL_WORKERS,
+        public_url: str = IMAGE_PUBLIC_URL
+    ):
+        self.root = root
+        self.widths = sorted(widths)
+        self.pool_workers = pool_workers
+        self.public_url = public_url.rstrip("/")
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Хеш -> обработка в пуле: повторная загрузка не ставит вторую
+        self._processing: Dict[str, asyncio.Future] = {}
+        # Хеш -> (число неудач подряд, время monotonic, раньше которого не повторять)
+        self._failures: Dict[str, Tuple[int, float]] = {}
+
+    def _dir(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2])
+
+    def original_path(self, digest: str) -> str:
+        return os.path.join(self._dir(digest), digest)
+
+    def url(self, digest: str, width: Optional[int] = None) -> str:
+        return f"{self.public_url}/{digest}" + (f"/{width}.webp" if width else "")
+
+    async def save(self, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """Сохранить загруженное изображение и поставить варианты в очередь пула"""
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp_path = await asyncio.to_thread(self._create_upload)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pending = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > MAX_IMAGE_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Изображение больше {MAX_IMAGE_SIZE} байт"
+                        )
+                    if len(head) < 12:
+                        head += chunk[:12]
+                    digest.update(chunk)
+                    pending += chunk
+                    if len(pending) >= UPLOAD_WRITE_BUFFER:
+                        await asyncio.to_thread(f.write, pending)
+                        pending = bytearray()
+                if pending:
+                    await asyncio.to_thread(f.write, pending)
+            content_type = sniff_image_type(head)
+            if content_type is None:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail="Поддерживаются PNG, JPEG, GIF и WebP"
+                )
+            digest = digest.hexdigest()
+            await asyncio.to_thread(self._commit_upload, tmp_path, digest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._schedule_variants(digest)
+        return {
+            "hash": digest,
+            "url": self.url(digest),
+            "content_type": content_type,
+            "size": size,
+            "variants": [self.url(digest, width) for width in self.widths]
+        }
+
+    def _create_upload(self) -> Tuple[int, str]:
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, prefix=".upload-")
+
+    def _commit_upload(self, tmp_path: str, digest: str):
+        """Переместить загрузку на место оригинала (тот же файл уже есть — удалить)"""
+        path = self.original_path(digest)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(self._dir(digest), exist_ok=True)
+            os.replace(tmp_path, path)
+
+    def _meta_path(self, digest: str) -> str:
+        return os.path.join(self._dir(digest), f"{digest}.json")
+
+    def _schedule_variants(self, digest: str):
+        if not self.widths or digest in self._processing:
+            return
+        failure = self._failures.get(digest)
+        if failure is not None and time.monotonic() < failure[1]:
+            return
+        if os.path.exists(self._meta_path(digest)):
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), _make_variants, self.original_path(digest), digest, self.widths)
+        self._processing[digest] = future
+        future.add_done_callback(lambda done: self._variants_done(digest, done))
+
+    def _variants_done(self, digest: str, future: asyncio.Future):
+        self._processing.pop(digest, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            self._failures.pop(digest, None)
+            return
+        # Оригинал остается доступен; варианты повторим при запросе после паузы
+        attempts = self._failures.get(digest, (0, 0.0))[0] + 1
+        delay = min(VARIANT_RETRY_DELAY * 2 ** (attempts - 1), VARIANT_RETRY_MAX_DELAY)
+        self._failures[digest] = (attempts, time.monotonic() + delay)
+        if isinstance(error, BrokenProcessPool) and self._pool is not None:
+            # Упавший дочерний процесс ломает весь пул: следующая обработка заведет новый
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        logger.warning(
+            "Не удалось сделать варианты изображения %s (попытка %d, повтор через %d с)",
+            digest, attempts, delay, exc_info=error
+        )
+
+    async def resolve(self, digest: str, width: Optional[int] = None) -> Optional[Tuple[str, str, str]]:
+        """Файл для ответа: (путь, media type, Cache-Control); None — изображения нет"""
+        resolved = await asyncio.to_thread(self._resolve, digest, width)
+        if resolved is not None and resolved[2] == CACHE_PENDING:
+            # Обработка не завершена: если она не идет (упала), пора повторить
+            self._schedule_variants(digest)
+        return resolved
+
+    def _resolve(self, digest: str, width: Optional[int]) -> Optional[Tuple[str, str, str]]:
+        path = self.original_path(digest)
+        try:
+            with open(path, "rb") as f:
+                content_type = sniff_image_type(f.read(12)) or "application/octet-stream"
+        except FileNotFoundError:
+            return None
+        if width is None:
+            return path, content_type, CACHE_IMMUTABLE
+        variant = _variant_path(self._dir(digest), digest, width)
+        if os.path.exists(variant):
+            return variant, "image/webp", CACHE_IMMUTABLE
+        # Обработка завершена без этого варианта (оригинал уже нужной ширины) — оригинал навсегда
+        done = os.path.exists(self._meta_path(digest))
+        return path, content_type, CACHE_IMMUTABLE if done else CACHE_PENDING
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.pool_workers)
+        return self._pool
+
+    def shutdown(self):
+        """Остановить пул обработки изображений"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+image_store = ImageStore()
+
+def get_image_store() -> ImageStore:
+    """Dependency для получения хранилища изображений"""
+    return image_store
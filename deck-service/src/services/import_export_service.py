@@ -0,0 +1,210 @@
+import asyncio
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from src.config import IMPORT_BATCH_SIZE, MAX_CARDS_PER_IMPORT, MAX_IMPORT_ERRORS, EXPORT_PAGE_SIZE
+from src.models.import_export import ImportProgress, ImportRowError
+from src.services.card_service import CardService, get_card_service
+from src.services.database_client import DatabaseClient, get_database_client
+from src.services.deck_service import DeckService, get_deck_service
+from src.services.markdown_service import MarkdownService, get_markdown_service
+from src.services.render_cache import RenderCache, get_render_cache
+from src.utils.import_parsers import CsvRowParser, JsonCardsParser, ImportFormatError, ImportRow
+
+RowParser = Union[CsvRowParser, JsonCardsParser]
+
+EXPORT_CARD_FIELDS = ("question", "answer", "question_html", "answer_html", "attachments")
+EXPORT_DECK_FIELDS = ("id", "title", "description", "is_public", "category", "tags")
+
+
+class ImportExportService:
+    """Потоковый импорт и экспорт карточек.
+
+    Импорт читает тело запроса кусками, разбирает его инкрементально и
+    обрабатывает карточки пачками по IMPORT_BATCH_SIZE: проверка, рендер
+    HTML (через кеш и пул процессов) и один bulk INSERT на пачку. Запись
+    пачки идет параллельно с разбором следующей, в памяти не больше двух
+    пачек. Экспорт читает колоду keyset пагинацией по EXPORT_PAGE_SIZE.
+    """
+
+    def __init__(
+        self,
+        db_client: Optional[DatabaseClient] = None,
+        decks: Optional[DeckService] = None,
+        cards: Optional[CardService] = None,
+        markdown: Optional[MarkdownService] = None,
+        cache: Optional[RenderCache] = None
+    ):
+        self.db_client = db_client or get_database_client()
+        self.decks = decks or get_deck_service()
+        self.cards = cards or get_card_service()
+        self.markdown = markdown or get_markdown_service()
+        self.cache = cache or get_render_cache()
+
+    async def import_cards(
+        self,
+        deck_id: int,
+        user_id: int,
+        body: AsyncIterator[bytes],
+        parser: RowParser,
+        render_html: bool = True
+    ) -> AsyncIterator[ImportProgress]:
+        """Проверить доступ и вернуть поток состояний импорта (последнее — итоговое)"""
+        # Проверяем до начала ответа, чтобы 403/404 вернулись обычными HTTP ошибками
+        await self.decks.get_deck(deck_id, user_id, write=True)
+        return self._run_import(deck_id, body, parser, render_html)
+
+    async def _run_import(
+        self,
+        deck_id: int,
+        body: AsyncIterator[bytes],
+        parser: RowParser,
+        render_html: bool
+    ) -> AsyncIterator[ImportProgress]:
+        progress = ImportProgress()
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        batch: List[ImportRow] = []
+        pending: Optional[asyncio.Task] = None
+
+        async def flush():
+            nonlocal pending
+            cards = await self._prepare_batch(batch, progress, render_html)
+            batch.clear()
+            if pending is not None:
+                progress.imported += await pending
+                pending = None
+            if cards:
+                pending = asyncio.create_task(self.db_client.create_cards_bulk(deck_id, cards))
+
+        try:
+            eof = False
+            chunks = body.__aiter__()
+            while not eof:
+                try:
+                    chunk = await chunks.__anext__()
+                    rows = parser.feed(decoder.decode(chunk))
+                except StopAsyncIteration:
+                    eof = True
+                    rows = parser.feed(decoder.decode(b"", final=True)) + parser.close()
+                for row in rows:
+                    if progress.processed + len(batch) >= MAX_CARDS_PER_IMPORT:
+                        raise ImportFormatError(f"Больше {MAX_CARDS_PER_IMPORT} карточек в одном импорте")
+                    batch.append(row)
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        await flush()
+                        yield progress.model_copy(update={"errors": []})
+            await flush()
+            if pending is not None:
+                progress.imported += await pending
+                pending = None
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            progress.error = str(e)
+        except HTTPException as e:
+            progress.error = f"Ошибка записи карточек: {e.detail}"
+        finally:
+            if pending is not None:
+                # Импорт прерван: дожидаемся уже отправленной пачки, чтобы счетчик был честным
+                try:
+                    progress.imported += await pending
+                except HTTPException:
+                    pass
+            self.decks.public.invalidate_deck(deck_id)
+        progress.done = True
+        yield progress
+
+    async def _prepare_batch(
+        self,
+        rows: List[ImportRow],
+        progress: ImportProgress,
+        render_html: bool
+    ) -> List[Dict[str, Any]]:
+        """Проверить и подготовить пачку карточек к записи"""
+        cards = await run_in_threadpool(self._validate_batch, rows, progress)
+        if render_html and cards:
+            rendered = await self.cache.render_many(
+                [(card["question"], card["answer"]) for card in cards], store=False
+            )
+            for card, (html_key, (question_html, answer_html)) in zip(cards, rendered):
+                card.update(question_html=question_html, answer_html=answer_html, html_key=html_key)
+        return cards
+
+    def _validate_batch(self, rows: List[ImportRow], progress: ImportProgress) -> List[Dict[str, Any]]:
+        cards = []
+        for row in rows:
+            progress.processed += 1
+            error = row.error
+            if error is None:
+                errors = self.markdown.validate_markdown(row.question) + self.markdown.validate_markdown(row.answer)
+                error = "; ".join(errors) if errors else None
+            if error is not None:
+                progress.failed += 1
+                if len(progress.errors) < MAX_IMPORT_ERRORS:
+                    progress.errors.append(ImportRowError(row=row.row, error=error))
+                continue
+            attachments = self.markdown.extract_images(row.question) + self.markdown.extract_images(row.answer)
+            cards.append({
+                "question": row.question,
+                "answer": row.answer,
+                "attachments": list(dict.fromkeys(attachments))
+            })
+        return cards
+
+    async def export_deck(self, deck_id: int, user_id: int, fmt: str) -> AsyncIterator[str]:
+        """Проверить доступ и вернуть поток экспорта колоды в CSV или JSON"""
+        deck = await self.decks.get_deck(deck_id, user_id)
+        if fmt == "csv":
+            return self._export_csv(deck_id)
+        return self._export_json(deck)
+
+    async def _iter_pages(self, deck_id: int, with_html: bool = False) -> AsyncIterator[List[Dict[str, Any]]]:
+        after_rank = after_id = None
+        while True:
+            page = await self.db_client.get_deck_cards_after(deck_id, after_rank, after_id, EXPORT_PAGE_SIZE)
+            if not page or not page["cards"]:
+                return
+            cards = page["cards"]
+            if with_html:
+                await self.cards.resolve_html(cards, store=False)
+            yield cards
+            if not page["has_more"]:
+                return
+            after_rank, after_id = cards[-1]["rank"], cards[-1]["id"]
+
+    async def _export_csv(self, deck_id: int) -> AsyncIterator[str]:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["question", "answer"])
+        async for cards in self._iter_pages(deck_id):
+            for card in cards:
+                writer.writerow([card["question"], card["answer"]])
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        if output.tell():
+            yield output.getvalue()
+
+    async def _export_json(self, deck: Dict[str, Any]) -> AsyncIterator[str]:
+        header = json.dumps({field: deck.get(field) for field in EXPORT_DECK_FIELDS}, ensure_ascii=False)
+        yield '{"deck": ' + header[:-1] + ', "cards": ['
+        separator = ""
+        async for cards in self._iter_pages(deck["id"], with_html=True):
+            yield separator + ", ".join(
+                json.dumps({field: card.get(field) for field in EXPORT_CARD_FIELDS}, ensure_ascii=False)
+                for card in cards
+            )
+            separator = ", "
+        yield "]}}"
+
+
+# Singleton instance
+import_export_service = ImportExportService()
+
+def get_import_export_service() -> ImportExportService:
+    """Dependency для получения сервиса импорта/экспорта"""
+    return import_export_service
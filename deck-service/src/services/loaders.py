@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Set, TypeVar
+
+from src.services.database_client import DatabaseClient, get_database_client
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Ограничение размера пачки в POST /api/v1/{users,decks,cards}/batch Database Service
+BATCH_LIMIT = 1000
+
+
+class BatchLoader(Generic[K, V]):
+    """Загрузчик в стиле DataLoader.
+
+    Все load() за один проход event loop собираются в одну пачку, которая
+    уходит одним вызовом batch_fn (ключ -> значение; отсутствующие ключи
+    дают None). Результаты запоминаются: повторный load() того же ключа в
+    рамках загрузчика не делает запросов. Загрузчик живет один HTTP запрос,
+    поэтому память о прочитанном не переживает запрос и не устаревает.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]], max_batch: int = BATCH_LIMIT):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self._memo: Dict[K, asyncio.Future] = {}
+        self._queue: Dict[K, asyncio.Future] = {}
+        # Ссылки на отправленные пачки, чтобы их не собрал GC
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        future = self._memo.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._memo[key] = loop.create_future()
+            if not self._queue:
+                # Отправка после того, как остальные готовые задачи этого прохода добавят свои ключи
+                loop.call_soon(self._dispatch)
+            self._queue[key] = future
+        # Отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: V):
+        """Положить уже известное значение (например, из ответа на запись)"""
+        if key not in self._memo:
+            future = self._memo[key] = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, {}
+        keys = list(queue)
+        for start in range(0, len(keys), self.max_batch):
+            batch = {key: queue[key] for key in keys[start:start + self.max_batch]}
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[K, asyncio.Future]):
+        try:
+            values = await self.batch_fn(list(batch))
+        except Exception as e:
+            for key, future in batch.items():
+                # Ошибка не запоминается: следующий load() повторит запрос
+                self._memo.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+class Loaders:
+    """Загрузчики пользователей, колод и карточек одного HTTP запроса"""
+
+    def __init__(self, db_client: Optional[DatabaseClient] = None):
+        db_client = db_client or get_database_client()
+        self.users: BatchLoader[int, Dict[str, Any]] = BatchLoader(db_client.get_users_by_ids)
+        self.decks: BatchLoader[int, Dict[str, Any]] = BatchLoader(db_client.get_decks_by_ids)
+        self.cards: BatchLoader[int, Dict[str, Any]] = BatchLoader(db_client.get_cards_by_ids)
+
+
+def get_loaders() -> Loaders:
+    """Dependency: новые загрузчики на каждый запрос (FastAPI переиспользует их внутри запроса)"""
+    return Loaders()
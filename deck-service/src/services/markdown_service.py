@@ -0,0 +1,57 @@
+from typing import List
+
+import markdown
+
+from src.config import MAX_MARKDOWN_SIZE, MAX_IMAGES_PER_CARD
+from src.utils.markdown_utils import (
+    sanitize_markdown_html, extract_images_from_markdown, validate_image_urls, rewrite_image_variants
+)
+
+# Версия рендерера входит в ключ кеша HTML: при изменении расширений,
+# настроек или санитизации ее нужно увеличить, чтобы кеш пересобрался
+RENDERER_VERSION = "2"
+
+
+class MarkdownService:
+    """Рендеринг Markdown в безопасный HTML"""
+    
+    def __init__(self):
+        self.md_processor = markdown.Markdown(
+            extensions=['fenced_code', 'codehilite', 'tables', 'sane_lists'],
+            extension_configs={
+                # Подсветка выполняется на клиенте по классу language-*
+                'codehilite': {'css_class': 'highlight', 'use_pygments': False}
+            }
+        )
+    
+    def convert_to_html(self, markdown_text: str) -> str:
+        """Преобразовать Markdown в санитизированный HTML"""
+        self.md_processor.reset()
+        return rewrite_image_variants(self.sanitize_html(self.md_processor.convert(markdown_text)))
+    
+    def sanitize_html(self, html: str) -> str:
+        """Очистить HTML от опасных тегов и атрибутов"""
+        return sanitize_markdown_html(html)
+    
+    def extract_images(self, markdown_text: str) -> List[str]:
+        """Извлечь URL изображений"""
+        return extract_images_from_markdown(markdown_text)
+    
+    def validate_markdown(self, markdown_text: str) -> List[str]:
+        """Проверить Markdown контент; возвращает список ошибок"""
+        errors = []
+        if len(markdown_text) > MAX_MARKDOWN_SIZE:
+            errors.append(f"Markdown превышает {MAX_MARKDOWN_SIZE} символов")
+        if len(self.extract_images(markdown_text)) > MAX_IMAGES_PER_CARD:
+            errors.append(f"Больше {MAX_IMAGES_PER_CARD} изображений")
+        for url in validate_image_urls(markdown_text):
+            errors.append(f"Недопустимый URL изображения: {url}")
+        return errors
+
+
+# Singleton instance
+markdown_service = MarkdownService()
+
+def get_markdown_service() -> MarkdownService:
+    """Dependency для получения Markdown сервиса"""
+    return markdown_service
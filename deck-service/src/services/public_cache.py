@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from src.config import PUBLIC_CACHE_MAX_BYTES, PUBLIC_CACHE_TTL, PUBLIC_CACHE_STALE_TTL
+
+logger = logging.getLogger(__name__)
+
+# (deck_id, представление): "deck" или ("cards", page, size)
+CacheKey = Tuple[int, Hashable]
+Loader = Callable[[], Awaitable[Optional[bytes]]]
+
+# Потолок счетчика обращений; раз в AGING_FACTOR * len(записей) обращений
+# счетчики делятся пополам, чтобы бывшие популярные колоды не жили вечно
+MAX_FREQUENCY = 64
+AGING_FACTOR = 10
+
+
+class _Entry:
+    __slots__ = ("body", "fresh_until", "stale_until", "frequency")
+
+    def __init__(self, body: bytes, fresh_until: float, stale_until: float):
+        self.body = body
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.frequency = 1
+
+
+class PublicDeckCache:
+    """Горячий кеш готовых JSON ответов публичных колод.
+
+    Хранит уже сериализованные тела ответов (колода, страницы карточек с
+    HTML), поэтому чтение популярной колоды — копия байт из памяти без
+    запросов к Database Service, рендера и сериализации. Размер ограничен
+    PUBLIC_CACHE_MAX_BYTES, вытесняются редко читаемые записи (LFU, при
+    равенстве — давно читанные).
+
+    Свежая запись отдается PUBLIC_CACHE_TTL секунд, затем еще до
+    PUBLIC_CACHE_STALE_TTL отдается устаревшая, пока одна фоновая загрузка
+    ее обновляет. Загрузка ключа всегда одна: промахи и обновления одного
+    ключа ждут общую задачу, а не идут в базу толпой. Изменения колод и
+    карточек сбрасывают записи колоды сразу: локальные записи — через
+    invalidate_deck, изменения с других инстансов — через события outbox.
+    В ответ колоды входит имя владельца, поэтому загрузка запоминает его
+    (set_owner), и user.updated сбрасывает все колоды этого владельца.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = PUBLIC_CACHE_MAX_BYTES,
+        ttl: float = PUBLIC_CACHE_TTL,
+        stale_ttl: float = PUBLIC_CACHE_STALE_TTL
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[CacheKey, _Entry] = {}
+        # Частота -> ключи с этой частотой в порядке последнего чтения
+        self._buckets: Dict[int, "OrderedDict[CacheKey, None]"] = {}
+        self._by_deck: Dict[int, Set[CacheKey]] = {}
+        # Владелец колоды и колоды владельца: пока у колоды есть записи или загрузки
+        self._owner_of: Dict[int, int] = {}
+        self._by_owner: Dict[int, Set[int]] = {}
+        self._bytes = 0
+        self._accesses = 0
+        self._loading: Dict[CacheKey, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, deck_id: int, view: Hashable, load: Loader) -> Optional[bytes]:
+        """Тело ответа из кеша или из load().
+
+        load() возвращает None, если колода не публичная: такой ответ не
+        кешируется, и вызывающий идет обычным путем с проверкой доступа.
+        """
+        key = (deck_id, view)
+        entry = self._entries.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if now < entry.stale_until:
+                self._touch(key, entry)
+                if now >= entry.fresh_until:
+                    self.stale_hits += 1
+                    self._start_load(key, load)
+                else:
+                    self.hits += 1
+                return entry.body
+            self._remove(key)
+        self.misses += 1
+        # Отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(self._start_load(key, load))
+
+    def invalidate_deck(self, deck_id: int):
+        """Сбросить все ответы колоды и результаты еще идущих загрузок"""
+        for key in self._by_deck.get(deck_id, set()).copy():
+            self._remove(key)
+        for key in [key for key in self._loading if key[0] == deck_id]:
+            # Задача доработает, но ее результат не попадет в кеш
+            del self._loading[key]
+        self._forget_owner(deck_id)
+
+    def set_owner(self, deck_id: int, owner_id: int):
+        """Запомнить владельца колоды, чьи данные попадут в ответ (вызывать из загрузки)"""
+        if self._owner_of.get(deck_id) == owner_id:
+            return
+        self._forget_owner(deck_id, force=True)
+        self._owner_of[deck_id] = owner_id
+        self._by_owner.setdefault(owner_id, set()).add(deck_id)
+
+    def invalidate_owner(self, owner_id: int):
+        """Сбросить колоды владельца (изменилось его имя)"""
+        for deck_id in self._by_owner.get(owner_id, set()).copy():
+            self.invalidate_deck(deck_id)
+
+    def apply(self, events: Iterable[Any]) -> int:
+        """Сбросить колоды из событий outbox (deck.*, card.*, user.updated); вернуть число примененных"""
+        applied = 0
+        for event in events:
+            if event.topic == "user.updated":
+                user_id = event.payload.get("user_id")
+                if user_id is not None:
+                    self.invalidate_owner(user_id)
+                    applied += 1
+                continue
+            deck_id = event.payload.get("deck_id")
+            if deck_id is not None and event.topic.startswith(("deck.", "card.")):
+                self.invalidate_deck(deck_id)
+                applied += 1
+        return applied
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+    def _start_load(self, key: CacheKey, load: Loader) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, load))
+            self._loading[key] = task
+            task.add_done_callback(self._load_done)
+        return task
+
+    async def _load(self, key: CacheKey, load: Loader) -> Optional[bytes]:
+        try:
+            body = await load()
+        except BaseException:
+            if self._loading.get(key) is asyncio.current_task():
+                del self._loading[key]
+            self._forget_owner(key[0])
+            raise
+        # Колоду изменили во время загрузки — результат мог устареть, не кешируем
+        if self._loading.get(key) is asyncio.current_task():
+            del self._loading[key]
+            if body is None:
+                self._remove(key)
+            else:
+                self._store(key, body)
+        self._forget_owner(key[0])
+        return body
+
+    def _load_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            # Устаревшая запись (если есть) остается до конца PUBLIC_CACHE_STALE_TTL
+            logger.warning("Не удалось обновить кеш публичной колоды", exc_info=task.exception())
+
+    def _store(self, key: CacheKey, body: bytes):
+        if len(body) > self.max_bytes:
+            self._remove(key)
+            return
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            # Обновление сохраняет набранную частоту: горячая колода не вытесняется после refresh
+            self._bytes += len(body) - len(entry.body)
+            entry.body = body
+            entry.fresh_until = now + self.ttl
+            entry.stale_until = now + self.stale_ttl
+        else:
+            self._entries[key] = _Entry(body, now + self.ttl, now + self.stale_ttl)
+            self._buckets.setdefault(1, OrderedDict())[key] = None
+            self._by_deck.setdefault(key[0], set()).add(key)
+            self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            victim, _ = self._buckets[min(self._buckets)].popitem(last=False)
+            self._remove(victim, bucket_removed=True)
+
+    def _touch(self, key: CacheKey, entry: _Entry):
+        if entry.frequency < MAX_FREQUENCY:
+            self._unbucket(key, entry.frequency)
+            entry.frequency += 1
+            self._buckets.setdefault(entry.frequency, OrderedDict())[key] = None
+        else:
+            self._buckets[entry.frequency].move_to_end(key)
+        self._accesses += 1
+        if self._accesses >= AGING_FACTOR * len(self._entries):
+            self._age()
+
+    def _age(self):
+        """Разделить счетчики пополам с сохранением порядка чтения внутри частоты"""
+        self._accesses = 0
+        buckets: Dict[int, "OrderedDict[CacheKey, None]"] = {}
+        for frequency in sorted(self._buckets):
+            for key in self._buckets[frequency]:
+                entry = self._entries[key]
+                entry.frequency = max(frequency // 2, 1)
+                buckets.setdefault(entry.frequency, OrderedDict())[key] = None
+        self._buckets = buckets
+
+    def _unbucket(self, key: CacheKey, frequency: int):
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[frequency]
+
+    def _remove(self, key: CacheKey, bucket_removed: bool = False):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if bucket_removed:
+            if not self._buckets[entry.frequency]:
+                del self._buckets[entry.frequency]
+        else:
+            self._unbucket(key, entry.frequency)
+        keys = self._by_deck[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._by_deck[key[0]]
+            self._forget_owner(key[0])
+        self._bytes -= len(entry.body)
+
+    def _forget_owner(self, deck_id: int, force: bool = False):
+        """Забыть владельца колоды, если у нее не осталось записей и загрузок"""
+        owner_id = self._owner_of.get(deck_id)
+        if owner_id is None:
+            return
+        if not force and (deck_id in self._by_deck or any(key[0] == deck_id for key in self._loading)):
+            return
+        del self._owner_of[deck_id]
+        decks = self._by_owner[owner_id]
+        decks.discard(deck_id)
+        if not decks:
+            del self._by_owner[owner_id]
+
+
+# Singleton instance
+public_cache = PublicDeckCache()
+
+def get_public_cache() -> PublicDeckCache:
+    """Dependency для получения кеша публичных колод"""
+    return public_cache
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import RENDER_CACHE_SIZE, RENDER_POOL_WORKERS, RENDER_POOL_THRESHOLD
+from src.services.markdown_service import RENDERER_VERSION, markdown_service
+
+# (question_html, answer_html)
+RenderedHtml = Tuple[str, str]
+
+
+def render_key(question: str, answer: str) -> str:
+    """Ключ HTML кеша: хеш исходного Markdown и версии рендерера"""
+    digest = hashlib.sha256()
+    for part in (RENDERER_VERSION, question, answer):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def render_pair(question: str, answer: str) -> RenderedHtml:
+    """Отрендерить вопрос и ответ карточки"""
+    return markdown_service.convert_to_html(question), markdown_service.convert_to_html(answer)
+
+
+def _render_batch(pairs: List[Tuple[str, str]]) -> List[RenderedHtml]:
+    """Рендер пачки карточек в дочернем процессе"""
+    return [render_pair(question, answer) for question, answer in pairs]
+
+
+class RenderCache:
+    """Кеш отрендеренного HTML карточек.
+
+    Уровни: LRU в памяти процесса -> колонки question_html/answer_html/html_key
+    в БД -> рендер. Ключ адресует содержимое, поэтому устаревший HTML никогда
+    не отдается: при изменении Markdown или RENDERER_VERSION ключ не совпадет.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RENDER_CACHE_SIZE,
+        pool_workers: int = RENDER_POOL_WORKERS,
+        pool_threshold: int = RENDER_POOL_THRESHOLD
+    ):
+        self.max_entries = max_entries
+        self.pool_workers = pool_workers or (os.cpu_count() or 1)
+        self.pool_threshold = pool_threshold
+        self._entries: "OrderedDict[str, RenderedHtml]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def get(self, key: str) -> Optional[RenderedHtml]:
+        html = self._entries.get(key)
+        if html is not None:
+            self._entries.move_to_end(key)
+        return html
+
+    def put(self, key: str, html: RenderedHtml):
+        self._entries[key] = html
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def render(self, question: str, answer: str) -> Tuple[str, RenderedHtml]:
+        """HTML для Markdown (используется при записи карточки)"""
+        key = render_key(question, answer)
+        html = self.get(key)
+        if html is None:
+            html = render_pair(question, answer)
+            self.put(key, html)
+        return key, html
+
+    async def render_many(
+        self,
+        pairs: List[Tuple[str, str]],
+        store: bool = True
+    ) -> List[Tuple[str, RenderedHtml]]:
+        """Ключи и HTML для пачки (вопрос, ответ); промахи рендерятся одной пачкой.
+
+        store=False не кладет результат в LRU: массовый импорт или экспорт
+        не должен вытеснять из кеша карточки, которые сейчас изучают.
+        """
+        keys = [render_key(question, answer) for question, answer in pairs]
+        results: List[Optional[RenderedHtml]] = [self.get(key) for key in keys]
+        misses = [i for i, html in enumerate(results) if html is None]
+        if misses:
+            rendered = await self._render_many([pairs[i] for i in misses])
+            for i, html in zip(misses, rendered):
+                results[i] = html
+                if store:
+                    self.put(keys[i], html)
+        return list(zip(keys, results))
+
+    async def resolve_cards(self, cards: List[Dict[str, Any]], store: bool = True) -> List[Dict[str, Any]]:
+        """Заполнить HTML карточек из кеша; вернуть карточки, HTML которых нужно сохранить в БД.
+
+        Карточки изменяются на месте. Промахи кеша рендерятся пачкой: при
+        большом их числе — в пуле процессов, чтобы не блокировать event loop.
+        """
+        stale = []
+        for card in cards:
+            key = render_key(card["question"], card["answer"])
+            if card.get("html_key") == key and card.get("question_html") is not None:
+                if store:
+                    self.put(key, (card["question_html"], card["answer_html"]))
+            else:
+                stale.append(card)
+
+        if not stale:
+            return []
+
+        rendered = await self.render_many([(card["question"], card["answer"]) for card in stale], store)
+        for card, (key, html) in zip(stale, rendered):
+            card["question_html"], card["answer_html"] = html
+            card["html_key"] = key
+        # Карточки, у которых HTML в БД устарел или отсутствует (в т.ч. взятые из LRU)
+        return stale
+
+    async def _render_many(self, pairs: List[Tuple[str, str]]) -> List[RenderedHtml]:
+        if len(pairs) < self.pool_threshold:
+            return _render_batch(pairs)
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        chunk = max(len(pairs) // self.pool_workers, 1)
+        chunks = [pairs[i:i + chunk] for i in range(0, len(pairs), chunk)]
+        results = await asyncio.gather(*(loop.run_in_executor(pool, _render_batch, c) for c in chunks))
+        return [html for batch in results for html in batch]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.pool_workers)
+        return self._pool
+
+    def shutdown(self):
+        """Остановить пул процессов рендеринга"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+render_cache = RenderCache()
+
+def get_render_cache() -> RenderCache:
+    """Dependency для получения кеша HTML"""
+    return render_cache
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from src.models.sync import ChangesResponse
+from src.services.card_service import CardService, get_card_service
+from src.services.database_client import DatabaseClient, get_database_client
+
+
+class SyncService:
+    """Дельта-синхронизация колод, карточек и прогресса пользователя"""
+
+    def __init__(self, db_client: Optional[DatabaseClient] = None, cards: Optional[CardService] = None):
+        self.db_client = db_client or get_database_client()
+        self.cards = cards or get_card_service()
+
+    async def get_changes(self, user_id: int, since: int, limit: int) -> ChangesResponse:
+        """Изменения после версии since; HTML карточек берется из кеша рендера"""
+        result = await self.db_client.get_changes(user_id, since, limit)
+        cards = [change["card"] for change in result["changes"] if change.get("card")]
+        # Как в экспорте: пачка изменений не должна вытеснять горячие карточки из LRU
+        await self.cards.resolve_html(cards, store=False)
+        return ChangesResponse(**result)
+
+
+# Singleton instance
+sync_service = SyncService()
+
+def get_sync_service() -> SyncService:
+    """Dependency для получения сервиса синхронизации"""
+    return sync_service
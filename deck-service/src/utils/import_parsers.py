@@ -0,0 +1,192 @@
+import csv
+import json
+import re
+from typing import Any, List, NamedTuple, Optional
+
+from src.config import MAX_MARKDOWN_SIZE
+
+# Предел одной записи файла: два поля по MAX_MARKDOWN_SIZE с запасом на экранирование
+MAX_RECORD_SIZE = MAX_MARKDOWN_SIZE * 4 + 1024
+# Сколько можно прочитать в поисках массива карточек в JSON
+MAX_JSON_HEADER_SIZE = 1024 * 1024
+
+CARDS_ARRAY_PATTERN = re.compile(r'"cards"\s*:\s*\[')
+JSON_WHITESPACE = " \t\r\n"
+
+
+class ImportFormatError(ValueError):
+    """Файл нельзя разобрать дальше; импорт прерывается"""
+
+
+class ImportRow(NamedTuple):
+    row: int
+    question: Optional[str]
+    answer: Optional[str]
+    error: Optional[str] = None
+
+
+def _row_from_fields(row: int, question: Any, answer: Any) -> ImportRow:
+    if not isinstance(question, str) or not isinstance(answer, str):
+        return ImportRow(row, None, None, "Вопрос и ответ должны быть строками")
+    if not question.strip() or not answer.strip():
+        return ImportRow(row, None, None, "Пустой вопрос или ответ")
+    return ImportRow(row, question, answer)
+
+
+class CsvRowParser:
+    """Инкрементальный разбор CSV.
+
+    Текст подается кусками через feed(); наружу отдаются только полные
+    записи. Запись заканчивается на переводе строки вне поля в кавычках,
+    поэтому многострочные Markdown поля в кавычках не разрываются. Как и в
+    csv.reader, поле в кавычках открывает только кавычка в начале поля
+    (внутри него кавычки удваиваются по RFC 4180), а кавычка посреди
+    обычного поля (12" pizza) — просто символ.
+    """
+
+    def __init__(self, has_header: bool = True, question_column: int = 0, answer_column: int = 1):
+        self.skip_header = has_header
+        self.question_column = question_column
+        self.answer_column = answer_column
+        self._tail = ""
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._quoted = False
+        self._line = 0
+
+    def feed(self, text: str) -> List[ImportRow]:
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        records = []
+        for line in lines:
+            self._push(line + "\n")
+            if not self._quoted:
+                records.append(self._take())
+        if len(self._tail) + self._pending_size > MAX_RECORD_SIZE:
+            raise ImportFormatError(f"Строка {self._line + 1}: запись больше {MAX_RECORD_SIZE} символов")
+        return self._parse(records)
+
+    def close(self) -> List[ImportRow]:
+        if self._tail:
+            self._push(self._tail)
+            self._tail = ""
+        if not self._pending:
+            return []
+        if self._quoted:
+            raise ImportFormatError(f"Строка {self._line + 1}: незакрытая кавычка")
+        return self._parse([self._take()])
+
+    def _push(self, line: str):
+        self._pending.append(line)
+        self._pending_size += len(line)
+        position = line.find('"')
+        while position != -1:
+            if self._quoted:
+                if line.startswith('"', position + 1):
+                    position += 1  # удвоенная кавычка внутри поля
+                else:
+                    self._quoted = False
+            elif position == 0 or line[position - 1] == ",":
+                # Строка вне кавычек начинает запись: позиция 0 — начало поля
+                self._quoted = True
+            position = line.find('"', position + 1)
+
+    def _take(self) -> str:
+        record = "".join(self._pending)
+        self._pending = []
+        self._pending_size = 0
+        return record
+
+    def _parse(self, records: List[str]) -> List[ImportRow]:
+        rows = []
+        for record in records:
+            row = self._line + 1
+            self._line += record.count("\n")
+            if not record.strip():
+                continue
+            if self.skip_header:
+                self.skip_header = False
+                continue
+            try:
+                fields = next(csv.reader([record]))
+            except csv.Error as e:
+                rows.append(ImportRow(row, None, None, f"Некорректная CSV строка: {e}"))
+                continue
+            if len(fields) <= max(self.question_column, self.answer_column):
+                rows.append(ImportRow(row, None, None, "Не хватает колонок"))
+                continue
+            rows.append(_row_from_fields(row, fields[self.question_column], fields[self.answer_column]))
+        return rows
+
+
+class JsonCardsParser:
+    """Инкрементальный разбор JSON с карточками.
+
+    Поддерживаются массив карточек и объект с массивом "cards" (в т.ч. формат
+    экспорта {"deck": {..., "cards": [...]}}). Элементы массива разбираются
+    по одному через JSONDecoder.raw_decode, в памяти — только текущий элемент.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._finished = False
+        self._row = 0
+
+    def feed(self, text: str) -> List[ImportRow]:
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return self._parse(eof=False)
+
+    def close(self) -> List[ImportRow]:
+        rows = self._parse(eof=True)
+        if not self._finished:
+            raise ImportFormatError("Неожиданный конец JSON: массив карточек не закрыт")
+        return rows
+
+    def _find_array(self, eof: bool) -> bool:
+        start = len(self._buffer) - len(self._buffer.lstrip(JSON_WHITESPACE))
+        if start < len(self._buffer) and self._buffer[start] == "[":
+            self._pos = start + 1
+            return True
+        match = CARDS_ARRAY_PATTERN.search(self._buffer)
+        if match:
+            self._pos = match.end()
+            return True
+        if eof or len(self._buffer) > MAX_JSON_HEADER_SIZE:
+            raise ImportFormatError('Не найден массив карточек: ожидается [...] или {"cards": [...]}')
+        return False
+
+    def _parse(self, eof: bool) -> List[ImportRow]:
+        rows = []
+        if self._finished:
+            return rows
+        if not self._in_array:
+            if not self._find_array(eof):
+                return rows
+            self._in_array = True
+
+        buffer = self._buffer
+        while True:
+            while self._pos < len(buffer) and buffer[self._pos] in JSON_WHITESPACE + ",":
+                self._pos += 1
+            if self._pos >= len(buffer):
+                return rows
+            if buffer[self._pos] == "]":
+                self._finished = True
+                return rows
+            try:
+                item, end = self._decoder.raw_decode(buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Элемент может быть просто не дочитан
+                if eof or len(buffer) - self._pos > MAX_RECORD_SIZE:
+                    raise ImportFormatError(f"Элемент {self._row + 1}: некорректный JSON ({e.msg})")
+                return rows
+            self._pos = end
+            self._row += 1
+            if isinstance(item, dict):
+                rows.append(_row_from_fields(self._row, item.get("question"), item.get("answer")))
+            else:
+                rows.append(ImportRow(self._row, None, None, "Карточка должна быть объектом"))
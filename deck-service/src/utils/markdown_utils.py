@@ -0,0 +1,87 @@
+import re
+from typing import List
+
+import bleach
+
+from src.config import IMAGE_PUBLIC_URL, IMAGE_VARIANT_WIDTHS
+
+ALLOWED_TAGS = [
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'p', 'br', 'hr', 'strong', 'em', 'u', 's', 'del',
+    'ul', 'ol', 'li', 'blockquote',
+    'code', 'pre', 'table', 'thead', 'tbody', 'tr', 'td', 'th',
+    'img', 'a'
+]
+
+ALLOWED_ATTRIBUTES = {
+    'img': ['src', 'alt', 'title'],
+    'a': ['href', 'title'],
+    'code': ['class'],
+    'pre': ['class'],
+    'th': ['align'],
+    'td': ['align']
+}
+
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+
+IMAGE_PATTERN = re.compile(r'!\[.*?\]\((.*?)\)')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+# Изображения из хранилища Deck Service: префикс и SHA-256 содержимого, без расширения
+LOCAL_IMAGE_PATTERN = re.compile(re.escape(IMAGE_PUBLIC_URL.rstrip('/')) + r'/[0-9a-f]{64}$')
+LOCAL_IMG_SRC_PATTERN = re.compile(
+    r'(<img\b[^>]*?\bsrc=")(' + re.escape(IMAGE_PUBLIC_URL.rstrip('/')) + r'/[0-9a-f]{64})(")'
+)
+
+
+# bleach.clean() собирает Cleaner на каждый вызов; как и Markdown процессор,
+# общий экземпляр используется только из одного потока (event loop или процесс пула)
+_cleaner = bleach.sanitizer.Cleaner(
+    tags=ALLOWED_TAGS,
+    attributes=ALLOWED_ATTRIBUTES,
+    protocols=ALLOWED_PROTOCOLS,
+    strip=True
+)
+
+
+def sanitize_markdown_html(html: str) -> str:
+    """Очистка HTML от потенциально опасного контента"""
+    return _cleaner.clean(html)
+
+
+def extract_images_from_markdown(markdown_content: str) -> List[str]:
+    """Извлекает URL изображений из Markdown контента (без дубликатов, с сохранением порядка)"""
+    return list(dict.fromkeys(IMAGE_PATTERN.findall(markdown_content)))
+
+
+def validate_image_urls(markdown_content: str) -> List[str]:
+    """Валидация URL изображений в Markdown; возвращает невалидные URL"""
+    invalid_urls = []
+    for img_url in extract_images_from_markdown(markdown_content):
+        if LOCAL_IMAGE_PATTERN.match(img_url):
+            continue
+        if not img_url.startswith(('http://', 'https://')):
+            invalid_urls.append(img_url)
+        elif not img_url.lower().endswith(IMAGE_EXTENSIONS):
+            invalid_urls.append(img_url)
+    return invalid_urls
+
+
+def _variant_attributes(match: re.Match) -> str:
+    url = match.group(2)
+    if not IMAGE_VARIANT_WIDTHS:
+        return match.group(0) + ' loading="lazy"'
+    widths = sorted(IMAGE_VARIANT_WIDTHS)
+    srcset = ", ".join(f"{url}/{width}.webp {width}w" for width in widths)
+    return (
+        f'{match.group(1)}{url}/{widths[-1]}.webp{match.group(3)} srcset="{srcset}" '
+        f'sizes="(max-width: {widths[-1]}px) 100vw, {widths[-1]}px" loading="lazy"'
+    )
+
+
+def rewrite_image_variants(html: str) -> str:
+    """Изображения из хранилища ссылаются на варианты WebP нужной ширины (srcset).
+
+    Выполняется после санитизации: атрибуты собираются только из хеша и
+    настроенных ширин, пользовательские srcset по-прежнему вырезаются.
+    """
+    return LOCAL_IMG_SRC_PATTERN.sub(_variant_attributes, html)
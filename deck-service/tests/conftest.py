@@ -0,0 +1,32 @@
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.image_store import ImageStore
+from src.services.public_cache import PublicDeckCache
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def тесты выполняются в своем event loop через asyncio.run (без pytest-asyncio)"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    asyncio.run(pyfuncitem.obj(**{name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}))
+    return True
+
+
+@pytest.fixture
+def public_cache() -> PublicDeckCache:
+    return PublicDeckCache(max_bytes=1024, ttl=60, stale_ttl=120)
+
+
+@pytest.fixture
+def image_store(tmp_path) -> ImageStore:
+    """Хранилище во временном каталоге с одним вариантом ширины 320"""
+    store = ImageStore(root=str(tmp_path), widths=[320], pool_workers=1, public_url="/img")
+    store._pool = ThreadPoolExecutor(max_workers=1)
+    yield store
+    store._pool.shutdown()
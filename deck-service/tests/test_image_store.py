@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+from src.services import image_store as image_store_module
+from src.services.image_store import CACHE_IMMUTABLE, CACHE_PENDING, ImageStore
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+async def _chunks(data: bytes, size: int = 16):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _flaky_variants(failures: int):
+    """_make_variants, который сначала падает failures раз, затем пишет вариант и метаданные"""
+    calls = []
+
+    def make_variants(path, digest, widths):
+        calls.append(digest)
+        if len(calls) <= failures:
+            raise OSError("decoder crashed")
+        directory = os.path.dirname(path)
+        for width in widths:
+            with open(image_store_module._variant_path(directory, digest, width), "wb") as f:
+                f.write(b"RIFF\x00\x00\x00\x00WEBP")
+        with open(os.path.join(directory, f"{digest}.json"), "w") as f:
+            f.write("{}")
+        return {}
+
+    return make_variants, calls
+
+
+async def _processed(store: ImageStore, digest: str):
+    future = store._processing.get(digest)
+    if future is not None:
+        await asyncio.wait([future])
+        await asyncio.sleep(0)
+
+
+async def test_save_writes_original(image_store, monkeypatch):
+    make_variants, _ = _flaky_variants(0)
+    monkeypatch.setattr(image_store_module, "_make_variants", make_variants)
+    monkeypatch.setattr(image_store_module, "UPLOAD_WRITE_BUFFER", 20)
+
+    saved = await image_store.save(_chunks(PNG))
+    await _processed(image_store, saved["hash"])
+    with open(image_store.original_path(saved["hash"]), "rb") as f:
+        assert f.read() == PNG
+    assert saved["content_type"] == "image/png"
+    assert saved["size"] == len(PNG)
+
+
+async def test_failed_variants_fall_back_to_original_and_retry(image_store, monkeypatch):
+    make_variants, calls = _flaky_variants(1)
+    monkeypatch.setattr(image_store_module, "_make_variants", make_variants)
+
+    digest = (await image_store.save(_chunks(PNG)))["hash"]
+    await _processed(image_store, digest)
+    # Упало: отдается оригинал, повтор ждет паузы
+    pending = await image_store.resolve(digest, 320)
+    assert pending == (image_store.original_path(digest), "image/png", CACHE_PENDING)
+    assert digest not in image_store._processing
+
+    # Пауза прошла
+    image_store._failures[digest] = (1, 0.0)
+    await image_store.resolve(digest, 320)
+    await _processed(image_store, digest)
+    path, media_type, cache_control = await image_store.resolve(digest, 320)
+    assert len(calls) == 2
+    assert path.endswith(f"{digest}-320.webp")
+    assert (media_type, cache_control) == ("image/webp", CACHE_IMMUTABLE)
+    assert digest not in image_store._failures
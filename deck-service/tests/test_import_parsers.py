@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from src.utils.import_parsers import CsvRowParser, ImportFormatError, ImportRow, JsonCardsParser
+
+
+def _parse(parser, text: str, chunk: int):
+    """Подать текст кусками по chunk символов, как при потоковой загрузке"""
+    rows = []
+    for start in range(0, len(text), chunk):
+        rows += parser.feed(text[start:start + chunk])
+    return rows + parser.close()
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 1024])
+def test_csv_quote_inside_unquoted_field(chunk):
+    text = 'question,answer\n12" pizza size,30cm\nCapital of France,Paris\n'
+    assert _parse(CsvRowParser(), text, chunk) == [
+        ImportRow(2, '12" pizza size', "30cm"),
+        ImportRow(3, "Capital of France", "Paris"),
+    ]
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 1024])
+def test_csv_multiline_quoted_field(chunk):
+    text = 'question,answer\n"**Bold**\n\nsay ""hi""",answer\nnext,row'
+    assert _parse(CsvRowParser(), text, chunk) == [
+        ImportRow(2, '**Bold**\n\nsay "hi"', "answer"),
+        ImportRow(5, "next", "row"),
+    ]
+
+
+def test_csv_row_errors_do_not_stop_import():
+    text = "question,answer\nonly one column\n , \nq,a\n"
+    rows = _parse(CsvRowParser(), text, 1024)
+    assert [row.row for row in rows] == [2, 3, 4]
+    assert rows[0].error == "Не хватает колонок"
+    assert rows[1].error == "Пустой вопрос или ответ"
+    assert rows[2] == ImportRow(4, "q", "a")
+
+
+def test_csv_unclosed_quote():
+    with pytest.raises(ImportFormatError, match="незакрытая кавычка"):
+        _parse(CsvRowParser(), 'question,answer\n"never closed,a\n', 1024)
+
+
+def test_csv_custom_columns_without_header():
+    rows = _parse(CsvRowParser(has_header=False, question_column=2, answer_column=0), "a,x,q\n", 1024)
+    assert rows == [ImportRow(1, "q", "a")]
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 4096])
+@pytest.mark.parametrize("wrap", [
+    lambda cards: cards,
+    lambda cards: {"cards": cards},
+    lambda cards: {"deck": {"title": "Export [v1]", "cards": cards}},
+])
+def test_json_cards_formats(chunk, wrap):
+    cards = [{"question": "Q1", "answer": "A [1]"}, {"question": "Q2 ]", "answer": "A2"}]
+    text = json.dumps(wrap(cards), indent=2)
+    assert _parse(JsonCardsParser(), text, chunk) == [
+        ImportRow(1, "Q1", "A [1]"),
+        ImportRow(2, "Q2 ]", "A2"),
+    ]
+
+
+def test_json_item_errors():
+    rows = _parse(JsonCardsParser(), '[{"question": "Q", "answer": 1}, "text", {"question": "Q", "answer": "A"}]', 1024)
+    assert [row.error for row in rows] == [
+        "Вопрос и ответ должны быть строками", "Карточка должна быть объектом", None
+    ]
+
+
+@pytest.mark.parametrize("text, message", [
+    ('{"title": "no cards"}', "Не найден массив карточек"),
+    ('[{"question": "Q", "answer": "A"}', "массив карточек не закрыт"),
+    ('[{"question": "Q", "answer": }]', "некорректный JSON"),
+])
+def test_json_format_errors(text, message):
+    with pytest.raises(ImportFormatError, match=message):
+        _parse(JsonCardsParser(), text, 1024)
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from src.services.loaders import BatchLoader
+
+
+class CountingBatch:
+    """batch_fn, записывающий пачки ключей; ключ -> ключ * 10, ключи из missing отсутствуют"""
+
+    def __init__(self, missing=(), fail_times: int = 0):
+        self.batches = []
+        self.missing = set(missing)
+        self.fail_times = fail_times
+
+    async def __call__(self, keys):
+        self.batches.append(list(keys))
+        await asyncio.sleep(0)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("Database Service недоступен")
+        return {key: key * 10 for key in keys if key not in self.missing}
+
+
+async def test_loads_in_one_loop_pass_are_batched():
+    batch_fn = CountingBatch(missing={3})
+    loader = BatchLoader(batch_fn)
+
+    async def resolve(key):
+        # Разные ветви запроса: загрузки собираются, пока они в одном проходе
+        return await loader.load(key)
+
+    assert await asyncio.gather(resolve(1), resolve(2), resolve(3), resolve(1)) == [10, 20, None, 10]
+    assert batch_fn.batches == [[1, 2, 3]]
+
+    # Следующий проход — новая пачка
+    assert await loader.load_many([4, 5, 4]) == [40, 50, 40]
+    assert batch_fn.batches == [[1, 2, 3], [4, 5]]
+
+
+async def test_results_are_memoized():
+    batch_fn = CountingBatch(missing={2})
+    loader = BatchLoader(batch_fn)
+    assert await loader.load_many([1, 2]) == [10, None]
+    # Отсутствующий ключ тоже запоминается
+    assert await loader.load_many([2, 1, 1]) == [None, 10, 10]
+    loader.prime(5, 555)
+    assert await loader.load(5) == 555
+    assert batch_fn.batches == [[1, 2]]
+
+
+async def test_batches_are_split_by_max_batch():
+    batch_fn = CountingBatch()
+    loader = BatchLoader(batch_fn, max_batch=3)
+    assert await loader.load_many(range(1, 9)) == [key * 10 for key in range(1, 9)]
+    assert batch_fn.batches == [[1, 2, 3], [4, 5, 6], [7, 8]]
+
+
+async def test_errors_are_not_cached():
+    batch_fn = CountingBatch(fail_times=1)
+    loader = BatchLoader(batch_fn)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    # Повтор после ошибки снова идет в batch_fn
+    assert await loader.load_many([1, 2]) == [10, 20]
+    assert batch_fn.batches == [[1, 2], [1, 2]]
+
+
+async def test_cancelled_waiter_does_not_cancel_batch():
+    batch_fn = CountingBatch()
+    loader = BatchLoader(batch_fn)
+    first = asyncio.create_task(loader.load(1))
+    second = asyncio.create_task(loader.load(1))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 10
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert batch_fn.batches == [[1]]
@@ -0,0 +1,54 @@
+import asyncio
+
+from src.models.event import Event
+from src.services.public_cache import PublicDeckCache
+
+
+def _event(topic: str, **payload):
+    return Event(id=1, topic=topic, key="k", payload=payload)
+
+
+def _loader(cache: PublicDeckCache, deck_id: int, owner_id: int, body: bytes, calls: list):
+    async def load():
+        cache.set_owner(deck_id, owner_id)
+        calls.append(deck_id)
+        return body
+    return load
+
+
+async def test_user_updated_invalidates_owner_decks(public_cache):
+    calls = []
+    await public_cache.get(1, "deck", _loader(public_cache, 1, 10, b"alice-1", calls))
+    await public_cache.get(2, "deck", _loader(public_cache, 2, 10, b"alice-2", calls))
+    await public_cache.get(3, "deck", _loader(public_cache, 3, 20, b"bob-3", calls))
+    assert public_cache.apply([_event("user.updated", user_id=10, username="alice2")]) == 1
+    for deck_id, owner_id in ((1, 10), (2, 10), (3, 20)):
+        await public_cache.get(deck_id, "deck", _loader(public_cache, deck_id, owner_id, b"new", calls))
+
+    # Колоды владельца 10 загружены заново, колода владельца 20 — из кеша
+    assert calls == [1, 2, 3, 1, 2]
+    assert public_cache._by_owner == {10: {1, 2}, 20: {3}}
+
+
+async def test_user_updated_during_load_is_not_cached(public_cache):
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_load():
+        public_cache.set_owner(1, 10)
+        started.set()
+        await release.wait()
+        return b"old-name"
+
+    pending = asyncio.create_task(public_cache.get(1, "deck", slow_load))
+    await started.wait()
+    public_cache.apply([_event("user.updated", user_id=10)])
+    release.set()
+    assert await pending == b"old-name"
+    assert await public_cache.get(1, "deck", _loader(public_cache, 1, 10, b"new-name", [])) == b"new-name"
+
+
+async def test_owner_forgotten_with_last_entry(public_cache):
+    await public_cache.get(1, "deck", _loader(public_cache, 1, 10, b"body", []))
+    public_cache.apply([_event("deck.upserted", deck_id=1, owner_id=10)])
+    assert public_cache._owner_of == {} and public_cache._by_owner == {}
@@ -0,0 +1,26 @@
+-- Шард refresh токенов: таблица как в основной базе, но без внешнего ключа
+-- на users (пользователи живут в основной базе, токены удаляются явно)
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id SERIAL PRIMARY KEY,
+    token_hash VARCHAR(255) UNIQUE NOT NULL,
+    user_id INTEGER NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    is_revoked BOOLEAN DEFAULT FALSE,
+    -- Время отзыва: по нему и created_at строятся дельты снимка отзыва
+    revoked_at TIMESTAMP WITH TIME ZONE,
+    -- Ротация заменяет хеш в той же строке; прежний хеш — для обнаружения повторного использования
+    previous_hash VARCHAR(255),
+    rotated_at TIMESTAMP WITH TIME ZONE,
+    -- Семейство ротации: общий ID всех поколений токена одной сессии
+    family_id VARCHAR(32)
+);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_token_hash ON refresh_tokens(token_hash);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires_at ON refresh_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_created_at ON refresh_tokens(created_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_revoked_at ON refresh_tokens(revoked_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_previous_hash ON refresh_tokens(previous_hash);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_rotated_at ON refresh_tokens(rotated_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family_id ON refresh_tokens(family_id);
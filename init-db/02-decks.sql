@@ -0,0 +1,48 @@
+-- Создание таблицы колод
+CREATE TABLE IF NOT EXISTS decks (
+    id SERIAL PRIMARY KEY,
+    owner_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title VARCHAR(200) NOT NULL,
+    description TEXT,
+    is_public BOOLEAN NOT NULL DEFAULT FALSE,
+    category VARCHAR(100),
+    tags JSON NOT NULL DEFAULT '[]',
+    cards_count INTEGER NOT NULL DEFAULT 0,
+    -- Версия последнего изменения для дельта-синхронизации (03-sync.sql)
+    version BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_decks_owner_id ON decks(owner_id);
+CREATE INDEX IF NOT EXISTS idx_decks_category ON decks(category);
+CREATE INDEX IF NOT EXISTS idx_decks_owner_version ON decks(owner_id, version);
+
+-- Создание таблицы карточек
+CREATE TABLE IF NOT EXISTS cards (
+    id SERIAL PRIMARY KEY,
+    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    -- Кеш отрендеренного HTML; html_key — хеш исходника и версии рендерера
+    question_html TEXT,
+    answer_html TEXT,
+    html_key VARCHAR(64),
+    attachments JSON NOT NULL DEFAULT '[]',
+    -- Дробный ключ порядка: вставка и перемещение меняют одну строку; сравнение побайтовое
+    rank VARCHAR(128) COLLATE "C" NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_cards_deck_id ON cards(deck_id);
+-- Порядок карточек в колоде и keyset пагинация экспорта по (rank, id)
+CREATE INDEX IF NOT EXISTS idx_cards_deck_rank ON cards(deck_id, rank, id);
+CREATE INDEX IF NOT EXISTS idx_cards_version ON cards(version);
+
+-- updated_at карточек выставляет приложение: сохранение HTML кеша не должно его менять
+CREATE TRIGGER update_decks_updated_at
+    BEFORE UPDATE ON decks
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
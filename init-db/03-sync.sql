@@ -0,0 +1,73 @@
+-- Состояние повторения карточек (пишет Study Service)
+CREATE TABLE IF NOT EXISTS card_reviews (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
+    interval DOUBLE PRECISION NOT NULL,
+    -- Время следующего повторения (unix time)
+    due DOUBLE PRECISION NOT NULL,
+    reps INTEGER NOT NULL DEFAULT 0,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, card_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_card_reviews_user_version ON card_reviews(user_id, version);
+
+-- Надгробия удаленных колод, карточек и состояний повторения
+CREATE TABLE IF NOT EXISTS tombstones (
+    id SERIAL PRIMARY KEY,
+    entity VARCHAR(16) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    deck_id INTEGER,
+    version BIGINT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_tombstones_owner_version ON tombstones(owner_id, version);
+CREATE INDEX IF NOT EXISTS idx_tombstones_created_at ON tombstones(created_at);
+
+-- Потоки версий по владельцам: строка владельца блокируется до commit,
+-- поэтому его версии фиксируются по возрастанию; строка создается первой записью
+CREATE TABLE IF NOT EXISTS sync_streams (
+    owner_id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    purged_version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER update_card_reviews_updated_at
+    BEFORE UPDATE ON card_reviews
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Transactional outbox: события пишутся в транзакции изменения после выделения версии,
+-- версия изменения — в payload
+CREATE TABLE IF NOT EXISTS outbox_events (
+    id BIGSERIAL PRIMARY KEY,
+    topic VARCHAR(64) NOT NULL,
+    key VARCHAR(64) NOT NULL,
+    payload JSON NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Позиции доставки подписчикам (ретранслятор Database Service)
+CREATE TABLE IF NOT EXISTS outbox_cursors (
+    subscriber VARCHAR(64) PRIMARY KEY,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    -- xmax снимка при обнаружении пропуска в ID после last_event_id
+    gap_xmax BIGINT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITH TIME ZONE,
+    lease_until TIMESTAMP WITH TIME ZONE,
+    last_error TEXT
+);
+
+CREATE TABLE IF NOT EXISTS outbox_dead_letters (
+    id SERIAL PRIMARY KEY,
+    subscriber VARCHAR(64) NOT NULL,
+    first_event_id BIGINT NOT NULL,
+    last_event_id BIGINT NOT NULL,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
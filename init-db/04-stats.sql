@@ -0,0 +1,42 @@
+-- Журнал ответов (append-only, пишет Study Service); старые события удаляет компактизация
+CREATE TABLE IF NOT EXISTS review_events (
+    id BIGSERIAL PRIMARY KEY,
+    event_id VARCHAR(36) UNIQUE NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    -- Без внешних ключей: журнал переживает удаление карточек и колод
+    card_id INTEGER NOT NULL,
+    deck_id INTEGER,
+    performance DOUBLE PRECISION NOT NULL,
+    reviewed_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_review_events_user_reviewed ON review_events(user_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_review_events_reviewed_at ON review_events(reviewed_at);
+
+-- Сводки статистики, обновляются вместе со вставкой событий
+CREATE TABLE IF NOT EXISTS study_user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    reviews BIGINT NOT NULL DEFAULT 0,
+    correct BIGINT NOT NULL DEFAULT 0,
+    -- Серия заканчивается на last_active_day (дни — по UTC)
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_active_day DATE
+);
+
+CREATE TABLE IF NOT EXISTS study_daily_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS study_deck_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    last_reviewed_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (user_id, deck_id)
+);
@@ -0,0 +1,128 @@
+"""Бенчмарк индекса поиска на синтетических колодах.
+
+Запуск из каталога search-service:
+
+    python -m benchmarks.search_bench
+    python -m benchmarks.search_bench --cards 100000 --cards-per-deck 50
+
+Строит индекс, пишет снимок, загружает его через mmap и меряет задержку
+запросов (одно и два слова, с фильтром по тегу), автодополнения и
+запросов после точечных изменений (снимок + дельта).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.index import SearchIndex
+
+SYLLABLES = ["ka", "to", "ri", "mo", "ne", "sa", "lu", "vi", "po", "de", "ga", "zu", "ber", "lin", "tor", "mak"]
+
+
+def make_words(rng: np.random.Generator, count: int) -> List[str]:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES, rng.integers(2, 5))))
+    return sorted(words)
+
+
+def zipf_text(rng: np.random.Generator, words: List[str], size: int) -> str:
+    ranks = np.minimum(rng.zipf(1.2, size), len(words)) - 1
+    return " ".join(words[r] for r in ranks)
+
+
+def latency(func: Callable, args_list: List[tuple]) -> Dict[str, float]:
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(float(np.percentile(times, 50)), 3), "p99_ms": round(float(np.percentile(times, 99)), 3)}
+
+
+def bench(cards: int, cards_per_deck: int, vocabulary: int, queries: int, updates: int, seed: int):
+    rng = np.random.default_rng(seed)
+    words = make_words(rng, vocabulary)
+    tags = [f"tag{i}" for i in range(200)]
+    decks = cards // cards_per_deck
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    card_id = 0
+    for deck_id in range(decks):
+        deck_cards = []
+        for _ in range(cards_per_deck):
+            deck_cards.append((card_id, zipf_text(rng, words, 6), zipf_text(rng, words, 8)))
+            card_id += 1
+        index.upsert_deck(
+            deck_id, zipf_text(rng, words, 4), zipf_text(rng, words, 12),
+            list(rng.choice(tags, 3, replace=False)), deck_cards
+        )
+    build_s = time.perf_counter() - start
+
+    path = os.path.join(tempfile.mkdtemp(), "index")
+    start = time.perf_counter()
+    index.build_snapshot(path)
+    snapshot_s = time.perf_counter() - start
+    size_mb = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2 ** 20
+    del index
+
+    start = time.perf_counter()
+    index = SearchIndex()
+    index.load(path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    def sample(n: int) -> List[str]:
+        # Запросы из слов средней частоты и из частых слов
+        return [words[int(r)] for r in np.minimum(rng.zipf(1.1, n), len(words)) - 1]
+
+    one = [(q,) for q in sample(queries)]
+    two = [(f"{a} {b}",) for a, b in zip(sample(queries), sample(queries))]
+    tagged = [(q, [tags[int(rng.integers(len(tags)))]]) for q in sample(queries)]
+    prefixes = [(w[:int(rng.integers(1, 4))],) for w in sample(queries)]
+
+    results = {
+        "decks": decks,
+        "cards": decks * cards_per_deck,
+        "build_s": round(build_s, 1),
+        "snapshot_write_s": round(snapshot_s, 1),
+        "snapshot_mb": round(size_mb, 1),
+        "load_mmap_ms": round(load_ms, 1),
+        "query_1_word": latency(index.search, one),
+        "query_2_words": latency(index.search, two),
+        "query_tag_filter": latency(index.search, tagged),
+        "suggest": latency(index.suggest, prefixes),
+    }
+
+    # Точечные изменения: карточки колод из снимка переходят в дельту
+    start = time.perf_counter()
+    for i in range(updates):
+        index.upsert_card(int(rng.integers(decks)), cards + i, zipf_text(rng, words, 6), zipf_text(rng, words, 8))
+    results["card_update_ms"] = round((time.perf_counter() - start) * 1000 / max(updates, 1), 3)
+    results["query_with_delta"] = latency(index.search, two)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк индекса поиска")
+    parser.add_argument("--cards", type=int, default=1000000, help="Всего карточек")
+    parser.add_argument("--cards-per-deck", type=int, default=100, help="Карточек в колоде")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="Размер словаря")
+    parser.add_argument("--queries", type=int, default=2000, help="Запросов каждого вида")
+    parser.add_argument("--updates", type=int, default=1000, help="Точечных изменений карточек")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = bench(args.cards, args.cards_per_deck, args.vocabulary, args.queries, args.updates, args.seed)
+    print(f"\n== {results['decks']} колод, {results['cards']} карточек")
+    for name, value in results.items():
+        print(f"  {name:<20}{value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
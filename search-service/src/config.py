@@ -0,0 +1,19 @@
+import os
+
+# Настройки приложения
+PORT = int(os.getenv("PORT", "8005"))
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
+# Database Service (источник колод для полной переиндексации)
+DATABASE_SERVICE_URL = os.getenv("DATABASE_SERVICE_URL", "http://localhost:8002")
+DATABASE_SERVICE_TIMEOUT = int(os.getenv("DATABASE_SERVICE_TIMEOUT", "30"))
+
+# Индекс
+# Каталог снимка индекса (загружается через mmap при старте); пусто — индекс только в памяти
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "")
+# После скольких измененных колод изменения сливаются в новый снимок
+SEARCH_MERGE_DOCS = int(os.getenv("SEARCH_MERGE_DOCS", "5000"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+MAX_SUGGESTIONS = int(os.getenv("MAX_SUGGESTIONS", "20"))
@@ -0,0 +1,71 @@
+from typing import List, Optional
+
+import httpx
+
+from src.config import DATABASE_SERVICE_URL, DATABASE_SERVICE_TIMEOUT
+from src.reindex import get_deck_cards
+from src.schemas import Event
+from src.service import SearchService, get_search_service
+
+
+class EventConsumer:
+    """Применяет события outbox Database Service к индексу.
+
+    Доставка "хотя бы один раз", поэтому каждое событие идемпотентно. Когда
+    колода становится публичной, ее карточки читаются из Database Service.
+    """
+
+    def __init__(self, service: Optional[SearchService] = None, base_url: str = DATABASE_SERVICE_URL):
+        self.service = service or get_search_service()
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=DATABASE_SERVICE_TIMEOUT)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def apply(self, events: List[Event]) -> int:
+        """Применить пачку по порядку; вернуть число изменивших индекс событий"""
+        applied = 0
+        for event in events:
+            applied += await self._apply(event)
+        return applied
+
+    async def _apply(self, event: Event) -> bool:
+        payload = event.payload
+        if event.topic == "deck.upserted":
+            deck_id = payload["deck_id"]
+            if not payload["is_public"]:
+                return await self.service.remove_deck(deck_id)
+            cards = None
+            if deck_id not in self.service.index:
+                cards = [
+                    (card["id"], card["question"], card["answer"])
+                    for card in await get_deck_cards(self._get_client(), deck_id)
+                ]
+            await self.service.upsert_deck(deck_id, payload["title"], payload.get("description"), payload["tags"], cards)
+            return True
+        if event.topic == "deck.deleted":
+            return await self.service.remove_deck(payload["deck_id"])
+        # Карточки приватных колод не индексируются: upsert_card вернет False
+        if event.topic == "card.upserted":
+            return await self.service.upsert_card(
+                payload["deck_id"], payload["card_id"], payload["question"], payload["answer"]
+            )
+        if event.topic == "card.deleted":
+            return await self.service.remove_card(payload["deck_id"], payload["card_id"])
+        return False
+
+
+# Singleton instance
+event_consumer = EventConsumer()
+
+def get_event_consumer() -> EventConsumer:
+    """Dependency для получения обработчика событий"""
+    return event_consumer
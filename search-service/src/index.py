@@ -0,0 +1,693 @@
+import json
+import math
+import os
+import shutil
+from collections import Counter
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import BM25_K1, BM25_B
+from src.tokenizer import analyze, normalize, tokenize
+
+SNAPSHOT_VERSION = 1
+
+# Веса полей при подсчете частоты терма в колоде (упрощенный BM25F)
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+TAGS_WEIGHT = 2.0
+CARDS_WEIGHT = 1.0
+
+# Пачка токенов при построении постингов снимка (ограничивает пиковую память)
+BUILD_CHUNK_TOKENS = 2_000_000
+
+TERM_DTYPE = np.int32
+EMPTY_TERMS = np.zeros(0, dtype=TERM_DTYPE)
+
+_length = attrgetter("length")
+
+
+def _csr(arrays: Sequence[np.ndarray], dtype=TERM_DTYPE) -> Tuple[np.ndarray, np.ndarray]:
+    """Список массивов -> (смещения, значения)"""
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    if arrays:
+        np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    values = np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.zeros(0, dtype=dtype)
+    return offsets, values
+
+
+def _gather(offsets: np.ndarray, values: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Выбрать строки rows из CSR (offsets, values) без цикла по строкам"""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets, np.asarray(values[index])
+
+
+class StringTable:
+    """Отсортированные строки в двух массивах: UTF-8 блоб и смещения.
+
+    Порядок байтов UTF-8 совпадает с порядком кодовых точек, поэтому поиск
+    строки — бинарный поиск прямо по (возможно, отображенному в память)
+    блобу, без построения словаря при загрузке.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, strings: Sequence[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8).copy(), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _bytes(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def get(self, i: int) -> str:
+        return self._bytes(i).decode("utf-8")
+
+    def find(self, s: str) -> int:
+        """Номер строки или -1"""
+        key = s.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self._bytes(lo) == key else -1
+
+    def strings(self) -> List[str]:
+        data = self.blob.tobytes()
+        bounds = self.offsets.tolist()
+        return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(self))]
+
+
+class Vocabulary:
+    """Строки снимка (номера 0..n-1) плюс новые строки, добавленные после него"""
+
+    def __init__(self, table: StringTable):
+        self.table = table
+        self.extra: Dict[str, int] = {}
+        self.extra_list: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.table) + len(self.extra_list)
+
+    def find(self, s: str) -> int:
+        i = self.table.find(s)
+        return i if i >= 0 else self.extra.get(s, -1)
+
+    def add(self, s: str) -> int:
+        i = self.find(s)
+        if i < 0:
+            i = self.extra[s] = len(self)
+            self.extra_list.append(s)
+        return i
+
+    def add_all(self, strings: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.add(s) for s in strings), dtype=TERM_DTYPE)
+
+    def get(self, i: int) -> str:
+        base = len(self.table)
+        return self.table.get(i) if i < base else self.extra_list[i - base]
+
+    def strings(self) -> List[str]:
+        return self.table.strings() + self.extra_list
+
+
+class DeckDocument:
+    """Прямой индекс колоды: номера термов по полям, тегов и слов для подсказок"""
+
+    __slots__ = ("deck_id", "title", "description", "tag_terms", "tags", "words", "cards",
+                 "terms", "tf", "length")
+
+    def __init__(
+        self,
+        deck_id: int,
+        title: np.ndarray,
+        description: np.ndarray,
+        tag_terms: np.ndarray,
+        tags: np.ndarray,
+        words: np.ndarray,
+        cards: Dict[int, np.ndarray]
+    ):
+        self.deck_id = deck_id
+        self.title = title
+        self.description = description
+        self.tag_terms = tag_terms
+        self.tags = tags
+        self.words = words
+        self.cards = cards
+        # Взвешенные частоты уникальных термов и длина колоды
+        parts = [title, description, tag_terms, *cards.values()]
+        weights = np.repeat(
+            np.array([TITLE_WEIGHT, DESCRIPTION_WEIGHT, TAGS_WEIGHT] + [CARDS_WEIGHT] * len(cards)),
+            [len(p) for p in parts]
+        )
+        self.terms, inverse = np.unique(np.concatenate(parts), return_inverse=True)
+        self.tf = np.bincount(inverse, weights=weights, minlength=len(self.terms))
+        self.length = float(weights.sum())
+
+
+class StaticSegment:
+    """Неизменяемая часть индекса: массивы снимка (обычно отображены в память).
+
+    Инвертированный индекс — CSR: постинги терма t лежат в
+    post_rows/post_tf[post_off[t]:post_off[t+1]]. Рядом хранится прямой
+    индекс колод (термы по полям, теги, слова, карточки), чтобы колоду из
+    снимка можно было изменить точечно.
+    """
+
+    ARRAYS = (
+        "deck_ids", "doc_len", "post_off", "post_rows", "post_tf",
+        "title_off", "title", "description_off", "description", "tag_terms_off", "tag_terms",
+        "tags_off", "tags", "words_off", "words", "card_doc_off", "card_ids", "card_tok_off", "card_tokens",
+        "tag_post_off", "tag_post_rows", "word_counts",
+        "term_blob", "term_str_off", "tag_blob", "tag_str_off", "word_blob", "word_str_off",
+    )
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.size = len(self.deck_ids)
+        self.terms = StringTable(self.term_blob, self.term_str_off)
+        self.tag_table = StringTable(self.tag_blob, self.tag_str_off)
+        self.word_table = StringTable(self.word_blob, self.word_str_off)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "StaticSegment":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {meta.get('version')}")
+        mode = "r" if mmap else None
+        return cls({name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mode) for name in cls.ARRAYS})
+
+    def row(self, deck_id: int) -> int:
+        """Строка колоды в снимке или -1"""
+        row = int(np.searchsorted(self.deck_ids, deck_id))
+        return row if row < self.size and self.deck_ids[row] == deck_id else -1
+
+    def document(self, row: int) -> DeckDocument:
+        """Прямой индекс колоды из снимка (копия, пригодная для изменения)"""
+        def field(name: str) -> np.ndarray:
+            offsets = getattr(self, name + "_off")
+            return np.array(getattr(self, name)[offsets[row]:offsets[row + 1]])
+
+        first, last = int(self.card_doc_off[row]), int(self.card_doc_off[row + 1])
+        cards = {
+            card_id: np.array(self.card_tokens[self.card_tok_off[i]:self.card_tok_off[i + 1]])
+            for i, card_id in zip(range(first, last), self.card_ids[first:last].tolist())
+        }
+        return DeckDocument(
+            int(self.deck_ids[row]), field("title"), field("description"), field("tag_terms"),
+            field("tags"), field("words"), cards
+        )
+
+    def row_words(self, row: int) -> np.ndarray:
+        return self.words[self.words_off[row]:self.words_off[row + 1]]
+
+
+class PrefixTrie:
+    """Префиксное дерево слов для автодополнения.
+
+    Узел — [дети, число колод со словом, кеш лучших продолжений]. Кеш
+    заполняется при первом запросе префикса; рост счетчика обновляет кеши
+    на пути слова на месте, уменьшение — сбрасывает их.
+    """
+
+    CHILDREN, COUNT, CACHE = 0, 1, 2
+
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        self.root = [{}, 0, None]
+
+    def add(self, word: str, delta: int):
+        node = self.root
+        path = [node]
+        for char in word:
+            child = node[self.CHILDREN].get(char)
+            if child is None:
+                if delta < 0:
+                    return
+                child = node[self.CHILDREN][char] = [{}, 0, None]
+            node = child
+            path.append(node)
+        count = node[self.COUNT] = max(node[self.COUNT] + delta, 0)
+        for prefix_node in path:
+            cache = prefix_node[self.CACHE]
+            if cache is None:
+                continue
+            if delta < 0:
+                prefix_node[self.CACHE] = None
+                continue
+            cache = [entry for entry in cache if entry[1] != word]
+            cache.append((count, word))
+            cache.sort(key=lambda entry: (-entry[0], entry[1]))
+            prefix_node[self.CACHE] = cache[:self.cache_size]
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        node = self.root
+        for char in prefix:
+            node = node[self.CHILDREN].get(char)
+            if node is None:
+                return []
+        if node[self.CACHE] is None:
+            node[self.CACHE] = self._collect(node, prefix)
+        return [(word, count) for count, word in node[self.CACHE][:limit]]
+
+    def _collect(self, node: list, prefix: str) -> List[Tuple[int, str]]:
+        found: List[Tuple[int, str]] = []
+        stack = [(node, prefix)]
+        while stack:
+            current, word = stack.pop()
+            if current[self.COUNT] > 0:
+                found.append((current[self.COUNT], word))
+            stack.extend((child, word + char) for char, child in current[self.CHILDREN].items())
+        found.sort(key=lambda entry: (-entry[0], entry[1]))
+        return found[:self.cache_size]
+
+
+class SearchIndex:
+    """Полнотекстовый индекс публичных колод с ранжированием BM25.
+
+    Индекс состоит из снимка (StaticSegment, массивы NumPy через mmap) и
+    дельты в памяти: колоды, измененные после снимка, помечаются удаленными
+    в снимке и живут в словарных постингах дельты. Запрос считает BM25 по
+    снимку векторно, по дельте — циклом, и объединяет лучшие результаты.
+    save() сливает снимок и дельту в новый снимок.
+    """
+
+    def __init__(self, suggestion_cache: int = 20, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.suggestion_cache = suggestion_cache
+        self._set_static(build_segment([], [], [], []))
+
+    def _set_static(self, segment: StaticSegment):
+        self.static = segment
+        self.deleted = np.zeros(segment.size, dtype=bool)
+        self.terms = Vocabulary(segment.terms)
+        self.tags = Vocabulary(segment.tag_table)
+        self.words = Vocabulary(segment.word_table)
+        self.docs: Dict[int, DeckDocument] = {}
+        self.postings: Dict[int, Dict[int, float]] = {}
+        self.doc_count = segment.size
+        self.total_len = float(np.sum(segment.doc_len, dtype=np.float64))
+        self._tag_bitmaps: Dict[int, np.ndarray] = {}
+        self.trie = PrefixTrie(self.suggestion_cache)
+        for word, count in zip(segment.word_table.strings(), segment.word_counts.tolist()):
+            self.trie.add(word, count)
+
+    @property
+    def delta_size(self) -> int:
+        """Колоды, измененные после снимка (включая удаленные)"""
+        return len(self.docs) + int(np.count_nonzero(self.deleted))
+
+    def __contains__(self, deck_id: int) -> bool:
+        if deck_id in self.docs:
+            return True
+        row = self.static.row(deck_id)
+        return row >= 0 and not self.deleted[row]
+
+    # Изменения
+
+    def make_document(
+        self,
+        deck_id: int,
+        title: str,
+        description: Optional[str],
+        tags: Sequence[str],
+        cards: Iterable[Tuple[int, str, str]]
+    ) -> DeckDocument:
+        tag_names = list(dict.fromkeys(normalize(tag).strip() for tag in tags if tag.strip()))
+        words = list(dict.fromkeys(tokenize(title) + [w for tag in tag_names for w in tokenize(tag)]))
+        return DeckDocument(
+            deck_id,
+            self.terms.add_all(analyze(title)),
+            self.terms.add_all(analyze(description or "")),
+            self.terms.add_all(analyze(" ".join(tag_names))),
+            self.tags.add_all(tag_names),
+            self.words.add_all(words),
+            {card_id: self.card_terms(question, answer) for card_id, question, answer in cards}
+        )
+
+    def card_terms(self, question: str, answer: str) -> np.ndarray:
+        return self.terms.add_all(analyze(question) + analyze(answer))
+
+    def upsert_deck(
+        self,
+        deck_id: int,
+        title: str,
+        description: Optional[str],
+        tags: Sequence[str],
+        cards: Optional[Iterable[Tuple[int, str, str]]] = None
+    ):
+        """Проиндексировать колоду; cards=None — сохранить уже проиндексированные карточки"""
+        old = self._take(deck_id)
+        doc = self.make_document(deck_id, title, description, tags, cards or ())
+        if cards is None and old is not None:
+            doc = DeckDocument(deck_id, doc.title, doc.description, doc.tag_terms, doc.tags, doc.words, old.cards)
+        self._put(doc)
+        self._update_words(old.words if old is not None else EMPTY_TERMS, doc.words)
+
+    def remove_deck(self, deck_id: int) -> bool:
+        old = self._take(deck_id)
+        if old is None:
+            return False
+        self._update_words(old.words, EMPTY_TERMS)
+        return True
+
+    def upsert_card(self, deck_id: int, card_id: int, question: str, answer: str) -> bool:
+        """Обновить текст карточки; False, если колода не проиндексирована"""
+        return self._replace_cards(deck_id, {card_id: self.card_terms(question, answer)}, ())
+
+    def remove_card(self, deck_id: int, card_id: int) -> bool:
+        return self._replace_cards(deck_id, {}, (card_id,))
+
+    def _replace_cards(self, deck_id: int, updated: Dict[int, np.ndarray], removed: Iterable[int]) -> bool:
+        old = self._take(deck_id)
+        if old is None:
+            return False
+        cards = dict(old.cards)
+        cards.update(updated)
+        for card_id in removed:
+            cards.pop(card_id, None)
+        self._put(DeckDocument(deck_id, old.title, old.description, old.tag_terms, old.tags, old.words, cards))
+        return True
+
+    def _take(self, deck_id: int) -> Optional[DeckDocument]:
+        """Убрать колоду из постингов и статистики; вернуть ее прямой индекс"""
+        doc = self.docs.pop(deck_id, None)
+        if doc is not None:
+            for term in doc.terms.tolist():
+                postings = self.postings[term]
+                del postings[deck_id]
+                if not postings:
+                    del self.postings[term]
+            self.doc_count -= 1
+            self.total_len -= doc.length
+            return doc
+        row = self.static.row(deck_id)
+        if row < 0 or self.deleted[row]:
+            return None
+        self.deleted[row] = True
+        self.doc_count -= 1
+        self.total_len -= float(self.static.doc_len[row])
+        return self.static.document(row)
+
+    def _put(self, doc: DeckDocument):
+        self.docs[doc.deck_id] = doc
+        for term, tf in zip(doc.terms.tolist(), doc.tf.tolist()):
+            self.postings.setdefault(term, {})[doc.deck_id] = tf
+        self.doc_count += 1
+        self.total_len += doc.length
+
+    def _update_words(self, old: np.ndarray, new: np.ndarray):
+        diff = Counter(new.tolist())
+        diff.subtract(old.tolist())
+        for word_id, delta in diff.items():
+            if delta:
+                self.trie.add(self.words.get(word_id), delta)
+
+    # Поиск
+
+    def search(
+        self,
+        query: str,
+        tags: Sequence[str] = (),
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[int, List[Tuple[int, float]]]:
+        """(число найденных колод, [(deck_id, score)]) по убыванию релевантности"""
+        term_ids = [t for t in dict.fromkeys(self.terms.find(term) for term in analyze(query)) if t >= 0]
+        tag_ids = [self.tags.find(normalize(tag).strip()) for tag in tags]
+        if not term_ids or -1 in tag_ids or self.doc_count <= 0:
+            return 0, []
+        top = offset + limit
+        avgdl = self.total_len / self.doc_count
+        idf = {t: self._idf(t) for t in term_ids}
+
+        # Снимок: векторный BM25 по постингам
+        static = self.static
+        scores = np.zeros(static.size, dtype=np.float32)
+        for t in term_ids:
+            if t >= len(static.terms):
+                continue
+            start, end = static.post_off[t], static.post_off[t + 1]
+            rows = static.post_rows[start:end]
+            tf = static.post_tf[start:end]
+            norm = self.k1 * (1 - self.b + self.b * static.doc_len[rows] / avgdl)
+            scores[rows] += idf[t] * tf * (self.k1 + 1) / (tf + norm)
+        matched = scores > 0
+        matched &= ~self.deleted
+        if tag_ids:
+            matched &= self._static_tag_mask(tag_ids)
+        rows = np.flatnonzero(matched)
+        total = len(rows)
+        if total > top:
+            rows = rows[np.argpartition(-scores[rows], top - 1)[:top]]
+        results = list(zip(static.deck_ids[rows].tolist(), scores[rows].tolist()))
+
+        # Дельта: те же формулы по словарным постингам (массивы собираются без цикла Python)
+        delta_ids, delta_scores = [], []
+        for t in term_ids:
+            postings = self.postings.get(t)
+            if not postings:
+                continue
+            n = len(postings)
+            ids = np.fromiter(postings.keys(), dtype=np.int64, count=n)
+            tf = np.fromiter(postings.values(), dtype=np.float64, count=n)
+            doc_len = np.fromiter(map(_length, map(self.docs.__getitem__, postings.keys())), dtype=np.float64, count=n)
+            norm = self.k1 * (1 - self.b + self.b * doc_len / avgdl)
+            delta_ids.append(ids)
+            delta_scores.append(idf[t] * tf * (self.k1 + 1) / (tf + norm))
+        if delta_ids:
+            ids, inverse = np.unique(np.concatenate(delta_ids), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(delta_scores))
+            if tag_ids:
+                wanted = set(tag_ids)
+                keep = np.fromiter((wanted.issubset(self.docs[d].tags.tolist()) for d in ids.tolist()),
+                                   dtype=bool, count=len(ids))
+                ids, scores = ids[keep], scores[keep]
+            total += len(ids)
+            if len(ids) > top:
+                best = np.argpartition(-scores, top - 1)[:top]
+                ids, scores = ids[best], scores[best]
+            results.extend(zip(ids.tolist(), scores.tolist()))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return total, results[offset:top]
+
+    def _idf(self, term: int) -> float:
+        df = len(self.postings.get(term, ()))
+        if term < len(self.static.terms):
+            # Удаленные из снимка колоды не вычитаются: df точен после слияния
+            df += int(self.static.post_off[term + 1] - self.static.post_off[term])
+        df = min(df, self.doc_count)
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def _static_tag_mask(self, tag_ids: List[int]) -> np.ndarray:
+        """Пересечение битовых карт тегов по строкам снимка"""
+        bitmap = None
+        for tag in tag_ids:
+            tag_bitmap = self._tag_bitmap(tag)
+            bitmap = tag_bitmap if bitmap is None else bitmap & tag_bitmap
+        return np.unpackbits(bitmap, count=self.static.size).view(bool)
+
+    def _tag_bitmap(self, tag: int) -> np.ndarray:
+        bitmap = self._tag_bitmaps.get(tag)
+        if bitmap is None:
+            mask = np.zeros(self.static.size, dtype=bool)
+            if tag < len(self.static.tag_table):
+                mask[self.static.tag_post_rows[self.static.tag_post_off[tag]:self.static.tag_post_off[tag + 1]]] = True
+            bitmap = self._tag_bitmaps[tag] = np.packbits(mask)
+        return bitmap
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Слова из названий и тегов колод с данным префиксом: (слово, число колод)"""
+        words = tokenize(prefix)
+        if not words:
+            return []
+        return self.trie.complete(words[-1], min(limit, self.suggestion_cache))
+
+    # Снимки
+
+    def build_snapshot(self, path: str):
+        """Слить снимок и дельту и записать новый снимок в path.
+
+        Только читает индекс, поэтому может выполняться в отдельном потоке,
+        пока индекс не изменяется (запросы при этом обслуживаются).
+        """
+        static = self.static
+        live = np.flatnonzero(~self.deleted)
+        docs = sorted(self.docs.values(), key=lambda doc: doc.deck_id)
+
+        # Колоды снимка (без удаленных) и дельты в одном пространстве номеров
+        deck_ids = np.concatenate([static.deck_ids[live], np.array([d.deck_id for d in docs], dtype=np.int64)])
+        order = np.argsort(deck_ids, kind="stable")
+        fields = {}
+        for name in ("title", "description", "tag_terms", "tags", "words"):
+            static_off, static_values = _gather(getattr(static, name + "_off"), getattr(static, name), live)
+            delta_off, delta_values = _csr([getattr(d, name) for d in docs])
+            fields[name] = _gather(*_concat_csr(static_off, static_values, delta_off, delta_values), order)
+        # Карточки: колода -> диапазон карточек -> токены
+        static_card_off, static_cards = _gather(static.card_doc_off, np.arange(len(static.card_ids)), live)
+        static_tok_off, static_tokens = _gather(static.card_tok_off, static.card_tokens, static_cards)
+        delta_card_off, _ = _csr([np.zeros(len(d.cards)) for d in docs])
+        delta_tok_off, delta_tokens = _csr([tokens for d in docs for tokens in d.cards.values()])
+        card_ids = np.concatenate([
+            static.card_ids[static_cards],
+            np.array([card_id for d in docs for card_id in d.cards], dtype=np.int64)
+        ])
+        tok_off, tokens = _concat_csr(static_tok_off, static_tokens, delta_tok_off, delta_tokens)
+        card_doc_off, card_rows = _gather(
+            *_concat_csr(static_card_off, np.arange(len(static_cards)), delta_card_off,
+                         np.arange(len(card_ids) - len(static_cards)) + len(static_cards)),
+            order
+        )
+        card_tok_off, card_tokens = _gather(tok_off, tokens, card_rows)
+
+        # Перенумеровать термы, теги и слова: только используемые, в порядке строк
+        tables = {}
+        for vocab, names in ((self.terms, ("title", "description", "tag_terms")),
+                             (self.tags, ("tags",)), (self.words, ("words",))):
+            arrays = [fields[name][1] for name in names] + ([card_tokens] if vocab is self.terms else [])
+            strings, remap = _renumber(vocab, arrays)
+            for name in names:
+                fields[name] = (fields[name][0], remap[fields[name][1]])
+            if vocab is self.terms:
+                card_tokens = remap[card_tokens]
+            tables[id(vocab)] = strings
+
+        segment = build_segment(
+            deck_ids[order],
+            fields,
+            (card_doc_off, card_ids[card_rows], card_tok_off, card_tokens),
+            (tables[id(self.terms)], tables[id(self.tags)], tables[id(self.words)])
+        )
+        write_segment(segment, path)
+
+    def load(self, path: str):
+        """Заменить индекс снимком из path (массивы отображаются в память)"""
+        self._set_static(StaticSegment.load(path))
+
+    def save(self, path: str):
+        self.build_snapshot(path)
+        self.load(path)
+
+
+def _concat_csr(off_a, values_a, off_b, values_b) -> Tuple[np.ndarray, np.ndarray]:
+    return np.concatenate([off_a, off_b[1:] + off_a[-1]]), np.concatenate([values_a, values_b])
+
+
+def _renumber(vocab: Vocabulary, arrays: List[np.ndarray]) -> Tuple[List[str], np.ndarray]:
+    """Используемые строки по порядку и отображение старых номеров в новые"""
+    used = np.unique(np.concatenate(arrays)) if arrays else np.zeros(0, dtype=np.int64)
+    strings = [vocab.get(i) for i in used.tolist()]
+    order = sorted(range(len(strings)), key=strings.__getitem__)
+    remap = np.full(len(vocab), -1, dtype=TERM_DTYPE)
+    remap[used[order]] = np.arange(len(order), dtype=TERM_DTYPE)
+    return [strings[i] for i in order], remap
+
+
+def build_segment(deck_ids, fields, cards, tables) -> StaticSegment:
+    """Собрать снимок из прямого индекса колод (в порядке deck_id)"""
+    deck_ids = np.asarray(deck_ids, dtype=np.int64)
+    size = len(deck_ids)
+    empty = (np.zeros(1, dtype=np.int64), EMPTY_TERMS)
+    fields = {name: fields.get(name, empty) if fields else empty
+              for name in ("title", "description", "tag_terms", "tags", "words")}
+    if cards:
+        card_doc_off, card_ids, card_tok_off, card_tokens = cards
+    else:
+        card_doc_off, card_ids, card_tok_off, card_tokens = (
+            np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), EMPTY_TERMS
+        )
+    terms, tags, words = tables if tables else ([], [], [])
+    n_terms = len(terms)
+
+    # Токены всех полей: (колода, терм, вес)
+    sources = []
+    for name, weight in (("title", TITLE_WEIGHT), ("description", DESCRIPTION_WEIGHT), ("tag_terms", TAGS_WEIGHT)):
+        offsets, values = fields[name]
+        sources.append((np.repeat(np.arange(size), np.diff(offsets)), values, weight))
+    card_docs = np.repeat(np.arange(size), np.diff(card_doc_off))
+    sources.append((np.repeat(card_docs, np.diff(card_tok_off)), card_tokens, CARDS_WEIGHT))
+
+    doc_len = np.zeros(size, dtype=np.float64)
+    pair_docs, pair_terms, pair_tf = [], [], []
+    for docs, values, weight in sources:
+        doc_len += np.bincount(docs, minlength=size) * weight
+        for start in range(0, len(values), BUILD_CHUNK_TOKENS):
+            key = docs[start:start + BUILD_CHUNK_TOKENS].astype(np.int64) * max(n_terms, 1) + \
+                values[start:start + BUILD_CHUNK_TOKENS]
+            key, inverse = np.unique(key, return_inverse=True)
+            pair_docs.append(key // max(n_terms, 1))
+            pair_terms.append(key % max(n_terms, 1))
+            pair_tf.append(np.bincount(inverse, weights=np.full(len(inverse), weight)))
+    # Один терм мог прийти из нескольких полей и пачек: суммируем
+    key = np.concatenate(pair_terms + [np.zeros(0, dtype=np.int64)]) * max(size, 1) + \
+        np.concatenate(pair_docs + [np.zeros(0, dtype=np.int64)])
+    key, inverse = np.unique(key, return_inverse=True)
+    post_tf = np.bincount(inverse, weights=np.concatenate(pair_tf + [np.zeros(0)]), minlength=len(key))
+    post_terms = key // max(size, 1)
+    post_off = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(post_terms, minlength=n_terms), out=post_off[1:])
+
+    tag_off, tag_values = fields["tags"]
+    tag_docs = np.repeat(np.arange(size), np.diff(tag_off))
+    tag_order = np.argsort(tag_values, kind="stable")
+    tag_post_off = np.zeros(len(tags) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tag_values, minlength=len(tags)), out=tag_post_off[1:])
+
+    term_table, tag_table, word_table = StringTable.build(terms), StringTable.build(tags), StringTable.build(words)
+    arrays = {
+        "deck_ids": deck_ids,
+        "doc_len": doc_len.astype(np.float32),
+        "post_off": post_off,
+        "post_rows": (key % max(size, 1)).astype(np.int32),
+        "post_tf": post_tf.astype(np.float32),
+        "card_doc_off": np.asarray(card_doc_off, dtype=np.int64),
+        "card_ids": np.asarray(card_ids, dtype=np.int64),
+        "card_tok_off": np.asarray(card_tok_off, dtype=np.int64),
+        "card_tokens": np.asarray(card_tokens, dtype=TERM_DTYPE),
+        "tag_post_off": tag_post_off,
+        "tag_post_rows": tag_docs[tag_order].astype(np.int32),
+        "word_counts": np.bincount(fields["words"][1], minlength=len(words)).astype(np.int64),
+        "term_blob": term_table.blob, "term_str_off": term_table.offsets,
+        "tag_blob": tag_table.blob, "tag_str_off": tag_table.offsets,
+        "word_blob": word_table.blob, "word_str_off": word_table.offsets,
+    }
+    for name, (offsets, values) in fields.items():
+        arrays[name + "_off"] = np.asarray(offsets, dtype=np.int64)
+        arrays[name] = np.asarray(values, dtype=TERM_DTYPE)
+    return StaticSegment(arrays)
+
+
+def write_segment(segment: StaticSegment, path: str):
+    """Записать снимок атомарно: во временный каталог, затем переименование"""
+    tmp_path, old_path = path + ".tmp", path + ".old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name in StaticSegment.ARRAYS:
+        np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(getattr(segment, name)))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "decks": segment.size}, f)
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    # Старые файлы могут быть еще отображены в память: на POSIX это безопасно
+    shutil.rmtree(old_path, ignore_errors=True)
@@ -0,0 +1,53 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from src.routers import search, events
+from src.service import search_service
+from src.events import event_consumer
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Загрузка снимка индекса при запуске и сохранение изменений при остановке"""
+    search_service.load()
+    print("Search Service запущен")
+    yield
+    await event_consumer.close()
+    await search_service.shutdown()
+    print("Search Service остановлен")
+
+# Создание FastAPI приложения
+app = FastAPI(
+    title="Recall Pro - Search Service",
+    description="Полнотекстовый поиск публичных колод",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Настройка CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # В продакшене указать конкретные домены
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Подключение роутеров
+app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["events"])
+
+@app.get("/")
+async def root():
+    """Корневой эндпоинт"""
+    return {"message": "Recall Pro Search Service", "version": "1.0.0"}
+
+@app.get("/health")
+async def health_check():
+    """Проверка здоровья сервиса"""
+    return {"status": "healthy", "service": "search"}
+
+if __name__ == "__main__":
+    import uvicorn
+    from src.config import PORT, DEBUG
+    # Индекс хранится в памяти процесса, поэтому сервис работает в одном воркере
+    uvicorn.run("src.main:app", host="0.0.0.0", port=PORT, reload=DEBUG)
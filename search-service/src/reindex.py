@@ -0,0 +1,72 @@
+"""Полная переиндексация публичных колод из Database Service.
+
+Запуск из каталога search-service (снимок пишется в SEARCH_INDEX_DIR):
+
+    python -m src.reindex
+
+Работающий сервис подхватит новый снимок после перезапуска.
+"""
+import asyncio
+import sys
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+
+from src.config import DATABASE_SERVICE_URL, DATABASE_SERVICE_TIMEOUT, SEARCH_INDEX_DIR, MAX_SUGGESTIONS
+from src.index import SearchIndex
+
+DECKS_PAGE_SIZE = 100
+CARDS_PAGE_SIZE = 1000
+
+
+async def iter_public_decks(client: httpx.AsyncClient) -> AsyncIterator[Dict[str, Any]]:
+    page = 1
+    while True:
+        response = await client.get("/api/v1/decks/", params={"is_public": True, "page": page, "limit": DECKS_PAGE_SIZE})
+        response.raise_for_status()
+        data = response.json()
+        for deck in data["decks"]:
+            yield deck
+        if page >= data["total_pages"]:
+            return
+        page += 1
+
+
+async def get_deck_cards(client: httpx.AsyncClient, deck_id: int) -> List[Dict[str, Any]]:
+    cards: List[Dict[str, Any]] = []
+    params: Dict[str, Any] = {"limit": CARDS_PAGE_SIZE}
+    while True:
+        response = await client.get(f"/api/v1/decks/{deck_id}/cards/after", params=params)
+        response.raise_for_status()
+        page = response.json()
+        cards.extend(page["cards"])
+        if not page["has_more"]:
+            return cards
+        params.update(after_rank=cards[-1]["rank"], after_id=cards[-1]["id"])
+
+
+async def reindex(base_url: str, path: str) -> int:
+    """Построить индекс всех публичных колод и записать снимок; вернуть число колод"""
+    index = SearchIndex(MAX_SUGGESTIONS)
+    async with httpx.AsyncClient(base_url=base_url, timeout=DATABASE_SERVICE_TIMEOUT) as client:
+        async for deck in iter_public_decks(client):
+            cards = await get_deck_cards(client, deck["id"])
+            index.upsert_deck(
+                deck["id"], deck["title"], deck.get("description"), deck.get("tags") or [],
+                [(card["id"], card["question"], card["answer"]) for card in cards]
+            )
+    index.build_snapshot(path)
+    return index.doc_count
+
+
+def main() -> int:
+    if not SEARCH_INDEX_DIR:
+        print("Не задан SEARCH_INDEX_DIR", file=sys.stderr)
+        return 1
+    count = asyncio.run(reindex(DATABASE_SERVICE_URL, SEARCH_INDEX_DIR))
+    print(f"Проиндексировано колод: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Routers package
\ No newline at end of file
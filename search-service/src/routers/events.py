@@ -0,0 +1,23 @@
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.events import EventConsumer, get_event_consumer
+from src.schemas import EventBatchRequest, EventBatchResponse
+
+router = APIRouter()
+
+@router.post("/", response_model=EventBatchResponse)
+async def receive_events(
+    batch: EventBatchRequest,
+    consumer: EventConsumer = Depends(get_event_consumer)
+):
+    """Пачка событий outbox Database Service (колоды и карточки)"""
+    try:
+        applied = await consumer.apply(batch.events)
+    except httpx.HTTPError:
+        # Ретранслятор повторит всю пачку: события идемпотентны
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database Service недоступен"
+        )
+    return EventBatchResponse(applied=applied)
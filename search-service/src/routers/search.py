@@ -0,0 +1,110 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from src.config import MAX_SUGGESTIONS
+from src.service import SearchService, get_search_service
+from src.schemas import (
+    DeckIndexRequest, CardIndexRequest,
+    SearchResponse, SearchHit, SuggestResponse, Suggestion, IndexStatsResponse
+)
+
+router = APIRouter()
+
+@router.get("/decks", response_model=SearchResponse)
+async def search_decks(
+    q: str = Query(..., min_length=1, max_length=500, description="Поисковый запрос"),
+    tags: List[str] = Query([], description="Колода должна иметь все указанные теги"),
+    limit: int = Query(20, ge=1, le=100, description="Количество результатов"),
+    offset: int = Query(0, ge=0, le=1000, description="Сколько результатов пропустить"),
+    service: SearchService = Depends(get_search_service)
+):
+    """Полнотекстовый поиск публичных колод (BM25)"""
+    total, results = service.index.search(q, tags, limit, offset)
+    return SearchResponse(
+        results=[SearchHit(deck_id=deck_id, score=score) for deck_id, score in results],
+        total=total
+    )
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Начало слова"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS, description="Количество подсказок"),
+    service: SearchService = Depends(get_search_service)
+):
+    """Автодополнение по словам из названий и тегов колод"""
+    return SuggestResponse(suggestions=[
+        Suggestion(word=word, decks=decks) for word, decks in service.index.suggest(prefix, limit)
+    ])
+
+@router.put("/decks/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def index_deck(
+    deck_id: int,
+    data: DeckIndexRequest,
+    service: SearchService = Depends(get_search_service)
+):
+    """Проиндексировать публичную колоду (без cards — с прежними карточками)"""
+    cards = None
+    if data.cards is not None:
+        cards = [(card.id, card.question, card.answer) for card in data.cards]
+    await service.upsert_deck(deck_id, data.title, data.description, data.tags, cards)
+
+@router.delete("/decks/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_deck(
+    deck_id: int,
+    service: SearchService = Depends(get_search_service)
+):
+    """Убрать колоду из индекса (удалена или стала приватной)"""
+    if not await service.remove_deck(deck_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не проиндексирована"
+        )
+
+@router.put("/decks/{deck_id}/cards/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def index_card(
+    deck_id: int,
+    card_id: int,
+    data: CardIndexRequest,
+    service: SearchService = Depends(get_search_service)
+):
+    """Добавить или обновить текст карточки проиндексированной колоды"""
+    if not await service.upsert_card(deck_id, card_id, data.question, data.answer):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не проиндексирована"
+        )
+
+@router.delete("/decks/{deck_id}/cards/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_card(
+    deck_id: int,
+    card_id: int,
+    service: SearchService = Depends(get_search_service)
+):
+    """Убрать карточку из индекса"""
+    if not await service.remove_card(deck_id, card_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не проиндексирована"
+        )
+
+@router.post("/snapshot", response_model=IndexStatsResponse)
+async def merge_snapshot(service: SearchService = Depends(get_search_service)):
+    """Слить изменения в новый снимок индекса"""
+    if not await service.merge():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Снимки выключены: не задан SEARCH_INDEX_DIR"
+        )
+    return await get_stats(service)
+
+@router.get("/stats", response_model=IndexStatsResponse)
+async def get_stats(service: SearchService = Depends(get_search_service)):
+    """Размер индекса"""
+    index = service.index
+    return IndexStatsResponse(
+        decks=index.doc_count,
+        snapshot_decks=index.static.size,
+        delta_decks=index.delta_size,
+        terms=len(index.terms)
+    )
@@ -0,0 +1,61 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class CardIndexRequest(BaseModel):
+    question: str
+    answer: str
+
+
+class CardIndexItem(CardIndexRequest):
+    id: int
+
+
+class DeckIndexRequest(BaseModel):
+    title: str = Field(..., min_length=1)
+    description: Optional[str] = None
+    tags: List[str] = []
+    # None — оставить уже проиндексированные карточки колоды
+    cards: Optional[List[CardIndexItem]] = None
+
+
+class SearchHit(BaseModel):
+    deck_id: int
+    score: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    total: int
+
+
+class Suggestion(BaseModel):
+    word: str
+    decks: int
+
+
+class SuggestResponse(BaseModel):
+    suggestions: List[Suggestion]
+
+
+class IndexStatsResponse(BaseModel):
+    decks: int
+    snapshot_decks: int
+    delta_decks: int
+    terms: int
+
+
+class Event(BaseModel):
+    """Событие outbox Database Service"""
+    id: int
+    topic: str
+    key: str
+    payload: Dict[str, Any]
+
+
+class EventBatchRequest(BaseModel):
+    events: List[Event]
+
+
+class EventBatchResponse(BaseModel):
+    applied: int
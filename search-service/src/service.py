@@ -0,0 +1,87 @@
+import asyncio
+import os
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from src.config import SEARCH_INDEX_DIR, SEARCH_MERGE_DOCS, MAX_SUGGESTIONS
+from src.index import SearchIndex
+
+
+class SearchService:
+    """Индекс публичных колод воркера.
+
+    Изменения применяются по одному под общей блокировкой. Когда дельта
+    дорастает до SEARCH_MERGE_DOCS колод, она сливается в новый снимок в
+    отдельном потоке: на это время записи ждут, а запросы обслуживаются
+    по старому снимку и дельте.
+    """
+
+    def __init__(
+        self,
+        index: Optional[SearchIndex] = None,
+        index_dir: Optional[str] = SEARCH_INDEX_DIR,
+        merge_docs: int = SEARCH_MERGE_DOCS
+    ):
+        self.index = index or SearchIndex(MAX_SUGGESTIONS)
+        self.index_dir = index_dir
+        self.merge_docs = merge_docs
+        self._lock = asyncio.Lock()
+        self._merge_task: Optional[asyncio.Task] = None
+
+    def load(self):
+        """Загрузить снимок из index_dir, если он есть"""
+        if self.index_dir and os.path.isdir(self.index_dir):
+            self.index.load(self.index_dir)
+
+    async def _write(self, func: Callable[..., Any], *args) -> Any:
+        async with self._lock:
+            result = func(*args)
+        if self.index_dir and self.index.delta_size >= self.merge_docs and (
+            self._merge_task is None or self._merge_task.done()
+        ):
+            self._merge_task = asyncio.create_task(self.merge())
+        return result
+
+    async def upsert_deck(
+        self,
+        deck_id: int,
+        title: str,
+        description: Optional[str],
+        tags: Sequence[str],
+        cards: Optional[List[Tuple[int, str, str]]] = None
+    ):
+        await self._write(self.index.upsert_deck, deck_id, title, description, tags, cards)
+
+    async def remove_deck(self, deck_id: int) -> bool:
+        return await self._write(self.index.remove_deck, deck_id)
+
+    async def upsert_card(self, deck_id: int, card_id: int, question: str, answer: str) -> bool:
+        return await self._write(self.index.upsert_card, deck_id, card_id, question, answer)
+
+    async def remove_card(self, deck_id: int, card_id: int) -> bool:
+        return await self._write(self.index.remove_card, deck_id, card_id)
+
+    async def merge(self) -> bool:
+        """Слить дельту в новый снимок; False, если снимки выключены"""
+        if not self.index_dir:
+            return False
+        async with self._lock:
+            await run_in_threadpool(self.index.build_snapshot, self.index_dir)
+            self.index.load(self.index_dir)
+        return True
+
+    async def shutdown(self):
+        """Дождаться фонового слияния и сохранить несохраненные изменения"""
+        if self._merge_task is not None:
+            await self._merge_task
+        if self.index.delta_size:
+            await self.merge()
+
+
+# Singleton instance
+search_service = SearchService()
+
+def get_search_service() -> SearchService:
+    """Dependency для получения сервиса поиска"""
+    return search_service
@@ -0,0 +1,49 @@
+import re
+from typing import List
+
+WORD_PATTERN = re.compile(r"[0-9a-zа-яё]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from in is it of on or that the this to was with
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+только ее мне было вот от меня еще нет о из ему теперь когда даже ну ли если уже
+или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей
+может они тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего
+раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним
+здесь этом один почти мой тем чтобы нее были куда зачем всех никогда можно при
+наконец два об другой хоть после над больше тот через эти нас про всего них
+какая много разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть
+том нельзя такой им более всегда конечно всю между это
+""".split())
+
+# Окончания для облегченного стемминга (длинные раньше коротких)
+RU_ENDINGS = tuple(sorted("""
+иями ями ами ием иях ях ах ов ев ей ой ий ый ая яя ое ее ые ие ом ем ам ям
+ого его ому ему ыми ими ую юю ешь ет ем ете ут ют ит ат ят ишь ила ило или ала
+ало али ать ять ить еть ость ости ы и а я о е у ю ь
+""".split(), key=len, reverse=True))
+EN_ENDINGS = ("ations", "ation", "ingly", "ings", "ing", "edly", "ies", "ied", "ed", "es", "ly", "s")
+MIN_STEM = 3
+
+
+def normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова текста в нижнем регистре (для автодополнения)"""
+    return WORD_PATTERN.findall(normalize(text))
+
+
+def stem(word: str) -> str:
+    """Облегченный стемминг: отрезаем типичное окончание, оставляя не меньше MIN_STEM букв"""
+    endings = EN_ENDINGS if word[0] < "Ѐ" else RU_ENDINGS
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Термы для индекса и запроса: слова без стоп-слов после стемминга"""
+    return [stem(word) for word in tokenize(text) if word not in STOPWORDS]
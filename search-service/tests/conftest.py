@@ -0,0 +1,28 @@
+import asyncio
+import inspect
+
+import pytest
+
+from src.index import SearchIndex
+from src.service import SearchService
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def тесты выполняются в своем event loop через asyncio.run (без pytest-asyncio)"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    asyncio.run(pyfuncitem.obj(**{name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}))
+    return True
+
+
+@pytest.fixture
+def index_dir(tmp_path) -> str:
+    return str(tmp_path / "index")
+
+
+@pytest.fixture
+def service(index_dir) -> SearchService:
+    """Сервис со снимками во временном каталоге; фоновое слияние выключено"""
+    return SearchService(SearchIndex(), index_dir, merge_docs=10 ** 9)
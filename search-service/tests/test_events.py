@@ -0,0 +1,49 @@
+import httpx
+
+from src.events import EventConsumer
+from src.schemas import Event
+
+
+def _event(event_id: int, topic: str, **payload) -> Event:
+    return Event(id=event_id, topic=topic, key=str(payload.get("deck_id")), payload=payload)
+
+
+def _deck(event_id: int, deck_id: int, is_public: bool = True, title: str = "Python basics") -> Event:
+    return _event(event_id, "deck.upserted", deck_id=deck_id, is_public=is_public,
+                  title=title, description=None, tags=["python"])
+
+
+async def test_events_update_index(service):
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        return httpx.Response(200, json={"cards": [
+            {"id": 11, "question": "What is a list?", "answer": "Sequence", "rank": "a"}
+        ], "has_more": False})
+
+    consumer = EventConsumer(service, "http://database")
+    consumer._client = httpx.AsyncClient(base_url="http://database", transport=httpx.MockTransport(handler))
+    try:
+        # Колода стала публичной: карточки читаются из Database Service один раз
+        assert await consumer.apply([_deck(1, 7), _deck(2, 7, title="Python lists")]) == 2
+        assert requested == ["/api/v1/decks/7/cards/after"]
+        assert service.index.search("sequence")[1][0][0] == 7
+        assert service.index.search("lists")[1][0][0] == 7
+
+        # Повторная доставка идемпотентна
+        card = _event(3, "card.upserted", deck_id=7, card_id=12, question="What is a tuple?", answer="Pair")
+        assert await consumer.apply([card, card]) == 2
+        assert await consumer.apply([_event(4, "card.deleted", deck_id=7, card_id=11)]) == 1
+        assert service.index.search("sequence")[0] == 0
+        assert service.index.search("tuple")[0] == 1
+
+        # Карточки неиндексированных колод пропускаются, приватная колода удаляется
+        assert await consumer.apply([
+            _event(5, "card.upserted", deck_id=8, card_id=81, question="q", answer="a"),
+            _deck(6, 7, is_public=False),
+            _event(7, "deck.deleted", deck_id=7),
+        ]) == 1
+        assert 7 not in service.index
+    finally:
+        await consumer.close()
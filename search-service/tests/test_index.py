@@ -0,0 +1,133 @@
+import pytest
+
+from src.index import SearchIndex
+
+DECKS = [
+    (1, "Python basics", "Variables and loops", ["programming", "python"],
+     [(11, "What is a list?", "Mutable sequence"), (12, "What is a tuple?", "Immutable sequence")]),
+    (2, "Advanced python", None, ["programming"],
+     [(21, "What is a generator?", "Lazy iterator")]),
+    (3, "Spanish verbs", "Irregular verbs", ["languages"],
+     [(31, "ser", "to be")]),
+    (4, "Rust ownership", "Borrowing and lifetimes", ["programming", "rust"],
+     [(41, "What is a borrow?", "Reference without ownership")]),
+]
+
+
+def _build(decks=DECKS) -> SearchIndex:
+    index = SearchIndex()
+    for deck in decks:
+        index.upsert_deck(*deck)
+    return index
+
+
+def _ids(index: SearchIndex, query: str, tags=()) -> list:
+    return [deck_id for deck_id, _ in index.search(query, tags)[1]]
+
+
+def test_snapshot_merge_keeps_results(index_dir):
+    delta = _build()
+    merged = _build()
+    merged.save(index_dir)
+    assert merged.static.size == len(DECKS) and merged.delta_size == 0
+
+    loaded = SearchIndex()
+    loaded.load(index_dir)
+    for query in ("python", "sequence", "verbs", "ownership borrow", "what"):
+        expected = delta.search(query)
+        for index in (merged, loaded):
+            total, results = index.search(query)
+            assert total == expected[0]
+            assert [deck_id for deck_id, _ in results] == [deck_id for deck_id, _ in expected[1]]
+            assert [score for _, score in results] == pytest.approx([score for _, score in expected[1]], rel=1e-5)
+
+
+def test_delta_overlays_snapshot(index_dir):
+    index = _build()
+    index.save(index_dir)
+
+    # Новая колода в дельте и измененная колода снимка
+    index.upsert_deck(5, "Python testing", None, ["python"], [(51, "What is a fixture?", "Setup")])
+    index.upsert_deck(3, "Spanish nouns", None, ["languages"])
+    assert index.delta_size == 3  # две колоды в дельте + строка снимка, закрытая изменением
+
+    assert set(_ids(index, "python")) == {1, 2, 5}
+    assert _ids(index, "nouns") == [3]
+    assert _ids(index, "verbs") == []
+    # cards=None сохраняет проиндексированные карточки колоды
+    assert _ids(index, "ser") == [3]
+    assert index.upsert_card(3, 32, "gato", "cat")
+    assert _ids(index, "gato") == [3]
+
+    # Повторное слияние дает те же результаты
+    expected = {query: sorted(_ids(index, query)) for query in ("python", "nouns", "verbs", "ser", "gato", "fixture")}
+    index.save(index_dir)
+    assert index.delta_size == 0
+    assert {query: sorted(_ids(index, query)) for query in expected} == expected
+
+
+def test_deletions_from_snapshot_and_delta(index_dir):
+    index = _build()
+    index.save(index_dir)
+    index.upsert_deck(5, "Python testing", None, ["python"], [])
+
+    assert index.remove_deck(1)
+    assert index.remove_deck(5)
+    assert not index.remove_deck(1)
+    assert not index.remove_deck(99)
+    assert 1 not in index and 5 not in index and 2 in index
+    assert _ids(index, "python") == [2]
+
+    assert index.remove_card(4, 41)
+    assert _ids(index, "reference") == []
+    assert _ids(index, "rust") == [4]
+    assert not index.remove_card(1, 11)
+    assert not index.upsert_card(1, 11, "q", "a")
+
+    index.save(index_dir)
+    assert index.static.size == 3
+    assert _ids(index, "python") == [2]
+    assert _ids(index, "reference") == []
+
+
+def test_tag_filter_over_snapshot_and_delta(index_dir):
+    index = _build()
+    index.save(index_dir)
+    index.upsert_deck(5, "Python web", None, ["Programming", "web"], [])
+
+    assert set(_ids(index, "what", ["programming"])) == {1, 2, 4}
+    assert set(_ids(index, "python", ["programming"])) == {1, 2, 5}
+    assert _ids(index, "python", ["programming", "python"]) == [1]
+    assert _ids(index, "python", ["web"]) == [5]
+    # Неизвестный тег ничего не находит
+    assert index.search("python", ["missing"]) == (0, [])
+
+    # Тег снят изменением колоды снимка
+    index.upsert_deck(1, "Python basics", None, ["python"])
+    assert set(_ids(index, "python", ["programming"])) == {2, 5}
+
+
+def test_search_pagination_counts_all_matches():
+    index = _build()
+    total, page = index.search("what", limit=2)
+    assert total == 3 and len(page) == 2
+    total, rest = index.search("what", limit=2, offset=2)
+    assert total == 3 and len(rest) == 1
+    assert {deck_id for deck_id, _ in page + rest} == {1, 2, 4}
+
+
+def test_suggest_counts_decks_per_word(index_dir):
+    index = _build()
+    assert dict(index.suggest("pro")) == {"programming": 3}
+    assert dict(index.suggest("py")) == {"python": 2}
+    index.save(index_dir)
+    assert dict(index.suggest("py")) == {"python": 2}
+
+    index.upsert_deck(5, "Python web", None, ["web"], [])
+    index.remove_deck(4)
+    assert dict(index.suggest("Py")) == {"python": 3}
+    assert dict(index.suggest("pro")) == {"programming": 2}
+    assert index.suggest("ru") == []
+    # Подсказка по последнему слову запроса
+    assert dict(index.suggest("spanish w")) == {"web": 1}
+    assert index.suggest("") == []
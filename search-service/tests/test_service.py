@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from src.index import SearchIndex
+from src.service import SearchService
+
+DECKS = 200
+
+
+async def _fill(service: SearchService, count: int = DECKS):
+    for deck_id in range(1, count + 1):
+        await service.upsert_deck(deck_id, f"Deck {deck_id} python", None, ["python"],
+                                  [(deck_id * 10, "question", f"answer {deck_id}")])
+
+
+async def test_queries_are_served_while_merge_runs(service):
+    await _fill(service)
+    started, release = threading.Event(), threading.Event()
+    build_snapshot = service.index.build_snapshot
+
+    def gated_build(path):
+        started.set()
+        release.wait(5)
+        build_snapshot(path)
+
+    service.index.build_snapshot = gated_build
+    merge = asyncio.create_task(service.merge())
+    while not started.is_set():
+        await asyncio.sleep(0.001)
+
+    # Слияние идет в потоке: запросы отвечают по старому снимку и дельте
+    total, results = service.index.search("python", limit=5)
+    assert total == DECKS and len(results) == 5
+    assert service.index.suggest("py") == [("python", DECKS)]
+
+    # Записи ждут окончания слияния
+    write = asyncio.create_task(service.upsert_deck(DECKS + 1, "Rust", None, [], []))
+    await asyncio.sleep(0.05)
+    assert not write.done()
+    assert DECKS + 1 not in service.index
+
+    release.set()
+    assert await merge
+    await write
+    assert service.index.static.size == DECKS
+    assert service.index.delta_size == 1
+    assert service.index.search("python")[0] == DECKS
+    assert service.index.search("rust")[1][0][0] == DECKS + 1
+
+
+async def test_concurrent_queries_during_merge_see_all_decks(service):
+    await _fill(service)
+    merge = asyncio.create_task(service.merge())
+    totals = []
+    while not merge.done():
+        totals.append(service.index.search(f"answer {DECKS // 2}")[0])
+        await asyncio.sleep(0)
+    assert await merge
+    assert totals and set(totals) == {DECKS}
+    assert service.index.delta_size == 0
+
+
+async def test_background_merge_after_merge_docs(index_dir):
+    service = SearchService(SearchIndex(), index_dir, merge_docs=3)
+    await _fill(service, 3)
+    await service._merge_task
+    assert service.index.static.size == 3
+    assert service.index.delta_size == 0
+
+
+async def test_shutdown_saves_delta_for_next_start(service, index_dir):
+    await _fill(service, 5)
+    await service.merge()
+    await service.remove_deck(1)
+    await service.upsert_card(2, 21, "extra", "card")
+    await service.shutdown()
+
+    restarted = SearchService(SearchIndex(), index_dir)
+    restarted.load()
+    assert restarted.index.search("python")[0] == 4
+    assert [deck_id for deck_id, _ in restarted.index.search("extra")[1]] == [2]
+
+
+async def test_merge_without_index_dir_is_disabled():
+    service = SearchService(SearchIndex(), None)
+    await _fill(service, 3)
+    assert not await service.merge()
+    assert service.index.delta_size == 3
@@ -0,0 +1,115 @@
+"""Бенчмарк индекса дистракторов на синтетической колоде.
+
+Запуск из каталога study-service:
+
+    python -m benchmarks.distractor_bench
+    python -m benchmarks.distractor_bench --cards 10000 --questions 50 --runs 200
+
+Меряет построение индекса колоды, выдачу теста из готовых соседей,
+точечные изменения карточек и сравнивает с подбором дистракторов
+полным проходом по колоде на каждый вопрос (без индекса).
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from src.distractors import DeckDistractors, answer_kind, answer_vector, normalize_answer
+
+SYLLABLES = ["ка", "ро", "ми", "та", "ле", "но", "за", "ви", "су", "пе", "ло", "ди", "ne", "ra", "to", "li"]
+
+
+def make_answer(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.2:
+        return str(rng.randint(1, 3000))
+    words = rng.choice([1, 1, 2, 3, 6])
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(words)
+    ).capitalize()
+
+
+def naive_test(deck: DeckDistractors, questions: int, choices: int, rng: random.Random) -> List[List[int]]:
+    """Подбор без индекса: признаки и похожесть считаются на каждый вопрос заново"""
+    alive = np.flatnonzero(deck.alive[:deck.size])
+    vectors = np.stack([answer_vector(normalize_answer(deck.answers[slot])) for slot in alive])
+    kinds = np.array([answer_kind(normalize_answer(deck.answers[slot])) for slot in alive])
+    test = []
+    for position in rng.sample(range(len(alive)), min(questions, len(alive))):
+        scores = vectors @ vectors[position] + 0.15 * (kinds == kinds[position])
+        scores[position] = -np.inf
+        test.append(alive[np.argsort(-scores)[:choices - 1]].tolist())
+    return test
+
+
+def percentile(values: List[float], p: float) -> float:
+    return float(np.percentile(values, p)) if values else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк индекса дистракторов")
+    parser.add_argument("--cards", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--choices", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--naive-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    cards = [(card_id, 1, f"Вопрос {card_id}", make_answer(rng)) for card_id in range(1, args.cards + 1)]
+
+    deck = DeckDistractors(1)
+    start = time.perf_counter()
+    deck.upsert_cards(cards, rebuild=True)
+    build = time.perf_counter() - start
+    print(f"Построение: {args.cards} карточек за {build * 1000:.0f} мс")
+
+    latencies = []
+    for run in range(args.runs):
+        start = time.perf_counter()
+        test = deck.make_test(args.questions, args.choices, random.Random(run))
+        latencies.append((time.perf_counter() - start) * 1000)
+    assert all(len(options) == args.choices for _, options, _ in test)
+    print(f"Тест из {args.questions} вопросов: p50 {percentile(latencies, 50):.2f} мс, "
+          f"p95 {percentile(latencies, 95):.2f} мс")
+
+    naive = []
+    for run in range(args.naive_runs):
+        start = time.perf_counter()
+        naive_test(deck, args.questions, args.choices, random.Random(run))
+        naive.append((time.perf_counter() - start) * 1000)
+    print(f"Без индекса: p50 {percentile(naive, 50):.1f} мс "
+          f"(x{percentile(naive, 50) / max(percentile(latencies, 50), 1e-6):.0f})")
+
+    version = 2
+    upserts, removals = [], []
+    for i in range(args.updates):
+        card_id = rng.randint(1, args.cards)
+        start = time.perf_counter()
+        deck.upsert_cards([(card_id, version, f"Вопрос {card_id}", make_answer(rng))])
+        upserts.append((time.perf_counter() - start) * 1000)
+        version += 1
+        if i % 4 == 0:
+            start = time.perf_counter()
+            deck.remove_cards([(rng.randint(1, args.cards), version)])
+            removals.append((time.perf_counter() - start) * 1000)
+            version += 1
+    print(f"Изменение карточки: p50 {percentile(upserts, 50):.2f} мс, p95 {percentile(upserts, 95):.2f} мс")
+    print(f"Удаление карточки: p50 {percentile(removals, 50):.2f} мс, p95 {percentile(removals, 95):.2f} мс")
+
+    # Инкрементальные правки должны дать те же соседи, что и полное построение
+    incremental = np.sort(deck.scores[:deck.size], axis=1)
+    deck.rebuild()
+    rebuilt = np.sort(deck.scores[:deck.size], axis=1)
+    mismatched = int((~np.isclose(incremental, rebuilt) & np.isfinite(rebuilt)).any(axis=1).sum())
+    print(f"Строк, расходящихся с полным построением: {mismatched}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Бенчмарк планировщика повторений на симулированных пользователях.
+
+Запуск из каталога study-service:
+
+    python -m benchmarks.scheduler_bench
+    python -m benchmarks.scheduler_bench --users 10 --cards 100000 --days 30
+
+Сравнивает векторный пересчет пачки ответов с покарточным алгоритмом из
+README (объекты datetime), и выборку "следующих k карточек" из очереди
+с полным просмотром всех карточек пользователя.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from src.scheduler import UserSchedule, DAY_SECONDS
+
+
+class ScalarCard:
+    """Карточка в покарточной реализации из README"""
+
+    def __init__(self, card_id: int, now: datetime):
+        self.card_id = card_id
+        self.interval = 0.0
+        self.due = now
+
+
+def spaced_repetition(card: ScalarCard, user_performance: float, now: datetime) -> datetime:
+    """Алгоритм из README (с теми же граничными условиями, что в next_intervals)"""
+    interval = max(1.0, card.interval)
+    if user_performance == 0:
+        interval = max(1.0, interval * 0.5)
+    else:
+        interval = interval * (2.5 - (0.8 * user_performance))
+    card.interval = interval
+    return now + timedelta(days=interval)
+
+
+def simulate_performance(rng: np.random.Generator, size: int) -> np.ndarray:
+    """20% неверных ответов, остальные — случайная трудность"""
+    perf = rng.uniform(0.05, 1.0, size).astype(np.float32)
+    perf[rng.random(size) < 0.2] = 0
+    return perf
+
+
+def scan_due(schedule: UserSchedule, k: int, now: float) -> np.ndarray:
+    """Следующие k карточек полным просмотром (как запрос без индекса)"""
+    due = schedule.due[:schedule.size]
+    return schedule.card_ids[np.argsort(np.where(due <= now, due, np.inf))[:k]]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench(users: int, cards: int, days: int, batch: int, k: int, compare: int, seed: int) -> Dict[str, float]:
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    per_user = cards // users
+
+    tracemalloc.start()
+    schedules: List[UserSchedule] = []
+    for u in range(users):
+        schedule = UserSchedule()
+        schedule.add_cards(range(u * per_user, (u + 1) * per_user), now)
+        schedules.append(schedule)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    review_ms: List[float] = []
+    due_ms: List[float] = []
+    scan_ms: List[float] = []
+    reviewed = 0
+    for day in range(days):
+        clock = now + day * DAY_SECONDS
+        for schedule in schedules:
+            # Пользователь повторяет накопившиеся карточки пачками по batch
+            for _ in range(max(schedule.count_due(clock) // batch, 1)):
+                due, ms = timed(schedule.due_cards, batch, clock)
+                due_ms.append(ms)
+                if not due:
+                    break
+                ids = [card_id for card_id, _ in due]
+                _, ms = timed(schedule.review, ids, simulate_performance(rng, len(ids)), clock)
+                review_ms.append(ms)
+                reviewed += len(ids)
+            _, ms = timed(scan_due, schedule, k, clock)
+            scan_ms.append(ms)
+
+    # Одна большая пачка: векторный пересчет против покарточного из README
+    fresh = UserSchedule()
+    fresh.add_cards(range(compare), now)
+    perf = simulate_performance(rng, compare)
+    _, vector_batch_ms = timed(fresh.review, list(range(compare)), perf, now)
+    dt_now = datetime.now()
+    scalar_cards = [ScalarCard(i, dt_now) for i in range(compare)]
+    start = time.perf_counter()
+    for card, p in zip(scalar_cards, perf.tolist()):
+        card.due = spaced_repetition(card, p, dt_now)
+    scalar_batch_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "users": users,
+        "cards": per_user * users,
+        "reviews_simulated": reviewed,
+        "build_peak_mb": round(peak / 2 ** 20, 1),
+        "build_bytes_per_card": round(peak / (per_user * users)),
+        "review_batch_p50_ms": round(float(np.percentile(review_ms, 50)), 3) if review_ms else 0.0,
+        "due_next_k_p50_ms": round(float(np.percentile(due_ms, 50)), 3) if due_ms else 0.0,
+        "full_scan_k_p50_ms": round(float(np.percentile(scan_ms, 50)), 3),
+        f"scalar_readme_{compare}_ms": round(scalar_batch_ms, 3),
+        f"vector_{compare}_ms": round(vector_batch_ms, 3),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк планировщика повторений")
+    parser.add_argument("--users", type=int, default=10, help="Число пользователей")
+    parser.add_argument("--cards", type=int, default=100000, help="Всего карточек")
+    parser.add_argument("--days", type=int, default=30, help="Сколько дней симулировать")
+    parser.add_argument("--batch", type=int, default=20, help="Размер пачки ответов")
+    parser.add_argument("--k", type=int, default=20, help="Сколько карточек запрашивать из очереди")
+    parser.add_argument("--compare", type=int, default=10000,
+                        help="Размер пачки для сравнения с покарточным алгоритмом")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for users in sorted({args.users, 1}):
+        results = bench(users, args.cards, args.days, args.batch, args.k, args.compare, args.seed)
+        print(f"\n== {results['users']} польз., {results['cards']} карточек, {args.days} дней")
+        for name, value in results.items():
+            print(f"  {name:<28}{value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Бенчмарк хранилища учебных сессий в памяти.
+
+Запуск из каталога study-service:
+
+    python -m benchmarks.session_bench
+    python -m benchmarks.session_bench --sessions 500000 --cards 30
+
+Меряет память на сессию (tracemalloc) в сравнении с тем же состоянием в
+виде JSON-подобного словаря, скорость ответов, запись снимка через
+memory-mapped файл и загрузку его обратно.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from src.sessions import MODES, MemorySessionStore
+
+
+def dict_session(user_id: int, mode: str, card_ids):
+    """Состояние сессии словарем, как его хранили бы JSON в Redis"""
+    return {
+        "user_id": user_id, "deck_id": None, "mode": mode, "cursor": 0,
+        "cards": [{"card_id": card_id, "attempts": 0, "correct": 0} for card_id in card_ids],
+        "created_at": time.time(), "updated_at": time.time(),
+    }
+
+
+async def run(args) -> int:
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as state_dir:
+        store = MemorySessionStore(state_dir=state_dir, max_sessions=args.sessions, ttl=3600)
+
+        decks = [rng.sample(range(1, 1_000_000), args.cards) for _ in range(1000)]
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        ids = []
+        for user_id in range(args.sessions):
+            session = await store.create(user_id, MODES[user_id % len(MODES)], decks[user_id % len(decks)])
+            ids.append((session.session_id, user_id))
+        create = time.perf_counter() - start
+        used = tracemalloc.get_traced_memory()[0] - base
+
+        sample = min(args.sessions, 10000)
+        base = tracemalloc.get_traced_memory()[0]
+        dicts = [dict_session(i, "learn", rng.sample(range(1, 1_000_000), args.cards)) for i in range(sample)]
+        dict_used = (tracemalloc.get_traced_memory()[0] - base) / sample
+        del dicts
+        tracemalloc.stop()
+        print(f"{args.sessions} сессий по {args.cards} карточек: {used / 2**20:.0f} МБ, "
+              f"{used / args.sessions:.0f} Б на сессию (словарь: {dict_used:.0f} Б), "
+              f"создание {create / args.sessions * 1e6:.1f} мкс")
+
+        start = time.perf_counter()
+        for _ in range(args.answers):
+            session_id, user_id = ids[rng.randrange(len(ids))]
+            session = await store.get(session_id, user_id)
+            card_id = session.current_card_id
+            if card_id is not None:
+                await store.answer(session, card_id, rng.random() < 0.7)
+        answer = time.perf_counter() - start
+        print(f"Ответ (get + answer): {answer / args.answers * 1e6:.1f} мкс")
+
+        start = time.perf_counter()
+        await store.snapshot()
+        write = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(state_dir, "sessions.snapshot"))
+        print(f"Снимок: {write * 1000:.0f} мс, {size / 2**20:.0f} МБ")
+
+        loaded = MemorySessionStore(state_dir=state_dir, max_sessions=args.sessions, ttl=3600)
+        start = time.perf_counter()
+        loaded.load()
+        load = time.perf_counter() - start
+        print(f"Загрузка снимка: {load * 1000:.0f} мс, сессий {len(loaded)}")
+
+        mismatched = 0
+        for session_id, user_id in rng.sample(ids, min(len(ids), 1000)):
+            a, b = store._sessions[session_id], loaded._sessions[session_id]
+            if (a.card_ids, a.attempts, a.correct, a.cursor, a.mode) != (b.card_ids, b.attempts, b.correct, b.cursor, b.mode):
+                mismatched += 1
+        print(f"Сессий, расходящихся после загрузки: {mismatched}")
+        return 1 if mismatched or len(loaded) != len(store) else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк хранилища учебных сессий")
+    parser.add_argument("--sessions", type=int, default=200000)
+    parser.add_argument("--cards", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=200000)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
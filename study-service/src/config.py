@@ -0,0 +1,34 @@
+import os
+
+# Настройки приложения
+PORT = int(os.getenv("PORT", "8004"))
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+
+# JWT (общий секрет с User Service)
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+
+# Планировщик повторений
+MAX_INTERVAL_DAYS = float(os.getenv("MAX_INTERVAL_DAYS", "3650"))
+# Каталог снимков состояния (загружается при старте, сохраняется периодически и при остановке);
+# пусто — без снимков
+STUDY_STATE_DIR = os.getenv("STUDY_STATE_DIR", "")
+STUDY_SCHEDULE_SNAPSHOT_INTERVAL = float(os.getenv("STUDY_SCHEDULE_SNAPSHOT_INTERVAL", "60"))
+
+# Запись состояний повторения в Database Service для дельта-синхронизации клиентов; пусто — выключена
+DATABASE_SERVICE_URL = os.getenv("DATABASE_SERVICE_URL", "")
+DATABASE_SERVICE_TIMEOUT = int(os.getenv("DATABASE_SERVICE_TIMEOUT", "30"))
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "1.0"))
+# Ответов в очереди журнала статистики, пока Database Service недоступен (сверх — не записываются)
+STATS_MAX_PENDING_EVENTS = int(os.getenv("STATS_MAX_PENDING_EVENTS", "100000"))
+
+# Дистракторы для режимов Test и Match: похожих ответов на карточку и предел карточек в памяти
+DISTRACTOR_TOP_K = int(os.getenv("DISTRACTOR_TOP_K", "12"))
+DISTRACTOR_MAX_CARDS = int(os.getenv("DISTRACTOR_MAX_CARDS", "200000"))
+
+# Учебные сессии (Flashcards/Learn/Write/Match): предел в памяти узла, время жизни без обращений
+# и период снимков в STUDY_STATE_DIR (секунды)
+STUDY_SESSION_MAX = int(os.getenv("STUDY_SESSION_MAX", "500000"))
+STUDY_SESSION_TTL = float(os.getenv("STUDY_SESSION_TTL", "3600"))
+STUDY_SESSION_SNAPSHOT_INTERVAL = float(os.getenv("STUDY_SESSION_SNAPSHOT_INTERVAL", "60"))
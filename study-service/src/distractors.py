@@ -0,0 +1,412 @@
+import asyncio
+import random
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from src.config import DATABASE_SERVICE_URL, DATABASE_SERVICE_TIMEOUT, DISTRACTOR_TOP_K, DISTRACTOR_MAX_CARDS
+
+# Размерность хешированных признаков ответа (слова + символьные триграммы)
+DIMENSIONS = 128
+# Ответ длиннее обрезается: для похожести хватает начала
+MAX_FEATURE_CHARS = 200
+WORD_WEIGHT = 2.0
+# Поправки к косинусу: тот же тип ответа ближе, разница длины (в разах) — дальше
+TYPE_BONUS = 0.15
+LENGTH_PENALTY = 0.1
+INITIAL_CAPACITY = 64
+# Строк матрицы похожести за один проход (BLOCK_ROWS x карточек колоды)
+BLOCK_ROWS = 256
+# Пачка изменений больше этой доли колоды пересчитывается целиком, а не по карточке
+REBUILD_FRACTION = 0.1
+CARDS_PAGE_SIZE = 1000
+
+# Типы ответов
+KIND_EMPTY, KIND_NUMBER, KIND_WORD, KIND_PHRASE, KIND_TEXT = range(5)
+PHRASE_MAX_WORDS = 4
+
+COLUMNS = ("card_ids", "vectors", "kinds", "lengths", "answer_keys", "alive", "neighbors", "scores")
+FILL = {"neighbors": -1, "scores": -np.inf}
+
+_NOT_WORD = re.compile(r"[\W_]+")
+
+CardRow = Tuple[int, int, str, str]  # card_id, version, question, answer
+
+
+def normalize_answer(text: str) -> str:
+    """Ответ без регистра, разметки и пунктуации: "**Париж.**" -> "париж" """
+    text = text[:MAX_FEATURE_CHARS].lower().replace("ё", "е")
+    return " ".join(_NOT_WORD.sub(" ", text).split())
+
+
+def answer_kind(normalized: str) -> int:
+    tokens = normalized.split()
+    if not tokens:
+        return KIND_EMPTY
+    if all(token.isdigit() for token in tokens):
+        return KIND_NUMBER
+    if len(tokens) == 1:
+        return KIND_WORD
+    return KIND_PHRASE if len(tokens) <= PHRASE_MAX_WORDS else KIND_TEXT
+
+
+def answer_vector(normalized: str) -> np.ndarray:
+    """L2-нормированный вектор хешированных слов и символьных триграмм"""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for token in normalized.split():
+        vector[zlib.crc32(b"w:" + token.encode()) % DIMENSIONS] += WORD_WEIGHT
+        padded = f" {token} ".encode()
+        for i in range(len(padded) - 2):
+            vector[zlib.crc32(padded[i:i + 3]) % DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class DeckDistractors:
+    """Заранее посчитанные дистракторы карточек одной колоды.
+
+    Признаки ответа (вектор, тип, корзина длины log2) хранятся колонками
+    NumPy, а для каждой карточки — top-K самых похожих чужих ответов
+    (neighbors/scores, порядок внутри строки не важен). Построение —
+    блочным умножением матриц; изменение карточки пересчитывает ее строку
+    и подставляет ее вместо худшего соседа там, где она лучше, удаление —
+    только строки, где она была соседом. Запрос теста не считает похожесть,
+    а читает готовые строки.
+    """
+
+    def __init__(self, deck_id: int, top_k: int = DISTRACTOR_TOP_K, capacity: int = INITIAL_CAPACITY):
+        self.deck_id = deck_id
+        self.top_k = top_k
+        self.owner_id: Optional[int] = None
+        self.is_public = False
+        self.deck_version = 0
+        self.deleted = False
+        self.size = 0
+        self.card_ids = np.zeros(capacity, dtype=np.int64)
+        self.vectors = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        self.kinds = np.zeros(capacity, dtype=np.int8)
+        self.lengths = np.zeros(capacity, dtype=np.float32)
+        self.answer_keys = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.neighbors = np.full((capacity, top_k), -1, dtype=np.int32)
+        self.scores = np.full((capacity, top_k), -np.inf, dtype=np.float32)
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.index: Dict[int, int] = {}
+        # Версии карточек, включая удаленные: события могут прийти не по порядку
+        self.versions: Dict[int, int] = {}
+        self._free: List[int] = []
+
+    @property
+    def card_count(self) -> int:
+        return len(self.index)
+
+    def set_deck(self, version: int, owner_id: int, is_public: bool):
+        if version >= self.deck_version:
+            self.deck_version, self.owner_id, self.is_public = version, owner_id, is_public
+
+    def _reserve(self, needed: int):
+        capacity = len(self.card_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.full((capacity,) + column.shape[1:], FILL.get(name, 0), dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _set(self, card_id: int, question: str, answer: str) -> int:
+        slot = self.index.get(card_id)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self.size
+                self._reserve(slot + 1)
+                self.size += 1
+                self.questions.append("")
+                self.answers.append("")
+            self.index[card_id] = slot
+        normalized = normalize_answer(answer)
+        self.card_ids[slot] = card_id
+        self.vectors[slot] = answer_vector(normalized)
+        self.kinds[slot] = answer_kind(normalized)
+        self.lengths[slot] = len(normalized).bit_length()
+        self.answer_keys[slot] = zlib.crc32(normalized.encode())
+        self.alive[slot] = True
+        self.questions[slot] = question
+        self.answers[slot] = answer
+        return slot
+
+    def _score(self, rows: np.ndarray) -> np.ndarray:
+        """Похожесть ответов rows на все слоты; одинаковые ответы и пустые слоты — -inf"""
+        n = self.size
+        scores = self.vectors[rows] @ self.vectors[:n].T
+        scores += TYPE_BONUS * (self.kinds[rows, None] == self.kinds[None, :n])
+        scores -= LENGTH_PENALTY * np.abs(self.lengths[rows, None] - self.lengths[None, :n])
+        excluded = (self.answer_keys[rows, None] == self.answer_keys[None, :n]) | ~self.alive[None, :n]
+        scores[excluded] = -np.inf
+        return scores
+
+    def _recompute(self, rows: np.ndarray):
+        k, n = self.top_k, self.size
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            scores = self._score(block)
+            if n > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(n), (len(block), n))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            width = top.shape[1]
+            self.neighbors[block] = -1
+            self.scores[block] = -np.inf
+            self.neighbors[block, :width] = np.where(np.isfinite(top_scores), top, -1)
+            self.scores[block, :width] = top_scores
+
+    def _referencing(self, slot: int) -> np.ndarray:
+        return np.flatnonzero((self.neighbors[:self.size] == slot).any(axis=1))
+
+    def _link(self, slot: int, changed: bool):
+        """Обновить соседей после записи слота (похожесть симметрична)"""
+        stale = self._referencing(slot) if changed else np.empty(0, dtype=np.int64)
+        self._recompute(np.append(stale, slot))
+        n = self.size
+        scores = self._score(np.array([slot]))[0]
+        worst = np.argmin(self.scores[:n], axis=1)
+        better = np.flatnonzero((scores > self.scores[np.arange(n), worst]) & self.alive[:n])
+        better = better[(self.neighbors[better] != slot).all(axis=1)]
+        self.neighbors[better, worst[better]] = slot
+        self.scores[better, worst[better]] = scores[better]
+
+    def rebuild(self):
+        self._recompute(np.flatnonzero(self.alive[:self.size]))
+
+    def upsert_cards(self, cards: Iterable[CardRow], rebuild: bool = False) -> int:
+        """Записать карточки новее известных версий; вернуть число записанных"""
+        written = []
+        for card_id, version, question, answer in cards:
+            if version <= self.versions.get(card_id, 0):
+                continue
+            self.versions[card_id] = version
+            changed = card_id in self.index
+            written.append((self._set(card_id, question, answer), changed))
+        if not written:
+            return 0
+        if rebuild or len(written) > max(1, REBUILD_FRACTION * self.card_count):
+            self.rebuild()
+        else:
+            for slot, changed in written:
+                self._link(slot, changed)
+        return len(written)
+
+    def remove_cards(self, cards: Iterable[Tuple[int, int]]) -> int:
+        """Удалить карточки (card_id, version); вернуть число удаленных"""
+        stale = []
+        for card_id, version in cards:
+            if version <= self.versions.get(card_id, 0):
+                continue
+            self.versions[card_id] = version
+            slot = self.index.pop(card_id, None)
+            if slot is None:
+                continue
+            self.alive[slot] = False
+            self.neighbors[slot] = -1
+            self.scores[slot] = -np.inf
+            self.questions[slot] = self.answers[slot] = ""
+            self._free.append(slot)
+            stale.append(slot)
+        if not stale:
+            return 0
+        rows = np.flatnonzero(np.isin(self.neighbors[:self.size], stale).any(axis=1))
+        self._recompute(rows)
+        return len(stale)
+
+    def distractors(self, slot: int, count: int, rng: random.Random) -> List[int]:
+        """count слотов с попарно разными ответами, не совпадающими с ответом slot.
+
+        Берутся случайные из 2 * count лучших соседей, чтобы тесты по одной
+        карточке не повторялись; если похожих не хватает — случайные карточки.
+        """
+        row, scores = self.neighbors[slot], self.scores[slot]
+        ranked = [int(row[i]) for i in np.argsort(-scores) if row[i] >= 0]
+        head = ranked[:2 * count]
+        rng.shuffle(head)
+        picked: List[int] = []
+        seen = {int(self.answer_keys[slot])}
+        candidates = head + ranked[2 * count:]
+        if len(candidates) < count:
+            alive = np.flatnonzero(self.alive[:self.size])
+            candidates += [int(s) for s in rng.sample(alive.tolist(), min(len(alive), 4 * count))]
+        for candidate in candidates:
+            key = int(self.answer_keys[candidate])
+            if key not in seen and self.alive[candidate]:
+                seen.add(key)
+                picked.append(candidate)
+                if len(picked) == count:
+                    break
+        return picked
+
+    def make_test(self, questions: int, choices: int, rng: random.Random) -> List[Tuple[int, List[int], int]]:
+        """Вопросы теста: (слот вопроса, слоты вариантов, индекс верного)"""
+        alive = np.flatnonzero(self.alive[:self.size]).tolist()
+        test = []
+        for slot in rng.sample(alive, min(questions, len(alive))):
+            options = self.distractors(slot, choices - 1, rng)
+            correct = rng.randrange(len(options) + 1)
+            options.insert(correct, slot)
+            test.append((slot, options, correct))
+        return test
+
+    def make_match(self, pairs: int, rng: random.Random) -> List[int]:
+        """Слоты для подбора пар: случайная карточка и ее самые похожие по ответу"""
+        alive = np.flatnonzero(self.alive[:self.size])
+        if not len(alive):
+            return []
+        seed = int(rng.choice(alive.tolist()))
+        group = [seed] + self.distractors(seed, pairs - 1, rng)
+        rng.shuffle(group)
+        return group
+
+
+class DistractorIndex:
+    """Индексы дистракторов колод воркера (LRU по числу карточек).
+
+    Колода загружается из Database Service при первом тесте по ней, после
+    чего поддерживается событиями outbox (card.*, deck.*). События колод,
+    которых нет в памяти, пропускаются: их индекс построится при
+    следующем обращении.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DATABASE_SERVICE_URL,
+        top_k: int = DISTRACTOR_TOP_K,
+        max_cards: int = DISTRACTOR_MAX_CARDS
+    ):
+        self.base_url = base_url
+        self.top_k = top_k
+        self.max_cards = max_cards
+        self.decks: "OrderedDict[int, DeckDistractors]" = OrderedDict()
+        # Колоды, которые сейчас загружаются: события применяются и к ним
+        self._building: Dict[int, DeckDistractors] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.base_url)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=DATABASE_SERVICE_TIMEOUT)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, deck_id: int) -> Optional[DeckDistractors]:
+        """Индекс колоды (загружается при первом обращении); None — колоды нет"""
+        deck = self.decks.get(deck_id)
+        if deck is not None:
+            self.decks.move_to_end(deck_id)
+            return deck
+        task = self._loading.get(deck_id)
+        if task is None:
+            task = self._loading[deck_id] = asyncio.create_task(self._load(deck_id))
+            task.add_done_callback(lambda _: self._loading.pop(deck_id, None))
+        # Отмена одного запроса не прерывает загрузку для остальных
+        return await asyncio.shield(task)
+
+    async def _load(self, deck_id: int) -> Optional[DeckDistractors]:
+        deck = self._building[deck_id] = DeckDistractors(deck_id, self.top_k)
+        try:
+            client = self._get_client()
+            response = await client.get(f"/api/v1/decks/{deck_id}")
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            meta = response.json()
+            deck.set_deck(meta["version"], meta["owner_id"], meta["is_public"])
+            cards: List[CardRow] = []
+            params: Dict[str, object] = {"limit": CARDS_PAGE_SIZE}
+            while True:
+                response = await client.get(f"/api/v1/decks/{deck_id}/cards/after", params=params)
+                response.raise_for_status()
+                page = response.json()
+                cards.extend((card["id"], card["version"], card["question"], card["answer"]) for card in page["cards"])
+                if not page["has_more"]:
+                    break
+                last = page["cards"][-1]
+                params.update(after_rank=last["rank"], after_id=last["id"])
+            deck.upsert_cards(cards, rebuild=True)
+            if deck.deleted:
+                return None
+            self.decks[deck_id] = deck
+            self._evict()
+            return deck
+        finally:
+            self._building.pop(deck_id, None)
+
+    def _evict(self):
+        total = sum(deck.card_count for deck in self.decks.values())
+        while total > self.max_cards and len(self.decks) > 1:
+            _, deck = self.decks.popitem(last=False)
+            total -= deck.card_count
+
+    def _find(self, deck_id: int) -> Optional[DeckDistractors]:
+        return self.decks.get(deck_id) or self._building.get(deck_id)
+
+    def apply(self, events) -> int:
+        """Применить пачку событий outbox; вернуть число изменивших индекс.
+
+        Карточки группируются по колоде, так что массовое добавление
+        пересчитывает колоду один раз, а не по событию. Со строками из
+        Database Service сравнивается версия изменения из payload, а не ID
+        события: ID общий для всех владельцев, версии — из потока владельца.
+        """
+        upserts: Dict[int, List[CardRow]] = {}
+        removals: Dict[int, List[Tuple[int, int]]] = {}
+        applied = 0
+        for event in events:
+            payload = event.payload
+            deck = self._find(payload.get("deck_id"))
+            if deck is None:
+                continue
+            if event.topic == "card.upserted":
+                upserts.setdefault(deck.deck_id, []).append(
+                    (payload["card_id"], payload["version"], payload["question"], payload["answer"])
+                )
+            elif event.topic == "card.deleted":
+                removals.setdefault(deck.deck_id, []).append((payload["card_id"], payload["version"]))
+            elif event.topic == "deck.upserted":
+                deck.set_deck(payload["version"], payload["owner_id"], payload["is_public"])
+                applied += 1
+            elif event.topic == "deck.deleted":
+                deck.deleted = True
+                self.decks.pop(deck.deck_id, None)
+                applied += 1
+        for deck_id, cards in upserts.items():
+            deck = self._find(deck_id)
+            if deck is not None:
+                applied += deck.upsert_cards(cards)
+        for deck_id, cards in removals.items():
+            deck = self._find(deck_id)
+            if deck is not None:
+                applied += deck.remove_cards(cards)
+        return applied
+
+
+# Singleton instance
+distractor_index = DistractorIndex()
+
+def get_distractor_index() -> DistractorIndex:
+    """Dependency для получения индекса дистракторов"""
+    return distractor_index
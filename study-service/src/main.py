@@ -0,0 +1,66 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from src.routers import study, events
+from src.scheduler import scheduler
+from src.progress import progress_sync
+from src.distractors import distractor_index
+from src.sessions import session_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Загрузка расписаний при запуске и сохранение при остановке"""
+    # С Database Service расписания загружаются оттуда при первом обращении:
+    # локальные снимки могли отстать от записанного туда прогресса
+    local_schedules = not progress_sync.enabled
+    if local_schedules:
+        scheduler.load()
+        await scheduler.start()
+    session_store.load()
+    await progress_sync.start()
+    await session_store.start()
+    print("Study Service запущен")
+    yield
+    await progress_sync.shutdown()
+    await session_store.shutdown()
+    await distractor_index.close()
+    if local_schedules:
+        await scheduler.shutdown()
+    print("Study Service остановлен")
+
+# Создание FastAPI приложения
+app = FastAPI(
+    title="Recall Pro - Study Service",
+    description="Сервис интервальных повторений",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Настройка CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # В продакшене указать конкретные домены
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Подключение роутеров
+app.include_router(study.router, prefix="/api/v1/study", tags=["study"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["events"])
+
+@app.get("/")
+async def root():
+    """Корневой эндпоинт"""
+    return {"message": "Recall Pro Study Service", "version": "1.0.0"}
+
+@app.get("/health")
+async def health_check():
+    """Проверка здоровья сервиса"""
+    return {"status": "healthy", "service": "study"}
+
+if __name__ == "__main__":
+    import uvicorn
+    from src.config import PORT, DEBUG
+    # Расписания хранятся в памяти процесса, поэтому сервис работает в одном воркере
+    uvicorn.run("src.main:app", host="0.0.0.0", port=PORT, reload=DEBUG)
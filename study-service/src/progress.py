@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+import httpx
+import numpy as np
+
+from src.config import (
+    DATABASE_SERVICE_URL, DATABASE_SERVICE_TIMEOUT, PROGRESS_FLUSH_INTERVAL, STATS_MAX_PENDING_EVENTS
+)
+from src.scheduler import COLUMNS, UserSchedule
+
+logger = logging.getLogger(__name__)
+
+# Ограничение размера пачки в PUT /api/v1/reviews/bulk и POST /api/v1/stats/events Database Service
+BULK_LIMIT = 1000
+
+
+class ProgressSync:
+    """Отложенная запись состояний повторения в Database Service.
+
+    Ответы и изменения расписания копятся в памяти (по карточке остается
+    последнее состояние) и раз в PROGRESS_FLUSH_INTERVAL секунд уходят
+    пачками: Database Service версионирует их для дельта-синхронизации
+    клиентов. Каждый ответ, кроме того, пишется событием в журнал
+    статистики (POST /api/v1/stats/events), где по нему обновляются сводки.
+    Без DATABASE_SERVICE_URL запись выключена.
+    """
+
+    def __init__(self, base_url: str = DATABASE_SERVICE_URL, interval: float = PROGRESS_FLUSH_INTERVAL):
+        self.base_url = base_url
+        self.interval = interval
+        self._updated: Dict[int, Dict[int, dict]] = {}
+        self._removed: Dict[int, Set[int]] = {}
+        self._events: Dict[int, List[dict]] = {}
+        self._pending_events = 0
+        self._client = None
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.base_url)
+
+    def updated(self, user_id: int, schedule: UserSchedule, card_ids: List[int]):
+        """Запомнить текущее состояние карточек пользователя"""
+        if not self.enabled or not card_ids:
+            return
+        rows = schedule.rows(card_ids)
+        pending = self._updated.setdefault(user_id, {})
+        removed = self._removed.get(user_id)
+        for card_id, interval, due, reps, lapses in zip(
+            schedule.card_ids[rows].tolist(), schedule.interval[rows].tolist(), schedule.due[rows].tolist(),
+            schedule.reps[rows].tolist(), schedule.lapses[rows].tolist()
+        ):
+            pending[card_id] = {"card_id": card_id, "interval": interval, "due": due, "reps": reps, "lapses": lapses}
+            if removed:
+                removed.discard(card_id)
+
+    def removed(self, user_id: int, card_ids: Iterable[int]):
+        """Запомнить карточки, убранные из расписания"""
+        if not self.enabled:
+            return
+        pending = self._updated.get(user_id, {})
+        removed = self._removed.setdefault(user_id, set())
+        for card_id in card_ids:
+            pending.pop(card_id, None)
+            removed.add(card_id)
+
+    def reviewed(self, user_id: int, card_ids: List[int], performance: List[float], now: float):
+        """Запомнить ответы для журнала статистики (каждый ответ — отдельное событие)"""
+        if not self.enabled:
+            return
+        if self._pending_events + len(card_ids) > STATS_MAX_PENDING_EVENTS:
+            logger.warning("Очередь событий статистики переполнена, пропущено ответов: %s", len(card_ids))
+            return
+        self._events.setdefault(user_id, []).extend(
+            {"event_id": uuid.uuid4().hex, "card_id": card_id, "performance": perf, "reviewed_at": now}
+            for card_id, perf in zip(card_ids, performance)
+        )
+        self._pending_events += len(card_ids)
+
+    async def load_schedule(self, user_id: int) -> Optional[UserSchedule]:
+        """Расписание пользователя из сохраненных состояний; None — запись выключена.
+
+        Ошибки Database Service пробрасываются: пустое расписание вместо
+        недоступного затерло бы прогресс пользователя.
+        """
+        if self._client is None:
+            return None
+        rows: List[dict] = []
+        after_card_id = 0
+        while True:
+            response = await self._client.get(
+                f"/api/v1/reviews/users/{user_id}",
+                params={"after_card_id": after_card_id, "limit": BULK_LIMIT}
+            )
+            response.raise_for_status()
+            page = response.json()
+            rows += page
+            if len(page) < BULK_LIMIT:
+                break
+            after_card_id = page[-1]["card_id"]
+        # Еще не отправленные изменения новее сохраненных
+        pending = self._updated.get(user_id, {})
+        removed = self._removed.get(user_id, set())
+        states = {row["card_id"]: row for row in rows if row["card_id"] not in removed}
+        states.update(pending)
+        return UserSchedule.from_arrays({
+            column: np.array([state[key] for state in states.values()])
+            for column, key in zip(COLUMNS, ("card_id", "interval", "due", "reps", "lapses"))
+        })
+
+    async def get_stats(self, user_id: int, days: int) -> Optional[dict]:
+        """Сводки статистики пользователя из Database Service; None — запись выключена"""
+        if self._client is None:
+            return None
+        response = await self._client.get(f"/api/v1/stats/users/{user_id}", params={"days": days})
+        response.raise_for_status()
+        return response.json()
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=DATABASE_SERVICE_TIMEOUT)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        """Отправить накопленные изменения; при ошибке вернуть их в очередь"""
+        if self._client is None:
+            return
+        updated, removed = self._updated, self._removed
+        self._updated, self._removed = {}, {}
+        for user_id in updated.keys() | removed.keys():
+            reviews = list(updated.get(user_id, {}).values())
+            gone = list(removed.get(user_id, ()))
+            try:
+                for start in range(0, max(len(reviews), len(gone)), BULK_LIMIT):
+                    response = await self._client.put("/api/v1/reviews/bulk", json={
+                        "user_id": user_id,
+                        "reviews": reviews[start:start + BULK_LIMIT],
+                        "removed_card_ids": gone[start:start + BULK_LIMIT]
+                    })
+                    response.raise_for_status()
+            except httpx.HTTPError:
+                logger.warning("Не удалось сохранить прогресс пользователя %s", user_id, exc_info=True)
+                self._requeue(user_id, reviews, gone)
+        await self._flush_events()
+
+    async def _flush_events(self):
+        events, self._events = self._events, {}
+        self._pending_events = 0
+        for user_id, user_events in events.items():
+            try:
+                for start in range(0, len(user_events), BULK_LIMIT):
+                    response = await self._client.post("/api/v1/stats/events", json={
+                        "user_id": user_id,
+                        "events": user_events[start:start + BULK_LIMIT]
+                    })
+                    response.raise_for_status()
+            except httpx.HTTPError:
+                logger.warning("Не удалось записать события статистики пользователя %s", user_id, exc_info=True)
+                # Повтор безопасен: уже записанные event_id Database Service пропустит
+                self._events.setdefault(user_id, [])[:0] = user_events
+                self._pending_events += len(user_events)
+
+    def _requeue(self, user_id: int, reviews: List[dict], gone: List[int]):
+        # Более новые состояния, накопленные во время отправки, важнее возвращаемых
+        pending = self._updated.setdefault(user_id, {})
+        removed = self._removed.setdefault(user_id, set())
+        for review in reviews:
+            if review["card_id"] not in removed:
+                pending.setdefault(review["card_id"], review)
+        removed.update(card_id for card_id in gone if card_id not in pending)
+
+    async def shutdown(self):
+        """Остановить фоновую запись и отправить остаток"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+
+
+progress_sync = ProgressSync()
+
+
+def get_progress_sync() -> ProgressSync:
+    """Dependency для записи прогресса"""
+    return progress_sync
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from src.distractors import DistractorIndex, get_distractor_index
+from src.schemas import EventBatchRequest, EventBatchResponse
+
+router = APIRouter()
+
+@router.post("/", response_model=EventBatchResponse)
+async def receive_events(
+    batch: EventBatchRequest,
+    index: DistractorIndex = Depends(get_distractor_index)
+):
+    """Пачка событий outbox Database Service (колоды и карточки) для индекса дистракторов"""
+    return EventBatchResponse(applied=index.apply(batch.events))
@@ -0,0 +1,269 @@
+import random
+import time
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from src.auth import get_current_user_id
+from src.distractors import DeckDistractors, DistractorIndex, get_distractor_index
+from src.progress import ProgressSync, get_progress_sync
+from src.scheduler import Scheduler, UserSchedule, get_scheduler
+from src.sessions import MODES, SessionStore, StudySession, get_session_store
+from src.schemas import (
+    EnrollCardsRequest, EnrollCardsResponse,
+    ReviewBatchRequest, ReviewBatchResponse,
+    DueCardsResponse, ScheduledCard, StudyStatsResponse,
+    SessionCreateRequest, SessionAnswerRequest, SessionResponse, SessionCard,
+    TestResponse, TestQuestion, TestOption, MatchResponse, MatchPair
+)
+
+router = APIRouter()
+
+async def get_user_schedule(
+    user_id: int = Depends(get_current_user_id),
+    scheduler: Scheduler = Depends(get_scheduler),
+    progress: ProgressSync = Depends(get_progress_sync)
+) -> UserSchedule:
+    """Расписание пользователя; после перезапуска — из состояний в Database Service"""
+    try:
+        return await scheduler.get_or_load(user_id, progress.load_schedule)
+    except httpx.HTTPError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Расписание временно недоступно"
+        )
+
+@router.post("/cards", response_model=EnrollCardsResponse)
+async def enroll_cards(
+    data: EnrollCardsRequest,
+    user_id: int = Depends(get_current_user_id),
+    schedule: UserSchedule = Depends(get_user_schedule),
+    progress: ProgressSync = Depends(get_progress_sync)
+):
+    """Добавить карточки в расписание пользователя (к повторению сразу)"""
+    new_ids = [card_id for card_id in dict.fromkeys(data.card_ids) if card_id not in schedule.index]
+    added = schedule.add_cards(new_ids, time.time())
+    progress.updated(user_id, schedule, new_ids)
+    return EnrollCardsResponse(added_count=added, total_cards=schedule.size)
+
+@router.post("/reviews", response_model=ReviewBatchResponse)
+async def submit_reviews(
+    data: ReviewBatchRequest,
+    user_id: int = Depends(get_current_user_id),
+    schedule: UserSchedule = Depends(get_user_schedule),
+    progress: ProgressSync = Depends(get_progress_sync)
+):
+    """Применить пачку ответов и вернуть новое время повторения"""
+    card_ids = [review.card_id for review in data.reviews]
+    unknown = [card_id for card_id in card_ids if card_id not in schedule.index]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Карточки не в расписании: {unknown[:20]}"
+        )
+    performance = [review.performance for review in data.reviews]
+    now = time.time()
+    schedule.review(card_ids, performance, now)
+    reviewed = list(dict.fromkeys(card_ids))
+    rows = schedule.rows(reviewed)
+    progress.updated(user_id, schedule, reviewed)
+    progress.reviewed(user_id, card_ids, performance, now)
+    return ReviewBatchResponse(cards=[
+        ScheduledCard(card_id=card_id, due=due)
+        for card_id, due in zip(schedule.card_ids[rows].tolist(), schedule.due[rows].tolist())
+    ])
+
+@router.get("/due", response_model=DueCardsResponse)
+async def get_due_cards(
+    limit: int = Query(20, ge=1, le=500, description="Количество карточек"),
+    schedule: UserSchedule = Depends(get_user_schedule)
+):
+    """Следующие карточки к повторению"""
+    now = time.time()
+    return DueCardsResponse(
+        cards=[ScheduledCard(card_id=card_id, due=due) for card_id, due in schedule.due_cards(limit, now)],
+        due_count=schedule.count_due(now),
+        total_cards=schedule.size
+    )
+
+@router.get("/stats", response_model=StudyStatsResponse)
+async def get_stats(
+    days: int = Query(30, ge=1, le=366, description="Глубина истории активности в днях"),
+    user_id: int = Depends(get_current_user_id),
+    schedule: UserSchedule = Depends(get_user_schedule),
+    progress: ProgressSync = Depends(get_progress_sync)
+):
+    """Статистика для дашборда: очередь из расписания, история — из сводок Database Service"""
+    try:
+        stats = await progress.get_stats(user_id, days) or {}
+    except httpx.HTTPError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Статистика временно недоступна"
+        )
+    stats.pop("user_id", None)
+    return StudyStatsResponse(
+        due_count=schedule.count_due(time.time()),
+        total_cards=schedule.size,
+        **stats
+    )
+
+@router.delete("/cards/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_card(
+    card_id: int,
+    user_id: int = Depends(get_current_user_id),
+    schedule: UserSchedule = Depends(get_user_schedule),
+    progress: ProgressSync = Depends(get_progress_sync)
+):
+    """Убрать карточку из расписания"""
+    if not schedule.remove_cards([card_id]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Карточка не в расписании"
+        )
+    progress.removed(user_id, [card_id])
+
+def _session_response(session: StudySession) -> SessionResponse:
+    return SessionResponse(
+        session_id=f"{session.session_id:016x}",
+        mode=MODES[session.mode],
+        deck_id=session.deck_id or None,
+        current_card_id=session.current_card_id,
+        remaining=session.remaining(),
+        done=session.done,
+        cards=[
+            SessionCard(card_id=card_id, attempts=attempts, correct=correct)
+            for card_id, attempts, correct in zip(session.card_ids, session.attempts, session.correct)
+        ],
+        created_at=session.created_at,
+        updated_at=session.touched_at
+    )
+
+async def _get_session(store: SessionStore, session_id: str, user_id: int) -> StudySession:
+    """Сессия пользователя или 404 (в том числе для чужой и истекшей)"""
+    try:
+        session = await store.get(int(session_id, 16), user_id)
+    except ValueError:
+        session = None
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сессия не найдена"
+        )
+    return session
+
+@router.post("/sessions", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_session(
+    data: SessionCreateRequest,
+    user_id: int = Depends(get_current_user_id),
+    store: SessionStore = Depends(get_session_store)
+):
+    """Начать сессию режима Flashcards/Learn/Write/Match по списку карточек"""
+    session = await store.create(user_id, data.mode, data.card_ids, data.deck_id or 0, data.shuffle)
+    return _session_response(session)
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(
+    session_id: str,
+    user_id: int = Depends(get_current_user_id),
+    store: SessionStore = Depends(get_session_store)
+):
+    """Состояние сессии: текущая карточка и попытки по карточкам"""
+    return _session_response(await _get_session(store, session_id, user_id))
+
+@router.post("/sessions/{session_id}/answers", response_model=SessionResponse)
+async def answer_session(
+    session_id: str,
+    data: SessionAnswerRequest,
+    user_id: int = Depends(get_current_user_id),
+    store: SessionStore = Depends(get_session_store)
+):
+    """Ответ на карточку сессии; в Learn и Write неверно отвеченные карточки возвращаются"""
+    session = await _get_session(store, session_id, user_id)
+    if data.card_id not in session.card_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Карточки нет в сессии"
+        )
+    return _session_response(await store.answer(session, data.card_id, data.correct))
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_session(
+    session_id: str,
+    user_id: int = Depends(get_current_user_id),
+    store: SessionStore = Depends(get_session_store)
+):
+    """Завершить сессию"""
+    try:
+        deleted = await store.delete(int(session_id, 16), user_id)
+    except ValueError:
+        deleted = False
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сессия не найдена"
+        )
+
+async def _get_deck(index: DistractorIndex, deck_id: int, user_id: int) -> DeckDistractors:
+    """Индекс дистракторов колоды с проверкой доступа: владелец или публичная"""
+    if not index.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database Service не настроен"
+        )
+    try:
+        deck = await index.get(deck_id)
+    except httpx.HTTPError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database Service недоступен"
+        )
+    if deck is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Колода не найдена"
+        )
+    if deck.owner_id != user_id and not deck.is_public:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Нет доступа к колоде"
+        )
+    return deck
+
+@router.get("/decks/{deck_id}/test", response_model=TestResponse)
+async def get_test(
+    deck_id: int,
+    questions: int = Query(20, ge=1, le=200, description="Количество вопросов"),
+    choices: int = Query(4, ge=2, le=10, description="Вариантов ответа в вопросе"),
+    seed: Optional[int] = Query(None, description="Зерно для воспроизводимого теста"),
+    user_id: int = Depends(get_current_user_id),
+    index: DistractorIndex = Depends(get_distractor_index)
+):
+    """Тест с выбором ответа: неверные варианты — похожие ответы других карточек колоды"""
+    deck = await _get_deck(index, deck_id, user_id)
+    test = deck.make_test(questions, choices, random.Random(seed))
+    return TestResponse(deck_id=deck_id, questions=[
+        TestQuestion(
+            card_id=int(deck.card_ids[slot]),
+            question=deck.questions[slot],
+            options=[TestOption(card_id=int(deck.card_ids[option]), answer=deck.answers[option]) for option in options],
+            answer_index=correct
+        )
+        for slot, options, correct in test
+    ])
+
+@router.get("/decks/{deck_id}/match", response_model=MatchResponse)
+async def get_match(
+    deck_id: int,
+    pairs: int = Query(6, ge=2, le=20, description="Количество пар"),
+    seed: Optional[int] = Query(None, description="Зерно для воспроизводимой игры"),
+    user_id: int = Depends(get_current_user_id),
+    index: DistractorIndex = Depends(get_distractor_index)
+):
+    """Игра на подбор пар из карточек с легко путаемыми ответами"""
+    deck = await _get_deck(index, deck_id, user_id)
+    return MatchResponse(deck_id=deck_id, pairs=[
+        MatchPair(card_id=int(deck.card_ids[slot]), question=deck.questions[slot], answer=deck.answers[slot])
+        for slot in deck.make_match(pairs, random.Random(seed))
+    ])
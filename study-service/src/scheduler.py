@@ -0,0 +1,279 @@
+import asyncio
+import heapq
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import MAX_INTERVAL_DAYS, STUDY_STATE_DIR, STUDY_SCHEDULE_SNAPSHOT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400.0
+MIN_INTERVAL_DAYS = 1.0
+INITIAL_CAPACITY = 64
+# Перестраиваем очередь, когда устаревших записей становится больше, чем живых
+HEAP_COMPACT_MIN = 1024
+
+COLUMNS = ("card_ids", "interval", "due", "reps", "lapses")
+
+
+def next_intervals(interval: np.ndarray, performance: np.ndarray) -> np.ndarray:
+    """Новые интервалы (в днях) для пачки ответов.
+
+    performance: 0 — неверный ответ (интервал уменьшается вдвое), иначе
+    (0, 1] — насколько трудно дался верный ответ: множитель 2.5 - 0.8 * p.
+    Новые карточки (интервал 0) считаются с интервалом в один день.
+    """
+    base = np.maximum(interval, MIN_INTERVAL_DAYS)
+    grown = base * (2.5 - 0.8 * performance)
+    shrunk = np.maximum(base * 0.5, MIN_INTERVAL_DAYS)
+    return np.minimum(np.where(performance <= 0, shrunk, grown), MAX_INTERVAL_DAYS).astype(np.float32)
+
+
+class UserSchedule:
+    """Состояние повторений карточек одного пользователя.
+
+    Поля карточек хранятся колонками NumPy (строка = карточка), поэтому
+    пачка ответов пересчитывается одной векторной операцией. Очередь к
+    повторению — min-heap из (due, card_id) с ленивым удалением: при
+    изменении due добавляется новая запись, а устаревшие отбрасываются при
+    извлечении, так что следующие k карточек выбираются за O(k log n).
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self.card_ids = np.zeros(capacity, dtype=np.int64)
+        self.interval = np.zeros(capacity, dtype=np.float32)  # дни
+        self.due = np.zeros(capacity, dtype=np.float64)  # unix time
+        self.reps = np.zeros(capacity, dtype=np.int32)
+        self.lapses = np.zeros(capacity, dtype=np.int32)
+        self.index: Dict[int, int] = {}
+        self._heap: List[Tuple[float, int]] = []
+
+    def _reserve(self, needed: int):
+        capacity = len(self.card_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def add_cards(self, card_ids: Iterable[int], now: float) -> int:
+        """Добавить новые карточки (к повторению сразу); вернуть число добавленных"""
+        new_ids = [card_id for card_id in dict.fromkeys(card_ids) if card_id not in self.index]
+        if not new_ids:
+            return 0
+        start, end = self.size, self.size + len(new_ids)
+        self._reserve(end)
+        self.card_ids[start:end] = new_ids
+        self.interval[start:end] = 0
+        self.due[start:end] = now
+        self.reps[start:end] = 0
+        self.lapses[start:end] = 0
+        for row, card_id in enumerate(new_ids, start):
+            self.index[card_id] = row
+            heapq.heappush(self._heap, (now, card_id))
+        self.size = end
+        return len(new_ids)
+
+    def remove_cards(self, card_ids: Iterable[int]) -> int:
+        """Удалить карточки; последняя строка переносится на место удаленной"""
+        removed = 0
+        for card_id in card_ids:
+            row = self.index.pop(card_id, None)
+            if row is None:
+                continue
+            last = self.size - 1
+            if row != last:
+                for name in COLUMNS:
+                    column = getattr(self, name)
+                    column[row] = column[last]
+                self.index[int(self.card_ids[row])] = row
+            self.size = last
+            removed += 1
+        # Записи очереди удаленных карточек отбросятся при извлечении
+        self._maybe_compact()
+        return removed
+
+    def rows(self, card_ids: List[int]) -> np.ndarray:
+        """Номера строк карточек; KeyError для неизвестных"""
+        return np.fromiter((self.index[card_id] for card_id in card_ids), dtype=np.int64, count=len(card_ids))
+
+    def review(self, card_ids: List[int], performance: List[float], now: float) -> np.ndarray:
+        """Применить пачку ответов одной векторной операцией; вернуть новые due.
+
+        Если карточка встречается в пачке несколько раз, учитывается последний ответ.
+        """
+        ids = np.asarray(card_ids, dtype=np.int64)
+        perf = np.asarray(performance, dtype=np.float32)
+        # Последнее вхождение каждой карточки
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        ids, perf = ids[keep], perf[keep]
+
+        rows = self.rows(ids.tolist())
+        interval = next_intervals(self.interval[rows], perf)
+        due = now + interval.astype(np.float64) * DAY_SECONDS
+        self.interval[rows] = interval
+        self.due[rows] = due
+        self.reps[rows] += 1
+        self.lapses[rows] += (perf <= 0)
+
+        for entry in zip(due.tolist(), ids.tolist()):
+            heapq.heappush(self._heap, entry)
+        self._maybe_compact()
+        return due
+
+    def due_cards(self, limit: int, now: float) -> List[Tuple[int, float]]:
+        """До limit карточек с due <= now в порядке due: O(k log n)"""
+        result: List[Tuple[float, int]] = []
+        seen = set()
+        heap = self._heap
+        while heap and len(result) < limit:
+            due, card_id = heap[0]
+            if due > now:
+                break
+            heapq.heappop(heap)
+            row = self.index.get(card_id)
+            if row is None or self.due[row] != due or card_id in seen:
+                continue  # устаревшая запись
+            seen.add(card_id)
+            result.append((due, card_id))
+        # Карточки остаются в очереди до ответа
+        for entry in result:
+            heapq.heappush(heap, entry)
+        return [(card_id, due) for due, card_id in result]
+
+    def count_due(self, now: float) -> int:
+        """Число карточек к повторению"""
+        return int(np.count_nonzero(self.due[:self.size] <= now))
+
+    def _maybe_compact(self):
+        if len(self._heap) > 2 * self.size + HEAP_COMPACT_MIN:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = list(zip(self.due[:self.size].tolist(), self.card_ids[:self.size].tolist()))
+        heapq.heapify(self._heap)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name)[:self.size] for name in COLUMNS}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "UserSchedule":
+        size = len(arrays["card_ids"])
+        schedule = cls(max(size, INITIAL_CAPACITY))
+        for name in COLUMNS:
+            getattr(schedule, name)[:size] = arrays[name]
+        schedule.size = size
+        schedule.index = {card_id: row for row, card_id in enumerate(schedule.card_ids[:size].tolist())}
+        schedule._rebuild_heap()
+        return schedule
+
+
+ScheduleLoader = Callable[[int], Awaitable[Optional[UserSchedule]]]
+
+
+class Scheduler:
+    """Расписания повторений всех пользователей воркера.
+
+    Расписание, которого нет в памяти, при первом обращении загружается
+    через load (из состояний в Database Service), поэтому падение процесса
+    не теряет прогресс. Без Database Service страхуют снимки в state_dir:
+    раз в snapshot_interval секунд и при остановке.
+    """
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = STUDY_STATE_DIR,
+        snapshot_interval: float = STUDY_SCHEDULE_SNAPSHOT_INTERVAL
+    ):
+        self.state_dir = state_dir
+        self.snapshot_interval = snapshot_interval
+        self.users: Dict[int, UserSchedule] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def get_or_load(self, user_id: int, load: ScheduleLoader) -> UserSchedule:
+        """Расписание из памяти или из load(); одновременные обращения ждут одну загрузку.
+
+        load() возвращает None, если загружать неоткуда, — тогда расписание
+        пустое. Ошибка загрузки пробрасывается и не кешируется.
+        """
+        schedule = self.users.get(user_id)
+        if schedule is not None:
+            return schedule
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = self._loading[user_id] = asyncio.ensure_future(load(user_id))
+            loading.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        loaded = await asyncio.shield(loading)
+        return self.users.setdefault(user_id, loaded or UserSchedule())
+
+    def load(self):
+        """Загрузить снимки расписаний из state_dir"""
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return
+        for name in os.listdir(self.state_dir):
+            if name.startswith("user-") and name.endswith(".npz"):
+                with np.load(os.path.join(self.state_dir, name)) as arrays:
+                    self.users[int(name[5:-4])] = UserSchedule.from_arrays(dict(arrays))
+
+    def save(self):
+        """Сохранить снимки расписаний в state_dir (синхронно, при остановке)"""
+        if self.state_dir:
+            self._write_snapshots(self._copy_arrays())
+
+    async def snapshot(self):
+        """Сохранить снимки в потоке: event loop только копирует колонки"""
+        if self.state_dir:
+            await asyncio.to_thread(self._write_snapshots, self._copy_arrays())
+
+    def _copy_arrays(self) -> Dict[int, Dict[str, np.ndarray]]:
+        # Копия, чтобы ответы во время записи не меняли колонки под потоком
+        return {
+            user_id: {name: column.copy() for name, column in schedule.to_arrays().items()}
+            for user_id, schedule in self.users.items()
+        }
+
+    def _write_snapshots(self, users: Dict[int, Dict[str, np.ndarray]]):
+        os.makedirs(self.state_dir, exist_ok=True)
+        for user_id, arrays in users.items():
+            path = os.path.join(self.state_dir, f"user-{user_id}.npz")
+            np.savez(path + ".tmp.npz", **arrays)
+            os.replace(path + ".tmp.npz", path)
+
+    async def start(self):
+        if self.state_dir and self.snapshot_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception:
+                logger.warning("Не удалось сохранить снимки расписаний", exc_info=True)
+
+    async def shutdown(self):
+        """Остановить фоновые снимки и записать последний"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.save()
+
+
+# Singleton instance
+scheduler = Scheduler()
+
+def get_scheduler() -> Scheduler:
+    """Dependency для получения планировщика"""
+    return scheduler
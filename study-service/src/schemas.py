@@ -0,0 +1,136 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional
+
+
+class EnrollCardsRequest(BaseModel):
+    card_ids: List[int] = Field(..., min_length=1, max_length=10000)
+
+
+class EnrollCardsResponse(BaseModel):
+    added_count: int
+    total_cards: int
+
+
+class ReviewItem(BaseModel):
+    card_id: int
+    performance: float = Field(..., ge=0, le=1, description="0 — неверно, (0, 1] — трудность верного ответа")
+
+
+class ReviewBatchRequest(BaseModel):
+    reviews: List[ReviewItem] = Field(..., min_length=1, max_length=10000)
+
+
+class ScheduledCard(BaseModel):
+    card_id: int
+    due: float  # unix time
+
+
+class ReviewBatchResponse(BaseModel):
+    cards: List[ScheduledCard]
+
+
+class DueCardsResponse(BaseModel):
+    cards: List[ScheduledCard]
+    due_count: int
+    total_cards: int
+
+
+class DayStats(BaseModel):
+    day: date
+    reviews: int
+    correct: int
+
+
+class DeckStats(BaseModel):
+    deck_id: int
+    reviews: int
+    correct: int
+    last_reviewed_at: Optional[datetime] = None
+
+
+class StudyStatsResponse(BaseModel):
+    due_count: int
+    total_cards: int
+    reviews: int = 0
+    correct: int = 0
+    accuracy: Optional[float] = None
+    current_streak: int = 0
+    longest_streak: int = 0
+    last_active_day: Optional[date] = None
+    days: List[DayStats] = []
+    decks: List[DeckStats] = []
+
+
+class SessionCreateRequest(BaseModel):
+    mode: Literal["flashcards", "learn", "write", "match"]
+    card_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    deck_id: Optional[int] = None
+    shuffle: bool = True
+
+
+class SessionAnswerRequest(BaseModel):
+    card_id: int
+    correct: bool
+
+
+class SessionCard(BaseModel):
+    card_id: int
+    attempts: int
+    correct: int
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    mode: str
+    deck_id: Optional[int] = None
+    current_card_id: Optional[int] = Field(None, description="None — сессия пройдена")
+    remaining: int
+    done: bool
+    cards: List[SessionCard] = Field(..., description="Карточки в порядке показа")
+    created_at: float  # unix time
+    updated_at: float
+
+
+class TestOption(BaseModel):
+    card_id: int
+    answer: str
+
+
+class TestQuestion(BaseModel):
+    card_id: int
+    question: str
+    options: List[TestOption]
+    answer_index: int = Field(..., description="Индекс верного варианта в options")
+
+
+class TestResponse(BaseModel):
+    deck_id: int
+    questions: List[TestQuestion]
+
+
+class MatchPair(BaseModel):
+    card_id: int
+    question: str
+    answer: str
+
+
+class MatchResponse(BaseModel):
+    deck_id: int
+    pairs: List[MatchPair] = Field(..., description="Карточки с похожими ответами; клиент перемешивает колонки")
+
+
+class Event(BaseModel):
+    """Событие outbox Database Service"""
+    id: int
+    topic: str
+    key: str
+    payload: Dict[str, Any]
+
+
+class EventBatchRequest(BaseModel):
+    events: List[Event]
+
+
+class EventBatchResponse(BaseModel):
+    applied: int
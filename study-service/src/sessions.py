@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import os
+import random
+import secrets
+import time
+from array import array
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from src.config import (
+    STUDY_STATE_DIR, STUDY_SESSION_MAX, STUDY_SESSION_TTL, STUDY_SESSION_SNAPSHOT_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+# Режимы из плана проекта; в записи сессии хранится номер режима
+MODES = ("flashcards", "learn", "write", "match")
+# В Learn и Write карточка возвращается, пока на нее не ответят верно;
+# в Flashcards и Match каждую карточку проходят один раз
+REPEAT_UNTIL_CORRECT = {MODES.index("learn"), MODES.index("write")}
+MAX_COUNTER = 0xFFFF
+
+SNAPSHOT_NAME = "sessions.snapshot"
+SNAPSHOT_MAGIC = b"RPSESS01"
+SNAPSHOT_HEADER = np.dtype([("magic", "S8"), ("sessions", "<u8"), ("cards", "<u8")])
+SNAPSHOT_HEADER_SIZE = 64
+# Таблица сессий, затем колонки карточек всех сессий подряд (offset/count — срез сессии)
+SNAPSHOT_SESSION = np.dtype([
+    ("session_id", "<i8"), ("user_id", "<i8"), ("deck_id", "<i8"), ("mode", "u1"), ("cursor", "<i4"),
+    ("offset", "<i8"), ("count", "<i4"), ("created_at", "<f8"), ("touched_at", "<f8")
+])
+
+
+class StudySession:
+    """Состояние одной учебной сессии.
+
+    Порядок карточек и счетчики попыток хранятся массивами array (8 + 2 + 2
+    байта на карточку), а не JSON словарями: сотни тысяч сессий помещаются
+    в память одного узла. deck_id 0 — сессия не привязана к колоде.
+    """
+
+    __slots__ = ("session_id", "user_id", "deck_id", "mode", "cursor",
+                 "card_ids", "attempts", "correct", "created_at", "touched_at")
+
+    def __init__(
+        self,
+        session_id: int,
+        user_id: int,
+        deck_id: int,
+        mode: int,
+        card_ids: array,
+        now: float
+    ):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.deck_id = deck_id
+        self.mode = mode
+        self.cursor = 0
+        self.card_ids = card_ids
+        self.attempts = array("H", bytes(2 * len(card_ids)))
+        self.correct = array("H", bytes(2 * len(card_ids)))
+        self.created_at = now
+        self.touched_at = now
+
+    @property
+    def done(self) -> bool:
+        return self.cursor >= len(self.card_ids)
+
+    @property
+    def current_card_id(self) -> Optional[int]:
+        return None if self.done else self.card_ids[self.cursor]
+
+    def pending(self, position: int) -> bool:
+        """Карточку еще нужно показать"""
+        counters = self.correct if self.mode in REPEAT_UNTIL_CORRECT else self.attempts
+        return counters[position] == 0
+
+    def remaining(self) -> int:
+        counters = self.correct if self.mode in REPEAT_UNTIL_CORRECT else self.attempts
+        return counters.count(0)
+
+    def answer(self, card_id: int, correct: bool):
+        """Учесть ответ; ValueError, если карточки нет в сессии.
+
+        Ответ на текущую карточку переводит курсор к следующей еще не
+        пройденной (по кругу), ответ на другую (Match) курсор не двигает.
+        """
+        position = self.card_ids.index(card_id)
+        self.attempts[position] = min(self.attempts[position] + 1, MAX_COUNTER)
+        if correct:
+            self.correct[position] = min(self.correct[position] + 1, MAX_COUNTER)
+        if not self.done and (position == self.cursor or not self.pending(self.cursor)):
+            self.cursor = self._next_pending(self.cursor)
+
+    def _next_pending(self, start: int) -> int:
+        count = len(self.card_ids)
+        for step in range(1, count + 1):
+            position = (start + step) % count
+            if self.pending(position):
+                return position
+        return count
+
+
+class SessionStore:
+    """Хранилище состояний учебных сессий.
+
+    Для нескольких узлов нужна общая реализация (например, на Redis) с тем
+    же интерфейсом; по умолчанию сессии хранятся в памяти процесса.
+    """
+
+    async def create(self, user_id: int, mode: str, card_ids: List[int], deck_id: int = 0,
+                     shuffle: bool = True) -> StudySession:
+        raise NotImplementedError
+
+    async def get(self, session_id: int, user_id: int) -> Optional[StudySession]:
+        """Сессия пользователя; None — нет, истекла или чужая"""
+        raise NotImplementedError
+
+    async def answer(self, session: StudySession, card_id: int, correct: bool) -> StudySession:
+        raise NotImplementedError
+
+    async def delete(self, session_id: int, user_id: int) -> bool:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Сессии в памяти процесса со снимками на диск.
+
+    Число сессий ограничено STUDY_SESSION_MAX (сверх лимита вытесняются
+    давно не использованные), сессии без обращений дольше
+    STUDY_SESSION_TTL секунд удаляются. Раз в
+    STUDY_SESSION_SNAPSHOT_INTERVAL секунд и при остановке все сессии
+    пишутся в один файл через memory-mapped массивы NumPy в STUDY_STATE_DIR,
+    при запуске загружаются обратно.
+    """
+
+    def __init__(
+        self,
+        state_dir: Optional[str] = STUDY_STATE_DIR,
+        max_sessions: int = STUDY_SESSION_MAX,
+        ttl: float = STUDY_SESSION_TTL,
+        snapshot_interval: float = STUDY_SESSION_SNAPSHOT_INTERVAL
+    ):
+        self.state_dir = state_dir
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.snapshot_interval = snapshot_interval
+        # Порядок — по давности обращения: истекшие и вытесняемые в начале
+        self._sessions: "OrderedDict[int, StudySession]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def create(self, user_id: int, mode: str, card_ids: List[int], deck_id: int = 0,
+                     shuffle: bool = True) -> StudySession:
+        card_ids = list(dict.fromkeys(card_ids))
+        if shuffle:
+            random.shuffle(card_ids)
+        session_id = secrets.randbits(63)
+        while session_id in self._sessions:
+            session_id = secrets.randbits(63)
+        session = StudySession(session_id, user_id, deck_id, MODES.index(mode), array("q", card_ids), time.time())
+        self._sessions[session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    async def get(self, session_id: int, user_id: int) -> Optional[StudySession]:
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        now = time.time()
+        if now - session.touched_at > self.ttl:
+            del self._sessions[session_id]
+            return None
+        session.touched_at = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def answer(self, session: StudySession, card_id: int, correct: bool) -> StudySession:
+        session.answer(card_id, correct)
+        return session
+
+    async def delete(self, session_id: int, user_id: int) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return False
+        del self._sessions[session_id]
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Удалить сессии без обращений дольше ttl; вернуть число удаленных"""
+        deadline = (now or time.time()) - self.ttl
+        expired = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.touched_at > deadline:
+                break
+            self._sessions.popitem(last=False)
+            expired += 1
+        return expired
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.state_dir, SNAPSHOT_NAME)
+
+    def load(self):
+        """Загрузить сессии из снимка (истекшие пропускаются)"""
+        if not self.state_dir or not os.path.exists(self._snapshot_path()):
+            return
+        path = self._snapshot_path()
+        header = np.fromfile(path, dtype=SNAPSHOT_HEADER, count=1)
+        if len(header) != 1 or header["magic"][0] != SNAPSHOT_MAGIC:
+            logger.warning("Снимок сессий %s в неизвестном формате, пропускаем", path)
+            return
+        sessions, cards = int(header["sessions"][0]), int(header["cards"][0])
+        if not sessions:
+            return
+        offset = SNAPSHOT_HEADER_SIZE
+        table = np.memmap(path, dtype=SNAPSHOT_SESSION, mode="r", offset=offset, shape=(sessions,))
+        offset += table.nbytes
+        card_ids = np.memmap(path, dtype="<i8", mode="r", offset=offset, shape=(cards,))
+        offset += card_ids.nbytes
+        attempts = np.memmap(path, dtype="<u2", mode="r", offset=offset, shape=(cards,))
+        correct = np.memmap(path, dtype="<u2", mode="r", offset=offset + attempts.nbytes, shape=(cards,))
+
+        deadline = time.time() - self.ttl
+        # Байтовые срезы memoryview не копируют данные до frombytes
+        card_bytes, attempt_bytes, correct_bytes = (
+            memoryview(column).cast("B") for column in (card_ids, attempts, correct)
+        )
+        # Строки идут по давности обращения, порядок OrderedDict сохраняется
+        for row in table.tolist():
+            session_id, user_id, deck_id, mode, cursor, start, count, created_at, touched_at = row
+            if touched_at <= deadline:
+                continue
+            session = StudySession(session_id, user_id, deck_id, mode, array("q"), created_at)
+            session.card_ids.frombytes(card_bytes[8 * start:8 * (start + count)])
+            session.attempts.frombytes(attempt_bytes[2 * start:2 * (start + count)])
+            session.correct.frombytes(correct_bytes[2 * start:2 * (start + count)])
+            session.cursor = cursor
+            session.touched_at = touched_at
+            self._sessions[session_id] = session
+        card_bytes.release()
+        attempt_bytes.release()
+        correct_bytes.release()
+        del table, card_ids, attempts, correct
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def save(self):
+        """Записать снимок всех сессий (синхронно, при остановке)"""
+        if self.state_dir:
+            self._write_snapshot(list(self._sessions.values()))
+
+    async def snapshot(self):
+        """Записать снимок в потоке: event loop только собирает список сессий"""
+        if self.state_dir:
+            await asyncio.to_thread(self._write_snapshot, list(self._sessions.values()))
+
+    def _write_snapshot(self, sessions: List[StudySession]):
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._snapshot_path()
+        tmp_path = path + ".tmp"
+        counts = np.fromiter((len(session.card_ids) for session in sessions), dtype=np.int64, count=len(sessions))
+        cards = int(counts.sum())
+        size = SNAPSHOT_HEADER_SIZE + len(sessions) * SNAPSHOT_SESSION.itemsize + cards * (8 + 2 + 2)
+        with open(tmp_path, "wb") as f:
+            header = np.zeros(1, dtype=SNAPSHOT_HEADER)
+            header[0] = (SNAPSHOT_MAGIC, len(sessions), cards)
+            f.write(header.tobytes())
+            f.truncate(size)
+        if sessions:
+            offset = SNAPSHOT_HEADER_SIZE
+            table = np.memmap(tmp_path, dtype=SNAPSHOT_SESSION, mode="r+", offset=offset, shape=(len(sessions),))
+            offsets = np.zeros(len(sessions), dtype=np.int64)
+            np.cumsum(counts[:-1], out=offsets[1:])
+            table["session_id"] = [session.session_id for session in sessions]
+            table["user_id"] = [session.user_id for session in sessions]
+            table["deck_id"] = [session.deck_id for session in sessions]
+            table["mode"] = [session.mode for session in sessions]
+            table["cursor"] = [session.cursor for session in sessions]
+            table["offset"] = offsets
+            table["count"] = counts
+            table["created_at"] = [session.created_at for session in sessions]
+            table["touched_at"] = [session.touched_at for session in sessions]
+            offset += table.nbytes
+            table.flush()
+            del table
+            for dtype, column in (("<i8", "card_ids"), ("<u2", "attempts"), ("<u2", "correct")):
+                if not cards:
+                    break
+                data = np.memmap(tmp_path, dtype=dtype, mode="r+", offset=offset, shape=(cards,))
+                data[:] = np.frombuffer(b"".join(getattr(session, column).tobytes() for session in sessions),
+                                        dtype=dtype)
+                offset += data.nbytes
+                data.flush()
+                del data
+        os.replace(tmp_path, path)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                self.expire()
+                await self.snapshot()
+            except Exception:
+                logger.warning("Не удалось сохранить снимок сессий", exc_info=True)
+
+    async def shutdown(self):
+        """Остановить фоновые снимки и записать последний"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.expire()
+        self.save()
+
+
+# Singleton instance
+session_store = MemorySessionStore()
+
+def get_session_store() -> SessionStore:
+    """Dependency для получения хранилища сессий"""
+    return session_store
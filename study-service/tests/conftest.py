@@ -0,0 +1,26 @@
+import asyncio
+import inspect
+
+import pytest
+
+from src.sessions import MemorySessionStore
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def тесты выполняются в своем event loop через asyncio.run (без pytest-asyncio)"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    asyncio.run(pyfuncitem.obj(**{name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}))
+    return True
+
+
+@pytest.fixture
+def make_session_store(tmp_path):
+    """MemorySessionStore со снимками в общем временном каталоге теста"""
+    def make(**kwargs) -> MemorySessionStore:
+        options = dict(state_dir=str(tmp_path), max_sessions=100, ttl=3600, snapshot_interval=60)
+        options.update(kwargs)
+        return MemorySessionStore(**options)
+    return make
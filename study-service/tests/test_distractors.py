@@ -0,0 +1,117 @@
+import asyncio
+import copy
+import random
+
+import httpx
+import numpy as np
+
+from src.distractors import DeckDistractors, DistractorIndex
+from src.schemas import Event
+
+WORDS = ["париж", "лондон", "берлин", "рим", "мадрид", "вена", "прага", "осло", "1812", "1945", "42"]
+
+
+def _answer(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def _neighbor_scores(deck: DeckDistractors) -> dict:
+    """Отсортированные оценки соседей каждой карточки (устойчиво к равным оценкам)"""
+    return {
+        card_id: np.sort(deck.scores[slot][deck.neighbors[slot] >= 0])
+        for card_id, slot in deck.index.items()
+    }
+
+
+def test_incremental_updates_match_full_rebuild():
+    rng = random.Random(5)
+    deck = DeckDistractors(1, top_k=5)
+    version = 0
+    cards = []
+    for card_id in range(1, 61):
+        version += 1
+        cards.append((card_id, version, f"q{card_id}", _answer(rng)))
+    deck.upsert_cards(cards, rebuild=True)
+    next_id = 61
+
+    for _ in range(200):
+        op = rng.random()
+        version += 1
+        if op < 0.4:
+            deck.upsert_cards([(next_id, version, f"q{next_id}", _answer(rng))])
+            next_id += 1
+        elif op < 0.7 and deck.index:
+            card_id = rng.choice(list(deck.index))
+            deck.upsert_cards([(card_id, version, f"q{card_id}", _answer(rng))])
+        elif deck.index:
+            deck.remove_cards([(rng.choice(list(deck.index)), version)])
+
+        rebuilt = copy.deepcopy(deck)
+        rebuilt.rebuild()
+        incremental, expected = _neighbor_scores(deck), _neighbor_scores(rebuilt)
+        assert incremental.keys() == expected.keys()
+        for card_id, scores in expected.items():
+            np.testing.assert_allclose(incremental[card_id], scores, atol=1e-5, err_msg=f"card {card_id}")
+
+
+def _event(topic: str, **payload) -> Event:
+    return Event(id=0, topic=topic, key=f"deck:{payload['deck_id']}", payload=payload)
+
+
+async def test_events_during_load_are_kept():
+    page_requested = asyncio.Event()
+    release_page = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/v1/decks/1":
+            return httpx.Response(200, json={"id": 1, "version": 1, "owner_id": 7, "is_public": False})
+        # Страница карточек прочитана до событий, но приходит после них
+        page = {"cards": [
+            {"id": 10, "version": 2, "question": "q10", "answer": "париж", "rank": "a0"},
+            {"id": 11, "version": 3, "question": "q11", "answer": "лондон", "rank": "a1"},
+        ], "has_more": False}
+        page_requested.set()
+        await release_page.wait()
+        return httpx.Response(200, json=page)
+
+    index = DistractorIndex(base_url="http://database-service")
+    index._client = httpx.AsyncClient(base_url="http://database-service", transport=httpx.MockTransport(handler))
+    loading = asyncio.create_task(index.get(1))
+    await page_requested.wait()
+
+    applied = index.apply([
+        _event("card.upserted", card_id=12, deck_id=1, question="q12", answer="берлин", version=4),
+        _event("card.upserted", card_id=10, deck_id=1, question="q10", answer="рим", version=5),
+        _event("card.deleted", card_id=11, deck_id=1, version=6),
+        _event("deck.upserted", deck_id=1, owner_id=7, is_public=True, version=7),
+    ])
+    assert applied == 3
+    release_page.set()
+    deck = await loading
+    await index.close()
+
+    assert deck is index.decks[1]
+    assert sorted(deck.index) == [10, 12]
+    assert deck.answers[deck.index[10]] == "рим"
+    assert deck.is_public
+
+
+async def test_deck_deleted_during_load_is_not_cached():
+    release_page = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/v1/decks/1":
+            return httpx.Response(200, json={"id": 1, "version": 1, "owner_id": 7, "is_public": False})
+        await release_page.wait()
+        return httpx.Response(200, json={"cards": [], "has_more": False})
+
+    index = DistractorIndex(base_url="http://database-service")
+    index._client = httpx.AsyncClient(base_url="http://database-service", transport=httpx.MockTransport(handler))
+    loading = asyncio.create_task(index.get(1))
+    while 1 not in index._building or index._building[1].deck_version == 0:
+        await asyncio.sleep(0)
+    index.apply([_event("deck.deleted", deck_id=1, owner_id=7, version=2)])
+    release_page.set()
+    assert await loading is None
+    await index.close()
+    assert 1 not in index.decks
@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+
+from src.progress import ProgressSync
+from src.scheduler import Scheduler, UserSchedule
+
+
+def _review_rows(count: int):
+    return [
+        {"card_id": card_id, "interval": 2.0, "due": 1000.0 + card_id, "reps": 3, "lapses": 1}
+        for card_id in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def make_progress():
+    """ProgressSync, чьи запросы к Database Service обслуживает handler (httpx.MockTransport)"""
+    def make(handler) -> ProgressSync:
+        progress = ProgressSync(base_url="http://db")
+        progress._client = httpx.AsyncClient(base_url="http://db", transport=httpx.MockTransport(handler))
+        return progress
+    return make
+
+
+async def test_schedule_is_restored_from_saved_reviews(make_progress):
+    rows = _review_rows(2500)
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        after = int(request.url.params["after_card_id"])
+        limit = int(request.url.params["limit"])
+        return httpx.Response(200, json=[row for row in rows if row["card_id"] > after][:limit])
+
+    scheduler, progress = Scheduler(state_dir=""), make_progress(handler)
+    # Одновременные первые обращения ждут одну загрузку
+    schedules = await asyncio.gather(*(scheduler.get_or_load(7, progress.load_schedule) for _ in range(5)))
+    assert all(schedule is schedules[0] for schedule in schedules)
+    schedule = schedules[0]
+    assert schedule.size == 2500
+    assert len(requests) == 3
+    row = schedule.index[42]
+    assert schedule.due[row] == 1042.0
+    assert schedule.reps[row] == 3
+    assert schedule.due_cards(2, now=1002.5) == [(1, 1001.0), (2, 1002.0)]
+
+
+async def test_pending_changes_override_saved_reviews(make_progress):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=_review_rows(3))
+
+    progress = make_progress(handler)
+    progress.removed(7, [3])
+    schedule = await progress.load_schedule(7)
+    assert sorted(schedule.index) == [1, 2]
+
+
+async def test_failed_load_is_not_cached_as_empty_schedule(make_progress):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json=_review_rows(2))
+
+    scheduler, progress = Scheduler(state_dir=""), make_progress(handler)
+    with pytest.raises(httpx.HTTPStatusError):
+        await scheduler.get_or_load(7, progress.load_schedule)
+    assert (await scheduler.get_or_load(7, progress.load_schedule)).size == 2
+
+
+async def test_snapshot_round_trip(tmp_path):
+    scheduler = Scheduler(state_dir=str(tmp_path))
+    schedule = scheduler.users[7] = UserSchedule()
+    schedule.add_cards([10, 20, 30], now=100.0)
+    schedule.review([20], [0.0], now=200.0)
+    await scheduler.snapshot()
+
+    restored = Scheduler(state_dir=str(tmp_path))
+    restored.load()
+    for name, column in schedule.to_arrays().items():
+        np.testing.assert_array_equal(restored.users[7].to_arrays()[name], column)
@@ -0,0 +1,48 @@
+import time
+
+from src.sessions import MODES
+
+
+def _fields(session):
+    return (
+        session.session_id, session.user_id, session.deck_id, session.mode, session.cursor,
+        list(session.card_ids), list(session.attempts), list(session.correct),
+        session.created_at, session.touched_at
+    )
+
+
+async def test_snapshot_round_trip(make_session_store):
+    store = make_session_store()
+    first = await store.create(1, "learn", [10, 11, 12], deck_id=7, shuffle=False)
+    await store.answer(first, 10, False)
+    await store.answer(first, 11, True)
+    await store.create(2, "flashcards", [], shuffle=False)
+    third = await store.create(1, "match", list(range(100, 400)), deck_id=8)
+    await store.answer(third, third.current_card_id, True)
+    # Обращение переносит сессию в конец порядка вытеснения
+    await store.get(first.session_id, 1)
+    await store.snapshot()
+
+    restored = make_session_store()
+    restored.load()
+    assert [_fields(s) for s in restored._sessions.values()] == [_fields(s) for s in store._sessions.values()]
+    assert list(restored._sessions.values())[-1].mode == MODES.index("learn")
+
+
+async def test_snapshot_skips_expired_and_keeps_limit(make_session_store):
+    store = make_session_store()
+    sessions = [await store.create(user_id, "write", [user_id], shuffle=False) for user_id in range(1, 6)]
+    sessions[0].touched_at = time.time() - 7200
+    store.save()
+
+    restored = make_session_store(max_sessions=3)
+    restored.load()
+    # Истекшая пропущена, из оставшихся четырех вытеснена давняя
+    assert list(restored._sessions) == [s.session_id for s in sessions[2:]]
+
+
+def test_empty_snapshot_loads_nothing(make_session_store):
+    make_session_store().save()
+    restored = make_session_store()
+    restored.load()
+    assert len(restored) == 0
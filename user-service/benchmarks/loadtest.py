@@ -0,0 +1,452 @@
+"""Нагрузочный тест аутентификации User Service.
+
+Запуск из каталога user-service:
+
+    # против in-process заглушки Database Service
+    python -m benchmarks.loadtest --duration 10 --concurrency 16
+
+    # против реального стека
+    python -m benchmarks.loadtest --target http://localhost:8001
+
+    # открытый цикл: фиксированная интенсивность запросов в секунду
+    python -m benchmarks.loadtest --rate 200
+
+    # сравнение с сохраненным baseline (код выхода 1 при регрессии)
+    python -m benchmarks.loadtest --baseline benchmarks/baseline.json
+
+С --baseline настройки нагрузки, не заданные явно, берутся из baseline, и
+прогон сравним с ним. Явно заданные отличающиеся настройки, операция с
+числом замеров меньше --min-samples и регрессия дают код выхода 1. Хост
+baseline записан в файл; на другом хосте выводится предупреждение.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_MIX = "signup=1,login=4,refresh=4,verify=8"
+PASSWORD = "loadtest-password"
+
+# Настройки нагрузки: значения по умолчанию и ключи для baseline.json.
+# Длительность выбрана так, чтобы даже signup (bcrypt, отказы допуска)
+# набирал --min-samples замеров на одном ядре
+LOAD_DEFAULTS = {
+    "target": "inprocess",
+    "mix": DEFAULT_MIX,
+    "duration": 180.0,
+    "concurrency": 16,
+    "rate": None,
+    "max_in_flight": 1000,
+    "rate_limits": False,
+    "users": 50,
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Разобрать строку вида ``login=4,verify=8``"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Неизвестная операция: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Перцентиль методом nearest-rank"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Session:
+    """Общее состояние нагрузки: созданные пользователи и выданные токены"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.usernames: List[str] = []
+        self.refresh_tokens: List[str] = []
+        self.access_tokens: List[str] = []
+
+    def remember_tokens(self, body: dict):
+        # Ограничиваем пулы, чтобы не расти бесконечно на длинных прогонах
+        for pool, key in ((self.refresh_tokens, "refresh_token"), (self.access_tokens, "access_token")):
+            if body.get(key):
+                pool.append(body[key])
+                if len(pool) > 10000:
+                    del pool[:5000]
+
+
+async def op_signup(session: Session) -> httpx.Response:
+    username = f"lt_{uuid.uuid4().hex[:16]}"
+    response = await session.client.post("/api/v1/signup", json={
+        "username": username, "email": f"{username}@loadtest.local", "password": PASSWORD,
+    })
+    if response.status_code == 200:
+        session.usernames.append(username)
+    return response
+
+
+async def op_login(session: Session) -> httpx.Response:
+    response = await session.client.post("/api/v1/login", json={
+        "username": random.choice(session.usernames), "password": PASSWORD,
+    })
+    if response.status_code == 200:
+        session.remember_tokens(response.json())
+    return response
+
+
+async def op_refresh(session: Session) -> Optional[httpx.Response]:
+    # При ротации токен одноразовый: берем его из пула, вместо него — новый из ответа
+    pool = session.refresh_tokens
+    if not pool:
+        # Все токены разобраны параллельными обменами
+        await op_login(session)
+    if not pool:
+        # Вход отклонен контролем допуска — обменивать нечего
+        return None
+    refresh_token = pool.pop(random.randrange(len(pool)))
+    response = await session.client.post("/api/v1/refresh", json={"refresh_token": refresh_token})
+    if response.status_code == 200:
+        body = response.json()
+        session.remember_tokens({**body, "refresh_token": body.get("refresh_token") or refresh_token})
+    return response
+
+
+async def op_verify(session: Session) -> Optional[httpx.Response]:
+    if not session.access_tokens:
+        return None
+    return await session.client.get("/api/v1/verify", headers={
+        "Authorization": f"Bearer {random.choice(session.access_tokens)}",
+    })
+
+
+OPERATIONS = {
+    "signup": op_signup,
+    "login": op_login,
+    "refresh": op_refresh,
+    "verify": op_verify,
+}
+
+
+class Recorder:
+    """Сбор латентностей и ошибок по операциям"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        # Отказы контроля допуска (429/503) — ожидаемое поведение под нагрузкой
+        self.shed: Dict[str, int] = defaultdict(int)
+        # Операции без запроса: нет токена, все входы отклонены
+        self.skipped: Dict[str, int] = defaultdict(int)
+
+    async def run(self, name: str, session: Session, scheduled: Optional[float] = None) -> Optional[float]:
+        """Выполнить операцию; при отказе допуска вернуть Retry-After (секунды)"""
+        # В открытом цикле латентность считается от запланированного момента,
+        # чтобы очередь на стороне клиента не скрывала деградацию сервера
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = await OPERATIONS[name](session)
+            if response is None:
+                self.skipped[name] += 1
+                return
+            ok = response.status_code < 400
+            if response.status_code in (429, 503):
+                self.shed[name] += 1
+                return float(response.headers.get("Retry-After", 1))
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            self.latencies[name].append((time.perf_counter() - start) * 1000)
+        else:
+            self.errors[name] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name in sorted(set(self.latencies) | set(self.errors) | set(self.shed) | set(self.skipped)):
+            values = sorted(self.latencies[name])
+            result[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "shed": self.shed[name],
+                "skipped": self.skipped[name],
+                "throughput": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+            }
+        return result
+
+
+def choose(mix: Dict[str, int]) -> str:
+    return random.choices(list(mix), weights=list(mix.values()))[0]
+
+
+async def closed_loop(session, recorder, mix, concurrency: int, duration: float):
+    """Замкнутый цикл: N воркеров, каждый отправляет запрос после ответа на предыдущий.
+
+    После отказа допуска воркер, как настоящий клиент, ждет Retry-After:
+    иначе мгновенные повторы меряют скорость отказов, а не сервис.
+    """
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            retry_after = await recorder.run(choose(mix), session)
+            if retry_after:
+                await asyncio.sleep(min(retry_after, max(deadline - time.perf_counter(), 0)))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(session, recorder, mix, rate: float, duration: float, max_in_flight: int):
+    """Открытый цикл: запросы приходят пуассоновским потоком с заданной интенсивностью"""
+    tasks = set()
+    start = time.perf_counter()
+    next_at = start
+    while next_at < start + duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) < max_in_flight:
+            task = asyncio.create_task(recorder.run(choose(mix), session, scheduled=next_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        else:
+            recorder.errors["dropped"] += 1
+        next_at += random.expovariate(rate)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def build_inprocess_client(rate_limits: bool) -> Tuple[httpx.AsyncClient, object]:
+    """User Service в процессе, Database Service заменен заглушкой в памяти"""
+    from src.main import app
+    from src.admission import AdmissionController, get_admission_controller
+    from src.auth_service import AuthService, get_auth_service, pwd_context
+    from src.database_client import DatabaseClient
+    from src.revocation import RevocationSet
+    from src.token_writer import TokenWriter
+    from benchmarks.stub_database_service import StubStore, create_stub_app
+
+    store = StubStore()
+    stub_client = DatabaseClient(
+        base_url="http://database-service.stub",
+        transport=httpx.ASGITransport(app=create_stub_app(store)),
+    )
+    # Все запросы идут с одного адреса, поэтому лимиты по IP по умолчанию выключены
+    admission = AdmissionController(rate_limits_enabled=rate_limits)
+    service = AuthService(stub_client, admission, RevocationSet(stub_client), TokenWriter(stub_client))
+    app.dependency_overrides[get_auth_service] = lambda: service
+    app.dependency_overrides[get_admission_controller] = lambda: admission
+    # Один хеш на всех предзаполненных пользователей: bcrypt не нужен на прогреве
+    store.seed_hash = pwd_context.hash(PASSWORD)
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://user-service.local",
+        timeout=60.0,
+    )
+    return client, store
+
+
+async def warmup(session: Session, store, users: int):
+    """Создать пользователей и выдать начальные токены"""
+    if store is not None:
+        for _ in range(users):
+            username = f"lt_seed_{uuid.uuid4().hex[:12]}"
+            store.add_user(username, f"{username}@loadtest.local", store.seed_hash)
+            session.usernames.append(username)
+    else:
+        await asyncio.gather(*(op_signup(session) for _ in range(users)))
+    for _ in range(min(users, 8)):
+        await op_login(session)
+    if not session.refresh_tokens:
+        raise RuntimeError("Не удалось выполнить вход на прогреве — проверьте целевой сервис")
+
+
+def host_info() -> Dict[str, Any]:
+    """Хост прогона: с ним сравнивают baseline"""
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def service_settings(target: str) -> Dict[str, Any]:
+    """Настройки User Service, от которых зависят цифры (только inprocess)"""
+    if target != "inprocess":
+        return {}
+    from src import admission
+    return {
+        "max_concurrent_password_hashes": admission.MAX_CONCURRENT_PASSWORD_HASHES,
+        "password_hash_queue_timeout": admission.PASSWORD_HASH_QUEUE_TIMEOUT,
+    }
+
+
+def resolve_settings(args, baseline: Optional[Dict]) -> Tuple[Dict[str, Any], List[str]]:
+    """Настройки нагрузки: явные аргументы, иначе из baseline, иначе по умолчанию.
+
+    Возвращает настройки и список явно заданных, отличающихся от baseline.
+    """
+    recorded = (baseline or {}).get("settings", {})
+    settings, mismatched = {}, []
+    for key, default in LOAD_DEFAULTS.items():
+        value = getattr(args, key)
+        if value is None:
+            value = recorded.get(key, default)
+        elif key in recorded and recorded[key] != value:
+            mismatched.append(f"{key}: {value} (в baseline {recorded[key]})")
+        settings[key] = value
+    return settings, mismatched
+
+
+def insufficient(result: Dict, min_samples: int) -> List[str]:
+    """Операции, у которых меньше min_samples успешных замеров"""
+    return [
+        f"{name}: {row['count']} замеров < {min_samples}"
+        for name, row in result.items() if row["count"] < min_samples
+    ]
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float, min_samples: int) -> List[str]:
+    """Сравнить с baseline: падение throughput или рост p95 больше допуска — регрессия.
+
+    Перцентили по нескольким десяткам замеров шумят сильнее допуска, поэтому
+    операция с числом замеров меньше min_samples — тоже ошибка, а не успех.
+    """
+    problems = []
+    for name, base in baseline["results"].items():
+        current = result.get(name)
+        if not current:
+            problems.append(f"{name}: нет данных в текущем прогоне")
+            continue
+        if current["count"] < min_samples:
+            problems.append(f"{name}: {current['count']} замеров < {min_samples}, сравнение ненадежно")
+            continue
+        if current["throughput"] < base["throughput"] * (1 - tolerance):
+            problems.append(
+                f"{name}: throughput {current['throughput']} < {base['throughput']} (-{tolerance:.0%})"
+            )
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {current['p95_ms']}ms > {base['p95_ms']}ms (+{tolerance:.0%})")
+    return problems
+
+
+async def main(args) -> int:
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    settings, mismatched = resolve_settings(args, baseline)
+    if mismatched:
+        print("Настройки отличаются от baseline, сравнение невозможно:")
+        for item in mismatched:
+            print(f"  - {item}")
+        return 1
+
+    mix = parse_mix(settings["mix"])
+    if settings["target"] == "inprocess":
+        client, store = build_inprocess_client(settings["rate_limits"])
+    else:
+        client, store = httpx.AsyncClient(base_url=settings["target"], timeout=60.0), None
+
+    async with client:
+        session = Session(client)
+        await warmup(session, store, settings["users"])
+        recorder = Recorder()
+        start = time.perf_counter()
+        if settings["rate"]:
+            await open_loop(
+                session, recorder, mix, settings["rate"], settings["duration"], settings["max_in_flight"]
+            )
+        else:
+            await closed_loop(session, recorder, mix, settings["concurrency"], settings["duration"])
+        result = recorder.report(time.perf_counter() - start)
+
+    print(f"{'operation':<10}{'count':>8}{'errors':>8}{'shed':>8}{'skipped':>9}{'rps':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in result.items():
+        print(f"{name:<10}{row['count']:>8}{row['errors']:>8}{row['shed']:>8}{row['skipped']:>9}{row['throughput']:>10}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": host_info(),
+        "settings": settings,
+        "service": service_settings(settings["target"]),
+        "results": result,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        short = insufficient(result, args.min_samples)
+        if short:
+            print("Baseline не сохранен, мало замеров (увеличьте --duration):")
+            for item in short:
+                print(f"  - {item}")
+            return 1
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Baseline сохранен в {args.save_baseline}")
+
+    if baseline:
+        for key, value in baseline.get("host", {}).items():
+            if report["host"].get(key) != value:
+                print(f"Предупреждение: baseline снят на другом хосте ({key}: {value}), цифры могут не совпасть")
+                break
+        if baseline.get("service", {}) != report["service"]:
+            print(f"Предупреждение: настройки сервиса отличаются от baseline ({baseline.get('service')})")
+        problems = compare(result, baseline, args.tolerance, args.min_samples)
+        if problems:
+            print("Регрессия производительности:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return 1
+        print("Регрессий относительно baseline нет")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест User Service")
+    # Настройки нагрузки без значений по умолчанию: их подставляет resolve_settings
+    parser.add_argument("--target", help="URL User Service или 'inprocess' для заглушки Database Service")
+    parser.add_argument("--mix", help=f"Смесь операций с весами (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float,
+                        help=f"Длительность, секунды (по умолчанию {LOAD_DEFAULTS['duration']:.0f})")
+    parser.add_argument("--concurrency", type=int, help="Воркеров в замкнутом цикле (по умолчанию 16)")
+    parser.add_argument("--rate", type=float, help="Запросов в секунду (открытый цикл)")
+    parser.add_argument("--max-in-flight", type=int,
+                        help="Лимит одновременных запросов в открытом цикле (по умолчанию 1000)")
+    parser.add_argument("--rate-limits", action="store_true", default=None,
+                        help="Не отключать лимиты по IP/имени в режиме inprocess")
+    parser.add_argument("--users", type=int, help="Пользователей на прогреве (по умолчанию 50)")
+    parser.add_argument("--output", help="Сохранить результат в JSON")
+    parser.add_argument("--baseline", help="JSON с baseline для сравнения")
+    parser.add_argument("--save-baseline", help="Сохранить результат как новый baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимое отклонение от baseline")
+    parser.add_argument("--min-samples", type=int, default=50,
+                        help="Минимум успешных замеров каждой операции для baseline и сравнения")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
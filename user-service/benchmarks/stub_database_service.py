@@ -0,0 +1,219 @@
+"""In-process заглушка Database Service для нагрузочных тестов.
+
+Реализует те же эндпоинты, что использует ``DatabaseClient``, но хранит
+данные в памяти. Позволяет мерить User Service без PostgreSQL и сети.
+"""
+import base64
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, HTTPException, status
+from pydantic import BaseModel
+
+
+class UserCreate(BaseModel):
+    username: str
+    email: str
+    password_hash: str
+
+
+class UserUpdate(BaseModel):
+    username: Optional[str] = None
+    email: Optional[str] = None
+    password_hash: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class TokenCreate(BaseModel):
+    token_hash: str
+    user_id: int
+    expires_at: datetime
+
+
+class TokenBulkCreate(BaseModel):
+    tokens: List[TokenCreate]
+
+
+class TokenRevoke(BaseModel):
+    token_hash: str
+    user_id: Optional[int] = None
+
+
+class TokenRotate(BaseModel):
+    token_hash: str
+    new_token_hash: str
+    expires_at: datetime
+    user_id: Optional[int] = None
+
+
+class StubStore:
+    """Хранилище пользователей и токенов в памяти"""
+
+    def __init__(self):
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.by_username: Dict[str, int] = {}
+        self.by_email: Dict[str, int] = {}
+        self.tokens: Dict[str, Dict[str, Any]] = {}
+        self._user_seq = 0
+        self._token_seq = 0
+        # Хеш пароля для пользователей, создаваемых напрямую в обход signup
+        self.seed_hash: Optional[str] = None
+
+    def add_user(self, username: str, email: str, password_hash: str) -> Dict[str, Any]:
+        self._user_seq += 1
+        user = {
+            "id": self._user_seq,
+            "username": username,
+            "email": email,
+            "password_hash": password_hash,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "updated_at": None,
+            "is_active": True,
+        }
+        self.users[user["id"]] = user
+        self.by_username[username] = user["id"]
+        self.by_email[email] = user["id"]
+        return user
+
+    def add_token(self, token_hash: str, user_id: int, expires_at: datetime) -> Dict[str, Any]:
+        self._token_seq += 1
+        token = {
+            "id": self._token_seq,
+            "token_hash": token_hash,
+            "user_id": user_id,
+            "expires_at": expires_at.isoformat(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "is_revoked": False,
+            "_expires": expires_at,
+        }
+        self.tokens[token_hash] = token
+        return token
+
+
+def _public(token: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in token.items() if not k.startswith("_")}
+
+
+def create_stub_app(store: Optional[StubStore] = None) -> FastAPI:
+    """Создать FastAPI приложение-заглушку Database Service"""
+    store = store or StubStore()
+    app = FastAPI(title="Database Service stub")
+    app.state.store = store
+
+    def _user_or_404(user_id: Optional[int]) -> Dict[str, Any]:
+        user = store.users.get(user_id) if user_id is not None else None
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+        return user
+
+    @app.post("/api/v1/users/", status_code=status.HTTP_201_CREATED)
+    async def create_user(data: UserCreate):
+        if data.username in store.by_username:
+            raise HTTPException(status_code=400, detail="Пользователь с таким именем уже существует")
+        if data.email in store.by_email:
+            raise HTTPException(status_code=400, detail="Пользователь с таким email уже существует")
+        return store.add_user(data.username, data.email, data.password_hash)
+
+    @app.get("/api/v1/users/{user_id}")
+    async def get_user(user_id: int):
+        return _user_or_404(user_id)
+
+    @app.get("/api/v1/users/search/by-username/{username}")
+    async def get_user_by_username(username: str):
+        return _user_or_404(store.by_username.get(username))
+
+    @app.get("/api/v1/users/search/by-email/{email}")
+    async def get_user_by_email(email: str):
+        return _user_or_404(store.by_email.get(email))
+
+    @app.put("/api/v1/users/{user_id}")
+    async def update_user(user_id: int, data: UserUpdate):
+        user = _user_or_404(user_id)
+        user.update(data.model_dump(exclude_unset=True))
+        user["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return user
+
+    @app.delete("/api/v1/users/{user_id}")
+    async def delete_user(user_id: int):
+        user = _user_or_404(user_id)
+        del store.users[user_id]
+        store.by_username.pop(user["username"], None)
+        store.by_email.pop(user["email"], None)
+        return {"success": True, "message": "Пользователь успешно удален"}
+
+    @app.post("/api/v1/tokens/", status_code=status.HTTP_201_CREATED)
+    async def create_token(data: TokenCreate):
+        return _public(store.add_token(data.token_hash, data.user_id, data.expires_at))
+
+    @app.post("/api/v1/tokens/bulk", status_code=status.HTTP_201_CREATED)
+    async def create_tokens_bulk(data: TokenBulkCreate):
+        fresh = [token for token in data.tokens if token.token_hash not in store.tokens]
+        for token in fresh:
+            store.add_token(token.token_hash, token.user_id, token.expires_at)
+        return {"created": len(fresh)}
+
+    @app.get("/api/v1/tokens/verify/{token_hash}")
+    async def verify_token(token_hash: str):
+        token = store.tokens.get(token_hash)
+        if not token or token["is_revoked"] or token["_expires"] <= datetime.now(timezone.utc):
+            raise HTTPException(status_code=404, detail="Токен не найден, отозван или истек")
+        return _public(token)
+
+    @app.post("/api/v1/tokens/rotate")
+    async def rotate_token(data: TokenRotate):
+        token = store.tokens.get(data.token_hash)
+        if not token or token["is_revoked"] or token["_expires"] <= datetime.now(timezone.utc):
+            raise HTTPException(status_code=404, detail="Токен не найден, отозван или истек")
+        # Обнаружение повторного использования не моделируется: старый хеш просто удаляется
+        del store.tokens[data.token_hash]
+        return _public(store.add_token(data.new_token_hash, token["user_id"], data.expires_at))
+
+    @app.post("/api/v1/tokens/revoke")
+    async def revoke_token(data: TokenRevoke):
+        token = store.tokens.get(data.token_hash)
+        if not token:
+            raise HTTPException(status_code=404, detail="Токен не найден")
+        token["is_revoked"] = True
+        return {"success": True, "message": "Токен успешно отозван"}
+
+    @app.get("/api/v1/tokens/revocations")
+    async def get_revocations(since: Optional[float] = None):
+        # Всегда полный снимок без фильтра: отозванные просто не попадают в префиксы
+        now = datetime.now(timezone.utc)
+        prefixes = array("Q", sorted(
+            int(token_hash[:16], 16) for token_hash, token in store.tokens.items()
+            if not token["is_revoked"] and token["_expires"] > now and len(token_hash) == 64
+        ))
+        if sys.byteorder == "big":
+            prefixes.byteswap()
+        return {
+            "version": time.time(),
+            "full": True,
+            "prefixes": base64.b64encode(prefixes.tobytes()).decode(),
+            "bloom": None,
+            "bloom_bits": 0,
+            "bloom_hashes": 0,
+            "revoked": []
+        }
+
+    @app.post("/api/v1/tokens/revoke-user/{user_id}")
+    async def revoke_user_tokens(user_id: int):
+        count = 0
+        for token in store.tokens.values():
+            if token["user_id"] == user_id and not token["is_revoked"]:
+                token["is_revoked"] = True
+                count += 1
+        return {"success": True, "message": f"Отозвано токенов: {count}"}
+
+    @app.post("/api/v1/tokens/cleanup")
+    async def cleanup_expired_tokens():
+        now = datetime.now(timezone.utc)
+        expired = [h for h, t in store.tokens.items() if t["_expires"] <= now]
+        for token_hash in expired:
+            del store.tokens[token_hash]
+        return {"deleted_count": len(expired), "message": f"Удалено просроченных токенов: {len(expired)}"}
+
+    return app
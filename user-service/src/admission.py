@@ -0,0 +1,175 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+# Лимиты входа и регистрации (rate — токенов в секунду, burst — емкость корзины)
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", "5"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_USERNAME_RATE = float(os.getenv("LOGIN_USERNAME_RATE", "0.2"))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", "5"))
+SIGNUP_IP_RATE = float(os.getenv("SIGNUP_IP_RATE", "1"))
+SIGNUP_IP_BURST = int(os.getenv("SIGNUP_IP_BURST", "5"))
+
+# Ограничение одновременных bcrypt операций на воркер
+WORKERS = max(int(os.getenv("WORKERS", "1")), 1)
+# Пустое значение (как в env.example) — значение по умолчанию
+MAX_CONCURRENT_PASSWORD_HASHES = int(
+    os.getenv("MAX_CONCURRENT_PASSWORD_HASHES") or max((os.cpu_count() or 1) // WORKERS, 1)
+)
+# Очередь к слотам: сколько запросов ждут освобождения слота и сколько секунд
+# (сверх — 503); ожидание сглаживает всплески вместо мгновенного отказа
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH") or 4 * MAX_CONCURRENT_PASSWORD_HASHES)
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2"))
+OVERLOAD_RETRY_AFTER = int(os.getenv("OVERLOAD_RETRY_AFTER", "1"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class RateLimitBackend:
+    """Хранилище token bucket корзин.
+
+    Для нескольких воркеров/узлов нужна общая реализация (например, на Redis)
+    с тем же интерфейсом; по умолчанию корзины хранятся в памяти процесса.
+    """
+
+    async def consume(self, key: str, rate: float, burst: int) -> float:
+        """Списать один токен; вернуть 0, если разрешено, иначе секунды до пополнения"""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token bucket корзины в памяти с вытеснением давно неиспользуемых ключей"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> (токены, время последнего обновления); порядок — по давности обращения
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, rate: float, burst: int) -> float:
+        now = self.clock()
+        tokens, updated = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        # Случайные имена пользователей при атаке не должны раздувать память
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionController:
+    """Контроль допуска для дорогих (bcrypt) операций.
+
+    Лимиты по IP и по имени пользователя проверяются до похода в Database
+    Service и до bcrypt, а число одновременных bcrypt операций ограничено.
+    Сверх лимита запрос ждет слот в ограниченной очереди (max_queue
+    ожидающих, не дольше queue_timeout секунд); при полной очереди, по
+    таймауту или если по средней длительности операции слот заведомо не
+    освободится за queue_timeout — 503, не занимая CPU. Сами bcrypt операции выполняются в
+    пуле потоков, чтобы не блокировать event loop дешевым эндпоинтам
+    (/verify, /refresh).
+    """
+
+    def __init__(
+        self,
+        backend: Optional[RateLimitBackend] = None,
+        max_concurrent_hashes: int = MAX_CONCURRENT_PASSWORD_HASHES,
+        rate_limits_enabled: bool = True,
+        max_queue: int = PASSWORD_HASH_QUEUE_DEPTH,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT
+    ):
+        self.backend = backend or MemoryRateLimitBackend()
+        self.max_concurrent_hashes = max_concurrent_hashes
+        self.rate_limits_enabled = rate_limits_enabled
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_concurrent_hashes)
+        # Скользящее среднее длительности bcrypt операции (с)
+        self._op_seconds = 0.0
+
+    async def _check(self, key: str, rate: float, burst: int):
+        if not self.rate_limits_enabled or rate <= 0:
+            return
+        wait = await self.backend.consume(key, rate, burst)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много попыток, повторите позже",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    async def admit_login(self, client_ip: str, username: str):
+        """Проверить лимиты попыток входа"""
+        await self._check(f"login:ip:{client_ip}", LOGIN_IP_RATE, LOGIN_IP_BURST)
+        await self._check(f"login:user:{username.lower()}", LOGIN_USERNAME_RATE, LOGIN_USERNAME_BURST)
+
+    async def admit_signup(self, client_ip: str):
+        """Проверить лимиты регистраций"""
+        await self._check(f"signup:ip:{client_ip}", SIGNUP_IP_RATE, SIGNUP_IP_BURST)
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис перегружен, повторите позже",
+            headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)}
+        )
+
+    def ensure_capacity(self):
+        """Быстрый отказ до похода в Database Service, если все слоты заняты и очередь полна"""
+        if self.in_flight >= self.max_concurrent_hashes and self.waiting >= self.max_queue:
+            raise self._overloaded()
+
+    @asynccontextmanager
+    async def password_slot(self):
+        """Слот для bcrypt операции; ожидание в очереди ограничено, сверх — 503"""
+        self.ensure_capacity()
+        if self._slots.locked():
+            expected_wait = (self.waiting + 1) * self._op_seconds / self.max_concurrent_hashes
+            if expected_wait > self.queue_timeout:
+                raise self._overloaded()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._overloaded()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+            elapsed = time.monotonic() - started
+            self._op_seconds = elapsed if not self._op_seconds else 0.8 * self._op_seconds + 0.2 * elapsed
+
+    async def run_password_op(self, func: Callable[..., T], *args) -> T:
+        """Выполнить bcrypt операцию в пуле потоков внутри слота"""
+        async with self.password_slot():
+            return await run_in_threadpool(func, *args)
+
+
+# Singleton instance
+admission_controller = AdmissionController()
+
+def get_admission_controller() -> AdmissionController:
+    """Dependency для получения контроллера допуска"""
+    return admission_controller
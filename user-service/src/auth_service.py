@@ -9,15 +9,24 @@ from src.schemas import (
     UserLogoutResponse, UserResponse
 )
 from src.database_client import DatabaseClient, get_database_client
+from src.admission import AdmissionController, get_admission_controller
+from src.revocation import RevocationSet, get_revocation_set
+from src.token_writer import TokenWriter, get_token_writer
 import hashlib
+import logging
+import uuid
 from datetime import timezone
 import os
 
+logger = logging.getLogger(__name__)
+
 # Настройки JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# /refresh обменивает refresh токен на новый; прежний становится недействительным
+REFRESH_TOKEN_ROTATION = os.getenv("REFRESH_TOKEN_ROTATION", "true").lower() == "true"
 
 # Настройка хеширования паролей
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -25,17 +34,28 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 class AuthService:
     """Сервис аутентификации и авторизации пользователей"""
     
-    def __init__(self, db_client: DatabaseClient = None):
+    def __init__(
+        self,
+        db_client: DatabaseClient = None,
+        admission: AdmissionController = None,
+        revocations: RevocationSet = None,
+        token_writer: TokenWriter = None
+    ):
         self.pwd_context = pwd_context
         self.db_client = db_client or get_database_client()
+        self.admission = admission or get_admission_controller()
+        self.revocations = revocations or get_revocation_set()
+        self.token_writer = token_writer or get_token_writer()
     
-    def _hash_password(self, password: str) -> str:
-        """Хеширование пароля"""
-        return self.pwd_context.hash(password)
+    async def _hash_password(self, password: str) -> str:
+        """Хеширование пароля (в пуле потоков, с ограничением параллелизма)"""
+        return await self.admission.run_password_op(self.pwd_context.hash, password)
     
-    def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Проверка пароля"""
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля (в пуле потоков, с ограничением параллелизма)"""
+        return await self.admission.run_password_op(
+            self.pwd_context.verify, plain_password, hashed_password
+        )
     
     def _create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Создание access токена"""
@@ -53,7 +73,8 @@ class AuthService:
         """Создание refresh токена"""
         to_encode = data.copy()
         expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        to_encode.update({"exp": expire})
+        # jti делает токены уникальными: выданные в одну секунду не совпадают по хешу
+        to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     
@@ -61,9 +82,38 @@ class AuthService:
         """Хеширование токена для безопасного хранения"""
         return hashlib.sha256(token.encode()).hexdigest()
     
+    def _token_user_id(self, token: str) -> Optional[int]:
+        """ID владельца из refresh токена: по нему Database Service выбирает шард.
+
+        Подпись здесь не проверяется — решает поиск по хешу, а без ID
+        токен ищется во всех шардах.
+        """
+        try:
+            user_id = jwt.get_unverified_claims(token).get("user_id")
+        except JWTError:
+            return None
+        return user_id if isinstance(user_id, int) else None
+    
+    def _token_expires_at(self, token: str) -> Optional[datetime]:
+        """Срок действия refresh токена с проверенной подписью.
+
+        По нему Database Service сохраняет еще не записанный токен сразу
+        отозванным, поэтому подпись здесь проверяется: чужой хеш так не
+        заблокировать. Истекший токен при выходе допустим.
+        """
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+        except JWTError:
+            return None
+        exp = payload.get("exp")
+        return datetime.fromtimestamp(exp, tz=timezone.utc) if isinstance(exp, (int, float)) else None
+    
     async def signup(self, user_data: UserCreateRequest) -> UserCreateResponse:
         """Регистрация нового пользователя"""
         
+        # При перегрузке отказываем до запросов к Database Service
+        self.admission.ensure_capacity()
+        
         # Проверяем, не существует ли уже пользователь
         existing_user = await self.db_client.get_user_by_username(user_data.username)
         if existing_user:
@@ -80,7 +130,7 @@ class AuthService:
             )
         
         # Создаем нового пользователя
-        hashed_password = self._hash_password(user_data.password)
+        hashed_password = await self._hash_password(user_data.password)
         new_user = await self.db_client.create_user(
             username=user_data.username,
             email=user_data.email,
@@ -104,6 +154,9 @@ class AuthService:
     async def login(self, user_data: UserLoginRequest) -> UserLoginResponse:
         """Авторизация пользователя"""
         
+        # При перегрузке отказываем до запросов к Database Service
+        self.admission.ensure_capacity()
+        
         # Находим пользователя
         user = await self.db_client.get_user_by_username(user_data.username)
         if not user:
@@ -120,7 +173,7 @@ class AuthService:
             )
         
         # Проверяем пароль
-        if not self._verify_password(user_data.password, user["password_hash"]):
+        if not await self._verify_password(user_data.password, user["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Неверное имя пользователя или пароль"
@@ -130,19 +183,20 @@ class AuthService:
         access_token = self._create_access_token(
             data={"sub": user["username"], "user_id": user["id"]}
         )
+        # fid — семейство ротации: общий ID всех поколений токена этой сессии
+        family_id = uuid.uuid4().hex
         refresh_token = self._create_refresh_token(
-            data={"sub": user["username"], "user_id": user["id"]}
+            data={"sub": user["username"], "user_id": user["id"], "fid": family_id}
         )
         
         # Сохраняем refresh токен в базе данных
         expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         token_hash = self._hash_token(refresh_token)
         
-        await self.db_client.create_refresh_token(
-            token_hash=token_hash,
-            user_id=user["id"],
-            expires_at=expires_at
-        )
+        await self.token_writer.save(token_hash, user["id"], expires_at, family_id)
+        if not self.token_writer.enabled:
+            # Отложенно записанный токен станет известен снимку после сохранения
+            self.revocations.added(token_hash)
         
         # Создаем объект пользователя для ответа
         user_response = UserResponse(
@@ -165,7 +219,18 @@ class AuthService:
         
         # Хешируем токен и отзываем его
         token_hash = self._hash_token(refresh_token)
-        await self.db_client.revoke_refresh_token(token_hash)
+        await self.token_writer.ensure_saved(token_hash)
+        # Токен может ждать в очереди записи другого воркера: с его сроком
+        # Database Service сохранит неизвестный хеш сразу отозванным
+        revoked = await self.db_client.revoke_refresh_token(
+            token_hash, self._token_user_id(refresh_token), self._token_expires_at(refresh_token)
+        )
+        if not revoked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Невалидный refresh токен"
+            )
+        self.revocations.revoked(token_hash)
         
         return UserLogoutResponse()
     
@@ -186,21 +251,59 @@ class AuthService:
                 detail="Невалидный токен"
             )
     
+    async def _rotate_refresh_token(self, refresh_token: str, token_hash: str) -> tuple:
+        """Обменять refresh токен на новый. Возвращает (ID пользователя, новый токен)"""
+        payload = self.verify_token(refresh_token)
+        family_id = payload.get("fid") if isinstance(payload.get("fid"), str) else None
+        new_refresh_token = self._create_refresh_token(
+            data={"sub": payload["sub"], "user_id": payload.get("user_id"), "fid": family_id}
+        )
+        expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        await self.token_writer.ensure_saved(token_hash)
+        try:
+            token_record = await self.db_client.rotate_refresh_token(
+                token_hash,
+                self._hash_token(new_refresh_token),
+                expires_at,
+                self._token_user_id(refresh_token),
+                family_id
+            )
+        except HTTPException as e:
+            if e.status_code != status.HTTP_409_CONFLICT:
+                raise
+            # Токен уже обменивали: его копия у кого-то еще, сессия отозвана
+            logger.warning("Повторное использование refresh токена, user_id=%s", payload.get("user_id"))
+            token_record = None
+        self.revocations.revoked(token_hash)
+        if not token_record:
+            return None, None
+        return token_record["user_id"], new_refresh_token
+    
     async def refresh_access_token(self, refresh_token: str) -> dict:
         """Обновление access токена с помощью refresh токена"""
         
         # Проверяем refresh токен
         token_hash = self._hash_token(refresh_token)
-        token_record = await self.db_client.verify_refresh_token(token_hash)
+        new_refresh_token = None
+        if REFRESH_TOKEN_ROTATION:
+            # Проверка и обмен — один запрос к базе
+            user_id, new_refresh_token = await self._rotate_refresh_token(refresh_token, token_hash)
+        elif self.revocations.confirms(token_hash):
+            # Токен заведомо не отозван: достаточно проверить подпись и срок
+            user_id = self.verify_token(refresh_token).get("user_id")
+        else:
+            await self.token_writer.ensure_saved(token_hash)
+            token_record = await self.db_client.verify_refresh_token(token_hash, self._token_user_id(refresh_token))
+            user_id = token_record["user_id"] if token_record else None
         
-        if not token_record:
+        if not isinstance(user_id, int):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Невалидный или просроченный refresh токен"
             )
         
         # Получаем пользователя
-        user = await self.db_client.get_user_by_id(token_record["user_id"])
+        user = await self.db_client.get_user_by_id(user_id)
         if not user or not user.get("is_active", True):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -214,6 +317,7 @@ class AuthService:
         
         return {
             "access_token": access_token,
+            "refresh_token": new_refresh_token,
             "token_type": "bearer"
         }
 
@@ -1,46 +1,86 @@
 import httpx
+import json
 import os
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from fastapi import HTTPException, status
 
+# Лимит HTTP соединений к Database Service на весь сервис делится между воркерами
+WORKERS = max(int(os.getenv("WORKERS", "1")), 1)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_POOL_SIZE = max(HTTP_MAX_CONNECTIONS // WORKERS, 10)
+# Число ответов, которые клиент хранит для условных GET (If-None-Match)
+ETAG_CACHE_SIZE = int(os.getenv("ETAG_CACHE_SIZE", "1024"))
+
 
 class DatabaseClient:
     """HTTP клиент для взаимодействия с Database Service"""
     
-    def __init__(self):
-        self.base_url = os.getenv("DATABASE_SERVICE_URL", "http://database-service:8002")
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url or os.getenv("DATABASE_SERVICE_URL", "http://database-service:8002")
         self.timeout = 30.0
+        # Позволяет подменить сеть, например in-process заглушкой в нагрузочных тестах
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        # URL -> (ETag, тело ответа): при 304 тело берется отсюда без сериализации на сервере
+        self._etag_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Общий клиент с пулом keep-alive соединений (создается лениво)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_SIZE,
+                    max_keepalive_connections=HTTP_POOL_SIZE
+                )
+            )
+        return self._client
+
+    async def close(self):
+        """Закрыть пул соединений"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def _make_request(
         self, 
         method: str, 
         endpoint: str, 
         data: Optional[Dict[Any, Any]] = None,
-        params: Optional[Dict[str, Any]] = None
+        params: Optional[Dict[str, Any]] = None,
+        revalidate: bool = False
     ) -> Dict[Any, Any]:
         """Выполнить HTTP запрос к Database Service"""
         url = f"{self.base_url}{endpoint}"
         
+        client = self._get_client()
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                if method.upper() == "GET":
-                    response = await client.get(url, params=params)
-                elif method.upper() == "POST":
-                    response = await client.post(url, json=data, params=params)
-                elif method.upper() == "PUT":
-                    response = await client.put(url, json=data, params=params)
-                elif method.upper() == "DELETE":
-                    response = await client.delete(url, params=params)
-                else:
-                    raise ValueError(f"Неподдерживаемый HTTP метод: {method}")
-                
-                if response.status_code == 404:
-                    return None
-                
-                response.raise_for_status()
-                return response.json()
-                
+            if method.upper() == "GET" and revalidate:
+                return await self._revalidating_get(client, url)
+            elif method.upper() == "GET":
+                response = await client.get(url, params=params)
+            elif method.upper() == "POST":
+                response = await client.post(url, json=data, params=params)
+            elif method.upper() == "PUT":
+                response = await client.put(url, json=data, params=params)
+            elif method.upper() == "DELETE":
+                response = await client.delete(url, params=params)
+            else:
+                raise ValueError(f"Неподдерживаемый HTTP метод: {method}")
+            
+            if response.status_code == 404:
+                return None
+            
+            response.raise_for_status()
+            return response.json()
+            
         except httpx.TimeoutException:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -69,6 +109,26 @@ class DatabaseClient:
                     detail=f"Ошибка Database Service: {e.response.text}"
                 )
     
+    async def _revalidating_get(self, client: httpx.AsyncClient, url: str) -> Optional[Dict[Any, Any]]:
+        """GET с проверкой сохраненного ответа по ETag (LRU на ETAG_CACHE_SIZE записей)"""
+        cached = self._etag_cache.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            self._etag_cache.move_to_end(url)
+            return json.loads(cached[1])
+        if response.status_code == 404:
+            self._etag_cache.pop(url, None)
+            return None
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        if etag and ETAG_CACHE_SIZE > 0:
+            self._etag_cache[url] = (etag, response.content)
+            self._etag_cache.move_to_end(url)
+            if len(self._etag_cache) > ETAG_CACHE_SIZE:
+                self._etag_cache.popitem(last=False)
+        return response.json()
+
     # Методы для работы с пользователями
     async def create_user(self, username: str, email: str, password_hash: str) -> Optional[Dict[Any, Any]]:
         """Создать пользователя"""
@@ -81,15 +141,15 @@ class DatabaseClient:
     
     async def get_user_by_id(self, user_id: int) -> Optional[Dict[Any, Any]]:
         """Получить пользователя по ID"""
-        return await self._make_request("GET", f"/api/v1/users/{user_id}")
+        return await self._make_request("GET", f"/api/v1/users/{user_id}", revalidate=True)
     
     async def get_user_by_username(self, username: str) -> Optional[Dict[Any, Any]]:
         """Получить пользователя по имени пользователя"""
-        return await self._make_request("GET", f"/api/v1/users/search/by-username/{username}")
+        return await self._make_request("GET", f"/api/v1/users/search/by-username/{username}", revalidate=True)
     
     async def get_user_by_email(self, email: str) -> Optional[Dict[Any, Any]]:
         """Получить пользователя по email"""
-        return await self._make_request("GET", f"/api/v1/users/search/by-email/{email}")
+        return await self._make_request("GET", f"/api/v1/users/search/by-email/{email}", revalidate=True)
     
     async def update_user(self, user_id: int, **kwargs) -> Optional[Dict[Any, Any]]:
         """Обновить пользователя"""
@@ -108,26 +168,71 @@ class DatabaseClient:
         self, 
         token_hash: str, 
         user_id: int, 
-        expires_at: datetime
+        expires_at: datetime,
+        family_id: Optional[str] = None
     ) -> Optional[Dict[Any, Any]]:
         """Создать refresh токен"""
         data = {
             "token_hash": token_hash,
             "user_id": user_id,
-            "expires_at": expires_at.isoformat()
+            "expires_at": expires_at.isoformat(),
+            "family_id": family_id
         }
         return await self._make_request("POST", "/api/v1/tokens/", data)
     
-    async def verify_refresh_token(self, token_hash: str) -> Optional[Dict[Any, Any]]:
-        """Проверить refresh токен"""
-        return await self._make_request("GET", f"/api/v1/tokens/verify/{token_hash}")
+    async def create_refresh_tokens(self, tokens: List[Dict[str, Any]]) -> Optional[Dict[Any, Any]]:
+        """Создать пачку refresh токенов одним запросом"""
+        return await self._make_request("POST", "/api/v1/tokens/bulk", {"tokens": tokens})
     
-    async def revoke_refresh_token(self, token_hash: str) -> bool:
-        """Отозвать refresh токен"""
+    async def verify_refresh_token(self, token_hash: str, user_id: Optional[int] = None) -> Optional[Dict[Any, Any]]:
+        """Проверить refresh токен (с user_id поиск идет в одном шарде)"""
+        params = {"user_id": user_id} if user_id is not None else None
+        return await self._make_request("GET", f"/api/v1/tokens/verify/{token_hash}", params=params)
+    
+    async def rotate_refresh_token(
+        self,
+        token_hash: str,
+        new_token_hash: str,
+        expires_at: datetime,
+        user_id: Optional[int] = None,
+        family_id: Optional[str] = None
+    ) -> Optional[Dict[Any, Any]]:
+        """Обменять refresh токен на новый (409 — токен уже обменивали, сессия отозвана)"""
+        data = {
+            "token_hash": token_hash,
+            "new_token_hash": new_token_hash,
+            "expires_at": expires_at.isoformat()
+        }
+        if user_id is not None:
+            data["user_id"] = user_id
+        if family_id is not None:
+            data["family_id"] = family_id
+        return await self._make_request("POST", "/api/v1/tokens/rotate", data)
+    
+    async def revoke_refresh_token(
+        self,
+        token_hash: str,
+        user_id: Optional[int] = None,
+        expires_at: Optional[datetime] = None
+    ) -> bool:
+        """Отозвать refresh токен (с user_id отзыв идет в одном шарде).
+
+        С user_id и expires_at еще не сохраненный токен записывается сразу
+        отозванным, и отзыв не возвращает False.
+        """
         data = {"token_hash": token_hash}
+        if user_id is not None:
+            data["user_id"] = user_id
+        if expires_at is not None:
+            data["expires_at"] = expires_at.isoformat()
         result = await self._make_request("POST", "/api/v1/tokens/revoke", data)
         return result is not None
     
+    async def get_revocations(self, since: Optional[float] = None) -> Optional[Dict[Any, Any]]:
+        """Снимок отзыва refresh токенов (с since — дельта после него)"""
+        params = {"since": since} if since is not None else None
+        return await self._make_request("GET", "/api/v1/tokens/revocations", params=params)
+    
     async def revoke_user_tokens(self, user_id: int) -> bool:
         """Отозвать все токены пользователя"""
         result = await self._make_request("POST", f"/api/v1/tokens/revoke-user/{user_id}")
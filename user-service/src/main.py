@@ -1,14 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-import os
 from src.routers.auth import router as auth_router
+from src.database_client import database_client
+from src.revocation import revocation_set
+from src.token_writer import token_writer
+from src.profiling import setup_profiling
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация при запуске и освобождение ресурсов при остановке"""
+    # Снимок отзыва refresh токенов (при REVOCATION_SYNC_INTERVAL > 0)
+    await revocation_set.start()
+    print("User Service запущен")
+    yield
+    await revocation_set.shutdown()
+    # Сохраняем отложенные refresh токены до закрытия пула
+    await token_writer.shutdown()
+    # Закрываем пул соединений к Database Service после завершения текущих запросов
+    await database_client.close()
+    print("User Service остановлен")
 
 # Создание FastAPI приложения
 app = FastAPI(
     title="Recall Pro - User Service",
     description="Сервис аутентификации и управления пользователями",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -20,14 +38,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профилирование запросов (подключается только при PROFILING_ENABLED=true)
+setup_profiling(app)
+
 # Подключение роутеров
 app.include_router(auth_router, prefix="/api/v1")
 
-@app.on_event("startup")
-async def startup_event():
-    """Инициализация при запуске приложения"""
-    print("User Service запущен")
-
 @app.get("/")
 async def root():
     """Корневой эндпоинт"""
@@ -39,12 +55,5 @@ async def health_check():
     return {"status": "healthy", "service": "user"}
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", "8000"))
-    debug = os.getenv("DEBUG", "false").lower() == "true"
-    
-    uvicorn.run(
-        "main:app", 
-        host="0.0.0.0", 
-        port=port,
-        reload=debug
-    )
\ No newline at end of file
+    from src.server import run
+    run()
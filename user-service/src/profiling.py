@@ -0,0 +1,343 @@
+"""Профилирование отдельных запросов User Service (сэмплер стека или cProfile).
+
+Основная работа входа и обновления токенов — хеширование паролей — идет в
+пуле потоков (run_in_threadpool в src/admission.py), поэтому кроме потока
+event loop сэмплируются потоки пула, выполняющие работу профилируемого
+запроса.
+"""
+import asyncio
+import contextvars
+import cProfile
+import heapq
+import io
+import os
+import pstats
+import queue
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Optional, Dict, Any, List
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+# Настройки профилирования (по умолчанию выключено и ничего не стоит)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sample")  # sample | cprofile
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "1"))
+PROFILING_SLOWEST = int(os.getenv("PROFILING_SLOWEST", "20"))
+PROFILING_DIR = os.getenv("PROFILING_DIR")
+
+PROFILE_HEADER = b"x-profile"
+
+# Потоки пула run_in_threadpool (AnyIO)
+WORKER_THREAD_NAME = "AnyIO worker thread"
+# Корневой кадр стеков потоков пула в collapsed stacks
+WORKER_ROOT = "[пул потоков]"
+# Свободный поток пула ждет задачу в этих модулях
+_IDLE_FILES = {threading.__file__, queue.__file__}
+
+# ID профиля текущего запроса: контекст копируется в задачи пула потоков,
+# по нему сэмплер отличает работу профилируемого запроса от чужой
+_profile_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("profile_id", default=None)
+
+
+def _task_loop(frame):
+    """Кадр цикла потока-исполнителя, если поток выполняет задачу (None — поток свободен).
+
+    Под кадрами запуска потока (threading.py) лежит цикл исполнителя
+    (AnyIO WorkerThread.run); свободный поток ждет задачу в queue/threading.
+    """
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    loop = next((f for f in reversed(frames) if f.f_code.co_filename != threading.__file__), None)
+    if loop is None or all(f.f_code.co_filename in _IDLE_FILES or f is loop for f in frames):
+        return None
+    return loop
+
+
+def _request_context(frame) -> Optional[contextvars.Context]:
+    """Контекст задачи, которую выполняет поток пула AnyIO (None — поток свободен).
+
+    Задача выполняется через context.run(func), поэтому контекст лежит в
+    локальных переменных цикла WorkerThread.run.
+    """
+    loop = _task_loop(frame)
+    context = loop.f_locals.get("context") if loop is not None else None
+    return context if isinstance(context, contextvars.Context) else None
+
+
+def _collapse(frame) -> List[str]:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class StackSampler:
+    """Статистический сэмплер стека потока event loop и потоков пула.
+
+    Результат — collapsed stacks (формат flamegraph.pl / speedscope):
+    одна строка ``frame;frame;frame count`` на уникальный стек; стеки
+    потоков пула начинаются с кадра WORKER_ROOT. Поток event loop делят
+    все запросы, поэтому в профиль попадает и работа конкурентных
+    запросов — для поиска горячих мест это допустимо. Из потоков пула
+    берутся только выполняющие задачу профилируемого запроса.
+    """
+
+    def __init__(self, thread_id: Optional[int], interval: float, profile_id: str):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.profile_id = profile_id
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None and self.thread_id in frames:
+                self.stacks[";".join(_collapse(frames[self.thread_id]))] += 1
+            for thread in threading.enumerate():
+                if thread.name != WORKER_THREAD_NAME or thread.ident not in frames:
+                    continue
+                frame = frames[thread.ident]
+                context = _request_context(frame)
+                if context is not None and context.get(_profile_id) == self.profile_id:
+                    self.stacks[";".join([WORKER_ROOT] + _collapse(frame))] += 1
+
+
+class CProfileSampler:
+    """Детерминированный профиль через cProfile (формат pstats).
+
+    cProfile считает вызовы только потока, где он включен (event loop),
+    поэтому работа запроса в пуле потоков добавляется к отчету сэмплами
+    стека в формате collapsed stacks.
+    """
+
+    # Одновременно в интерпретаторе может работать только один профайлер
+    _lock = threading.Lock()
+
+    def __init__(self, interval: float, profile_id: str):
+        self.profiler = cProfile.Profile()
+        self.workers = StackSampler(None, interval, profile_id)
+        self.active = False
+
+    def start(self):
+        self.active = self._lock.acquire(blocking=False)
+        if self.active:
+            self.workers.start()
+            self.profiler.enable()
+
+    def stop(self) -> Optional[str]:
+        if not self.active:
+            return None
+        self.profiler.disable()
+        workers = self.workers.stop()
+        self._lock.release()
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        if workers:
+            out.write("\nПул потоков (collapsed stacks):\n" + workers + "\n")
+        return out.getvalue()
+
+
+class ProfileStore:
+    """Последние профили и кольцевой буфер самых медленных запросов"""
+
+    def __init__(self, slowest: int):
+        # slowest <= 0 — в памяти профили не хранятся (остается только PROFILING_DIR)
+        self.slowest = max(slowest, 0)
+        self._heap: List[tuple] = []
+        self._recent: deque = deque(maxlen=self.slowest)
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]):
+        if not self.slowest:
+            return
+        with self._lock:
+            self._recent.append(record)
+            item = (record["duration_ms"], record["id"], record)
+            if len(self._heap) < self.slowest:
+                heapq.heappush(self._heap, item)
+            elif item[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    @staticmethod
+    def dump(record: Dict[str, Any]):
+        """Записать профиль в PROFILING_DIR (блокирующий вызов, из потока)"""
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        ext = "folded" if record["format"] == "collapsed" else "txt"
+        with open(os.path.join(PROFILING_DIR, f"{record['id']}.{ext}"), "w") as f:
+            f.write(record["profile"])
+
+    def get_slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = [item[2] for item in sorted(self._heap, reverse=True)]
+        return [{k: v for k, v in r.items() if k != "profile"} for r in records]
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for record in list(self._recent) + [item[2] for item in self._heap]:
+                if record["id"] == profile_id:
+                    return record
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self._recent.clear()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware, профилирующее отдельные запросы.
+
+    Профилируется запрос с заголовком ``X-Profile: <PROFILING_TOKEN>``
+    или случайная доля запросов, если включена через админ-эндпоинт.
+    """
+
+    def __init__(self, app, state: "ProfilingState"):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.state.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        mode = self.state.mode
+        if mode == "cprofile":
+            sampler = CProfileSampler(self.state.interval, profile_id)
+        else:
+            sampler = StackSampler(threading.get_ident(), self.state.interval, profile_id)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode())
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        token = _profile_id.set(profile_id)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile_id.reset(token)
+            profile = sampler.stop()
+            if profile is not None:
+                record = {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status_code": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "timestamp": time.time(),
+                    "format": "pstats" if mode == "cprofile" else "collapsed",
+                    "profile": profile,
+                }
+                self.state.store.add(record)
+                if PROFILING_DIR:
+                    # Запись на диск не должна держать event loop
+                    await asyncio.to_thread(ProfileStore.dump, record)
+
+
+class ProfilingState:
+    """Текущие настройки профилирования (меняются через админ-эндпоинт)"""
+
+    def __init__(self):
+        self.mode = PROFILING_MODE
+        self.interval = PROFILING_INTERVAL_MS / 1000
+        self.sample_rate = 0.0
+        self.store = ProfileStore(PROFILING_SLOWEST)
+
+    def should_profile(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not PROFILING_TOKEN:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                return secrets.compare_digest(value.decode("latin-1"), PROFILING_TOKEN)
+        return False
+
+
+class ProfilingSettings(BaseModel):
+    sample_rate: float = Field(0.0, ge=0.0, le=1.0, description="Доля профилируемых запросов")
+    mode: Optional[str] = Field(None, pattern="^(sample|cprofile)$", description="Режим профилирования")
+
+
+profiling_state = ProfilingState()
+router = APIRouter()
+
+
+def _check_admin(token: Optional[str]):
+    if not PROFILING_TOKEN or not token or not secrets.compare_digest(token, PROFILING_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ запрещен")
+
+
+@router.get("/slowest")
+async def get_slowest(x_admin_token: Optional[str] = Header(None)):
+    """Самые медленные профилированные запросы"""
+    _check_admin(x_admin_token)
+    return {"requests": profiling_state.store.get_slowest()}
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Профиль запроса (collapsed stacks или pstats)"""
+    _check_admin(x_admin_token)
+    record = profiling_state.store.get(profile_id)
+    if not record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Профиль не найден")
+    return PlainTextResponse(record["profile"])
+
+
+@router.put("/settings")
+async def update_settings(settings: ProfilingSettings, x_admin_token: Optional[str] = Header(None)):
+    """Включить/выключить профилирование доли запросов"""
+    _check_admin(x_admin_token)
+    profiling_state.sample_rate = settings.sample_rate
+    if settings.mode:
+        profiling_state.mode = settings.mode
+    return {"sample_rate": profiling_state.sample_rate, "mode": profiling_state.mode}
+
+
+@router.delete("/profiles")
+async def clear_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Очистить сохраненные профили"""
+    _check_admin(x_admin_token)
+    profiling_state.store.clear()
+    return {"success": True}
+
+
+def setup_profiling(app: FastAPI):
+    """Подключить профилирование, если оно включено через PROFILING_ENABLED"""
+    if not PROFILING_ENABLED:
+        return
+    app.add_middleware(ProfilingMiddleware, state=profiling_state)
+    app.include_router(router, prefix="/admin/profiling", tags=["profiling"])
@@ -0,0 +1,170 @@
+"""Локальная проверка refresh токенов по снимку отзыва Database Service.
+
+Database Service отдает (GET /api/v1/tokens/revocations) отсортированный
+массив 64-битных префиксов хешей действующих токенов и фильтр Блума по
+отозванным, а с since — дельту: новые префиксы и отозванные хеши. Токен,
+чей префикс есть в снимке, а хеш не попал ни в фильтр, ни в отозванные
+после снимка, заведомо не отозван: такой refresh обходится без запроса к
+базе. Во всех остальных случаях (новый токен с другой реплики, попадание
+в фильтр, устаревший снимок) токен проверяется в базе как раньше.
+
+Формат префиксов и позиций фильтра совпадает с src/revocation.py
+Database Service. Выключено, пока REVOCATION_SYNC_INTERVAL равен 0.
+"""
+import asyncio
+import base64
+import logging
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from typing import Optional, Set
+
+from src.database_client import DatabaseClient, get_database_client
+
+logger = logging.getLogger(__name__)
+
+# Период запроса дельты (с); 0 — локальная проверка выключена
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "0"))
+# Период полного снимка: сбрасывает накопленные дельты и пересобирает фильтр
+REVOCATION_SNAPSHOT_INTERVAL = float(os.getenv("REVOCATION_SNAPSHOT_INTERVAL", "300"))
+# Снимок старше этого не используется: отзыв на другой реплике виден не позже
+REVOCATION_MAX_STALENESS = float(os.getenv("REVOCATION_MAX_STALENESS", "10"))
+
+PREFIX_HEX = 16
+HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def token_prefix(token_hash: str) -> Optional[int]:
+    """64-битный префикс sha256 хеша; None для хешей другого формата"""
+    if len(token_hash) != 64 or not HEX_DIGITS.issuperset(token_hash):
+        return None
+    return int(token_hash[:PREFIX_HEX], 16)
+
+
+def _decode_prefixes(data: str) -> array:
+    prefixes = array("Q")
+    prefixes.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        prefixes.byteswap()
+    return prefixes
+
+
+class RevocationSet:
+    """Снимок отзыва в памяти воркера с периодическим обновлением дельтами"""
+
+    def __init__(
+        self,
+        db_client: Optional[DatabaseClient] = None,
+        interval: float = REVOCATION_SYNC_INTERVAL
+    ):
+        self.db_client = db_client or get_database_client()
+        self.interval = interval
+        self.version: Optional[float] = None
+        self._prefixes = array("Q")
+        self._bloom = b""
+        self._bloom_bits = 0
+        self._bloom_hashes = 0
+        # Изменения после полного снимка: новые префиксы и отозванные хеши
+        self._added: Set[int] = set()
+        self._revoked: Set[str] = set()
+        self._synced_at = 0.0
+        self._snapshot_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def _fresh(self) -> bool:
+        return self.version is not None and time.monotonic() - self._synced_at <= REVOCATION_MAX_STALENESS
+
+    def _in_bloom(self, token_hash: str) -> bool:
+        for i in range(self._bloom_hashes):
+            position = int(token_hash[8 * i:8 * i + 8], 16) % self._bloom_bits
+            if not self._bloom[position >> 3] & (1 << (position & 7)):
+                return False
+        return self._bloom_hashes > 0
+
+    def _known(self, prefix: int) -> bool:
+        if prefix in self._added:
+            return True
+        index = bisect_left(self._prefixes, prefix)
+        return index < len(self._prefixes) and self._prefixes[index] == prefix
+
+    def confirms(self, token_hash: str) -> bool:
+        """True — токен заведомо действителен по снимку; False — проверить в базе"""
+        if not self._fresh():
+            return False
+        prefix = token_prefix(token_hash)
+        if prefix is None or token_hash in self._revoked or self._in_bloom(token_hash):
+            return False
+        return self._known(prefix)
+
+    def added(self, token_hash: str):
+        """Токен сохранен этим воркером: он известен до следующей дельты"""
+        prefix = token_prefix(token_hash)
+        if prefix is not None and self.enabled:
+            self._added.add(prefix)
+
+    def revoked(self, token_hash: str):
+        """Токен отозван этим воркером: локально это видно сразу"""
+        if self.enabled:
+            self._revoked.add(token_hash)
+
+    def apply(self, snapshot: dict):
+        """Применить полный снимок или дельту из Database Service"""
+        if snapshot["full"]:
+            self._prefixes = _decode_prefixes(snapshot["prefixes"])
+            self._bloom = base64.b64decode(snapshot["bloom"]) if snapshot.get("bloom") else b""
+            self._bloom_bits = snapshot["bloom_bits"]
+            self._bloom_hashes = snapshot["bloom_hashes"] if self._bloom_bits else 0
+            self._added = set()
+            self._revoked = set()
+            self._snapshot_at = time.monotonic()
+        else:
+            self._added.update(_decode_prefixes(snapshot["prefixes"]))
+            self._revoked.update(snapshot["revoked"])
+        self.version = snapshot["version"]
+        self._synced_at = time.monotonic()
+
+    async def sync(self):
+        """Запросить дельту, а раз в REVOCATION_SNAPSHOT_INTERVAL — полный снимок"""
+        full = self.version is None or time.monotonic() - self._snapshot_at >= REVOCATION_SNAPSHOT_INTERVAL
+        snapshot = await self.db_client.get_revocations(None if full else self.version)
+        if snapshot is not None:
+            self.apply(snapshot)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Снимок устареет, и проверки пойдут в базу
+                logger.warning("Не удалось обновить снимок отзыва токенов", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocation_set = RevocationSet()
+
+
+def get_revocation_set() -> RevocationSet:
+    """Dependency для получения снимка отзыва токенов"""
+    return revocation_set
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from src.schemas import (
@@ -7,17 +7,29 @@ from src.schemas import (
     UserLogoutResponse, RefreshTokenRequest, TokenResponse
 )
 from src.auth_service import AuthService, get_auth_service
+from src.admission import AdmissionController, get_admission_controller
 
 router = APIRouter()
 security = HTTPBearer()
 
+def _client_ip(request: Request) -> str:
+    """IP клиента.
+
+    uvicorn берет его из X-Forwarded-For, только если запрос пришел с адреса
+    из FORWARDED_ALLOW_IPS; иначе это адрес соединения (за прокси — адрес прокси).
+    """
+    return request.client.host if request.client else "unknown"
+
 @router.post("/signup", response_model=UserCreateResponse)
 async def signup(
     user_data: UserCreateRequest,
-    auth_service: AuthService = Depends(get_auth_service)
+    request: Request,
+    auth_service: AuthService = Depends(get_auth_service),
+    admission: AdmissionController = Depends(get_admission_controller)
 ):
     """Регистрация нового пользователя"""
     try:
+        await admission.admit_signup(_client_ip(request))
         return await auth_service.signup(user_data)
     except HTTPException:
         raise
@@ -27,10 +39,13 @@ async def signup(
 @router.post("/login", response_model=UserLoginResponse)
 async def login(
     user_data: UserLoginRequest,
-    auth_service: AuthService = Depends(get_auth_service)
+    request: Request,
+    auth_service: AuthService = Depends(get_auth_service),
+    admission: AdmissionController = Depends(get_admission_controller)
 ):
     """Авторизация пользователя"""
     try:
+        await admission.admit_login(_client_ip(request), user_data.username)
         return await auth_service.login(user_data)
     except HTTPException:
         raise
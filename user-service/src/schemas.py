@@ -55,6 +55,8 @@ class UserResponse(UserBase):
 # Схемы для токенов
 class TokenResponse(BaseModel):
     access_token: str
+    # Новый refresh токен при ротации: прежний больше не действует
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
 
 
@@ -0,0 +1,55 @@
+import importlib.util
+import os
+
+import uvicorn
+
+# Настройки запуска
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+# Адреса прокси, чьим X-Forwarded-For/-Proto можно верить (через запятую, "*" — любым).
+# Без этого за прокси или в Docker request.client — адрес прокси или шлюза сети
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS") or "127.0.0.1"
+
+
+def get_worker_count() -> int:
+    """Число воркеров: WORKERS или по числу ядер"""
+    workers = int(os.getenv("WORKERS", "0"))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def run():
+    """Запуск сервиса.
+
+    В режиме DEBUG — один процесс с автоперезагрузкой. Иначе — продакшен
+    режим: несколько воркеров, uvloop/httptools и плавная остановка,
+    дожидающаяся завершения текущих запросов.
+    """
+    if DEBUG:
+        uvicorn.run("src.main:app", host=HOST, port=PORT, reload=True, forwarded_allow_ips=FORWARDED_ALLOW_IPS)
+        return
+
+    workers = get_worker_count()
+    # Воркеры читают WORKERS, чтобы поделить пулы соединений между собой
+    os.environ["WORKERS"] = str(workers)
+    uvicorn.run(
+        "src.main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop="uvloop" if _has_module("uvloop") else "asyncio",
+        http="httptools" if _has_module("httptools") else "h11",
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    run()
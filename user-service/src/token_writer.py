@@ -0,0 +1,147 @@
+"""Отложенная (write-behind) запись refresh токенов при входе.
+
+Без TOKEN_WRITE_BEHIND вход, как и раньше, ждет сохранения токена. С ним
+запись токена встает в очередь воркера, и ответ уходит сразу; очередь
+сбрасывается одним запросом POST /api/v1/tokens/bulk (один INSERT на шард)
+через TOKEN_WRITE_BEHIND_DELAY_MS после первой записи или как только
+набралось TOKEN_WRITE_BEHIND_BATCH токенов. Проверка или отзыв токена,
+который еще не сохранен, сначала принудительно сбрасывает очередь.
+
+Очередь своя у каждого воркера, и запрос на выход может попасть в другой.
+Поэтому отзыв передает срок токена, и Database Service сохраняет
+неизвестный хеш сразу отозванным: поздний INSERT ... ON CONFLICT DO NOTHING
+из очереди проигрывает конфликт и не оживляет токен.
+
+Токены, не сохраненные к моменту падения процесса, теряются: их владельцы
+получат 401 на /refresh и войдут заново.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from src.database_client import DatabaseClient, get_database_client
+
+logger = logging.getLogger(__name__)
+
+TOKEN_WRITE_BEHIND = os.getenv("TOKEN_WRITE_BEHIND", "false").lower() == "true"
+TOKEN_WRITE_BEHIND_BATCH = int(os.getenv("TOKEN_WRITE_BEHIND_BATCH", "100"))
+TOKEN_WRITE_BEHIND_DELAY_MS = float(os.getenv("TOKEN_WRITE_BEHIND_DELAY_MS", "5"))
+# При переполнении очереди вход ждет сброса (обратное давление)
+TOKEN_WRITE_BEHIND_MAX_PENDING = int(os.getenv("TOKEN_WRITE_BEHIND_MAX_PENDING", "10000"))
+# Пауза перед повтором неудачного фонового сброса (с)
+TOKEN_WRITE_BEHIND_RETRY = 1.0
+
+# Ограничение размера пачки в POST /api/v1/tokens/bulk Database Service
+BULK_LIMIT = 1000
+
+
+class TokenWriter:
+    """Очередь записи refresh токенов воркера"""
+
+    def __init__(
+        self,
+        db_client: Optional[DatabaseClient] = None,
+        enabled: bool = TOKEN_WRITE_BEHIND,
+        batch_size: int = TOKEN_WRITE_BEHIND_BATCH,
+        delay: float = TOKEN_WRITE_BEHIND_DELAY_MS / 1000
+    ):
+        self.db_client = db_client or get_database_client()
+        self.enabled = enabled
+        self.batch_size = min(batch_size, BULK_LIMIT)
+        self.delay = delay
+        # Хеш -> запись токена; отправляемая пачка лежит в _inflight до ответа
+        self._pending: Dict[str, dict] = {}
+        self._inflight: Dict[str, dict] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Ссылки на фоновые сбросы, чтобы их не собрал GC
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def save(self, token_hash: str, user_id: int, expires_at: datetime, family_id: Optional[str] = None):
+        """Сохранить токен: сразу или через очередь (при TOKEN_WRITE_BEHIND)"""
+        if not self.enabled:
+            await self.db_client.create_refresh_token(
+                token_hash=token_hash,
+                user_id=user_id,
+                expires_at=expires_at,
+                family_id=family_id
+            )
+            return
+        if len(self._pending) + len(self._inflight) >= TOKEN_WRITE_BEHIND_MAX_PENDING:
+            await self.flush()
+        self._pending[token_hash] = {
+            "token_hash": token_hash,
+            "user_id": user_id,
+            "expires_at": expires_at.isoformat(),
+            "family_id": family_id
+        }
+        if len(self._pending) >= self.batch_size:
+            self._flush_in_background()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush_in_background)
+
+    def is_pending(self, token_hash: str) -> bool:
+        return token_hash in self._pending or token_hash in self._inflight
+
+    async def ensure_saved(self, token_hash: str):
+        """Перед проверкой или отзывом: дождаться сохранения токена, если он в очереди"""
+        if self.is_pending(token_hash):
+            # Блокировка дождется отправляемой пачки, затем уйдет остаток очереди
+            await self.flush()
+
+    def _flush_in_background(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.create_task(self._background_flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _background_flush(self):
+        try:
+            await self.flush()
+        except Exception:
+            logger.warning("Не удалось сохранить пачку refresh токенов", exc_info=True)
+            if self._pending and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    TOKEN_WRITE_BEHIND_RETRY, self._flush_in_background
+                )
+
+    async def flush(self):
+        """Отправить очередь; при ошибке записи возвращаются в очередь"""
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            while self._pending:
+                batch = dict(list(self._pending.items())[:BULK_LIMIT])
+                for token_hash in batch:
+                    del self._pending[token_hash]
+                self._inflight = batch
+                try:
+                    # Повтор пачки безопасен: уже сохраненные хеши пропускаются
+                    await self.db_client.create_refresh_tokens(list(batch.values()))
+                except BaseException:
+                    self._pending = {**batch, **self._pending}
+                    raise
+                finally:
+                    self._inflight = {}
+
+    async def shutdown(self):
+        """Сохранить остаток очереди при остановке"""
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        try:
+            await self.flush()
+        except Exception:
+            logger.error("Не сохранено refresh токенов при остановке: %s", len(self._pending), exc_info=True)
+
+
+token_writer = TokenWriter()
+
+
+def get_token_writer() -> TokenWriter:
+    """Dependency для записи refresh токенов"""
+    return token_writer
@@ -0,0 +1,24 @@
+import asyncio
+import inspect
+
+import pytest
+
+from src.admission import AdmissionController
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def тесты выполняются в своем event loop через asyncio.run (без pytest-asyncio)"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    asyncio.run(pyfuncitem.obj(**{name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}))
+    return True
+
+
+@pytest.fixture
+def make_admission():
+    """AdmissionController с одним слотом bcrypt и без rate limit"""
+    def make(**kwargs) -> AdmissionController:
+        return AdmissionController(max_concurrent_hashes=1, rate_limits_enabled=False, **kwargs)
+    return make
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+from src.admission import AdmissionController
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _hold(admission: AdmissionController, seconds: float):
+    async with admission.password_slot():
+        await asyncio.sleep(seconds)
+
+
+async def test_request_waits_for_busy_slot(make_admission):
+    admission = make_admission(max_queue=1, queue_timeout=1.0)
+    first = asyncio.create_task(_hold(admission, 0.05))
+    await asyncio.sleep(0)
+    await _hold(admission, 0)
+    await first
+    assert admission.in_flight == 0 and admission.waiting == 0
+
+
+async def test_full_queue_is_shed_immediately(make_admission):
+    admission = make_admission(max_queue=1, queue_timeout=1.0)
+    holder = asyncio.create_task(_hold(admission, 0.2))
+    queued = asyncio.create_task(_hold(admission, 0))
+    await asyncio.sleep(0.01)
+    try:
+        with pytest.raises(HTTPException) as error:
+            admission.ensure_capacity()
+    finally:
+        await asyncio.gather(holder, queued)
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"]
+
+
+async def test_wait_is_bounded_by_timeout(make_admission):
+    admission = make_admission(max_queue=10, queue_timeout=0.05)
+    holder = asyncio.create_task(_hold(admission, 0.3))
+    await asyncio.sleep(0)
+    try:
+        with pytest.raises(HTTPException) as error:
+            await _hold(admission, 0)
+    finally:
+        await holder
+    assert error.value.status_code == 503
+    assert admission.waiting == 0
+
+
+def test_blank_settings_use_defaults():
+    # Так переменные задает env.example: "MAX_CONCURRENT_PASSWORD_HASHES=   # ..."
+    env = dict(os.environ, MAX_CONCURRENT_PASSWORD_HASHES="", PASSWORD_HASH_QUEUE_DEPTH="", WORKERS="1")
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "from src import admission; print(admission.MAX_CONCURRENT_PASSWORD_HASHES,"
+         " admission.PASSWORD_HASH_QUEUE_DEPTH)"],
+        cwd=SERVICE_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    slots, depth = map(int, result.stdout.split())
+    assert slots == max(os.cpu_count() or 1, 1)
+    assert depth == 4 * slots
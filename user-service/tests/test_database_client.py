@@ -0,0 +1,37 @@
+import httpx
+
+from src.database_client import DatabaseClient
+
+
+class VersionedUsers:
+    """Database Service на httpx.MockTransport: ETag по версии пользователя"""
+
+    def __init__(self):
+        self.version = 1
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.headers.get("If-None-Match"))
+        if request.url.path != "/api/v1/users/7":
+            return httpx.Response(404, json={"detail": "Пользователь не найден"})
+        etag = f'"user-7-{self.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag}, json={"id": 7, "version": self.version})
+
+
+async def test_user_reads_revalidate_by_etag():
+    server = VersionedUsers()
+    client = DatabaseClient("http://database", transport=httpx.MockTransport(server))
+    try:
+        assert await client.get_user_by_id(7) == {"id": 7, "version": 1}
+        # 304: тело из сохраненного ответа
+        assert await client.get_user_by_id(7) == {"id": 7, "version": 1}
+        server.version = 2
+        assert await client.get_user_by_id(7) == {"id": 7, "version": 2}
+        assert await client.get_user_by_id(7) == {"id": 7, "version": 2}
+        assert server.requests == [None, '"user-7-1"', '"user-7-1"', '"user-7-2"']
+
+        assert await client.get_user_by_id(8) is None
+    finally:
+        await client.close()
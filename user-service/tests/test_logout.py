@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from src.auth_service import AuthService
+from src.revocation import RevocationSet
+from src.token_writer import TokenWriter
+
+
+class FakeDatabaseClient:
+    """Таблица refresh токенов Database Service в памяти с той же семантикой"""
+
+    def __init__(self):
+        self.tokens = {}
+
+    async def create_refresh_token(self, token_hash, user_id, expires_at):
+        await self.create_refresh_tokens([{"token_hash": token_hash, "user_id": user_id}])
+
+    async def create_refresh_tokens(self, tokens):
+        # INSERT ... ON CONFLICT (token_hash) DO NOTHING
+        for token in tokens:
+            self.tokens.setdefault(token["token_hash"], {"user_id": token["user_id"], "is_revoked": False})
+        return {"created": len(tokens)}
+
+    async def revoke_refresh_token(self, token_hash, user_id=None, expires_at=None):
+        token = self.tokens.get(token_hash)
+        if token is None:
+            if user_id is None or expires_at is None:
+                return False
+            self.tokens[token_hash] = {"user_id": user_id, "is_revoked": True}
+            return True
+        token["is_revoked"] = True
+        return True
+
+    def is_active(self, token_hash):
+        token = self.tokens.get(token_hash)
+        return token is not None and not token["is_revoked"]
+
+
+@pytest.fixture
+def db_client():
+    return FakeDatabaseClient()
+
+
+@pytest.fixture
+def make_worker(db_client):
+    """AuthService воркера User Service над общей таблицей токенов db_client"""
+    def make(write_behind=True) -> AuthService:
+        writer = TokenWriter(db_client=db_client, enabled=write_behind, delay=60)
+        return AuthService(
+            db_client=db_client,
+            admission=object(),
+            revocations=RevocationSet(db_client=db_client, interval=0),
+            token_writer=writer
+        )
+    return make
+
+
+async def test_logout_on_other_worker_wins_over_pending_write(db_client, make_worker):
+    login_worker, logout_worker = make_worker(), make_worker()
+
+    refresh_token = login_worker._create_refresh_token({"sub": "tester", "user_id": 7})
+    token_hash = login_worker._hash_token(refresh_token)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    await login_worker.token_writer.save(token_hash, 7, expires_at)
+    assert login_worker.token_writer.is_pending(token_hash)
+
+    await logout_worker.logout(refresh_token)
+    await login_worker.token_writer.flush()
+    assert db_client.is_active(token_hash) is False
+
+
+async def test_logout_flushes_own_pending_token_first(db_client, make_worker):
+    worker = make_worker()
+    refresh_token = worker._create_refresh_token({"sub": "tester", "user_id": 7})
+    token_hash = worker._hash_token(refresh_token)
+    await worker.token_writer.save(token_hash, 7, datetime.now(timezone.utc) + timedelta(days=7))
+
+    await worker.logout(refresh_token)
+    assert not worker.token_writer.is_pending(token_hash)
+    assert db_client.tokens[token_hash]["is_revoked"]
+
+
+async def test_logout_with_forged_token_fails(make_worker):
+    worker = make_worker(write_behind=False)
+    refresh_token = worker._create_refresh_token({"sub": "tester", "user_id": 7})
+    header, payload, signature = refresh_token.split(".")
+    forged = f"{header}.{payload}.{signature[::-1]}"
+    with pytest.raises(HTTPException) as error:
+        await worker.logout(forged)
+    assert error.value.status_code == 401
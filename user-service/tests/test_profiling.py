@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from starlette.concurrency import run_in_threadpool
+
+from src import profiling
+from src.profiling import WORKER_ROOT, ProfileStore, ProfilingMiddleware, ProfilingState
+
+
+def _record(profile_id: str, duration_ms: float):
+    return {"id": profile_id, "duration_ms": duration_ms, "format": "collapsed", "profile": "a;b 1"}
+
+
+def test_store_keeps_slowest():
+    store = ProfileStore(2)
+    for i, duration in enumerate([5, 1, 9, 3]):
+        store.add(_record(str(i), duration))
+    assert [r["id"] for r in store.get_slowest()] == ["2", "0"]
+
+
+def test_store_zero_slowest_is_disabled():
+    store = ProfileStore(0)
+    store.add(_record("a", 1))
+    store.add(_record("b", 2))
+    assert store.get_slowest() == []
+    assert store.get("b") is None
+
+
+async def test_middleware_dumps_profile_to_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    state = ProfilingState()
+    state.mode = "cprofile"
+    state.sample_rate = 1.0
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    await ProfilingMiddleware(app, state)(scope, None, send)
+    [dumped] = list(tmp_path.iterdir())
+    assert dumped.suffix == ".txt"
+    assert dumped.stem == state.store.get_slowest()[0]["id"]
+
+
+def hot_hash(seconds: float) -> int:
+    """Занимает поток пула, как хеширование пароля"""
+    end = time.perf_counter() + seconds
+    rounds = 0
+    while time.perf_counter() < end:
+        rounds += 1
+    return rounds
+
+
+async def _profile(state: ProfilingState, app) -> str:
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/login", "headers": []}
+    await ProfilingMiddleware(app, state)(scope, None, send)
+    [record] = state.store.get_slowest()
+    return state.store.get(record["id"])["profile"]
+
+
+@pytest.mark.parametrize("mode", ["sample", "cprofile"])
+async def test_threadpool_work_of_request_is_profiled(mode):
+    state = ProfilingState()
+    state.mode = mode
+    state.sample_rate = 1.0
+
+    async def app(scope, receive, send):
+        await run_in_threadpool(hot_hash, 0.1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    profile = await _profile(state, app)
+    worker_stacks = [line for line in profile.splitlines() if line.startswith(WORKER_ROOT)]
+    assert any("hot_hash" in line for line in worker_stacks)
+
+
+async def test_threadpool_work_of_other_requests_is_not_profiled():
+    state = ProfilingState()
+    state.sample_rate = 1.0
+    started = threading.Event()
+
+    def other_request():
+        started.set()
+        hot_hash(0.2)
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.1)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    # Работа запускается вне профилируемого запроса, но выполняется во время него
+    other = asyncio.ensure_future(run_in_threadpool(other_request))
+    await asyncio.to_thread(started.wait)
+    profile = await _profile(state, app)
+    await other
+    assert "hot_hash" not in profile
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+from array import array
+
+import httpx
+import pytest
+
+from src import revocation
+from src.database_client import DatabaseClient
+from src.revocation import RevocationSet
+
+BLOOM_BITS = 1024
+BLOOM_HASHES = 7
+
+
+def _hash(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def _prefixes(hashes) -> str:
+    # uint64 little-endian, как в src/revocation.py Database Service
+    return base64.b64encode(array("Q", sorted(int(h[:16], 16) for h in hashes)).tobytes()).decode()
+
+
+def _bloom(hashes) -> str:
+    bloom = bytearray(BLOOM_BITS // 8)
+    for token_hash in hashes:
+        for i in range(BLOOM_HASHES):
+            position = int(token_hash[8 * i:8 * i + 8], 16) % BLOOM_BITS
+            bloom[position >> 3] |= 1 << (position & 7)
+    return base64.b64encode(bytes(bloom)).decode()
+
+
+class RevocationServer:
+    """Database Service на httpx.MockTransport: снимок без since, дельта с since"""
+
+    def __init__(self):
+        self.active = {_hash("a"), _hash("b")}
+        self.revoked = {_hash("old")}
+        self.delta_active, self.delta_revoked = set(), set()
+        self.version = 100.0
+        self.since = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        since = request.url.params.get("since")
+        self.since.append(float(since) if since else None)
+        self.version += 1
+        if since is None:
+            return httpx.Response(200, json={
+                "version": self.version, "full": True, "prefixes": _prefixes(self.active),
+                "bloom": _bloom(self.revoked), "bloom_bits": BLOOM_BITS, "bloom_hashes": BLOOM_HASHES
+            })
+        return httpx.Response(200, json={
+            "version": self.version, "full": False, "prefixes": _prefixes(self.delta_active),
+            "revoked": sorted(self.delta_revoked)
+        })
+
+
+@pytest.fixture
+def server():
+    return RevocationServer()
+
+
+@pytest.fixture
+def revocations(server):
+    return RevocationSet(DatabaseClient("http://database", transport=httpx.MockTransport(server)), interval=1)
+
+
+async def test_snapshot_confirms_only_known_unrevoked_tokens(revocations, server):
+    assert not revocations.confirms(_hash("a"))  # снимка еще нет
+    await revocations.sync()
+    assert revocations.confirms(_hash("a")) and revocations.confirms(_hash("b"))
+    # Отозванный попадает в фильтр, неизвестный и не-sha256 идут в базу
+    assert not revocations.confirms(_hash("old"))
+    assert not revocations.confirms(_hash("new"))
+    assert not revocations.confirms("not-a-sha256")
+
+
+async def test_deltas_are_applied_on_top_of_snapshot(revocations, server, monkeypatch):
+    await revocations.sync()
+    server.delta_active = {_hash("new")}
+    server.delta_revoked = {_hash("b")}
+    await revocations.sync()
+    assert server.since == [None, 101.0]
+    assert revocations.confirms(_hash("new"))
+    assert not revocations.confirms(_hash("b"))
+    assert revocations.confirms(_hash("a"))
+
+    # Полный снимок сбрасывает накопленные дельты
+    monkeypatch.setattr(revocation, "REVOCATION_SNAPSHOT_INTERVAL", 0)
+    server.active = {_hash("a"), _hash("b")}
+    await revocations.sync()
+    assert server.since[-1] is None
+    assert not revocations.confirms(_hash("new"))
+    assert revocations.confirms(_hash("b"))
+
+
+async def test_local_changes_and_staleness(revocations, server, monkeypatch):
+    await revocations.sync()
+    revocations.added(_hash("local"))
+    revocations.revoked(_hash("a"))
+    assert revocations.confirms(_hash("local"))
+    assert not revocations.confirms(_hash("a"))
+
+    # Устаревший снимок не используется
+    monkeypatch.setattr(revocation, "REVOCATION_MAX_STALENESS", -1)
+    assert not revocations.confirms(_hash("b"))
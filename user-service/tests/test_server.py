@@ -0,0 +1,16 @@
+from src import server
+
+
+def test_production_run_trusts_configured_proxies(monkeypatch):
+    calls = []
+    monkeypatch.setattr(server, "DEBUG", False)
+    monkeypatch.setattr(server, "FORWARDED_ALLOW_IPS", "10.0.0.2,10.0.0.3")
+    monkeypatch.setattr(server.uvicorn, "run", lambda app, **kwargs: calls.append(kwargs))
+    monkeypatch.setenv("WORKERS", "2")
+
+    server.run()
+
+    [kwargs] = calls
+    assert kwargs["proxy_headers"] is True
+    assert kwargs["forwarded_allow_ips"] == "10.0.0.2,10.0.0.3"
+    assert kwargs["workers"] == 2